@@ -0,0 +1,39 @@
+"""add_daily_facts_table
+
+Revision ID: 3f9d2c7a1b4e
+Revises: 0731b6445e36
+Create Date: 2026-10-19 09:12:41.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9d2c7a1b4e'
+down_revision: Union[str, None] = '0731b6445e36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_facts',
+    sa.Column('fact_date', sa.Date(), nullable=False),
+    sa.Column('crop_id', sa.Integer(), nullable=False),
+    sa.Column('sales_amount', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('sales_quantity_kg', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('purchases_amount', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('purchases_count', sa.Integer(), nullable=False),
+    sa.Column('purchases_quantity_kg', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('expenses_amount', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('expenses_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('fact_date', 'crop_id')
+    )
+    # The table is filled on the next application start (bootstrap -> ensure_daily_facts)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_facts')
@@ -0,0 +1,40 @@
+"""notification_dedup_key_per_episode
+
+Revision ID: 4c7e2a9f1b38
+Revises: 7d3c9a5e1f86
+Create Date: 2026-10-20 10:12:37.504113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c7e2a9f1b38'
+down_revision: Union[str, None] = '7d3c9a5e1f86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A key now stays on its notification (read or not) until the alert condition clears,
+    # so keep it only on the latest notification per key before making it unique
+    op.execute(
+        "UPDATE notifications SET dedup_key = NULL "
+        "WHERE dedup_key IS NOT NULL AND notification_id NOT IN "
+        "(SELECT MAX(notification_id) FROM notifications WHERE dedup_key IS NOT NULL GROUP BY dedup_key)"
+    )
+    op.drop_index('uq_notifications_unread_dedup_key', table_name='notifications')
+    op.create_index('uq_notifications_dedup_key', 'notifications', ['dedup_key'], unique=True,
+                    sqlite_where=sa.text("dedup_key IS NOT NULL"))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_notifications_dedup_key', table_name='notifications')
+    op.execute(
+        "UPDATE notifications SET dedup_key = NULL WHERE is_read = 1"
+    )
+    op.create_index('uq_notifications_unread_dedup_key', 'notifications', ['dedup_key'], unique=True,
+                    sqlite_where=sa.text("is_read = 0"))
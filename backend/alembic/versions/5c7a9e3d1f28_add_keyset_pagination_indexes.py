@@ -0,0 +1,31 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: 5c7a9e3d1f28
+Revises: 8b1e4d6f2a90
+Create Date: 2026-10-19 12:14:41.902315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7a9e3d1f28'
+down_revision: Union[str, None] = '8b1e4d6f2a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_purchases_purchase_date_purchase_id', 'purchases', ['purchase_date', 'purchase_id'], unique=False)
+    op.create_index('ix_sales_sale_date_sale_id', 'sales', ['sale_date', 'sale_id'], unique=False)
+    op.create_index('ix_general_ledger_entry_date_entry_id', 'general_ledger', ['entry_date', 'entry_id'], unique=False)
+    op.create_index('ix_expenses_expense_date_expense_id', 'expenses', ['expense_date', 'expense_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_expenses_expense_date_expense_id', table_name='expenses')
+    op.drop_index('ix_general_ledger_entry_date_entry_id', table_name='general_ledger')
+    op.drop_index('ix_sales_sale_date_sale_id', table_name='sales')
+    op.drop_index('ix_purchases_purchase_date_purchase_id', table_name='purchases')
@@ -0,0 +1,29 @@
+"""add_report_job_lease
+
+Revision ID: 6e1b8d4a2c57
+Revises: 4c7e2a9f1b38
+Create Date: 2026-10-20 14:26:09.318842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1b8d4a2c57'
+down_revision: Union[str, None] = '4c7e2a9f1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Active jobs without a lease (created before this revision) are treated as expired
+    op.add_column('report_jobs', sa.Column('locked_by', sa.String(), nullable=True))
+    op.add_column('report_jobs', sa.Column('locked_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('report_jobs', 'locked_until')
+    op.drop_column('report_jobs', 'locked_by')
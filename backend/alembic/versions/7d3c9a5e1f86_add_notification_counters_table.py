@@ -0,0 +1,36 @@
+"""add_notification_counters_table
+
+Revision ID: 7d3c9a5e1f86
+Revises: 2b8e5d1f4c93
+Create Date: 2026-10-19 19:31:42.118506
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3c9a5e1f86'
+down_revision: Union[str, None] = '2b8e5d1f4c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_counters',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # user_id 0 = system-wide notifications (user_id NULL)
+    op.execute(
+        "INSERT INTO notification_counters (user_id, unread_count) "
+        "SELECT COALESCE(user_id, 0), COUNT(*) FROM notifications WHERE is_read = 0 "
+        "GROUP BY COALESCE(user_id, 0)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('notification_counters')
@@ -0,0 +1,35 @@
+"""add_report_cache_table
+
+Revision ID: 8b1e4d6f2a90
+Revises: 3f9d2c7a1b4e
+Create Date: 2026-10-19 11:02:17.538402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e4d6f2a90'
+down_revision: Union[str, None] = '3f9d2c7a1b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('report_cache',
+    sa.Column('report_name', sa.String(), nullable=False),
+    sa.Column('params_key', sa.String(), nullable=False),
+    sa.Column('range_start', sa.Date(), nullable=True),
+    sa.Column('range_end', sa.Date(), nullable=True),
+    sa.Column('ledger_watermark', sa.Integer(), nullable=False),
+    sa.Column('result', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('report_name', 'params_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('report_cache')
@@ -0,0 +1,53 @@
+"""add_notification_dedup_key
+
+Revision ID: 9a4f7c2e8b51
+Revises: c5e1a9d3f720
+Create Date: 2026-10-19 18:04:51.227431
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f7c2e8b51'
+down_revision: Union[str, None] = 'c5e1a9d3f720'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('dedup_key', sa.String(), nullable=True))
+
+    # Backfill keys of existing unread alerts so the next sweep does not duplicate them
+    # (the old code matched them by searching the message text)
+    conn = op.get_bind()
+    crops = conn.execute(sa.text("SELECT crop_id, crop_name FROM crops")).fetchall()
+    unread = conn.execute(sa.text(
+        "SELECT notification_id, type, message FROM notifications "
+        "WHERE is_read = 0 AND type IN ('LOW_STOCK', 'OVERDUE_DEBT') ORDER BY notification_id DESC"
+    )).fetchall()
+    seen = set()
+    for notification_id, type_, message in unread:
+        key = None
+        if type_ == 'OVERDUE_DEBT':
+            match = re.search(r"#(\d+)", message)
+            key = f"OVERDUE_DEBT:sale:{match.group(1)}" if match else None
+        else:
+            crop_ids = [crop_id for crop_id, crop_name in crops if crop_name in message]
+            key = f"LOW_STOCK:crop:{crop_ids[0]}" if len(crop_ids) == 1 else None
+        if key and key not in seen:
+            seen.add(key)
+            conn.execute(sa.text("UPDATE notifications SET dedup_key = :key WHERE notification_id = :id"),
+                         {"key": key, "id": notification_id})
+
+    op.create_index('uq_notifications_unread_dedup_key', 'notifications', ['dedup_key'], unique=True,
+                    sqlite_where=sa.text("is_read = 0"))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_notifications_unread_dedup_key', table_name='notifications')
+    op.drop_column('notifications', 'dedup_key')
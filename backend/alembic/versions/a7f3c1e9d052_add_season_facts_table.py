@@ -0,0 +1,41 @@
+"""add_season_facts_table
+
+Revision ID: a7f3c1e9d052
+Revises: d4e8b2a6c913
+Create Date: 2026-10-19 13:48:30.118524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7f3c1e9d052'
+down_revision: Union[str, None] = 'd4e8b2a6c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('season_facts',
+    sa.Column('season_id', sa.Integer(), nullable=False),
+    sa.Column('crop_id', sa.Integer(), nullable=False),
+    sa.Column('sales_amount', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('sales_quantity_kg', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('cogs_amount', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('purchases_amount', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('purchases_count', sa.Integer(), nullable=False),
+    sa.Column('purchases_quantity_kg', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('expenses_amount', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('expenses_count', sa.Integer(), nullable=False),
+    sa.Column('frozen_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('season_id', 'crop_id')
+    )
+    # The table is filled on the next application start (bootstrap -> ensure_season_facts)
+
+
+def downgrade() -> None:
+    op.drop_table('season_facts')
@@ -0,0 +1,44 @@
+"""add_report_jobs_table
+
+Revision ID: b3d9f2c7e614
+Revises: a7f3c1e9d052
+Create Date: 2026-10-19 15:12:07.402816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9f2c7e614'
+down_revision: Union[str, None] = 'a7f3c1e9d052'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('report_jobs',
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('report_name', sa.String(), nullable=False),
+    sa.Column('params_key', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index(op.f('ix_report_jobs_status'), 'report_jobs', ['status'], unique=False)
+    op.create_index('uq_report_jobs_active', 'report_jobs', ['report_name', 'params_key'], unique=True,
+                    sqlite_where=sa.text("status IN ('PENDING', 'RUNNING')"))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_report_jobs_active', table_name='report_jobs')
+    op.drop_index(op.f('ix_report_jobs_status'), table_name='report_jobs')
+    op.drop_table('report_jobs')
@@ -0,0 +1,42 @@
+"""add_treasury_day_closes_table
+
+Revision ID: c5e1a9d3f720
+Revises: e6a2c8f4b137
+Create Date: 2026-10-19 17:21:09.402817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e1a9d3f720'
+down_revision: Union[str, None] = 'e6a2c8f4b137'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('treasury_day_closes',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('close_date', sa.Date(), nullable=False),
+    sa.Column('opening_balance', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('total_in', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('total_out', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('closing_balance', sa.Numeric(precision=18, scale=4), nullable=False),
+    sa.Column('counted_cash', sa.Numeric(precision=18, scale=4), nullable=True),
+    sa.Column('variance', sa.Numeric(precision=18, scale=4), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('closed_at', sa.DateTime(), nullable=True),
+    sa.Column('closed_by', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['account_id'], ['financial_accounts.account_id'], ),
+    sa.ForeignKeyConstraint(['closed_by'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('account_id', 'close_date')
+    )
+    # The table is filled on the next application start (bootstrap -> ensure_treasury_day_closes)
+
+
+def downgrade() -> None:
+    op.drop_table('treasury_day_closes')
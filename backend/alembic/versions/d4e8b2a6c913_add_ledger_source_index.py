@@ -0,0 +1,25 @@
+"""add_ledger_source_index
+
+Revision ID: d4e8b2a6c913
+Revises: 5c7a9e3d1f28
+Create Date: 2026-10-19 13:05:12.447810
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e8b2a6c913'
+down_revision: Union[str, None] = '5c7a9e3d1f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_general_ledger_source_type_source_id', 'general_ledger', ['source_type', 'source_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_general_ledger_source_type_source_id', table_name='general_ledger')
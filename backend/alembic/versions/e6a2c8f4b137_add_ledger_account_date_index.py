@@ -0,0 +1,25 @@
+"""add_ledger_account_date_index
+
+Revision ID: e6a2c8f4b137
+Revises: b3d9f2c7e614
+Create Date: 2026-10-19 16:02:41.835190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a2c8f4b137'
+down_revision: Union[str, None] = 'b3d9f2c7e614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_general_ledger_account_id_entry_date', 'general_ledger', ['account_id', 'entry_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_general_ledger_account_id_entry_date', table_name='general_ledger')
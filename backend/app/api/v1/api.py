@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import contacts, crops, purchases, sales, financial_accounts, reports, expenses, journal, inventory, payments, seasons, sale_returns, purchase_returns, daily_prices, treasury, auth, backup, notifications, contracts, capital, system, transformations
+from app.api.v1.endpoints import contacts, crops, purchases, sales, financial_accounts, reports, expenses, journal, inventory, payments, seasons, sale_returns, purchase_returns, daily_prices, treasury, auth, backup, notifications, contracts, capital, system, transformations, events, exports, report_jobs
 
 api_router = APIRouter()
 
@@ -26,5 +26,8 @@ api_router.include_router(contracts.router, prefix="/contracts", tags=["contract
 api_router.include_router(capital.router, prefix="/capital", tags=["capital"])
 api_router.include_router(system.router, prefix="/system", tags=["system"])
 api_router.include_router(transformations.router, prefix="/transformations", tags=["transformations"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
+api_router.include_router(report_jobs.router, prefix="/report-jobs", tags=["report-jobs"])
 
 
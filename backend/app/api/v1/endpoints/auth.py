@@ -4,6 +4,7 @@ Authentication API Endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
@@ -13,13 +14,13 @@ import json
 
 from app.database import SessionLocal
 from app.auth.jwt import (
-    verify_password, 
-    get_password_hash, 
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
     Token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from app.auth.dependencies import get_db, get_current_user, require_admin
+from app.auth.dependencies import get_db, get_current_user, require_admin, invalidate_auth_cache
 from app import models
 
 
@@ -94,38 +95,21 @@ class RoleResponse(BaseModel):
 # Authentication Endpoints
 # ============================================
 
-@router.post("/login", response_model=Token)
-async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
-):
-    """تسجيل الدخول"""
-    # البحث عن المستخدم
-    user = db.query(models.User).filter(
-        models.User.username == form_data.username
-    ).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="اسم المستخدم أو كلمة المرور غير صحيحة",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    # التحقق من كلمة المرور
-    if not verify_password(form_data.password, user.password_hash):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="اسم المستخدم أو كلمة المرور غير صحيحة",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    # التحقق من أن الحساب نشط
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="الحساب معطل"
-        )
+def _find_credentials(db: Session, username: str):
+    """
+    (user_id, password_hash, is_active) بدون تحميل المستخدم، ثم إنهاء المعاملة
+    حتى لا يبقى اتصال قاعدة البيانات محجوزاً أثناء انتظار التحقق من كلمة المرور
+    """
+    credentials = db.query(
+        models.User.user_id, models.User.password_hash, models.User.is_active
+    ).filter(models.User.username == username).first()
+    db.rollback()
+    return credentials
+
+
+def _issue_token(db: Session, user_id: int) -> dict:
+    """تسجيل وقت الدخول وإنشاء الـ token بصلاحيات الدور"""
+    user = db.get(models.User, user_id)
     
     # الحصول على صلاحيات الدور
     role = db.query(models.Role).filter(
@@ -144,6 +128,7 @@ async def login(
     # تحديث وقت آخر تسجيل دخول
     user.last_login = datetime.utcnow()
     db.commit()
+    invalidate_auth_cache(user.username)
     
     # إنشاء الـ token
     access_token = create_access_token(
@@ -159,6 +144,44 @@ async def login(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@router.post("/login", response_model=Token)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    تسجيل الدخول
+    الاستعلامات في threadpool والتحقق من كلمة المرور (PBKDF2) بحد توازي منفصل،
+    فلا تتوقف باقي الطلبات أثناء موجة تسجيل دخول
+    """
+    # البحث عن المستخدم
+    user = await run_in_threadpool(_find_credentials, db, form_data.username)
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="اسم المستخدم أو كلمة المرور غير صحيحة",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # التحقق من كلمة المرور
+    if not await verify_password_async(form_data.password, user.password_hash):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="اسم المستخدم أو كلمة المرور غير صحيحة",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # التحقق من أن الحساب نشط
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="الحساب معطل"
+        )
+    
+    return await run_in_threadpool(_issue_token, db, user.user_id)
+
+
 @router.post("/logout")
 async def logout(current_user: models.User = Depends(get_current_user)):
     """
@@ -174,7 +197,7 @@ async def logout(current_user: models.User = Depends(get_current_user)):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(
+def get_current_user_info(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -202,7 +225,7 @@ class DashboardConfigUpdate(BaseModel):
     dashboard_config: str
 
 @router.put("/me/config")
-async def update_my_dashboard_config(
+def update_my_dashboard_config(
     config_data: DashboardConfigUpdate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -210,6 +233,7 @@ async def update_my_dashboard_config(
     """تحديث إعدادات لوحة التحكم للمستخدم الحالي"""
     current_user.dashboard_config = config_data.dashboard_config
     db.commit()
+    invalidate_auth_cache(current_user.username)
     return {"message": "تم تحديث الإعدادات بنجاح"}
 
 @router.post("/change-password")
@@ -220,15 +244,16 @@ async def change_password(
 ):
     """تغيير كلمة المرور"""
     # التحقق من كلمة المرور الحالية
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    if not await verify_password_async(password_data.current_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="كلمة المرور الحالية غير صحيحة"
         )
     
     # تحديث كلمة المرور
-    current_user.password_hash = get_password_hash(password_data.new_password)
-    db.commit()
+    current_user.password_hash = await get_password_hash_async(password_data.new_password)
+    await run_in_threadpool(db.commit)
+    invalidate_auth_cache(current_user.username)
     
     return {"message": "تم تغيير كلمة المرور بنجاح"}
 
@@ -238,7 +263,7 @@ async def change_password(
 # ============================================
 
 @router.get("/users", response_model=List[UserResponse])
-async def get_users(
+def get_users(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_admin)
 ):
@@ -268,13 +293,8 @@ async def get_users(
     return result
 
 
-@router.post("/users", response_model=UserResponse)
-async def create_user(
-    user_data: UserCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_admin)
-):
-    """إنشاء مستخدم جديد"""
+def _insert_user(db: Session, user_data: UserCreate, password_hash: str) -> UserResponse:
+    """إنشاء المستخدم بعد التحقق من الاسم والدور (كلمة المرور مشفرة مسبقاً)"""
     # التحقق من عدم وجود المستخدم
     existing = db.query(models.User).filter(
         models.User.username == user_data.username
@@ -300,7 +320,7 @@ async def create_user(
     # إنشاء المستخدم
     new_user = models.User(
         username=user_data.username,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         full_name=user_data.full_name,
         email=user_data.email,
         phone=user_data.phone,
@@ -327,8 +347,19 @@ async def create_user(
     )
 
 
+@router.post("/users", response_model=UserResponse)
+async def create_user(
+    user_data: UserCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """إنشاء مستخدم جديد"""
+    password_hash = await get_password_hash_async(user_data.password)
+    return await run_in_threadpool(_insert_user, db, user_data, password_hash)
+
+
 @router.put("/users/{user_id}", response_model=UserResponse)
-async def update_user(
+def update_user(
     user_id: int,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
@@ -360,6 +391,7 @@ async def update_user(
         user.dashboard_config = user_data.dashboard_config
     
     db.commit()
+    invalidate_auth_cache()
     db.refresh(user)
     
     role = db.query(models.Role).filter(
@@ -384,7 +416,7 @@ async def update_user(
 
 
 @router.delete("/users/{user_id}")
-async def delete_user(
+def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_admin)
@@ -415,6 +447,7 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    invalidate_auth_cache()
     
     return {"message": "تم حذف المستخدم بنجاح"}
 
@@ -424,7 +457,7 @@ async def delete_user(
 # ============================================
 
 @router.get("/roles", response_model=List[RoleResponse])
-async def get_roles(
+def get_roles(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -451,7 +484,7 @@ async def get_roles(
 
 
 @router.post("/roles", response_model=RoleResponse)
-async def create_role(
+def create_role(
     role_data: RoleCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(require_admin)
@@ -477,6 +510,7 @@ async def create_role(
     
     db.add(new_role)
     db.commit()
+    invalidate_auth_cache()
     db.refresh(new_role)
     
     return RoleResponse(
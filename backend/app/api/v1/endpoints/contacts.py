@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
@@ -7,6 +7,7 @@ from datetime import date
 from app import crud, schemas
 from app.api.v1.endpoints.crops import get_db
 from app.services import account_statement
+from app.core.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -15,8 +16,17 @@ def create_contact(contact: schemas.ContactCreate, db: Session = Depends(get_db)
     return crud.create_contact(db=db, contact=contact)
 
 @router.get("/", response_model=List[schemas.Contact])
-def read_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    contacts = crud.get_contacts(db, skip=skip, limit=limit)
+def read_contacts(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_count: bool = False,
+    db: Session = Depends(get_db)
+):
+    """قائمة جهات التعامل؛ الصفحة التالية عبر المؤشر في ترويسة X-Next-Cursor"""
+    contacts = crud.get_contacts(db, skip=skip, limit=limit, cursor=cursor, with_count=with_count)
+    set_page_headers(response, contacts)
     return contacts
 
 @router.get("/customers/balances")
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
 from app import crud, schemas
 from app.database import get_db
+from app.core.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -14,19 +15,26 @@ def create_daily_price(price: schemas.DailyPriceCreate, db: Session = Depends(ge
 
 @router.get("/", response_model=List[schemas.DailyPriceRead])
 def get_daily_prices(
+    response: Response,
     crop_id: Optional[int] = Query(None, description="Filter by crop ID"),
     start_date: Optional[date] = Query(None, description="Start date for filtering"),
     end_date: Optional[date] = Query(None, description="End date for filtering"),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    with_count: bool = False,
     db: Session = Depends(get_db)
 ):
     """Get daily prices with optional filters"""
-    return crud.get_daily_prices(
+    prices = crud.get_daily_prices(
         db, 
         crop_id=crop_id, 
         start_date=start_date, 
         end_date=end_date, 
         skip=skip, 
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        with_count=with_count
     )
+    set_page_headers(response, prices)
+    return prices
@@ -0,0 +1,148 @@
+"""
+Server-Sent Events
+بث التحديثات الحية للوحة التحكم والتنبيهات والخزينة
+
+- لوحة التحكم الخاملة لا تولد أي حمل على قاعدة البيانات: الاتصال ينتظر على ناقل الأحداث
+- المؤشرات يعاد قراءتها (من الذاكرة المؤقتة) فقط عند تغير جدول تعتمد عليه، ويرسل الفرق فقط
+- EventSource في المتصفح لا يدعم الترويسات، لذلك يمرر الـ token كمعامل في الرابط
+- المستخدم يُتحقق منه مثل get_current_user عند الاتصال وكل ACCESS_CHECK_SECONDS أثناء البث
+  (الحساب المحذوف أو المعطل ينقطع بثه)؛ المؤشرات والخزينة لمن لديه صلاحية الـ endpoints المقابلة فقط
+"""
+import asyncio
+import json
+import time
+from typing import NamedTuple
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from app.auth.dependencies import _get_role_permissions, _get_user
+from app.auth.jwt import decode_token
+from app.core.event_bus import event_bus
+from app.database import SessionLocal
+from app.services import dashboard
+
+router = APIRouter()
+
+# فترة رسالة الإبقاء على الاتصال (للبروكسيات)
+KEEPALIVE_SECONDS = 15
+# تجميع دفعات الترحيل المتتالية في رسالة واحدة
+DEBOUNCE_SECONDS = 0.25
+# إعادة التحقق من المستخدم وصلاحياته أثناء البث (من ذاكرة المصادقة غالباً)
+ACCESS_CHECK_SECONDS = 15
+
+KPI_PERMISSION = "dashboard:view"
+TREASURY_PERMISSION = "treasury:read"
+
+
+class _Access(NamedTuple):
+    user_id: int
+    kpis: bool
+    treasury: bool
+
+
+async def _stream_access(username: str) -> _Access:
+    """المستخدم الحالي وما يحق له استقباله (نفس فحوص get_current_user و require_permissions)"""
+    db = SessionLocal()
+    try:
+        user = await _get_user(db, username)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="غير مصرح - يرجى تسجيل الدخول"
+            )
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="الحساب معطل"
+            )
+        if user.is_superuser:
+            return _Access(user.user_id, True, True)
+        permissions = await _get_role_permissions(db, user.role_id) or frozenset()
+        return _Access(user.user_id, KPI_PERMISSION in permissions, TREASURY_PERMISSION in permissions)
+    finally:
+        db.close()
+
+
+def _format(event_type: str, data) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+
+def _read_kpis() -> dict:
+    db = SessionLocal()
+    try:
+        return dashboard.get_dashboard_kpis(db)
+    finally:
+        db.close()
+
+
+async def _event_stream(request: Request, username: str, access: _Access):
+    subscription = event_bus.subscribe()
+    try:
+        kpis = {}
+        if access.kpis:
+            kpis = await run_in_threadpool(_read_kpis)
+            yield _format("kpis", kpis)
+        checked_at = time.monotonic()
+
+        while True:
+            event = await subscription.get(timeout=KEEPALIVE_SECONDS)
+            if await request.is_disconnected():
+                break
+            if time.monotonic() - checked_at >= ACCESS_CHECK_SECONDS:
+                try:
+                    access = await _stream_access(username)
+                except HTTPException:
+                    break
+                checked_at = time.monotonic()
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+
+            await asyncio.sleep(DEBOUNCE_SECONDS)
+            changed = set()
+            for item in [event] + subscription.drain():
+                if item["type"] == "changes":
+                    changed.update(item["data"])
+                elif item["type"] == "notification":
+                    if item["data"]["user_id"] in (None, access.user_id):
+                        yield _format("notification", item["data"])
+                elif item["type"] == "treasury":
+                    if access.treasury:
+                        yield _format("treasury", item["data"])
+                else:
+                    yield _format(item["type"], item["data"])
+
+            if access.kpis and changed & dashboard.KPI_TABLES:
+                fresh = await run_in_threadpool(_read_kpis)
+                delta = {k: v for k, v in fresh.items() if kpis.get(k) != v}
+                kpis = fresh
+                if delta:
+                    yield _format("kpi_delta", delta)
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_events(request: Request, token: str = Query(...)):
+    """
+    بث SSE للتحديثات الحية
+    الأحداث: kpis (لقطة أولى)، kpi_delta، notification، treasury
+    kpis / kpi_delta تتطلب dashboard:view و treasury تتطلب treasury:read
+    """
+    token_data = decode_token(token)
+    if token_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="غير مصرح - يرجى تسجيل الدخول"
+        )
+
+    access = await _stream_access(token_data.username)
+
+    return StreamingResponse(
+        _event_stream(request, token_data.username, access),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
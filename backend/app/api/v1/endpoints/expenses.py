@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, models, schemas
 from app.database import SessionLocal
+from app.core.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -32,11 +33,20 @@ def create_expense(
     return crud.create_expense(db=db, expense=expense, user_id=current_user.user_id)
 
 @router.get("/", response_model=List[schemas.ExpenseRead])
-def read_expenses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_expenses(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_count: bool = False,
+    db: Session = Depends(get_db)
+):
     """
-    Retrieve all expenses.
+    Retrieve expenses, newest first.
+    The next page is requested with the cursor returned in the X-Next-Cursor header.
     """
-    expenses = crud.get_expenses(db, skip=skip, limit=limit)
+    expenses = crud.get_expenses(db, skip=skip, limit=limit, cursor=cursor, with_count=with_count)
+    set_page_headers(response, expenses)
     return expenses
 
 @router.put("/{expense_id}", response_model=schemas.ExpenseRead)
@@ -0,0 +1,62 @@
+"""
+Streaming Exports
+تصدير دفتر الأستاذ والقوائم بصيغة CSV أو XLSX كملف متدفق
+"""
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app import models
+from app.auth.dependencies import require_permissions
+from app.database import get_db
+from app.services import exports, parquet_export
+
+router = APIRouter()
+
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: str,
+    file_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    start_date: Optional[date] = Query(None, description="Start date"),
+    end_date: Optional[date] = Query(None, description="End date"),
+    _: models.User = Depends(require_permissions(["reports:export"]))
+):
+    """
+    تصدير مجموعة بيانات: ledger, sales, purchases, payments, expenses
+    أول البايتات تصل فوراً والذاكرة ثابتة مهما كان عدد الصفوف
+    """
+    if dataset not in exports.EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail="نوع التصدير غير موجود")
+
+    filename = f"{dataset}_{start_date or 'all'}_{end_date or date.today()}.{file_format}"
+    return StreamingResponse(
+        exports.stream_export(dataset, file_format, start_date, end_date),
+        media_type=exports.EXPORT_FORMATS[file_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.post("/parquet")
+def run_parquet_export(
+    tables: Optional[List[str]] = Query(None, description="Tables to export (default: all)"),
+    full: bool = Query(False, description="Rebuild from scratch instead of appending new rows"),
+    db: Session = Depends(get_db),
+    _: models.User = Depends(require_permissions(["reports:export"]))
+):
+    """
+    تصدير تزايدي لجداول الحقائق إلى ملفات Parquet (مقسمة حسب الشهر والمحصول)
+    يكتب الصفوف الجديدة فقط منذ آخر تشغيل
+    """
+    return parquet_export.export_parquet(db, tables, full)
+
+
+@router.get("/parquet/manifest")
+def get_parquet_manifest(
+    _: models.User = Depends(require_permissions(["reports:export"]))
+):
+    """الملفات المصدرة والعلامات المائية لكل جدول"""
+    return parquet_export.read_manifest()
@@ -1,12 +1,20 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from app.core.event_bus import event_bus
+from app.database import get_db, SessionLocal
 from app.api.v1.endpoints.auth import get_current_user, UserResponse
-from app.services import alerts
+from app.services import alerts, notification_counters
 
 router = APIRouter()
 
+# تجميع التنبيهات المدرجة في نفس الدفعة في رد واحد
+POLL_DEBOUNCE_SECONDS = 0.25
+# ناقل الأحداث داخل العملية: التنبيهات من عامل آخر (مثل فحص المجدول) تُلتقط بإعادة قراءة العداد
+POLL_RECHECK_SECONDS = 5
+
 @router.get("/", response_model=List[dict])
 def get_notifications(
     skip: int = 0,
@@ -45,10 +53,7 @@ def trigger_alert_check(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """تشغيل فحص التنبيهات يدوياً"""
-    stock_alerts = alerts.check_low_stock(db)
-    debt_alerts = alerts.check_overdue_debts(db)
-    
-    total_new = len(stock_alerts) + len(debt_alerts)
+    total_new = alerts.check_all_alerts(db)
     return {"message": "Alert check completed", "new_alerts": total_new}
 
 @router.put("/{notification_id}/read")
@@ -77,9 +82,59 @@ def get_unread_count(
     db: Session = Depends(get_db),
     current_user: UserResponse = Depends(get_current_user)
 ):
-    """عدد التنبيهات غير المقروءة"""
-    count = db.query(alerts.Notification).filter(
-        (alerts.Notification.user_id == current_user.user_id) | (alerts.Notification.user_id == None),
-        alerts.Notification.is_read == False
-    ).count()
-    return {"count": count}
+    """عدد التنبيهات غير المقروءة (من العدادات في الذاكرة، بدون عدّ جدول التنبيهات)"""
+    return {"count": notification_counters.get_unread_count(db, current_user.user_id)}
+
+
+def _read_unread_count(user_id: int, fresh: bool = False) -> int:
+    db = SessionLocal()
+    try:
+        return notification_counters.get_unread_count(db, user_id, fresh=fresh)
+    finally:
+        db.close()
+
+
+async def _unread_count(user_id: int, fresh: bool = False) -> int:
+    count = None if fresh else notification_counters.cached_unread_count(user_id)
+    return count if count is not None else await run_in_threadpool(_read_unread_count, user_id, fresh)
+
+
+@router.get("/poll")
+async def poll_notifications(
+    count: Optional[int] = Query(None, description="آخر عدد غير مقروء يعرفه العميل"),
+    timeout: int = Query(25, ge=1, le=60),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    استطلاع طويل: يرد فوراً إذا اختلف العدد عن count، وإلا ينتظر حتى يصل تنبيه جديد للمستخدم
+    أو يتغير عدده أو تنتهي المهلة. الانتظار على ناقل الأحداث لا يلمس قاعدة البيانات، ومع عدة عمال
+    يُقرأ صف العداد كل POLL_RECHECK_SECONDS لالتقاط ما كتبه عامل آخر
+    """
+    user_id = current_user.user_id
+    buckets = {notification_counters.bucket(user_id), notification_counters.BROADCAST}
+    subscription = event_bus.subscribe()
+    try:
+        current = await _unread_count(user_id)
+        notifications = []
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while current == count and not notifications:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            event = await subscription.get(timeout=min(remaining, POLL_RECHECK_SECONDS))
+            if event is None:
+                current = await _unread_count(user_id, fresh=True)
+                continue
+            await asyncio.sleep(POLL_DEBOUNCE_SECONDS)
+            changed = False
+            for item in [event] + subscription.drain():
+                if item["type"] == "notification" and item["data"]["user_id"] in (None, user_id):
+                    notifications.append(item["data"])
+                elif item["type"] == "unread" and (not item["data"] or buckets & set(item["data"])):
+                    changed = True
+            if changed or notifications:
+                current = await _unread_count(user_id)
+        return {"count": current, "notifications": notifications}
+    finally:
+        event_bus.unsubscribe(subscription)
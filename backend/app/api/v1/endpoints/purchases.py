@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import json
 
 from app import crud, schemas
 from app.api.v1.endpoints.crops import get_db # Reuse the get_db dependency
 from app.services import purchasing
 from app.core.idempotency import check_idempotency
+from app.core.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -50,12 +51,21 @@ def create_purchase(
     return purchasing.create_new_purchase(db=db, purchase=purchase, user_id=current_user.user_id)
 
 @router.get("/", response_model=List[schemas.PurchaseRead])
-def read_purchases(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_purchases(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_count: bool = False,
+    db: Session = Depends(get_db)
+):
     """
     Retrieve a list of purchases with crop and supplier details.
     This function now manually constructs the response to handle nested JSON strings.
+    The next page is requested with the cursor returned in the X-Next-Cursor header.
     """
-    db_purchases = crud.get_purchases(db, skip=skip, limit=limit)
+    db_purchases = crud.get_purchases(db, skip=skip, limit=limit, cursor=cursor, with_count=with_count)
+    set_page_headers(response, db_purchases)
     
     response_purchases = []
     for p in db_purchases:
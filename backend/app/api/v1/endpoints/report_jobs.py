@@ -0,0 +1,58 @@
+"""
+Report Jobs
+تشغيل التقارير الثقيلة في الخلفية ومتابعة حالتها ونتيجتها
+"""
+from typing import Any
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.auth.dependencies import require_permissions
+from app.database import get_db
+from app.services import report_jobs
+
+router = APIRouter()
+
+
+@router.post("", response_model=schemas.ReportJobRead, status_code=202)
+def submit_report_job(
+    request: schemas.ReportJobCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_permissions(["reports:view"]))
+):
+    """
+    إرسال تقرير للتنفيذ في الخلفية
+    طلب مطابق لمهمة قيد التنفيذ يُرجع نفس المهمة
+    """
+    return report_jobs.submit_report_job(db, request.report_name, request.params, current_user.user_id)
+
+
+@router.get("/{job_id}", response_model=schemas.ReportJobRead)
+def get_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    _: models.User = Depends(require_permissions(["reports:view"]))
+):
+    """حالة المهمة: PENDING / RUNNING / DONE / FAILED / CANCELLED"""
+    return report_jobs.get_report_job(db, job_id)
+
+
+@router.get("/{job_id}/result")
+def get_report_job_result(
+    job_id: str,
+    db: Session = Depends(get_db),
+    _: models.User = Depends(require_permissions(["reports:view"]))
+) -> Any:
+    """نتيجة المهمة المكتملة (409 إذا لم تنته بعد)"""
+    return report_jobs.get_report_job_result(db, job_id)
+
+
+@router.post("/{job_id}/cancel", response_model=schemas.ReportJobRead)
+def cancel_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    _: models.User = Depends(require_permissions(["reports:view"]))
+):
+    """إلغاء مهمة منتظرة أو جارية"""
+    return report_jobs.cancel_report_job(db, job_id)
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Any, Dict, Optional
 from datetime import date
 
 from app.services import reporting, dashboard
 from app.services import capital_distribution
-from app.services.accounting_engine import get_engine
 from app.api.v1.endpoints.crops import get_db
+from app.auth.dependencies import get_current_user, get_db as get_auth_db
+from app.core.pagination import set_page_headers
+from app import models
 from app.schemas import GeneralLedger, FinancialAccount, BaseModel, CapitalDistributionReport
 
 router = APIRouter()
@@ -58,12 +60,20 @@ class EquityStatementResponse(BaseModel):
 
 @router.get("/general-ledger", response_model=List[GeneralLedgerRead])
 def get_general_ledger(
+    response: Response,
     start_date: Optional[date] = Query(None, description="Start date"),
     end_date: Optional[date] = Query(None, description="End date"),
     account_id: Optional[int] = Query(None, description="Filter by account ID"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (cursor pagination)"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    with_count: bool = False,
     db: Session = Depends(get_db)
 ):
-    return reporting.get_general_ledger_entries(db, start_date, end_date, account_id)
+    entries = reporting.get_general_ledger_entries(
+        db, start_date, end_date, account_id, limit=limit, cursor=cursor, with_count=with_count
+    )
+    set_page_headers(response, entries)
+    return entries
 
 @router.get("/trial-balance", response_model=List[TrialBalanceEntry])
 def get_trial_balance(
@@ -95,9 +105,38 @@ def get_equity_statement(
 ):
     return reporting.generate_equity_statement(db, start_date=start_date, end_date=end_date)
 
+# --- القوائم متعددة الفترات (عمود لكل فترة) ---
+PERIOD_PATTERN = "^(month|quarter|year)$"
+
+@router.get("/income-statement/periods")
+def get_income_statement_periods(
+    start_date: date = Query(..., description="Start date, format YYYY-MM-DD"),
+    end_date: date = Query(..., description="End date, format YYYY-MM-DD"),
+    granularity: str = Query("month", pattern=PERIOD_PATTERN, description="month | quarter | year"),
+    db: Session = Depends(get_db)
+):
+    """قائمة الدخل لكل فترة بين التاريخين"""
+    return reporting.generate_income_statement_periods(db, start_date, end_date, granularity)
+
+@router.get("/balance-sheet/periods")
+def get_balance_sheet_periods(
+    start_date: date = Query(..., description="Start date, format YYYY-MM-DD"),
+    end_date: date = Query(..., description="End date, format YYYY-MM-DD"),
+    granularity: str = Query("month", pattern=PERIOD_PATTERN, description="month | quarter | year"),
+    db: Session = Depends(get_db)
+):
+    """الميزانية في نهاية كل فترة بين التاريخين"""
+    return reporting.generate_balance_sheet_periods(db, start_date, end_date, granularity)
+
 @router.get("/dashboard-kpis")
-def get_dashboard_kpis(db: Session = Depends(get_db)):
-    return dashboard.get_dashboard_kpis(db)
+def get_dashboard_kpis(response: Response, db: Session = Depends(get_db)):
+    """
+    مؤشرات الأداء الرئيسية (من الذاكرة المؤقتة عند عدم وجود ترحيلات جديدة)
+    الترويسة X-Cache توضح الحالة: HIT / PARTIAL / MISS
+    """
+    kpis, cache_status = dashboard.get_dashboard_kpis_cached(db)
+    response.headers["X-Cache"] = cache_status
+    return kpis
 
 @router.get("/dashboard-alerts")
 def get_dashboard_alerts(db: Session = Depends(get_db)):
@@ -140,44 +179,7 @@ def check_system_balance(db: Session = Depends(get_db)):
         has_discrepancy: هل يوجد فرق بين المخزون الدفتري والفعلي
         discrepancy_amount: قيمة الفرق في المخزون
     """
-    engine = get_engine(db)
-    dual_report = engine.validate_dual_balance()
-    
-    ledger = dual_report.ledger_balance
-    physical = dual_report.physical_balance
-    
-    return {
-        # المعاملات غير المتوازنة (المسبب المحتمل للفرق)
-        "unbalanced_transactions": engine.get_unbalanced_transactions(),
-        
-        # التوازن الدفتري (الأساسي - يتطابق مع ميزان المراجعة)
-        "is_balanced": ledger.is_balanced,
-        "difference": str(ledger.difference),
-        "total_assets": str(ledger.total_assets),
-        "total_liabilities_and_equity": str(ledger.total_liabilities_and_equity),
-        "details": ledger.details,
-        "status": "متوازن ✅" if ledger.is_balanced else f"غير متوازن ❌ (الفرق: {ledger.difference} ج.م)",
-        
-        # معلومات إضافية عن التوازن الفعلي
-        "physical_balance": {
-            "is_balanced": physical.is_balanced,
-            "difference": str(physical.difference),
-            "total_assets": str(physical.total_assets),
-            "total_liabilities_and_equity": str(physical.total_liabilities_and_equity),
-            "details": physical.details,
-        },
-        
-        # الفرق بين المخزون الدفتري والفعلي
-        "inventory_discrepancy": {
-            "has_discrepancy": dual_report.has_discrepancy,
-            "amount": str(dual_report.discrepancy_amount),
-            "ledger_inventory": ledger.details.get("inventory", 0),
-            "physical_inventory": physical.details.get("inventory", 0),
-            "message": f"فرق المخزون: {dual_report.discrepancy_amount} ج.م" if dual_report.has_discrepancy else "المخزون متطابق ✅"
-        },
-        
-        "checked_at": dual_report.checked_at.isoformat()
-    }
+    return dashboard.get_balance_check(db)
 
 
 # --- تقرير التدفقات النقدية ---
@@ -187,13 +189,27 @@ from app.services import cash_flow
 def get_cash_flow(
     start_date: date = Query(..., description="تاريخ البداية"),
     end_date: date = Query(..., description="تاريخ النهاية"),
+    account_ids: Optional[List[int]] = Query(None, description="حسابات النقدية (الافتراضي: كل حسابات CASH_ACCOUNT_IDS)"),
+    daily: bool = Query(False, description="تفصيل يومي"),
     db: Session = Depends(get_db)
 ):
     """
     تقرير التدفقات النقدية
     يُظهر مصادر واستخدامات النقدية خلال فترة محددة
     """
-    return cash_flow.get_cash_flow_report(db, start_date, end_date)
+    return cash_flow.get_cash_flow_report(db, start_date, end_date, account_ids, daily)
+
+
+@router.get("/cash-flow/periods")
+def get_cash_flow_periods(
+    start_date: date = Query(..., description="تاريخ البداية"),
+    end_date: date = Query(..., description="تاريخ النهاية"),
+    granularity: str = Query("month", pattern=PERIOD_PATTERN, description="month | quarter | year"),
+    account_ids: Optional[List[int]] = Query(None, description="حسابات النقدية (الافتراضي: كل حسابات CASH_ACCOUNT_IDS)"),
+    db: Session = Depends(get_db)
+):
+    """التدفقات النقدية لكل فترة بين التاريخين"""
+    return cash_flow.get_cash_flow_periods(db, start_date, end_date, granularity, account_ids)
 
 
 @router.get("/cash-flow-details")
@@ -201,10 +217,11 @@ def get_cash_flow_details(
     start_date: date = Query(..., description="تاريخ البداية"),
     end_date: date = Query(..., description="تاريخ النهاية"),
     category: Optional[str] = Query(None, description="الفئة: operating, investing, financing"),
+    account_ids: Optional[List[int]] = Query(None, description="حسابات النقدية (الافتراضي: كل حسابات CASH_ACCOUNT_IDS)"),
     db: Session = Depends(get_db)
 ):
     """تفاصيل حركات النقدية"""
-    return cash_flow.get_cash_flow_details(db, start_date, end_date, category)
+    return cash_flow.get_cash_flow_details(db, start_date, end_date, category, account_ids)
 
 # --- التقارير المتقدمة (Advanced Reports) ---
 from app.services import advanced_reports
@@ -212,13 +229,33 @@ from app.services import advanced_reports
 @router.get("/crop-profitability")
 def get_crop_profitability(
     season_id: Optional[int] = Query(None, description="معرف الموسم (اختياري)"),
+    breakdown: str = Query("crop", pattern="^(crop|season|month)$", description="crop | season | month"),
+    start_date: Optional[date] = Query(None, description="Start date"),
+    end_date: Optional[date] = Query(None, description="End date"),
     db: Session = Depends(get_db)
 ):
     """
     تقرير ربحية المحاصيل
-    يظهر: الإيرادات، التكاليف التقريبية، والربح لكل محصول
+    يظهر: الإيرادات، تكلفة البضاعة الفعلية (FIFO)، المصروفات المباشرة، والربح لكل محصول
     """
-    return advanced_reports.get_crop_profitability(db, season_id)
+    return advanced_reports.get_crop_profitability(db, season_id, breakdown, start_date, end_date)
+
+@router.get("/season-comparison")
+def get_season_comparison(
+    season_ids: Optional[str] = Query(None, description="معرفات المواسم مفصولة بفاصلة (اختياري: كل المواسم)"),
+    db: Session = Depends(get_db)
+):
+    """
+    مقارنة المواسم جنباً إلى جنب
+    الإيرادات، تكلفة البضاعة، المصروفات، الكميات وصافي الربح لكل موسم ولكل محصول
+    """
+    ids = None
+    if season_ids:
+        try:
+            ids = [int(s) for s in season_ids.split(",") if s.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="معرفات المواسم غير صالحة")
+    return advanced_reports.get_season_comparison(db, ids)
 
 @router.get("/top-customers")
 def get_top_customers(
@@ -253,10 +290,38 @@ def get_recent_activities(
     limit: int = Query(10, description="عدد العمليات"),
     db: Session = Depends(get_db)
 ):
-    """آخر العمليات (مبيعات ومشتريات)"""
+    """آخر العمليات (مبيعات، مشتريات، مدفوعات، مصروفات، مرتجعات)"""
     return dashboard.get_recent_activities(db, limit)
 
 
+@router.get("/dashboard/activity-feed")
+def get_activity_feed(
+    limit: int = Query(50, ge=1, le=500, description="عدد العمليات في الصفحة"),
+    cursor: Optional[str] = Query(None, description="مؤشر الصفحة التالية (next_cursor)"),
+    db: Session = Depends(get_db)
+):
+    """سجل النشاط الموحد مع ترقيم بالمؤشر"""
+    return dashboard.get_activity_feed(db, limit, cursor)
+
+
+@router.get("/dashboard/batch")
+def get_dashboard_batch(
+    widgets: Optional[str] = Query(None, description="قائمة مكونات مفصولة بفواصل (الافتراضي: إعدادات المستخدم)"),
+    top_customers_limit: int = Query(5, ge=1, le=100),
+    activities_limit: int = Query(10, ge=1, le=500),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_auth_db)
+):
+    """
+    كل بيانات لوحة التحكم للمستخدم الحالي في طلب واحد
+    المكونات تُقرأ من dashboard_config الخاص بالمستخدم
+    """
+    layout = dashboard.parse_dashboard_layout(
+        widgets.split(",") if widgets else current_user.dashboard_config
+    )
+    return dashboard.get_dashboard_batch(db, layout, top_customers_limit, activities_limit)
+
+
 @router.get("/dashboard/season-summary")
 def get_season_summary(db: Session = Depends(get_db)):
     """ملخص الموسم الحالي مع نسبة التقدم"""
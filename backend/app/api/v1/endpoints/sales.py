@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import json
 
 from app import crud, schemas
 from app.api.v1.endpoints.crops import get_db # Reuse the get_db dependency
 from app.services import sales as sales_service
 from app.core.idempotency import check_idempotency
+from app.core.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -46,8 +47,17 @@ def create_sale(
     return sales_service.create_new_sale(db=db, sale=sale, user_id=current_user.user_id)
 
 @router.get("/", response_model=List[schemas.SaleRead])
-def read_sales(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    db_sales = crud.get_sales(db, skip=skip, limit=limit)
+def read_sales(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_count: bool = False,
+    db: Session = Depends(get_db)
+):
+    """قائمة المبيعات (الأحدث أولاً)؛ الصفحة التالية عبر المؤشر في ترويسة X-Next-Cursor"""
+    db_sales = crud.get_sales(db, skip=skip, limit=limit, cursor=cursor, with_count=with_count)
+    set_page_headers(response, db_sales)
     
     # This is the fix from the purchases endpoint to prevent the same error.
     # I am applying it here from the start.
@@ -1,5 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from app import schemas
 from app.auth.dependencies import require_admin
+from app.database import get_db
+from app.services import scheduler
 import os
 import signal
 import sys
@@ -23,3 +28,23 @@ async def shutdown(current_user = Depends(require_admin)):
     # Run shutdown in a separate thread to allow sending the response first
     threading.Thread(target=shutdown_server).start()
     return {"message": "جاري إيقاف تشغيل النظام..."}
+
+@router.get("/scheduled-jobs", response_model=List[schemas.ScheduledJobRead])
+def list_scheduled_jobs(db: Session = Depends(get_db), current_user = Depends(require_admin)):
+    """مهام الصيانة الدورية وجدول تشغيلها وآخر نتيجة"""
+    return scheduler.list_scheduled_jobs(db)
+
+@router.put("/scheduled-jobs/{name}", response_model=schemas.ScheduledJobRead)
+def update_scheduled_job(
+    name: str,
+    data: schemas.ScheduledJobUpdate,
+    db: Session = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """تعديل جدول التشغيل (cron) أو إيقاف/تفعيل المهمة"""
+    return scheduler.update_scheduled_job(db, name, data)
+
+@router.post("/scheduled-jobs/{name}/run", response_model=schemas.ScheduledJobRead, status_code=202)
+def run_scheduled_job(name: str, db: Session = Depends(get_db), current_user = Depends(require_admin)):
+    """تشغيل المهمة في دورة المجدول التالية"""
+    return scheduler.trigger_scheduled_job(db, name)
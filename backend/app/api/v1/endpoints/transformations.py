@@ -2,14 +2,15 @@
 API Endpoints for Transformations
 تحويل المحاصيل الخام إلى منتجات نهائية
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.auth.dependencies import get_current_user
 from app import schemas, models
 from app.services import transformation as transformation_service
+from app.core.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -32,12 +33,17 @@ def create_transformation(
 
 @router.get("/", response_model=List[schemas.TransformationRead])
 def list_transformations(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    with_count: bool = False,
     db: Session = Depends(get_db)
 ):
-    """قائمة عمليات التحويل"""
-    return transformation_service.get_transformations(db, skip, limit)
+    """قائمة عمليات التحويل؛ الصفحة التالية عبر المؤشر في ترويسة X-Next-Cursor"""
+    page = transformation_service.get_transformations(db, skip, limit, cursor, with_count)
+    set_page_headers(response, page)
+    return page
 
 
 @router.get("/{transformation_id}", response_model=schemas.TransformationRead)
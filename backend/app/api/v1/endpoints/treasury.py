@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app import schemas
 from app.api.v1.endpoints.crops import get_db
-from app.services import treasury
+from app.services import treasury, treasury_closes
 from app.core.idempotency import check_idempotency
+from app.core.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -15,12 +16,51 @@ from app import models
 from app.auth.dependencies import get_current_user, require_permissions, require_write_permission
 
 @router.get("/summary", response_model=schemas.TreasurySummary)
-def read_treasury_summary(target_date: Optional[date] = None, db: Session = Depends(get_db)):
-    return treasury.get_treasury_summary(db, target_date)
+def read_treasury_summary(
+    target_date: Optional[date] = None,
+    account_ids: Optional[List[int]] = Query(None, description="حسابات النقدية والبنوك (الافتراضي: كل حسابات CASH_ACCOUNT_IDS)"),
+    db: Session = Depends(get_db)
+):
+    """ملخص الخزنة الموحد مع مركز كل درج أو بنك"""
+    return treasury.get_treasury_summary(db, target_date, account_ids)
 
 @router.get("/transactions", response_model=List[schemas.TreasuryTransaction])
-def read_treasury_transactions(target_date: Optional[date] = None, limit: int = 100, db: Session = Depends(get_db)):
-    return treasury.get_treasury_transactions(db, target_date, limit)
+def read_treasury_transactions(
+    response: Response,
+    target_date: Optional[date] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    account_ids: Optional[List[int]] = Query(None, description="حسابات النقدية والبنوك (الافتراضي: كل حسابات CASH_ACCOUNT_IDS)"),
+    db: Session = Depends(get_db)
+):
+    """دفتر النقدية ليوم أو فترة مع الرصيد الجاري؛ الصفحة التالية عبر المؤشر في ترويسة X-Next-Cursor"""
+    transactions = treasury.get_treasury_transactions(db, target_date, limit, cursor, start_date, end_date, account_ids)
+    set_page_headers(response, transactions)
+    return transactions
+
+@router.get("/day-closes", response_model=List[schemas.TreasuryDayClose])
+def read_treasury_day_closes(
+    start_date: date,
+    end_date: date,
+    account_id: Optional[int] = None,
+    closed_only: bool = False,
+    db: Session = Depends(get_db),
+    _: models.User = Depends(require_permissions(["treasury:read"]))
+):
+    """لقطات الإقفال اليومي (الافتتاحي، الوارد، المنصرف، الختامي، الجرد والفرق)"""
+    return treasury_closes.get_treasury_day_closes(db, start_date, end_date, account_id, closed_only)
+
+@router.post("/day-close", response_model=schemas.TreasuryDayClose)
+def close_treasury_day(
+    data: schemas.TreasuryDayCloseCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+    _: models.User = Depends(require_write_permission("treasury"))
+):
+    """إقفال يوم الخزنة بالجرد الفعلي وحساب الفرق"""
+    return treasury_closes.close_treasury_day(db, data, user_id=current_user.user_id)
 
 @router.post("/cash-receipt", dependencies=[Depends(check_idempotency)])
 def create_cash_receipt(
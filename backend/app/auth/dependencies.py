@@ -4,10 +4,14 @@ Authentication Dependencies
 """
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from typing import Optional, List
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from typing import Dict, FrozenSet, Optional, List, Tuple
 import json
+import threading
+import time
 
 from app.database import SessionLocal
 from app.auth.jwt import decode_token, TokenData
@@ -17,6 +21,18 @@ from app import models
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login", auto_error=False)
 
+# ذاكرة المصادقة داخل العملية حتى لا يقرأ كل طلب جدولي users و roles:
+# username -> نسخة منفصلة من المستخدم، role_id -> الصلاحيات بعد فك JSON
+# تُبطل بزيادة الإصدار من endpoints تعديل المستخدمين والأدوار، وتُعاد قراءتها
+# بعد AUTH_CACHE_SECONDS لتلتقط تعديلات العمليات الأخرى (uvicorn --workers)
+# القراءة من الذاكرة تتم على حلقة الأحداث مباشرة؛ الاستعلام عند عدم وجودها في threadpool
+AUTH_CACHE_SECONDS = 60
+
+_cache_lock = threading.Lock()
+_auth_version = 0
+_user_cache: Dict[str, Tuple[int, float, models.User]] = {}
+_role_cache: Dict[Optional[int], Tuple[int, float, Optional[FrozenSet[str]]]] = {}
+
 
 def get_db():
     """الحصول على جلسة قاعدة البيانات"""
@@ -27,6 +43,84 @@ def get_db():
         db.close()
 
 
+def invalidate_auth_cache(username: Optional[str] = None) -> None:
+    """
+    زيادة الإصدار بعد تعديل مستخدم أو دور (القراءات الجارية بالإصدار القديم لا تُخزن)
+    username: تعديل بيانات المستخدم نفسه فقط (آخر دخول، الإعدادات) -> حذف سجله وحده
+    """
+    global _auth_version
+    with _cache_lock:
+        if username is not None:
+            _user_cache.pop(username, None)
+            return
+        _auth_version += 1
+        _user_cache.clear()
+        _role_cache.clear()
+
+
+def _cached(cache: dict, key):
+    """(موجود؟، القيمة)"""
+    with _cache_lock:
+        entry = cache.get(key)
+        version = _auth_version
+    if entry is None or entry[0] != version or time.monotonic() - entry[1] > AUTH_CACHE_SECONDS:
+        return False, None
+    return True, entry[2]
+
+
+def _current_version() -> int:
+    with _cache_lock:
+        return _auth_version
+
+
+def _store(cache: dict, key, version: int, value) -> None:
+    with _cache_lock:
+        if version == _auth_version:
+            cache[key] = (version, time.monotonic(), value)
+
+
+def _load_user(db: Session, username: str) -> Optional[models.User]:
+    version = _current_version()
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if user is not None:
+        snapshot = models.User(**{
+            attr.key: getattr(user, attr.key) for attr in inspect(models.User).column_attrs
+        })
+        make_transient_to_detached(snapshot)
+        _store(_user_cache, username, version, snapshot)
+    return user
+
+
+async def _get_user(db: Session, username: str) -> Optional[models.User]:
+    """المستخدم بالاسم؛ من الذاكرة بدون استعلام إذا كان مخزناً"""
+    hit, snapshot = _cached(_user_cache, username)
+    if hit:
+        # نسخة في جلسة الطلب بدون SELECT؛ التعديل عليها يُحفظ بالـ commit كالمعتاد
+        return db.merge(snapshot, load=False)
+    return await run_in_threadpool(_load_user, db, username)
+
+
+def _load_role_permissions(db: Session, role_id: Optional[int]) -> Optional[FrozenSet[str]]:
+    version = _current_version()
+    role = db.query(models.Role).filter(models.Role.role_id == role_id).first()
+    permissions = None
+    if role is not None:
+        try:
+            permissions = frozenset(json.loads(role.permissions))
+        except (json.JSONDecodeError, TypeError):
+            permissions = frozenset()
+    _store(_role_cache, role_id, version, permissions)
+    return permissions
+
+
+async def _get_role_permissions(db: Session, role_id: Optional[int]) -> Optional[FrozenSet[str]]:
+    """صلاحيات الدور؛ None إذا لم يوجد الدور"""
+    hit, permissions = _cached(_role_cache, role_id)
+    if hit:
+        return permissions
+    return await run_in_threadpool(_load_role_permissions, db, role_id)
+
+
 async def get_current_user_optional(
     token: Optional[str] = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -39,9 +133,7 @@ async def get_current_user_optional(
     if token_data is None:
         return None
     
-    user = db.query(models.User).filter(
-        models.User.username == token_data.username
-    ).first()
+    user = await _get_user(db, token_data.username)
     
     return user
 
@@ -64,9 +156,7 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(models.User).filter(
-        models.User.username == token_data.username
-    ).first()
+    user = await _get_user(db, token_data.username)
     
     if user is None:
         raise credentials_exception
@@ -103,21 +193,14 @@ def require_permissions(required_permissions: List[str]):
             return current_user
         
         # الحصول على صلاحيات الدور
-        role = db.query(models.Role).filter(
-            models.Role.role_id == current_user.role_id
-        ).first()
+        user_permissions = await _get_role_permissions(db, current_user.role_id)
         
-        if role is None:
+        if user_permissions is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="لا يوجد دور معين للمستخدم"
             )
         
-        try:
-            user_permissions = json.loads(role.permissions)
-        except (json.JSONDecodeError, TypeError):
-            user_permissions = []
-        
         # التحقق من الصلاحيات المطلوبة
         for perm in required_permissions:
             if perm not in user_permissions:
@@ -5,10 +5,13 @@ JWT Authentication Configuration
 
 from datetime import datetime, timedelta
 from typing import Optional
+from anyio import CapacityLimiter, to_thread
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
+from app.core.config import settings
+
 # إعدادات الأمان
 SECRET_KEY = "your-secret-key-change-in-production-مفتاح-سري-للانتاج"
 ALGORITHM = "HS256"
@@ -43,6 +46,29 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# حد منفصل لخيوط PBKDF2 حتى لا تحجز موجة تسجيل دخول خيوط باقي الـ endpoints
+_hash_limiter: Optional[CapacityLimiter] = None
+
+
+def _password_limiter() -> CapacityLimiter:
+    global _hash_limiter
+    if _hash_limiter is None:
+        _hash_limiter = CapacityLimiter(settings.PASSWORD_HASH_WORKERS)
+    return _hash_limiter
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """التحقق من كلمة المرور في خيط منفصل (لا يوقف حلقة الأحداث)"""
+    return await to_thread.run_sync(
+        verify_password, plain_password, hashed_password, limiter=_password_limiter()
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """تشفير كلمة المرور في خيط منفصل (لا يوقف حلقة الأحداث)"""
+    return await to_thread.run_sync(get_password_hash, password, limiter=_password_limiter())
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """إنشاء JWT token"""
     to_encode = data.copy()
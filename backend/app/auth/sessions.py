@@ -1,19 +1,50 @@
 """
 Session Management Service
 خدمة إدارة الجلسات المحلية - بديل عن JWT للبيئة المحلية
+
+ملاحظة: غير مستخدمة حالياً في مسار أي طلب؛ المصادقة عبر JWT (app/auth/dependencies.py)
+ولا يستدعي أي endpoint الدالتين create_session أو validate_session.
+مخزن آخر نشاط وذاكرة الجلسات ومؤقت الكتابة لا تعمل إلا عند ربط الجلسات بطلب.
 """
 
+import logging
+import threading
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, NamedTuple, Optional
+from sqlalchemy import case
 from sqlalchemy.orm import Session as DBSession
 from passlib.context import CryptContext
 
 from app import models
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
 
 # إعدادات الجلسات
 SESSION_EXPIRE_HOURS = 24  # مدة صلاحية الجلسة بالساعات
 
+# آخر نشاط يُجمع في الذاكرة ويُكتب دفعة واحدة كل ACTIVITY_FLUSH_SECONDS (أو عند تسجيل الخروج)
+# حتى لا يتحول كل طلب قراءة إلى كتابة تنافس الترحيلات على قفل الكتابة
+# المخزن لكل عملية، فالكتابة من مؤقت في كل عملية (وليس من المجدول الذي يعمل في عامل واحد)
+ACTIVITY_FLUSH_SECONDS = 30
+# سجل الجلسة المخزن يُعاد قراءته بعد هذه المدة (لالتقاط الإلغاء من عملية أخرى)
+SESSION_CACHE_SECONDS = 60
+
+
+class _CachedSession(NamedTuple):
+    user_id: int
+    expires_at: datetime
+    cached_at: float
+
+
+_lock = threading.Lock()
+_session_cache: Dict[str, _CachedSession] = {}
+_pending_activity: Dict[str, datetime] = {}
+_flusher: Optional[threading.Thread] = None
+_stop_flusher = threading.Event()
+
 # Password hashing (نفس الإعدادات من jwt.py)
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
@@ -89,25 +120,27 @@ def validate_session(db: DBSession, session_token: str) -> Optional[models.User]
     if not session_token:
         return None
     
-    # البحث عن الجلسة
-    session = db.query(models.Session).filter(
-        models.Session.session_token == session_token,
-        models.Session.is_active == True
-    ).first()
+    # البحث عن الجلسة (من الذاكرة إن وُجدت ولم تنته صلاحية التخزين)
+    session = _get_cached_session(db, session_token)
     
     if not session:
         return None
     
+    now = datetime.utcnow()
     # التحقق من انتهاء الصلاحية
-    if session.expires_at < datetime.utcnow():
+    if session.expires_at < now:
         # الجلسة منتهية الصلاحية - إلغاء تفعيلها
-        session.is_active = False
+        _forget(session_token)
+        db.query(models.Session).filter(
+            models.Session.session_token == session_token
+        ).update({"is_active": False})
         db.commit()
         return None
     
-    # تحديث آخر نشاط
-    session.last_activity = datetime.utcnow()
-    db.commit()
+    # تسجيل آخر نشاط في الذاكرة؛ يكتبه مؤقت العملية مع غيره دفعة واحدة
+    with _lock:
+        _pending_activity[session_token] = now
+    _ensure_flusher()
     
     # الحصول على المستخدم
     user = db.query(models.User).filter(
@@ -118,6 +151,99 @@ def validate_session(db: DBSession, session_token: str) -> Optional[models.User]
     return user
 
 
+def _get_cached_session(db: DBSession, session_token: str) -> Optional[_CachedSession]:
+    with _lock:
+        cached = _session_cache.get(session_token)
+    if cached and time.monotonic() - cached.cached_at < SESSION_CACHE_SECONDS:
+        return cached
+
+    row = db.query(models.Session.user_id, models.Session.expires_at).filter(
+        models.Session.session_token == session_token,
+        models.Session.is_active == True
+    ).first()
+    if not row:
+        _forget(session_token)
+        return None
+    cached = _CachedSession(row.user_id, row.expires_at, time.monotonic())
+    with _lock:
+        _session_cache[session_token] = cached
+    return cached
+
+
+def _forget(*session_tokens: str) -> None:
+    """إزالة جلسات من الذاكرة (بعد إلغائها)"""
+    with _lock:
+        for token in session_tokens:
+            _session_cache.pop(token, None)
+
+
+def flush_session_activity(db: DBSession, session_tokens=None) -> int:
+    """
+    كتابة آخر نشاط المجمّع بجملة UPDATE واحدة لكل الجلسات (CASE على رمز الجلسة)
+    session_tokens: كتابة جلسات محددة فقط (مثل تسجيل الخروج)؛ None = الكل
+    """
+    with _lock:
+        if session_tokens is None:
+            pending = dict(_pending_activity)
+            _pending_activity.clear()
+        else:
+            pending = {t: _pending_activity.pop(t) for t in session_tokens if t in _pending_activity}
+    if not pending:
+        return 0
+
+    try:
+        db.query(models.Session).filter(
+            models.Session.session_token.in_(list(pending))
+        ).update(
+            {"last_activity": case(pending, value=models.Session.session_token)},
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        # إعادة النشاط للمحاولة التالية دون الكتابة فوق نشاط أحدث
+        with _lock:
+            for token, at in pending.items():
+                if token not in _pending_activity or _pending_activity[token] < at:
+                    _pending_activity[token] = at
+        raise
+    return len(pending)
+
+
+def _flush_loop() -> None:
+    while not _stop_flusher.wait(ACTIVITY_FLUSH_SECONDS):
+        db = SessionLocal()
+        try:
+            flush_session_activity(db)
+        except Exception:
+            logger.exception("Session activity flush failed")
+        finally:
+            db.close()
+
+
+def _ensure_flusher() -> None:
+    """تشغيل مؤقت الكتابة في هذه العملية عند أول نشاط (الخيط لا يُورث بعد fork فيُعاد تشغيله)"""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _stop_flusher.clear()
+            _flusher = threading.Thread(target=_flush_loop, name="session-activity", daemon=True)
+            _flusher.start()
+
+
+def stop_session_activity_flusher(db: DBSession) -> None:
+    """عند إغلاق التطبيق: إيقاف المؤقت وكتابة ما تبقى في الذاكرة"""
+    global _flusher
+    _stop_flusher.set()
+    with _lock:
+        flusher, _flusher = _flusher, None
+    if flusher is not None:
+        flusher.join(5)
+    flush_session_activity(db)
+
+
 def delete_session(db: DBSession, session_token: str) -> bool:
     """
     حذف/إلغاء جلسة (تسجيل الخروج)
@@ -129,6 +255,8 @@ def delete_session(db: DBSession, session_token: str) -> bool:
     Returns:
         bool: True إذا تم الحذف بنجاح
     """
+    _forget(session_token)
+    flush_session_activity(db, [session_token])
     session = db.query(models.Session).filter(
         models.Session.session_token == session_token
     ).first()
@@ -152,6 +280,9 @@ def delete_all_user_sessions(db: DBSession, user_id: int) -> int:
     Returns:
         int: عدد الجلسات المحذوفة
     """
+    with _lock:
+        tokens = [t for t, s in _session_cache.items() if s.user_id == user_id]
+    _forget(*tokens)
     count = db.query(models.Session).filter(
         models.Session.user_id == user_id,
         models.Session.is_active == True
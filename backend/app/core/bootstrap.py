@@ -30,6 +30,19 @@ def bootstrap_system(db: Session):
     # 3. Bootstrap Roles & Users
     bootstrap_roles_and_users(db)
 
+    # 4. Build aggregated fact tables for existing data (first run only)
+    from app.services.daily_facts import ensure_daily_facts
+    ensure_daily_facts(db)
+
+    from app.services.season_facts import ensure_season_facts
+    ensure_season_facts(db)
+
+    from app.services.treasury_closes import ensure_treasury_day_closes
+    ensure_treasury_day_closes(db)
+
+    from app.services.notification_counters import ensure_notification_counters
+    ensure_notification_counters(db)
+
 
 def bootstrap_financial_accounts(db: Session):
     """
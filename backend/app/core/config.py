@@ -1,7 +1,25 @@
+import os
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///../agricultural_accounting.db"
+    # عدد العمليات المنفذة لمهام التقارير الثقيلة في الخلفية
+    REPORT_JOB_WORKERS: int = 2
+    # مجلد ملفات Parquet للتحليل خارج التطبيق (بجانب قاعدة البيانات)
+    PARQUET_EXPORT_DIR: str = "../exports/parquet"
+    # محرك التقارير الثقيلة: sqlite أو duckdb (يتطلب pip install duckdb)
+    ANALYTICS_ENGINE: str = "sqlite"
+    # مصدر DuckDB: live (ملف قاعدة البيانات للقراءة فقط) أو snapshot (أحدث نسخة احتياطية)
+    ANALYTICS_SOURCE: str = "live"
+    # المجدول الداخلي لمهام الصيانة الدورية (يُعطل مثلاً عند تشغيل أكثر من نسخة بمجدول خارجي)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_TICK_SECONDS: int = 30
+    # أقصى عدد لعمليات تشفير/تحقق كلمات المرور المتزامنة (PBKDF2) خارج حلقة الأحداث
+    # (نصف الأنوية: تبقى أنوية لباقي الطلبات أثناء موجة تسجيل دخول)
+    PASSWORD_HASH_WORKERS: int = max(1, (os.cpu_count() or 2) // 2)
+    # عدادات تحديد المعدل: ملف SQLite مشترك بين عمليات uvicorn --workers (memory:// لعملية واحدة)
+    RATE_LIMIT_STORAGE_URI: str = "sqlite:///../rate_limits.db"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,84 @@
+"""
+In-Process Event Bus
+ناقل أحداث داخل العملية - لدفع التحديثات الحية للمتصفحات (SSE)
+
+- المشتركون (اتصالات SSE) يعيشون على حلقة asyncio
+- النشر يتم غالباً من خيوط الـ threadpool بعد commit، لذلك يمر عبر call_soon_threadsafe
+- لا توجد أي قراءة من قاعدة البيانات ما دام لا يوجد نشر
+"""
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+# أقصى عدد أحداث معلقة لكل مشترك قبل إسقاط الأقدم
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """اشتراك واحد (اتصال SSE واحد)"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _put(self, event: Dict[str, Any]) -> None:
+        if self.queue.full():
+            # المشترك البطيء يفقد الأقدم ولا يعطل الناشر
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """انتظار الحدث التالي (None عند انتهاء المهلة)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """سحب كل الأحداث المعلقة دون انتظار"""
+        events = []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+
+class EventBus:
+    """ناقل الأحداث"""
+
+    def __init__(self):
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Subscription:
+        """اشتراك جديد على الحلقة الحالية (يُستدعى من داخل async)"""
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event_type: str, data: Any = None) -> None:
+        """نشر حدث لكل المشتركين (آمن من أي خيط)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+
+        event = {"type": event_type, "data": data}
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                # الحلقة أُغلقت - الاشتراك ميت
+                self.unsubscribe(subscription)
+
+
+event_bus = EventBus()
@@ -0,0 +1,110 @@
+"""
+Keyset (Cursor) Pagination
+ترقيم الصفحات بالمؤشر بدلاً من OFFSET
+
+- الصفحة التالية تبدأ بعد آخر مفتاح ترتيب (تاريخ، رقم) مقروء، فتكلفة الصفحة 500 مثل الصفحة 1
+- الإضافات المتزامنة لا تزيح النتائج (لا تكرار ولا فقد بين الصفحات)
+- المؤشر نص base64 مبهم؛ يرجع للعميل في الترويسة X-Next-Cursor حتى لا يتغير شكل الاستجابة
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class Page(list):
+    """قائمة عناصر الصفحة مع مؤشر الصفحة التالية (None = آخر صفحة) والعدد الكلي الاختياري"""
+
+    def __init__(self, items, next_cursor: Optional[str] = None, total_count: Optional[int] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+        self.total_count = total_count
+
+
+def _column_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    """فك المؤشر وتحويل القيم لأنواع أعمدة الترتيب"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        decoded = []
+        for value, column in zip(values, columns):
+            python_type = _column_type(column)
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            elif python_type in (int, str) and value is not None:
+                value = python_type(value)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+
+
+def paginate(
+    query: Query,
+    sort_columns: Sequence,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+    with_count: bool = False,
+    skip: int = 0,
+) -> Page:
+    """
+    تطبيق ترقيم المؤشر على استعلام
+
+    Args:
+        sort_columns: أعمدة ترتيب فريدة معاً، عادة (التاريخ، المعرّف)، ويُفضل أن يغطيها فهرس
+        limit: حجم الصفحة
+        cursor: مؤشر الصفحة التالية من الاستجابة السابقة
+        with_count: حساب العدد الكلي (استعلام COUNT إضافي، لذلك اختياري)
+        skip: OFFSET للعملاء القدامى فقط (يُتجاهل مع المؤشر)
+    """
+    total_count = query.order_by(None).count() if with_count else None
+
+    if cursor:
+        key = tuple_(*sort_columns)
+        values = tuple_(*[
+            literal(value, column.type)
+            for value, column in zip(decode_cursor(cursor, sort_columns), sort_columns)
+        ])
+        query = query.filter(key < values if descending else key > values)
+
+    order = [c.desc() if descending else c.asc() for c in sort_columns]
+    query = query.order_by(*order)
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], c.key) for c in sort_columns])
+
+    return Page(rows, next_cursor, total_count)
+
+
+def set_page_headers(response: Response, page) -> None:
+    """إضافة مؤشر الصفحة التالية والعدد الكلي لترويسات الاستجابة"""
+    if getattr(page, "next_cursor", None):
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if getattr(page, "total_count", None) is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(page.total_count)
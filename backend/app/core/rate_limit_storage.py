@@ -0,0 +1,107 @@
+"""
+Rate Limit Storage
+تخزين عدادات تحديد المعدل (slowapi / limits) في ملف SQLite محلي مشترك بين العمليات
+
+- مخطط URI جديد: sqlite:///path/to/rate_limits.db (يُسجل في limits عند استيراد هذه الوحدة)
+- ملف منفصل عن قاعدة بيانات التطبيق حتى لا تتنافس كتابات العدادات مع قفل كتابة القيود
+- الزيادة UPSERT ذري واحد مع RETURNING (النافذة المنتهية تبدأ من جديد في نفس الجملة)،
+  فتتشارك عمليات uvicorn --workers نفس العدادات وتبقى بعد إعادة التشغيل
+- synchronous=OFF: فقدان آخر الزيادات عند انقطاع الكهرباء مقبول لعدادات المعدل
+- الصفوف المنتهية تُحذف من مهمة المجدول rate_limit_cleanup
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from limits.storage import Storage
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# كل تعبيرات SET تقرأ القيم القديمة للصف
+_INCR = """
+INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :now + :expiry)
+ON CONFLICT (key) DO UPDATE SET
+    count = CASE WHEN expires_at <= :now THEN excluded.count ELSE count + excluded.count END,
+    expires_at = CASE WHEN expires_at <= :now THEN excluded.expires_at ELSE expires_at END
+RETURNING count
+"""
+
+
+class SQLiteStorage(Storage):
+    """عدادات النافذة الثابتة (fixed-window، استراتيجية slowapi الافتراضية) في جدول rate_limits"""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        # نفس صيغة SQLAlchemy: sqlite:///relative.db أو sqlite:////absolute/path.db
+        self.path = uri.split("://", 1)[1][1:]
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        """اتصال لكل خيط (ولكل عملية: لا يُستخدم اتصال موروث بعد fork)"""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(_SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        return self._connection().execute(
+            _INCR, {"key": key, "amount": amount, "now": time.time(), "expiry": expiry}
+        ).fetchone()[0]
+
+    def _live(self, column: str, key: str) -> Optional[float]:
+        row = self._connection().execute(
+            f"SELECT {column} FROM rate_limits WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def get(self, key: str) -> int:
+        return self._live("count", key) or 0
+
+    def get_expiry(self, key: str) -> float:
+        return self._live("expires_at", key) or time.time()
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        return self._connection().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        return self._connection().execute(
+            "DELETE FROM rate_limits WHERE expires_at <= ?", (time.time(),)
+        ).rowcount
+
+
+def cleanup_expired_rate_limits(db: Session) -> int:
+    """حذف العدادات المنتهية (مهمة المجدول)؛ لا شيء إذا كان التخزين في الذاكرة"""
+    if not settings.RATE_LIMIT_STORAGE_URI.startswith("sqlite://"):
+        return 0
+    return SQLiteStorage(settings.RATE_LIMIT_STORAGE_URI).purge_expired()
@@ -0,0 +1,95 @@
+"""
+Write Generation Counters
+عدادات أجيال الكتابة - لإبطال الذاكرة المؤقتة عند أي ترحيل
+
+كل جدول له عداد يزيد بعد كل commit يلمس هذا الجدول.
+أي ذاكرة مؤقتة (مثل مؤشرات لوحة التحكم) تحفظ قيمة العدادات التي تعتمد عليها،
+وتعتبر النتيجة صالحة طالما لم تتغير هذه العدادات.
+
+التتبع يتم مركزياً عبر أحداث جلسة SQLAlchemy، لذلك تُحسب كل خدمات الترحيل
+(المبيعات، المشتريات، المدفوعات، الخزينة، المرتجعات، التسويات...) تلقائياً
+بدون الحاجة لاستدعاء يدوي في كل خدمة.
+
+ملاحظة: العدادات داخل العملية (in-process) فقط.
+"""
+import threading
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_generations: Dict[str, int] = {}
+_lock = threading.Lock()
+
+# مراقبون يُستدعون بعد كل زيادة (مثل ناقل الأحداث للتحديثات الحية)
+_observers: List[Callable[[Set[str]], None]] = []
+
+_PENDING_KEY = "write_generation_pending"
+
+
+def current_generation(*tables: str) -> Tuple[int, ...]:
+    """الحصول على قيم العدادات الحالية لمجموعة جداول (بنفس الترتيب)"""
+    with _lock:
+        return tuple(_generations.get(t, 0) for t in tables)
+
+
+def bump(tables: Iterable[str]) -> None:
+    """زيادة عدادات الجداول المحددة"""
+    tables = set(tables)
+    with _lock:
+        for table in tables:
+            _generations[table] = _generations.get(table, 0) + 1
+    for observer in list(_observers):
+        observer(tables)
+
+
+def on_bump(callback: Callable[[Set[str]], None]) -> None:
+    """تسجيل مراقب يُستدعى بأسماء الجداول بعد كل commit ناجح"""
+    _observers.append(callback)
+
+
+def has_pending_writes(session: Session) -> bool:
+    """هل توجد كتابات غير مؤكدة (قبل الـ commit) في هذه الجلسة؟"""
+    return bool(
+        session.info.get(_PENDING_KEY) or session.new or session.dirty or session.deleted
+    )
+
+
+def _pending(session: Session) -> Set[str]:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def _track_flush(session: Session, flush_context) -> None:
+    """تسجيل الجداول التي تغيرت في هذا الـ flush"""
+    pending = _pending(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            pending.add(table)
+
+
+def _track_bulk(orm_execute_state) -> None:
+    """تسجيل عمليات query.update() / query.delete() الجماعية"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _pending(orm_execute_state.session).add(mapper.local_table.name)
+
+
+def _publish(session: Session) -> None:
+    """زيادة العدادات بعد نجاح الـ commit فقط"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        bump(pending)
+
+
+def _discard(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_write_tracking(session_factory) -> None:
+    """ربط التتبع بمصنع الجلسات (يُستدعى مرة واحدة من database.py)"""
+    event.listen(session_factory, "after_flush", _track_flush)
+    event.listen(session_factory, "do_orm_execute", _track_bulk)
+    event.listen(session_factory, "after_commit", _publish)
+    event.listen(session_factory, "after_rollback", _discard)
@@ -3,14 +3,18 @@ Contact CRUD Operations
 """
 from sqlalchemy.orm import Session
 from app import models, schemas
+from app.core.pagination import paginate
 
 
 def get_contact(db: Session, contact_id: int):
     return db.query(models.Contact).filter(models.Contact.contact_id == contact_id).first()
 
 
-def get_contacts(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Contact).offset(skip).limit(limit).all()
+def get_contacts(db: Session, skip: int = 0, limit: int = 100, cursor: str = None, with_count: bool = False):
+    return paginate(
+        db.query(models.Contact), (models.Contact.contact_id,),
+        limit, cursor, descending=False, with_count=with_count, skip=skip
+    )
 
 
 def create_contact(db: Session, contact: schemas.ContactCreate):
@@ -4,18 +4,18 @@ Sales, Purchases, and Expenses CRUD Operations
 from sqlalchemy.orm import Session, joinedload
 import json
 from app import models, schemas
+from app.core.pagination import paginate
 
 
 # --- Purchase CRUD Functions ---
 
-def get_purchases(db: Session, skip: int = 0, limit: int = 100):
-    return (
-        db.query(models.Purchase)
-        .options(joinedload(models.Purchase.crop), joinedload(models.Purchase.supplier))
-        .order_by(models.Purchase.purchase_date.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+def get_purchases(db: Session, skip: int = 0, limit: int = 100, cursor: str = None, with_count: bool = False):
+    query = db.query(models.Purchase).options(
+        joinedload(models.Purchase.crop), joinedload(models.Purchase.supplier)
+    )
+    return paginate(
+        query, (models.Purchase.purchase_date, models.Purchase.purchase_id),
+        limit, cursor, with_count=with_count, skip=skip
     )
 
 
@@ -39,14 +39,13 @@ def create_purchase_record(db: Session, purchase_data: dict) -> models.Purchase:
 
 # --- Sale CRUD Functions ---
 
-def get_sales(db: Session, skip: int = 0, limit: int = 100):
-    return (
-        db.query(models.Sale)
-        .options(joinedload(models.Sale.crop), joinedload(models.Sale.customer))
-        .order_by(models.Sale.sale_date.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+def get_sales(db: Session, skip: int = 0, limit: int = 100, cursor: str = None, with_count: bool = False):
+    query = db.query(models.Sale).options(
+        joinedload(models.Sale.crop), joinedload(models.Sale.customer)
+    )
+    return paginate(
+        query, (models.Sale.sale_date, models.Sale.sale_id),
+        limit, cursor, with_count=with_count, skip=skip
     )
 
 
@@ -58,18 +57,15 @@ def create_sale_record(db: Session, sale_data: dict) -> models.Sale:
 
 # --- Expense CRUD Functions ---
 
-def get_expenses(db: Session, skip: int = 0, limit: int = 100):
-    return (
-        db.query(models.Expense)
-        .options(
-            joinedload(models.Expense.credit_account),
-            joinedload(models.Expense.debit_account),
-            joinedload(models.Expense.supplier)
-        )
-        .order_by(models.Expense.expense_date.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+def get_expenses(db: Session, skip: int = 0, limit: int = 100, cursor: str = None, with_count: bool = False):
+    query = db.query(models.Expense).options(
+        joinedload(models.Expense.credit_account),
+        joinedload(models.Expense.debit_account),
+        joinedload(models.Expense.supplier)
+    )
+    return paginate(
+        query, (models.Expense.expense_date, models.Expense.expense_id),
+        limit, cursor, with_count=with_count, skip=skip
     )
 
 
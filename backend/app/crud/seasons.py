@@ -3,6 +3,7 @@ Seasons and Daily Prices CRUD Operations
 """
 from sqlalchemy.orm import Session, joinedload
 from app import models, schemas
+from app.core.pagination import paginate
 
 
 # --- Season CRUD Functions ---
@@ -85,7 +86,10 @@ def create_daily_price(db: Session, price: schemas.DailyPriceCreate) -> models.D
     return db_price
 
 
-def get_daily_prices(db: Session, crop_id: int = None, start_date=None, end_date=None, skip: int = 0, limit: int = 100):
+def get_daily_prices(
+    db: Session, crop_id: int = None, start_date=None, end_date=None,
+    skip: int = 0, limit: int = 100, cursor: str = None, with_count: bool = False
+):
     query = db.query(models.DailyPrice).options(joinedload(models.DailyPrice.crop))
     
     if crop_id:
@@ -95,4 +99,7 @@ def get_daily_prices(db: Session, crop_id: int = None, start_date=None, end_date
     if end_date:
         query = query.filter(models.DailyPrice.price_date <= end_date)
     
-    return query.order_by(models.DailyPrice.price_date.desc()).offset(skip).limit(limit).all()
+    return paginate(
+        query, (models.DailyPrice.price_date, models.DailyPrice.price_id),
+        limit, cursor, with_count=with_count, skip=skip
+    )
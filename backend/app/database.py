@@ -1,6 +1,8 @@
+from contextlib import contextmanager
 from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
 from .core.config import settings
+from .core.write_generation import register_write_tracking
 
 engine = create_engine(
     settings.DATABASE_URL, 
@@ -18,6 +20,9 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# تتبع الجداول المعدلة بعد كل commit لإبطال الذاكرة المؤقتة
+register_write_tracking(SessionLocal)
+
 # ✅ Modern SQLAlchemy 2.0+ style
 class Base(DeclarativeBase):
     pass
@@ -30,3 +35,40 @@ def get_db():
     finally:
         db.close()
 
+
+@contextmanager
+def read_snapshot(db: Session):
+    """
+    معاملة قراءة واحدة متسقة (كل الاستعلامات ترى نفس لقطة البيانات)
+    مشغل sqlite3 لا يبدأ معاملة مع SELECT، لذلك نبدأها صراحة؛ وتُنهى بـ rollback
+    """
+    connection = db.connection()
+    if connection.dialect.name == "sqlite" and not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN")
+    try:
+        yield db
+    finally:
+        db.rollback()
+
+
+# صيانة جداول الحقائق المجمعة قبل كل commit
+# (يُستورد بعد تعريف Base و SessionLocal لتجنب الاستيراد الدائري مع models)
+from .services.daily_facts import register_fact_maintenance  # noqa: E402
+register_fact_maintenance(SessionLocal)
+
+from .services.season_facts import register_season_fact_maintenance  # noqa: E402
+register_season_fact_maintenance(SessionLocal)
+
+from .services.treasury_closes import register_treasury_close_maintenance  # noqa: E402
+register_treasury_close_maintenance(SessionLocal)
+
+from .services.notification_counters import register_notification_counters  # noqa: E402
+register_notification_counters(SessionLocal)
+
+# نشر التحديثات الحية (SSE) بعد كل commit
+from .services.live_updates import register_live_updates  # noqa: E402
+register_live_updates(SessionLocal)
+
+# إبطال ذاكرة التقارير الدائمة عند تعديل أو حذف قيود أو تغيير الجداول المعتمد عليها
+from .services.report_cache import register_report_cache_invalidation  # noqa: E402
+register_report_cache_invalidation(SessionLocal)
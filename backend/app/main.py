@@ -13,6 +13,9 @@ from app.models import Crop, Contact, FinancialAccount, Purchase, Inventory, Gen
 from app.api.v1.api import api_router
 from app.core.bootstrap import bootstrap_system
 from app.services.backup import auto_backup_on_startup
+from app.services.report_jobs import recover_report_jobs, shutdown_report_jobs
+from app.services.scheduler import start_scheduler, stop_scheduler
+from app.auth.sessions import stop_session_activity_flusher
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -28,19 +31,36 @@ async def lifespan(app: FastAPI):
         
         # Auto-backup on startup
         auto_backup_on_startup()
+
+        # مهام التقارير التي توقف عاملها (إعادة تشغيل سابقة) لن تكتمل
+        recover_report_jobs(db)
+
+        # مهام الصيانة الدورية: التنبيهات، التنظيف، النسخ الاحتياطي، ANALYZE، WAL checkpoint
+        start_scheduler(db)
     finally:
         db.close()
     yield
-    # On shutdown (if needed)
+    # On shutdown
+    stop_scheduler()
+    shutdown_report_jobs()
+
+    # آخر نشاط الجلسات المجمّع في الذاكرة
+    db = SessionLocal()
+    try:
+        stop_session_activity_flusher(db)
+    finally:
+        db.close()
 
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
+from app.core.config import settings
+from app.core.rate_limit_storage import SQLiteStorage  # noqa: F401 - يسجل مخطط sqlite:// في limits
 
 # ... imports ...
 
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, storage_uri=settings.RATE_LIMIT_STORAGE_URI)
 
 app = FastAPI(
     title="Agricultural Accounting API",
@@ -69,6 +89,7 @@ app.add_middleware(
     allow_credentials=True,          # ✅ مفعّل للـ cookies
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["Authorization", "Content-Type", "Accept"],
+    expose_headers=["X-Cache", "X-Next-Cursor", "X-Total-Count"],
 )
 
 from app.core.error_handling import setup_exception_handlers
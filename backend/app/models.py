@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, Float, Date, ForeignKey, DateTime, Numeric
+from sqlalchemy import Column, Integer, String, Boolean, Text, Float, Date, ForeignKey, DateTime, Numeric, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -47,6 +47,8 @@ class FinancialAccount(Base):
 
 class Purchase(Base):
     __tablename__ = "purchases"
+    # ترقيم الصفحات بالمؤشر (الأحدث أولاً)
+    __table_args__ = (Index("ix_purchases_purchase_date_purchase_id", "purchase_date", "purchase_id"),)
 
     purchase_id = Column(Integer, primary_key=True, index=True)
     crop_id = Column(Integer, ForeignKey("crops.crop_id"), nullable=False)
@@ -126,6 +128,7 @@ class InventoryBatch(Base):
 
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (Index("ix_sales_sale_date_sale_id", "sale_date", "sale_id"),)
 
     sale_id = Column(Integer, primary_key=True, index=True)
     crop_id = Column(Integer, ForeignKey("crops.crop_id"), nullable=False)
@@ -160,6 +163,12 @@ class Sale(Base):
 
 class GeneralLedger(Base):
     __tablename__ = "general_ledger"
+    __table_args__ = (
+        Index("ix_general_ledger_entry_date_entry_id", "entry_date", "entry_id"),
+        Index("ix_general_ledger_source_type_source_id", "source_type", "source_id"),
+        # رصيد وحركات حساب (أو مجموعة حسابات نقدية) حتى تاريخ: مسح نطاق واحد
+        Index("ix_general_ledger_account_id_entry_date", "account_id", "entry_date"),
+    )
 
     entry_id = Column(Integer, primary_key=True, index=True)
     entry_date = Column(Date, nullable=False)
@@ -186,6 +195,7 @@ class Expense(Base):
     - 'INDIRECT': مصروف تشغيلي عام
     """
     __tablename__ = "expenses"
+    __table_args__ = (Index("ix_expenses_expense_date_expense_id", "expense_date", "expense_id"),)
 
     expense_id = Column(Integer, primary_key=True, index=True)
     expense_date = Column(Date, nullable=False)
@@ -432,6 +442,14 @@ class AuditLog(Base):
 class Notification(Base):
     """نموذج التنبيهات"""
     __tablename__ = "notifications"
+    __table_args__ = (
+        # تنبيه واحد لكل مفتاح (صنف منخفض، فاتورة متأخرة) طوال استمرار الحالة، مقروءاً أو لا؛
+        # يُفك المفتاح عند زوال الحالة فيُنبَّه من جديد إذا عادت
+        Index(
+            "uq_notifications_dedup_key", "dedup_key", unique=True,
+            sqlite_where=Column("dedup_key", String) != None
+        ),
+    )
 
     notification_id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=True)  # Null means system-wide or for all admins
@@ -440,11 +458,23 @@ class Notification(Base):
     message = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
     action_url = Column(String, nullable=True)
+    dedup_key = Column(String, nullable=True)  # مثل LOW_STOCK:crop:5 أو OVERDUE_DEBT:sale:42
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User")
 
 
+class NotificationCounter(Base):
+    """
+    عدد التنبيهات غير المقروءة لكل مستخدم (user_id = 0 للتنبيهات العامة)
+    يُحدّث مع كل إدراج أو قراءة في نفس المعاملة، فلا تحتاج شارة التنبيهات لعدّ جدول notifications
+    """
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    unread_count = Column(Integer, nullable=False, default=0)
+
+
 # ============================================
 # نظام المستخدمين والصلاحيات
 # ============================================
@@ -574,3 +604,160 @@ class IdempotencyKey(Base):
     
     user = relationship("User")
 
+
+
+# ============================================
+# جداول الحقائق المجمعة (Fact Tables)
+# تُحدّث تلقائياً مع كل commit يمس الجداول المصدر
+# ============================================
+
+class DailyFact(Base):
+    """
+    الحقائق اليومية - مجاميع المبيعات والمشتريات والمصروفات لكل (يوم، محصول)
+    تستخدمها الرسوم البيانية والمقارنات بدلاً من التجميع من الجداول الخام
+    """
+    __tablename__ = "daily_facts"
+
+    fact_date = Column(Date, primary_key=True)
+    crop_id = Column(Integer, primary_key=True)  # 0 = مصروفات عامة غير مرتبطة بمحصول
+
+    sales_amount = Column(Numeric(18, 4), nullable=False, default=0)
+    sales_count = Column(Integer, nullable=False, default=0)
+    sales_quantity_kg = Column(Numeric(18, 4), nullable=False, default=0)
+
+    purchases_amount = Column(Numeric(18, 4), nullable=False, default=0)
+    purchases_count = Column(Integer, nullable=False, default=0)
+    purchases_quantity_kg = Column(Numeric(18, 4), nullable=False, default=0)
+
+    expenses_amount = Column(Numeric(18, 4), nullable=False, default=0)
+    expenses_count = Column(Integer, nullable=False, default=0)
+
+
+class SeasonFact(Base):
+    """
+    مجاميع الموسم لكل (موسم، محصول): الإيرادات، تكلفة البضاعة الفعلية، المشتريات، المصروفات، الكميات
+    تُحدّث مع كل ترحيل، وتُجمّد عند إغلاق الموسم (frozen_at)
+    """
+    __tablename__ = "season_facts"
+
+    season_id = Column(Integer, primary_key=True)
+    crop_id = Column(Integer, primary_key=True)  # 0 = مصروفات عامة غير مرتبطة بمحصول
+
+    sales_amount = Column(Numeric(18, 4), nullable=False, default=0)
+    sales_count = Column(Integer, nullable=False, default=0)
+    sales_quantity_kg = Column(Numeric(18, 4), nullable=False, default=0)
+    cogs_amount = Column(Numeric(18, 4), nullable=False, default=0)
+
+    purchases_amount = Column(Numeric(18, 4), nullable=False, default=0)
+    purchases_count = Column(Integer, nullable=False, default=0)
+    purchases_quantity_kg = Column(Numeric(18, 4), nullable=False, default=0)
+
+    expenses_amount = Column(Numeric(18, 4), nullable=False, default=0)
+    expenses_count = Column(Integer, nullable=False, default=0)
+
+    frozen_at = Column(DateTime, nullable=True)  # وقت إغلاق الموسم؛ لا يعاد الحساب بعده
+
+
+class TreasuryDayClose(Base):
+    """
+    إقفال يومي للخزنة لكل (حساب نقدية، يوم): الافتتاحي والوارد والمنصرف والختامي
+    يُنشأ تلقائياً لكل يوم به حركة، ويُعاد حسابه (مع ما بعده) عند ترحيل قيد بتاريخ سابق
+    الجرد الفعلي والفرق يُسجلان عند الإقفال اليدوي (closed_at)
+    """
+    __tablename__ = "treasury_day_closes"
+
+    account_id = Column(Integer, ForeignKey("financial_accounts.account_id"), primary_key=True)
+    close_date = Column(Date, primary_key=True)
+
+    opening_balance = Column(Numeric(18, 4), nullable=False, default=0)
+    total_in = Column(Numeric(18, 4), nullable=False, default=0)
+    total_out = Column(Numeric(18, 4), nullable=False, default=0)
+    closing_balance = Column(Numeric(18, 4), nullable=False, default=0)
+
+    counted_cash = Column(Numeric(18, 4), nullable=True)  # النقدية المعدودة فعلياً
+    variance = Column(Numeric(18, 4), nullable=True)  # المعدود - الختامي
+    notes = Column(Text, nullable=True)
+    closed_at = Column(DateTime, nullable=True)  # NULL = لقطة تلقائية لم تُقفل يدوياً
+    closed_by = Column(Integer, ForeignKey("users.user_id"), nullable=True)
+
+
+# ============================================
+# ذاكرة التقارير المؤقتة (Report Cache)
+# ============================================
+
+class ReportCache(Base):
+    """
+    نتيجة تقرير محفوظة لكل (تقرير، معاملات)
+    تبقى صالحة ما دام لم يُرحّل قيد جديد (entry_id > ledger_watermark)
+    بتاريخ داخل نطاق التقرير [range_start, range_end]
+    """
+    __tablename__ = "report_cache"
+
+    report_name = Column(String, primary_key=True)
+    params_key = Column(String, primary_key=True)  # JSON مرتب للمعاملات
+
+    range_start = Column(Date, nullable=True)  # NULL = من البداية
+    range_end = Column(Date, nullable=True)  # NULL = بدون نهاية
+    ledger_watermark = Column(Integer, nullable=False, default=0)  # أكبر entry_id وقت الحساب
+
+    result = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ============================================
+# مهام التقارير في الخلفية (Report Jobs)
+# ============================================
+
+REPORT_JOB_ACTIVE_STATUSES = ("PENDING", "RUNNING")
+
+
+class ReportJob(Base):
+    """
+    تقرير ثقيل يُنفذ في عملية منفصلة (process pool) بدلاً من طلب الـ API
+    الحالات: PENDING -> RUNNING -> DONE / FAILED / CANCELLED
+    """
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        # طلب واحد قيد التنفيذ لكل (تقرير، معاملات)؛ الطلبات المطابقة تُرجع نفس المهمة
+        Index(
+            "uq_report_jobs_active", "report_name", "params_key", unique=True,
+            sqlite_where=Column("status", String).in_(REPORT_JOB_ACTIVE_STATUSES)
+        ),
+    )
+
+    job_id = Column(String, primary_key=True)  # uuid hex
+    report_name = Column(String, nullable=False)
+    params_key = Column(String, nullable=False)  # JSON مرتب للمعاملات
+    status = Column(String, nullable=False, default="PENDING", index=True)
+
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+
+    created_by = Column(Integer, ForeignKey("users.user_id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    locked_by = Column(String, nullable=True)  # عامل الـ API الذي يتابع المهمة (host:pid:id)
+    locked_until = Column(DateTime, nullable=True)  # يجدده العامل دورياً؛ انتهاؤه يعني توقف العامل
+
+class ScheduledJob(Base):
+    """
+    مهمة صيانة دورية (تنبيهات، تنظيف، نسخ احتياطي، ANALYZE، ...) يشغلها المجدول داخل التطبيق
+    الجدول يحفظ جدول التشغيل (cron) وآخر تشغيل وقفل التنفيذ حتى لا يشغّل أكثر من عامل نفس المهمة
+    الأوقات بالتوقيت المحلي (مثل مواعيد cron)
+    """
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String, primary_key=True)
+    cron = Column(String, nullable=False)  # دقيقة ساعة يوم شهر يوم-الأسبوع، مثل "0 2 * * *"
+    enabled = Column(Boolean, nullable=False, default=True)
+
+    next_run_at = Column(DateTime, nullable=True, index=True)
+    last_run_at = Column(DateTime, nullable=True)  # بداية آخر تشغيل
+    last_status = Column(String, nullable=True)  # OK / FAILED
+    last_error = Column(Text, nullable=True)
+    last_duration_ms = Column(Integer, nullable=True)
+
+    locked_by = Column(String, nullable=True)  # العامل الذي يشغل المهمة الآن
+    locked_until = Column(DateTime, nullable=True)  # ينتهي القفل إذا توقف العامل أثناء التشغيل
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, ConfigDict, field_validator
 import json
-from typing import Optional, Dict, List
-from datetime import date
+from typing import Any, Optional, Dict, List
+from datetime import date, datetime
 from decimal import Decimal
 
 # --- Base Schemas ---
@@ -337,12 +337,58 @@ class DailyPriceRead(DailyPriceBase):
     crop: Crop
     model_config = ConfigDict(from_attributes=True)
 
+class TreasuryAccountPosition(BaseModel):
+    """مركز حساب نقدية واحد (درج أو بنك) في ملخص الخزنة"""
+    account_id: int
+    account_name: str
+    opening_balance: Decimal
+    total_in_today: Decimal
+    total_out_today: Decimal
+    closing_balance: Decimal
+    current_balance: Decimal
+    is_closed: bool = False
+    counted_cash: Optional[Decimal] = None
+    variance: Optional[Decimal] = None
+
 class TreasurySummary(BaseModel):
     opening_balance: Decimal
     total_in_today: Decimal
     total_out_today: Decimal
     closing_balance: Decimal
     current_balance: Decimal 
+    # الإقفال اليومي (إن تم جرد اليوم)
+    is_closed: bool = False
+    counted_cash: Optional[Decimal] = None
+    variance: Optional[Decimal] = None
+    # الحسابات المشمولة ومركز كل منها
+    account_ids: List[int] = []
+    accounts: List[TreasuryAccountPosition] = []
+
+class TreasuryDayCloseCreate(BaseModel):
+    close_date: date
+    counted_cash: Decimal
+    notes: Optional[str] = None
+    account_id: Optional[int] = None  # الافتراضي: الخزنة الرئيسية
+
+    @field_validator('counted_cash')
+    def validate_counted_cash(cls, v):
+        if v < 0:
+            raise ValueError('النقدية المعدودة لا يمكن أن تكون سالبة')
+        return v
+
+class TreasuryDayClose(BaseModel):
+    account_id: int
+    close_date: date
+    opening_balance: Decimal
+    total_in: Decimal
+    total_out: Decimal
+    closing_balance: Decimal
+    counted_cash: Optional[Decimal] = None
+    variance: Optional[Decimal] = None
+    notes: Optional[str] = None
+    closed_at: Optional[datetime] = None
+    closed_by: Optional[int] = None
+    model_config = ConfigDict(from_attributes=True)
 
 class TreasuryTransaction(BaseModel):
     transaction_id: int
@@ -353,6 +399,8 @@ class TreasuryTransaction(BaseModel):
     source: Optional[str] = None
     contact_name: Optional[str] = None
     account_name: Optional[str] = None  # New field for Contra Account Name
+    balance: Optional[Decimal] = None  # رصيد الخزنة بعد الحركة
+    cash_account_id: Optional[int] = None  # الدرج أو البنك الذي تمت عليه الحركة
 
 class AccountStatementEntry(BaseModel):
     """سطر واحد في كشف الحساب"""
@@ -501,3 +549,36 @@ class CapitalTransactionCreate(BaseModel):
         if v not in ('CONTRIBUTION', 'WITHDRAWAL'):
             raise ValueError('يجب أن يكون النوع مساهمة (CONTRIBUTION) أو سحب (WITHDRAWAL)')
         return v
+
+# --- Report Job Schemas ---
+class ReportJobCreate(BaseModel):
+    """طلب تشغيل تقرير في الخلفية"""
+    report_name: str
+    params: Dict[str, Any] = {}
+
+class ReportJobRead(BaseModel):
+    job_id: str
+    report_name: str
+    status: str
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class ScheduledJobRead(BaseModel):
+    name: str
+    cron: str
+    enabled: bool
+    next_run_at: Optional[datetime] = None
+    last_run_at: Optional[datetime] = None
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    last_duration_ms: Optional[int] = None
+    locked_by: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class ScheduledJobUpdate(BaseModel):
+    """تعديل جدول تشغيل مهمة أو إيقافها"""
+    cron: Optional[str] = None
+    enabled: Optional[bool] = None
@@ -1,71 +1,163 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, case
 from datetime import date, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from decimal import Decimal
 from app.models import Sale, Purchase, Crop, Contact, Season, GeneralLedger, InventoryBatch, Expense
 from app.core.settings import get_setting
+from app.services.report_cache import cached_report
+from app.services.analytics import fetch_all
 from sqlalchemy import extract
 
-def get_crop_profitability(db: Session, season_id: int):
+PROFITABILITY_BREAKDOWNS = ("crop", "season", "month")
+
+
+def join_sale_cogs(db: Session, query):
     """
-    تقرير ربحية المحاصيل لموسم محدد
-    يحسب: الإيرادات، التكاليف (الشراء + مصروفات مباشرة)، والربح الصافي لكل محصول
+    ربط استعلام على المبيعات بتكلفتها الفعلية (FIFO) من قيود SALE_COGS
+
+    المرتجع ينقص كمية البيع دون عكس قيد التكلفة، فتُنسب التكلفة للكمية المتبقية فقط
+
+    Returns:
+        (الاستعلام بعد الربط، تعبير تكلفة كل بيع)
     """
-    # 1. المبيعات (Revenue)
-    sales_query = db.query(
-        Crop.crop_name,
-        func.sum(Sale.total_sale_amount).label('total_revenue'),
-        func.sum(Sale.quantity_sold_kg).label('total_sold_kg')
-    ).join(Sale.crop).filter(
-        Sale.season_id == season_id if hasattr(Sale, 'season_id') else True # Fallback if season_id not directly on Sale
-    ).group_by(Crop.crop_name).all()
-
-    # 2. المشتريات (Cost of Goods Sold - approximation)
-    # We can approximate cost based on purchases for that crop
-    purchases_query = db.query(
+    from app.models import SaleReturn
+
+    cogs = db.query(
+        GeneralLedger.source_id.label('sale_id'),
+        func.sum(GeneralLedger.debit).label('cogs')
+    ).filter(
+        GeneralLedger.source_type == 'SALE_COGS',
+        GeneralLedger.debit > 0
+    ).group_by(GeneralLedger.source_id).subquery()
+
+    returned = db.query(
+        SaleReturn.sale_id,
+        func.sum(SaleReturn.quantity_kg).label('returned_kg')
+    ).group_by(SaleReturn.sale_id).subquery()
+
+    original_kg = Sale.quantity_sold_kg + func.coalesce(returned.c.returned_kg, 0)
+    sale_cogs = case(
+        (returned.c.returned_kg.is_(None), func.coalesce(cogs.c.cogs, 0)),
+        (original_kg > 0, func.coalesce(cogs.c.cogs, 0) * Sale.quantity_sold_kg / original_kg),
+        else_=0
+    )
+
+    query = query.outerjoin(cogs, cogs.c.sale_id == Sale.sale_id)\
+        .outerjoin(returned, returned.c.sale_id == Sale.sale_id)
+    return query, sale_cogs
+
+
+@cached_report(
+    "crop_profitability",
+    date_range=lambda season_id, breakdown, start_date, end_date: (start_date, end_date),
+)
+def get_crop_profitability(
+    db: Session,
+    season_id: int = None,
+    breakdown: str = "crop",
+    start_date: date = None,
+    end_date: date = None,
+):
+    """
+    تقرير ربحية المحاصيل من التكلفة الفعلية (FIFO)
+    - الإيراد: صافي قيمة المبيعات (بعد المرتجعات)
+    - تكلفة البضاعة: قيود SALE_COGS لكل بيع، منسوبة للكمية غير المرتجعة
+    - المصروفات المباشرة: المصروفات المرتبطة بمحصول
+
+    كل ذلك في استعلام واحد مجمّع حسب المحصول، أو (الموسم، المحصول)، أو (الشهر، المحصول)
+    """
+    from sqlalchemy import literal, union_all, Numeric
+
+    if breakdown not in PROFITABILITY_BREAKDOWNS:
+        raise ValueError(f"Unknown profitability breakdown: {breakdown}")
+
+    zero = literal(0, Numeric(18, 4))
+
+    def period(date_column, season_column):
+        if breakdown == "month":
+            return func.strftime('%Y-%m', date_column)
+        if breakdown == "season":
+            return season_column
+        return literal(None)
+
+    sale_rows, sale_cogs = join_sale_cogs(db, db.query(Sale))
+    sale_rows = sale_rows.with_entities(
+        period(Sale.sale_date, Sale.season_id).label('period'),
+        Sale.crop_id.label('crop_id'),
+        Sale.total_sale_amount.label('revenue'),
+        Sale.quantity_sold_kg.label('sold_kg'),
+        sale_cogs.label('cogs'),
+        zero.label('direct_expenses')
+    )
+
+    expense_rows = db.query(
+        period(Expense.expense_date, Expense.season_id).label('period'),
+        Expense.crop_id.label('crop_id'),
+        zero.label('revenue'),
+        zero.label('sold_kg'),
+        zero.label('cogs'),
+        Expense.amount.label('direct_expenses')
+    ).filter(Expense.crop_id.isnot(None))
+
+    if season_id:
+        sale_rows = sale_rows.filter(Sale.season_id == season_id)
+        expense_rows = expense_rows.filter(Expense.season_id == season_id)
+    if start_date:
+        sale_rows = sale_rows.filter(Sale.sale_date >= start_date)
+        expense_rows = expense_rows.filter(Expense.expense_date >= start_date)
+    if end_date:
+        sale_rows = sale_rows.filter(Sale.sale_date <= end_date)
+        expense_rows = expense_rows.filter(Expense.expense_date <= end_date)
+
+    rows = union_all(sale_rows.statement, expense_rows.statement).subquery()
+
+    query = db.query(
+        rows.c.period,
+        rows.c.crop_id,
         Crop.crop_name,
-        func.sum(Purchase.total_cost).label('total_purchase_cost'),
-        func.sum(Purchase.quantity_kg).label('total_purchased_kg')
-    ).join(Purchase.crop).filter(
-        Purchase.season_id == season_id if hasattr(Purchase, 'season_id') else True
-    ).group_by(Crop.crop_name).all()
-    
-    # Merge data
-    report_data = {}
-    
-    for s in sales_query:
-        report_data[s.crop_name] = {
-            "revenue": s.total_revenue or 0,
-            "sold_kg": s.total_sold_kg or 0,
-            "cost": 0,
-            "purchased_kg": 0,
-            "profit": 0,
-            "margin": 0
-        }
-        
-    for p in purchases_query:
-        if p.crop_name not in report_data:
-            report_data[p.crop_name] = {
-                "revenue": 0,
-                "sold_kg": 0,
-                "cost": 0,
-                "purchased_kg": 0,
-                "profit": 0,
-                "margin": 0
-            }
-        report_data[p.crop_name]["cost"] = p.total_purchase_cost or 0
-        report_data[p.crop_name]["purchased_kg"] = p.total_purchased_kg or 0
-
-    # Calculate profit
+        func.sum(rows.c.revenue).label('revenue'),
+        func.sum(rows.c.sold_kg).label('sold_kg'),
+        func.sum(rows.c.cogs).label('cogs'),
+        func.sum(rows.c.direct_expenses).label('direct_expenses')
+    ).join(Crop, Crop.crop_id == rows.c.crop_id)
+
+    if breakdown == "season":
+        query = query.add_columns(Season.name.label('season_name'))\
+            .outerjoin(Season, Season.season_id == rows.c.period)\
+            .group_by(rows.c.period, rows.c.crop_id, Crop.crop_name, Season.name)
+    else:
+        query = query.group_by(rows.c.period, rows.c.crop_id, Crop.crop_name)
+    query = query.order_by(rows.c.period, rows.c.crop_id)
+
     results = []
-    for crop_name, data in report_data.items():
-        data["profit"] = data["revenue"] - data["cost"]
-        if data["revenue"] > 0:
-            data["margin"] = (data["profit"] / data["revenue"]) * 100
-        results.append({"crop_name": crop_name, **data})
-        
-    return sorted(results, key=lambda x: x['profit'], reverse=True)
+    for r in fetch_all(db, query):
+        revenue = Decimal(str(r.revenue or 0))
+        cost_of_sales = Decimal(str(r.cogs or 0))
+        direct_expenses = Decimal(str(r.direct_expenses or 0))
+        cost = cost_of_sales + direct_expenses
+        profit = revenue - cost
+        item = {
+            "crop_id": r.crop_id,
+            "crop_name": r.crop_name,
+            "revenue": revenue,
+            "sold_kg": Decimal(str(r.sold_kg or 0)),
+            "cogs": cost_of_sales,
+            "direct_expenses": direct_expenses,
+            "cost": cost,
+            "profit": profit,
+            "margin": (profit / revenue * 100) if revenue > 0 else Decimal(0),
+        }
+        if breakdown == "season":
+            item.update({"season_id": r.period, "season_name": r.season_name})
+        elif breakdown == "month":
+            item["month"] = r.period
+        results.append(item)
+
+    results.sort(key=lambda x: x['profit'], reverse=True)
+    if breakdown != "crop":
+        results.sort(key=lambda x: (x.get('month') or x.get('season_id') or 0))
+    return results
 
 def get_top_customers(db: Session, limit: int = 10):
     """تحليل أفضل العملاء من حيث حجم المبيعات"""
@@ -80,12 +172,73 @@ def get_top_customers(db: Session, limit: int = 10):
      
     return [{"name": r.name, "transaction_count": r.transaction_count, "total_sales": str(r.total_sales or 0)} for r in results]
 
-def get_season_comparison(db: Session):
-    """مقارنة أداء المواسم"""
-    # This assumes we have a way to link sales/purchases to seasons directly or via date
-    # Simple approach: Group sales by year/month or if season_id exists on transactions using dates
-    pass
+def _season_figures(values) -> Dict[str, Any]:
+    revenue = Decimal(str(values.get("sales_amount") or 0))
+    cogs = Decimal(str(values.get("cogs_amount") or 0))
+    expenses = Decimal(str(values.get("expenses_amount") or 0))
+    gross_profit = revenue - cogs
+    net_profit = gross_profit - expenses
+    return {
+        "revenue": revenue,
+        "cogs": cogs,
+        "gross_profit": gross_profit,
+        "expenses": expenses,
+        "net_profit": net_profit,
+        "margin": (net_profit / revenue * 100) if revenue > 0 else Decimal(0),
+        "purchases": Decimal(str(values.get("purchases_amount") or 0)),
+        "sold_kg": Decimal(str(values.get("sales_quantity_kg") or 0)),
+        "purchased_kg": Decimal(str(values.get("purchases_quantity_kg") or 0)),
+        "sales_count": values.get("sales_count") or 0,
+        "purchases_count": values.get("purchases_count") or 0,
+        "expenses_count": values.get("expenses_count") or 0,
+    }
+
+
+def get_season_comparison(db: Session, season_ids: Optional[List[int]] = None):
+    """
+    مقارنة أداء المواسم جنباً إلى جنب
+    تُقرأ من مجاميع المواسم (season_facts) فتكلفتها لا تعتمد على عدد الحركات
+
+    Args:
+        season_ids: المواسم المطلوبة بالترتيب (الافتراضي: كل المواسم بترتيب تاريخ البداية)
+    """
+    from app.services import season_facts
+
+    query = db.query(Season)
+    if season_ids:
+        query = query.filter(Season.season_id.in_(season_ids))
+    seasons = {s.season_id: s for s in query.order_by(Season.start_date).all()}
+    ordered = [sid for sid in season_ids if sid in seasons] if season_ids else list(seasons)
+    if not ordered:
+        return []
 
+    totals = season_facts.get_season_totals(db, ordered)
+    crops: Dict[int, list] = {sid: [] for sid in ordered}
+    for fact, crop_name in season_facts.get_season_crop_facts(db, ordered):
+        values = {name: getattr(fact, name) for name in season_facts.MEASURES}
+        crops[fact.season_id].append({
+            "crop_id": fact.crop_id or None,
+            "crop_name": crop_name if fact.crop_id else "مصروفات عامة",
+            **_season_figures(values)
+        })
+
+    results = []
+    for sid in ordered:
+        season = seasons[sid]
+        season_totals = totals.get(sid, {})
+        results.append({
+            "season_id": sid,
+            "season_name": season.name,
+            "status": season.status,
+            "start_date": season.start_date,
+            "end_date": season.end_date,
+            "frozen": season_totals.get("frozen_at") is not None,
+            "totals": _season_figures(season_totals),
+            "crops": crops[sid],
+        })
+    return results
+
+@cached_report("debt_report", date_range=lambda: (None, None))
 def get_debt_report(db: Session):
     """
     تقرير المديونية (Statement of Detbs)
@@ -126,7 +279,7 @@ def get_debt_report(db: Session):
      .group_by(Payment.contact_id).subquery()
      
     # Combine results
-    customers = db.query(
+    customers = fetch_all(db, db.query(
         Contact.contact_id,
         Contact.name,
         Contact.phone,
@@ -136,7 +289,8 @@ def get_debt_report(db: Session):
     ).outerjoin(customers_sales, Contact.contact_id == customers_sales.c.contact_id)\
      .outerjoin(customers_returns, Contact.contact_id == customers_returns.c.contact_id)\
      .outerjoin(customers_payments, Contact.contact_id == customers_payments.c.contact_id)\
-     .filter(Contact.is_customer == True).all()
+     .filter(Contact.is_customer == True)\
+     .order_by(Contact.contact_id))
 
     receivables = []
     for c in customers:
@@ -190,7 +344,7 @@ def get_debt_report(db: Session):
      .filter(Contact.is_supplier == True)\
      .group_by(Payment.contact_id).subquery()
 
-    suppliers = db.query(
+    suppliers = fetch_all(db, db.query(
         Contact.contact_id,
         Contact.name,
         Contact.phone,
@@ -200,7 +354,8 @@ def get_debt_report(db: Session):
     ).outerjoin(suppliers_purchases, Contact.contact_id == suppliers_purchases.c.contact_id)\
      .outerjoin(suppliers_returns, Contact.contact_id == suppliers_returns.c.contact_id)\
      .outerjoin(suppliers_payments, Contact.contact_id == suppliers_payments.c.contact_id)\
-     .filter(Contact.is_supplier == True).all()
+     .filter(Contact.is_supplier == True)\
+     .order_by(Contact.contact_id))
 
     payables = []
     for s in suppliers:
@@ -1,88 +1,135 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, cast, exists, insert, literal, select, String
+from collections import Counter
 from datetime import datetime, timedelta
-from app.models import Notification, Inventory, Crop, Sale, Payment
-from typing import List
+from app.models import Notification, Inventory, Crop, Sale, Contact
+from app.services import notification_counters
+from app.services.live_updates import publish_notification
+from typing import Dict, List
 
-def create_notification(db: Session, title: str, message: str, type: str, user_id: int = None, action_url: str = None):
+def create_notification(db: Session, title: str, message: str, type: str, user_id: int = None, action_url: str = None, dedup_key: str = None):
     """Create a new notification."""
     notif = Notification(
         title=title,
         message=message,
         type=type,
         user_id=user_id,
-        action_url=action_url
+        action_url=action_url,
+        dedup_key=dedup_key
     )
     db.add(notif)
     db.commit()
     db.refresh(notif)
     return notif
 
-def check_low_stock(db: Session) -> List[Notification]:
+def _dedup_key(prefix: str, column):
+    """مفتاح منع التكرار كتعبير SQL (مثل LOW_STOCK:crop:5) ليُقارن داخل الاستعلام نفسه"""
+    return literal(prefix) + cast(column, String)
+
+def _not_notified(key):
+    """
+    Anti-join: لا يوجد تنبيه بنفس المفتاح (حتى لو قُرئ) - الحالة نُبّه عنها ولم تزل بعد
+    يستخدم الفهرس الجزئي uq_notifications_dedup_key (بحث واحد لكل مرشح بدلاً من LIKE على كل الجدول)
+    """
+    return ~exists().where(Notification.dedup_key == key)
+
+def _release_cleared(db: Session, type: str, active_keys) -> None:
+    """
+    فك مفاتيح التنبيهات التي زالت حالتها (ارتفع المخزون، سُددت الفاتورة)
+    حتى يُنبَّه من جديد إذا عادت الحالة لاحقاً
+    """
+    db.query(Notification).filter(
+        Notification.type == type,
+        Notification.dedup_key != None,
+        Notification.dedup_key.notin_(active_keys)
+    ).update({"dedup_key": None}, synchronize_session=False)
+
+def _insert_notifications(db: Session, rows: List[Dict]) -> int:
+    """
+    إدراج دفعة واحدة ثم commit واحد (مع فك المفاتيح في نفس المعاملة)
+    OR IGNORE: إذا سبقنا فحص متزامن لنفس المفتاح يتخطى الفهرس الفريد الصف بدلاً من فشل الدفعة كلها
+    """
+    inserted = []
+    if rows:
+        table = Notification.__table__
+        inserted = db.execute(insert(table).prefix_with("OR IGNORE").returning(*table.c), rows).all()
+        notification_counters.adjust(db, Counter(notification_counters.bucket(n.user_id) for n in inserted))
+        for n in inserted:
+            publish_notification(db, n)
+    db.commit()
+    return len(inserted)
+
+def check_low_stock(db: Session) -> int:
     """
     Check for inventory items below the threshold and generate notifications.
-    Returns list of generated notifications.
+    Returns the number of generated notifications.
     """
-    low_stock_items = db.query(Inventory).filter(
-        Inventory.current_stock_kg <= Inventory.low_stock_threshold
+    key = _dedup_key("LOW_STOCK:crop:", Inventory.crop_id)
+    is_low = Inventory.current_stock_kg <= Inventory.low_stock_threshold
+    _release_cleared(db, "LOW_STOCK", select(key).where(is_low))
+
+    low_stock_items = db.query(
+        key.label("dedup_key"), Crop.crop_name, Inventory.current_stock_kg, Inventory.low_stock_threshold
+    ).join(
+        Crop, Crop.crop_id == Inventory.crop_id
+    ).filter(
+        is_low,
+        _not_notified(key)
     ).all()
-    
-    generated_alerts = []
-    
-    for item in low_stock_items:
-        # Check if an unread alert already exists for this crop to avoid spam
-        existing_alert = db.query(Notification).filter(
-            Notification.type == "LOW_STOCK",
-            Notification.is_read == False,
-            Notification.message.contains(item.crop.crop_name)
-        ).first()
-        
-        if not existing_alert:
-            notif = create_notification(
-                db=db,
-                title="تنبيه مخزون منخفض",
-                message=f"مخزون {item.crop.crop_name} وصل إلى {item.current_stock_kg} كجم (الحد الأدنى: {item.low_stock_threshold} كجم)",
-                type="LOW_STOCK",
-                action_url="/inventory"
-            )
-            generated_alerts.append(notif)
-            
-    return generated_alerts
-
-def check_overdue_debts(db: Session, days_threshold: int = 30) -> List[Notification]:
+
+    return _insert_notifications(db, [
+        {
+            "title": "تنبيه مخزون منخفض",
+            "message": f"مخزون {item.crop_name} وصل إلى {item.current_stock_kg} كجم (الحد الأدنى: {item.low_stock_threshold} كجم)",
+            "type": "LOW_STOCK",
+            "action_url": "/inventory",
+            "dedup_key": item.dedup_key
+        }
+        for item in low_stock_items
+    ])
+
+def check_overdue_debts(db: Session, days_threshold: int = 30) -> int:
     """
     Check for unpaid sales older than `days_threshold` days.
+    Returns the number of generated notifications.
     """
     overdue_date = datetime.now().date() - timedelta(days=days_threshold)
-    
-    overdue_sales = db.query(Sale).filter(
-        Sale.payment_status != "PAID",
-        Sale.sale_date <= overdue_date
+
+    key = _dedup_key("OVERDUE_DEBT:sale:", Sale.sale_id)
+    is_overdue = (
+        (Sale.payment_status != "PAID")
+        & (Sale.sale_date <= overdue_date)
+        & (Sale.total_sale_amount - func.coalesce(Sale.amount_received, 0) > 0)
+    )
+    _release_cleared(db, "OVERDUE_DEBT", select(key).where(is_overdue))
+
+    overdue_sales = db.query(
+        key.label("dedup_key"), Sale.sale_id, Sale.sale_date,
+        Sale.total_sale_amount, Sale.amount_received, Contact.name.label("customer_name")
+    ).outerjoin(
+        Contact, Contact.contact_id == Sale.customer_id
+    ).filter(
+        is_overdue,
+        _not_notified(key)
     ).all()
-    
-    generated_alerts = []
-    
+
+    rows = []
     for sale in overdue_sales:
-        remaining_amount = sale.total_sale_amount - sale.amount_received
-        if remaining_amount > 0:
-            existing_alert = db.query(Notification).filter(
-                Notification.type == "OVERDUE_DEBT",
-                Notification.is_read == False,
-                Notification.message.contains(f"بيع #{sale.sale_id}")
-            ).first()
-            
-            if not existing_alert:
-                customer_name = sale.customer.name if sale.customer else "عميل"
-                notif = create_notification(
-                    db=db,
-                    title="ديون متأخرة",
-                    message=f"فاتورة بيع #{sale.sale_id} للعميل {customer_name} متاخرة منذ {sale.sale_date}. المبلغ المتبقي: {remaining_amount}",
-                    type="OVERDUE_DEBT",
-                    action_url=f"/sales" # Could be deep link to detail
-                )
-                generated_alerts.append(notif)
-                
-    return generated_alerts
+        remaining_amount = sale.total_sale_amount - (sale.amount_received or 0)
+        customer_name = sale.customer_name or "عميل"
+        rows.append({
+            "title": "ديون متأخرة",
+            "message": f"فاتورة بيع #{sale.sale_id} للعميل {customer_name} متاخرة منذ {sale.sale_date}. المبلغ المتبقي: {remaining_amount}",
+            "type": "OVERDUE_DEBT",
+            "action_url": f"/sales", # Could be deep link to detail
+            "dedup_key": sale.dedup_key
+        })
+
+    return _insert_notifications(db, rows)
+
+def check_all_alerts(db: Session) -> int:
+    """كل فحوصات التنبيهات (يشغلها المجدول دورياً أو الـ API يدوياً)"""
+    return check_low_stock(db) + check_overdue_debts(db)
 
 def mark_as_read(db: Session, notification_id: int):
     notif = db.query(Notification).filter(Notification.notification_id == notification_id).first()
@@ -93,13 +140,12 @@ def mark_as_read(db: Session, notification_id: int):
     return False
 
 def mark_all_as_read(db: Session, user_id: int = None):
+    """تحديد الكل كمقروء بجملة UPDATE واحدة وتصفير العدادات المعنية"""
     query = db.query(Notification).filter(Notification.is_read == False)
     if user_id:
         query = query.filter((Notification.user_id == user_id) | (Notification.user_id == None))
     
-    notifications = query.all()
-    for notif in notifications:
-        notif.is_read = True
-    
+    count = query.update({"is_read": True}, synchronize_session=False)
+    notification_counters.reset(db, [user_id, notification_counters.BROADCAST] if user_id else None)
     db.commit()
-    return len(notifications)
+    return count
@@ -0,0 +1,152 @@
+"""
+Analytics Engine
+تنفيذ استعلامات التقارير الثقيلة (للقراءة فقط) في DuckDB بدلاً من محرك SQLite
+
+- DuckDB يرفق ملف SQLite نفسه (أو أحدث نسخة احتياطية) للقراءة فقط عبر امتداد sqlite،
+  فالتجميعات العمودية لا تنافس الكتابة على اتصالات التطبيق
+- نفس استعلام SQLAlchemy يُترجم لـ DuckDB، فلا توجد نسخة ثانية من منطق التقارير
+- معطل افتراضياً (ANALYTICS_ENGINE=sqlite)؛ ومع أي خطأ أو غياب مكتبة duckdb يرجع التنفيذ لـ SQLite
+
+ملاحظة: DuckDB يقرأ ما تم حفظه (commit) فقط، ومع ANALYTICS_SOURCE=snapshot يقرأ آخر نسخة احتياطية
+"""
+import logging
+import os
+import threading
+from collections import namedtuple
+from typing import List
+
+from sqlalchemy import Numeric
+from sqlalchemy.dialects.postgresql.base import PGCompiler, PGDialect
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.services import backup
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - يعتمد على البيئة
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ENGINES = ("sqlite", "duckdb")
+ANALYTICS_SOURCES = ("live", "snapshot")
+ATTACHED_NAME = "agri"
+
+# اتصال DuckDB لكل خيط (الاتصال الواحد غير آمن للاستخدام المتزامن)
+_local = threading.local()
+
+
+class _DuckDBCompiler(PGCompiler):
+    """لهجة PostgreSQL مع الفروق التي تستخدمها التقارير"""
+
+    def visit_strftime_func(self, fn, **kw):
+        # SQLite: strftime(format, date) / DuckDB: strftime(date, format)
+        fmt, value = fn.clauses.clauses
+        return f"strftime({self.process(value, **kw)}, {self.process(fmt, **kw)})"
+
+    def visit_floordiv_binary(self, binary, operator, **kw):
+        # "/" في DuckDB قسمة عشرية دائماً
+        return f"{self.process(binary.left, **kw)} // {self.process(binary.right, **kw)}"
+
+
+class _DuckDBDialect(PGDialect):
+    statement_compiler = _DuckDBCompiler
+
+
+# paramstyle مسمى حتى لا تتضاعف علامات % في النصوص المضمّنة
+_dialect = _DuckDBDialect(paramstyle="named")
+
+
+def compile_for_duckdb(statement) -> str:
+    """نص SQL للاستعلام بقيم مضمّنة (DuckDB لا يستقبل معاملات SQLAlchemy المسماة)"""
+    return str(statement.compile(dialect=_dialect, compile_kwargs={"literal_binds": True}))
+
+
+def analytics_enabled() -> bool:
+    return settings.ANALYTICS_ENGINE == "duckdb" and duckdb is not None
+
+
+def _source_path(db: Session) -> str:
+    """ملف قاعدة البيانات الحالي، أو أحدث نسخة احتياطية"""
+    if settings.ANALYTICS_SOURCE == "snapshot":
+        backups = backup.list_backups()
+        if backups:
+            return os.path.abspath(os.path.join(backup.BACKUP_DIR, backups[0]["filename"]))
+        logger.warning("No backup snapshot found, analytics will read the live database")
+    return os.path.abspath(db.get_bind().url.database)
+
+
+def _connection(path: str):
+    """اتصال DuckDB للخيط الحالي مع إرفاق الملف للقراءة فقط (يعاد الإرفاق إن تغير الملف)"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = duckdb.connect(":memory:")
+        try:
+            conn.execute("LOAD sqlite")
+        except duckdb.Error:
+            conn.execute("INSTALL sqlite")
+            conn.execute("LOAD sqlite")
+        _local.conn, _local.path = conn, None
+
+    if _local.path != path:
+        if _local.path is not None:
+            conn.execute(f"DETACH {ATTACHED_NAME}")
+        escaped = path.replace("'", "''")
+        conn.execute(f"ATTACH '{escaped}' AS {ATTACHED_NAME} (TYPE SQLITE, READ_ONLY)")
+        conn.execute(f"USE {ATTACHED_NAME}")
+        _local.path = path
+    return conn
+
+
+def _numeric_processors(db: Session, statement) -> list:
+    """
+    محولات SQLAlchemy للأعمدة الرقمية (Numeric(18, 4) -> Decimal مقرب لنفس الخانات)
+    DuckDB يرجع المبالغ كـ DOUBLE، فتمر بنفس التحويل الذي تمر به نتائج SQLite
+    """
+    dialect = db.get_bind().dialect
+    return [
+        column.type.dialect_impl(dialect).result_processor(dialect, None)
+        if isinstance(column.type, Numeric) else None
+        for column in statement.selected_columns
+    ]
+
+
+def _duckdb_rows(db: Session, statement) -> list:
+    cursor = _connection(_source_path(db)).execute(compile_for_duckdb(statement))
+    Row = namedtuple("Row", [d[0] for d in cursor.description], rename=True)
+    processors = _numeric_processors(db, statement)
+    return [
+        Row(*(p(value) if p and value is not None else value for p, value in zip(processors, row)))
+        for row in cursor.fetchall()
+    ]
+
+
+def _sqlite_rows(db: Session, query) -> list:
+    if isinstance(query, Query):
+        return query.all()
+    return db.execute(query).all()
+
+
+def fetch_all(db: Session, query) -> List:
+    """
+    تنفيذ استعلام قراءة (Query أو select) في DuckDB إن كان مفعلاً، وإلا في SQLite
+    الصفوف في الحالتين تدعم الفك بالترتيب والوصول بالاسم (row.label)
+    ترتيب الصفوف غير مضمون بدون order_by صريح (DuckDB يجمع بالتوازي)
+    """
+    if analytics_enabled():
+        statement = query.statement if isinstance(query, Query) else query
+        try:
+            return _duckdb_rows(db, statement)
+        except Exception as e:
+            logger.warning(f"DuckDB analytics query failed, falling back to SQLite: {e}")
+            close_connection()
+    return _sqlite_rows(db, query)
+
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+    _local.conn = _local.path = None
+
@@ -10,8 +10,17 @@ from typing import Optional
 from app import models, schemas
 from app.core.settings import get_setting
 from app.services.reporting import generate_income_statement
+from app.services.report_cache import cached_report
 
 
+@cached_report(
+    "capital_distribution",
+    date_range=lambda report_date, start_date: (None, None),
+    # التقرير يقرأ الأرصدة الحالية، لذلك "اليوم" جزء من المفتاح
+    normalize=lambda p: {**p, "report_date": p["report_date"] or date.today()},
+    encode=lambda report: report.model_dump(),
+    decode=lambda data: schemas.CapitalDistributionReport(**data),
+)
 def generate_capital_distribution(
     db: Session, 
     report_date: Optional[date] = None,
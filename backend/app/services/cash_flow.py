@@ -1,167 +1,290 @@
 """
 خدمة تقرير التدفقات النقدية
 Cash Flow Statement Service
-"""
 
+التقرير استعلام واحد على قيود حسابات النقدية: SUM(CASE source_type ...) لكل بند،
+مجمعاً حسب اليوم (أو الفترة) مع فترة افتتاحية للقيود السابقة لبداية التقرير.
+تصنيف أنواع المصادر قابل للتعديل من الإعدادات (CASH_FLOW_SOURCE_MAPPING)،
+وحسابات النقدية والبنوك من CASH_ACCOUNT_IDS.
+"""
+import logging
+from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from datetime import date, timedelta
-from typing import Optional
+from sqlalchemy import func, case, literal
+from fastapi import HTTPException
+from datetime import date
+from typing import Dict, List, Optional
 
 from app import models
 from app.core.settings import get_setting
+from app.services.report_cache import cached_report
+from app.services.reporting import period_bucket, period_ranges, OPENING_PERIOD
+
+logger = logging.getLogger(__name__)
+
+# بند التقرير -> (النشاط، الاتجاه): in = مدين حساب النقدية، out = دائن حساب النقدية
+CASH_FLOW_LINES = {
+    "customer_collections": ("operating", "in"),
+    "supplier_payments": ("operating", "out"),
+    "operating_expenses": ("operating", "out"),
+    "inflows": ("investing", "in"),
+    "outflows": ("investing", "out"),
+    "capital_contributions": ("financing", "in"),
+    "capital_withdrawals": ("financing", "out"),
+}
+
+ACTIVITIES = ("operating", "investing", "financing")
+
+# نوع المصدر في دفتر الأستاذ -> بند (أو بندان باتجاهين مختلفين)
+# يمكن تعديله أو الإضافة عليه بإعداد CASH_FLOW_SOURCE_MAPPING (JSON بنفس الشكل)
+DEFAULT_SOURCE_MAPPING = {
+    "SALE": "customer_collections",
+    "SALE_PAYMENT": "customer_collections",
+    "CASH_RECEIPT": "customer_collections",
+    "PURCHASE": "supplier_payments",
+    "PURCHASE_PAYMENT": "supplier_payments",
+    "CASH_PAYMENT": "supplier_payments",
+    "PAYMENT": ["customer_collections", "supplier_payments"],
+    "EXPENSE": "operating_expenses",
+    "QUICK_EXPENSE": "operating_expenses",
+    "CAPITAL_CONTRIBUTION": "capital_contributions",
+    "CAPITAL_WITHDRAWAL": "capital_withdrawals",
+}
+
+_UNCLASSIFIED = ("unclassified_inflows", "unclassified_outflows")
+_COLUMNS = tuple(CASH_FLOW_LINES) + _UNCLASSIFIED
+
+
+def get_source_mapping(db: Session) -> Dict[str, Dict[str, str]]:
+    """نوع المصدر -> {الاتجاه: البند} بعد دمج الإعدادات مع التصنيف الافتراضي"""
+    mapping = {**DEFAULT_SOURCE_MAPPING, **(get_setting(db, "CASH_FLOW_SOURCE_MAPPING") or {})}
+    resolved = {}
+    for source_type, lines in mapping.items():
+        for line in ([lines] if isinstance(lines, str) else lines or []):
+            if line not in CASH_FLOW_LINES:
+                logger.warning(f"Unknown cash flow line '{line}' for source type {source_type}")
+                continue
+            resolved.setdefault(source_type, {})[CASH_FLOW_LINES[line][1]] = line
+    return resolved
+
+
+def get_cash_account_ids(db: Session, account_ids: Optional[List[int]] = None) -> List[int]:
+    """حسابات النقدية والبنوك (CASH_ACCOUNT_IDS، وافتراضياً الخزنة الرئيسية فقط)"""
+    configured = get_setting(db, "CASH_ACCOUNT_IDS") or get_setting(db, "CASH_ACCOUNT_ID")
+    configured = [int(a) for a in (configured if isinstance(configured, list) else [configured]) if a is not None]
+    if not account_ids:
+        return configured
+    if set(account_ids) - set(configured):
+        raise HTTPException(status_code=400, detail="الحساب المحدد ليس من حسابات النقدية")
+    return sorted(set(account_ids))
+
+
+def _cash_rows(db: Session, account_ids: List[int], end_date: date, bucket, mapping):
+    """
+    (المفتاح، صافي الحركة، قيمة كل بند...) لكل مفتاح في استعلام واحد
+    مسح نطاق واحد على فهرس (account_id, entry_date)
+    """
+    GL = models.GeneralLedger
+    columns = []
+    for line, (_, direction) in CASH_FLOW_LINES.items():
+        sources = [s for s, lines in mapping.items() if lines.get(direction) == line]
+        amount = GL.debit if direction == "in" else GL.credit
+        columns.append(func.sum(case((GL.source_type.in_(sources), amount), else_=0)) if sources else literal(0))
+
+    # ما لم يُصنف (ليظهر الفرق بين الرصيد المحسوب والفعلي بدلاً من أن يضيع)
+    for direction, amount in (("in", GL.debit), ("out", GL.credit)):
+        classified = [s for s, lines in mapping.items() if direction in lines]
+        columns.append(func.sum(case((GL.source_type.in_(classified), 0), else_=amount)))
+
+    return db.query(bucket, func.sum(GL.debit - GL.credit), *columns).filter(
+        GL.account_id.in_(account_ids),
+        GL.entry_date <= end_date
+    ).group_by(bucket).order_by(bucket).all()
+
+
+def _money(value) -> float:
+    return round(float(value or 0), 2)
+
+
+def _activities(values: Dict[str, Decimal]) -> dict:
+    """تقسيم البنود على الأنشطة مع صافي كل نشاط"""
+    sections = {}
+    for activity in ACTIVITIES:
+        section, net = {}, Decimal(0)
+        for line, (line_activity, direction) in CASH_FLOW_LINES.items():
+            if line_activity == activity:
+                section[line] = _money(values[line])
+                net += values[line] if direction == "in" else -values[line]
+        section[f"net_{activity}_cash_flow"] = _money(net)
+        sections[f"{activity}_activities"] = section
+    return sections
+
+
+def _net_change(values: Dict[str, Decimal]) -> Decimal:
+    return sum(
+        (values[line] if direction == "in" else -values[line])
+        for line, (_, direction) in CASH_FLOW_LINES.items()
+    )
 
 
-def get_cash_flow_report(db: Session, start_date: date, end_date: date):
+@cached_report(
+    "cash_flow",
+    date_range=lambda start_date, end_date, account_ids, daily: (None, end_date)
+)
+def get_cash_flow_report(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    account_ids: Optional[List[int]] = None,
+    daily: bool = False
+):
     """
     إنشاء تقرير التدفقات النقدية
-    يُظهر مصادر واستخدامات النقدية خلال فترة محددة
+    يُظهر مصادر واستخدامات النقدية خلال فترة محددة (مع تفصيل يومي اختياري)
     """
-    
-    # 1. رصيد البداية
-    cash_id = int(get_setting(db, "CASH_ACCOUNT_ID"))
-
-    opening_balance = db.query(
-        func.sum(models.GeneralLedger.debit - models.GeneralLedger.credit)
-    ).filter(
-        models.GeneralLedger.account_id == cash_id,
-        models.GeneralLedger.entry_date < start_date
-    ).scalar() or 0.0
-    
-    # 2. التدفقات النقدية من الأنشطة التشغيلية
-    
-    # 2.1 تحصيلات من العملاء
-    customer_collections = db.query(
-        func.sum(models.GeneralLedger.debit)
-    ).filter(
-        models.GeneralLedger.account_id == cash_id,
-        models.GeneralLedger.entry_date.between(start_date, end_date),
-        models.GeneralLedger.source_type.in_(['SALE', 'SALE_PAYMENT', 'CASH_RECEIPT'])
-    ).scalar() or 0.0
-    
-    # 2.2 مدفوعات للموردين
-    supplier_payments = db.query(
-        func.sum(models.GeneralLedger.credit)
-    ).filter(
-        models.GeneralLedger.account_id == cash_id,
-        models.GeneralLedger.entry_date.between(start_date, end_date),
-        models.GeneralLedger.source_type.in_(['PURCHASE', 'PURCHASE_PAYMENT', 'CASH_PAYMENT'])
-    ).scalar() or 0.0
-    
-    # 2.3 مدفوعات مصروفات تشغيلية
-    operating_expenses = db.query(
-        func.sum(models.GeneralLedger.credit)
-    ).filter(
-        models.GeneralLedger.account_id == cash_id,
-        models.GeneralLedger.entry_date.between(start_date, end_date),
-        models.GeneralLedger.source_type.in_(['EXPENSE', 'QUICK_EXPENSE'])
-    ).scalar() or 0.0
-    
-    # صافي التدفق من الأنشطة التشغيلية
-    operating_cash_flow = customer_collections - supplier_payments - operating_expenses
-    
-    # 3. التدفقات النقدية من الأنشطة الاستثمارية (حالياً فارغة)
-    investing_inflow = 0.0
-    investing_outflow = 0.0
-    investing_cash_flow = investing_inflow - investing_outflow
-    
-    # 4. التدفقات النقدية من الأنشطة التمويلية
-    
-    # 4.1 مساهمات رأس المال
-    capital_contributions = db.query(
-        func.sum(models.CapitalAllocation.amount)
-    ).filter(
-        models.CapitalAllocation.allocation_date.between(start_date, end_date),
-        models.CapitalAllocation.allocation_type == 'CONTRIBUTION'
-    ).scalar() or 0.0
-    
-    # 4.2 سحوبات رأس المال
-    capital_withdrawals = db.query(
-        func.sum(models.CapitalAllocation.amount)
-    ).filter(
-        models.CapitalAllocation.allocation_date.between(start_date, end_date),
-        models.CapitalAllocation.allocation_type == 'WITHDRAWAL'
-    ).scalar() or 0.0
-    
-    financing_cash_flow = capital_contributions - capital_withdrawals
-    
-    # 5. صافي التغير في النقدية
-    net_cash_change = operating_cash_flow + investing_cash_flow + financing_cash_flow
-    
-    # 6. رصيد الإغلاق
+    accounts = get_cash_account_ids(db, account_ids)
+    GL = models.GeneralLedger
+    bucket = case(
+        (GL.entry_date < start_date, OPENING_PERIOD),
+        else_=func.strftime('%Y-%m-%d', GL.entry_date)
+    )
+    rows = _cash_rows(db, accounts, end_date, bucket, get_source_mapping(db))
+
+    opening_balance = Decimal(0)
+    totals = {name: Decimal(0) for name in _COLUMNS}
+    days = []
+    balance = Decimal(0)
+    for day, net, *values in rows:
+        net = Decimal(str(net or 0))
+        balance += net
+        if day == OPENING_PERIOD:
+            opening_balance = net
+            continue
+
+        values = dict(zip(_COLUMNS, (Decimal(str(v or 0)) for v in values)))
+        for name, value in values.items():
+            totals[name] += value
+        if daily:
+            sections = _activities(values)
+            item = {"date": day}
+            for activity in ACTIVITIES:
+                key = f"net_{activity}_cash_flow"
+                item[key] = sections[f"{activity}_activities"][key]
+            item.update({
+                "unclassified": _money(values["unclassified_inflows"] - values["unclassified_outflows"]),
+                "net_cash_change": _money(net),
+                "closing_balance": _money(balance),
+            })
+            days.append(item)
+
+    net_cash_change = _net_change(totals)
     closing_balance = opening_balance + net_cash_change
-    
-    # 7. الرصيد الفعلي للتحقق
-    actual_balance = db.query(
-        func.sum(models.GeneralLedger.debit - models.GeneralLedger.credit)
-    ).filter(
-        models.GeneralLedger.account_id == cash_id,
-        models.GeneralLedger.entry_date <= end_date
-    ).scalar() or 0.0
-    
-    return {
+
+    report = {
         "period": {
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat()
         },
-        "opening_balance": round(opening_balance, 2),
-        
-        "operating_activities": {
-            "customer_collections": round(customer_collections, 2),
-            "supplier_payments": round(supplier_payments, 2),
-            "operating_expenses": round(operating_expenses, 2),
-            "net_operating_cash_flow": round(operating_cash_flow, 2)
+        "account_ids": accounts,
+        "opening_balance": _money(opening_balance),
+        **_activities(totals),
+        "unclassified": {
+            "inflows": _money(totals["unclassified_inflows"]),
+            "outflows": _money(totals["unclassified_outflows"]),
         },
-        
-        "investing_activities": {
-            "inflows": round(investing_inflow, 2),
-            "outflows": round(investing_outflow, 2),
-            "net_investing_cash_flow": round(investing_cash_flow, 2)
-        },
-        
-        "financing_activities": {
-            "capital_contributions": round(capital_contributions, 2),
-            "capital_withdrawals": round(capital_withdrawals, 2),
-            "net_financing_cash_flow": round(financing_cash_flow, 2)
-        },
-        
-        "net_cash_change": round(net_cash_change, 2),
-        "closing_balance": round(closing_balance, 2),
-        "actual_balance": round(actual_balance, 2),
-        "is_balanced": abs(closing_balance - actual_balance) < 0.01
+        "net_cash_change": _money(net_cash_change),
+        "closing_balance": _money(closing_balance),
+        "actual_balance": _money(balance),
+        "is_balanced": abs(closing_balance - balance) < Decimal("0.01")
+    }
+    if daily:
+        report["daily"] = days
+    return report
+
+
+@cached_report(
+    "cash_flow_periods",
+    date_range=lambda start_date, end_date, granularity, account_ids: (None, end_date)
+)
+def get_cash_flow_periods(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    granularity: str = "month",
+    account_ids: Optional[List[int]] = None
+):
+    """
+    التدفقات النقدية لعدة فترات (عمود لكل فترة) بنفس استعلام التقرير مجمعاً حسب الفترة
+    """
+    periods = period_ranges(start_date, end_date, granularity)
+    accounts = get_cash_account_ids(db, account_ids)
+    GL = models.GeneralLedger
+    bucket = case(
+        (GL.entry_date < start_date, OPENING_PERIOD),
+        else_=period_bucket(GL.entry_date, granularity)
+    )
+    rows = {row[0]: row[1:] for row in _cash_rows(db, accounts, end_date, bucket, get_source_mapping(db))}
+
+    opening = Decimal(str(rows[OPENING_PERIOD][0] or 0)) if OPENING_PERIOD in rows else Decimal(0)
+    columns = []
+    for p in periods:
+        net, *values = rows.get(p["period"], (0,) + (0,) * len(_COLUMNS))
+        values = dict(zip(_COLUMNS, (Decimal(str(v or 0)) for v in values)))
+        change = _net_change(values)
+        actual = opening + Decimal(str(net or 0))
+        columns.append({
+            "opening_balance": _money(opening),
+            **_activities(values),
+            "net_cash_change": _money(change),
+            "closing_balance": _money(opening + change),
+            "actual_balance": _money(actual),
+        })
+        opening = actual
+
+    def transpose(key):
+        first = columns[0][key]
+        if isinstance(first, dict):
+            return {k: [c[key][k] for c in columns] for k in first}
+        return [c[key] for c in columns]
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "granularity": granularity,
+        "periods": periods,
+        "account_ids": accounts,
+        **{key: transpose(key) for key in columns[0]},
     }
 
 
-def get_cash_flow_details(db: Session, start_date: date, end_date: date, category: str = None):
+def get_cash_flow_details(
+    db: Session, start_date: date, end_date: date, category: str = None,
+    account_ids: Optional[List[int]] = None
+):
     """
+    حركات النقدية خلال الفترة (مع فلتر اختياري بالنشاط حسب تصنيف المصادر)
     """
-    cash_id = int(get_setting(db, "CASH_ACCOUNT_ID"))
+    accounts = get_cash_account_ids(db, account_ids)
 
     query = db.query(models.GeneralLedger).filter(
-        models.GeneralLedger.account_id == cash_id,
+        models.GeneralLedger.account_id.in_(accounts),
         models.GeneralLedger.entry_date.between(start_date, end_date)
     )
-    
-    if category == "operating":
-        query = query.filter(
-            models.GeneralLedger.source_type.in_([
-                'SALE', 'SALE_PAYMENT', 'CASH_RECEIPT',
-                'PURCHASE', 'PURCHASE_PAYMENT', 'CASH_PAYMENT',
-                'EXPENSE', 'QUICK_EXPENSE'
-            ])
-        )
-    elif category == "financing":
-        query = query.filter(
-            models.GeneralLedger.source_type.in_(['CAPITAL_CONTRIBUTION', 'CAPITAL_WITHDRAWAL'])
-        )
-    
+
+    if category in ACTIVITIES:
+        sources = [
+            source_type for source_type, lines in get_source_mapping(db).items()
+            if any(CASH_FLOW_LINES[line][0] == category for line in lines.values())
+        ]
+        query = query.filter(models.GeneralLedger.source_type.in_(sources))
+
     entries = query.order_by(models.GeneralLedger.entry_date.desc()).all()
-    
+
     result = []
     for entry in entries:
         flow_type = "IN" if entry.debit > 0 else "OUT"
         amount = entry.debit if entry.debit > 0 else entry.credit
-        
+
         result.append({
             "date": entry.entry_date.isoformat(),
             "description": entry.description,
@@ -169,5 +292,5 @@ def get_cash_flow_details(db: Session, start_date: date, end_date: date, categor
             "flow_type": flow_type,
             "amount": round(amount, 2)
         })
-    
+
     return result
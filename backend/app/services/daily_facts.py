@@ -0,0 +1,295 @@
+"""
+Daily Facts Service
+خدمة الحقائق اليومية - صيانة جدول daily_facts وقراءته
+
+الجدول مفتاحه (التاريخ، المحصول) ويحمل مجاميع وأعداد وكميات
+المبيعات والمشتريات والمصروفات.
+
+الصيانة تتم تلقائياً قبل كل commit:
+- أحداث الجلسة تجمع المفاتيح (التاريخ، المحصول) التي تأثرت بالإضافة أو التعديل أو الحذف
+  (بما في ذلك القيم القديمة عند تغيير التاريخ أو المحصول)
+- العمليات الجماعية query.update()/delete() تُقرأ مفاتيحها قبل التنفيذ
+- قبل الـ commit يعاد حساب هذه المفاتيح فقط من الجداول المصدر داخل نفس المعاملة
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import case, event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+FactKey = Tuple[date, int]
+
+_KEYS = "daily_facts_keys"
+_REKEY = "daily_facts_rekey"
+
+# عدد التواريخ في كل استعلام إعادة حساب (لتجنب حد متغيرات SQLite)
+_DATE_CHUNK = 500
+
+
+def _sources():
+    """
+    الجداول المصدر: اسم الجدول -> (النموذج، عمود التاريخ، عمود المحصول، المقاييس)
+    المقاييس: اسم العمود في daily_facts -> تعبير التجميع
+    """
+    return {
+        "sales": (
+            models.Sale, models.Sale.sale_date, models.Sale.crop_id,
+            {
+                "sales_amount": func.sum(models.Sale.total_sale_amount),
+                "sales_count": func.count(models.Sale.sale_id),
+                "sales_quantity_kg": func.sum(models.Sale.quantity_sold_kg),
+            },
+        ),
+        "purchases": (
+            models.Purchase, models.Purchase.purchase_date, models.Purchase.crop_id,
+            {
+                "purchases_amount": func.sum(models.Purchase.total_cost),
+                "purchases_count": func.count(models.Purchase.purchase_id),
+                "purchases_quantity_kg": func.sum(models.Purchase.quantity_kg),
+            },
+        ),
+        "expenses": (
+            models.Expense, models.Expense.expense_date, models.Expense.crop_id,
+            {
+                "expenses_amount": func.sum(models.Expense.amount),
+                "expenses_count": func.count(models.Expense.expense_id),
+            },
+        ),
+    }
+
+
+MEASURES = (
+    "sales_amount", "sales_count", "sales_quantity_kg",
+    "purchases_amount", "purchases_count", "purchases_quantity_kg",
+    "expenses_amount", "expenses_count",
+)
+
+
+# ============================================
+# تجميع المفاتيح المتأثرة (Session Events)
+# ============================================
+
+def _key_of(obj, date_attr: str, crop_attr: str, use_history: bool = False) -> Set[FactKey]:
+    """مفاتيح الكائن الحالية (والقديمة عند التعديل)"""
+    keys = set()
+    fact_date = getattr(obj, date_attr)
+    crop_id = getattr(obj, crop_attr)
+    if fact_date is not None:
+        keys.add((fact_date, crop_id or 0))
+
+    if use_history:
+        state = inspect(obj)
+        old_dates = state.attrs[date_attr].history.deleted or [fact_date]
+        old_crops = state.attrs[crop_attr].history.deleted or [crop_id]
+        for d in old_dates:
+            for c in old_crops:
+                if d is not None:
+                    keys.add((d, c or 0))
+    return keys
+
+
+def _collect_flush(session: Session, flush_context, instances) -> None:
+    sources = _sources()
+    keys = session.info.setdefault(_KEYS, set())
+    for group, use_history in ((session.new, False), (session.dirty, True), (session.deleted, True)):
+        for obj in group:
+            source = sources.get(getattr(obj, "__tablename__", None))
+            if source is None:
+                continue
+            _, date_col, crop_col, _ = source
+            keys |= _key_of(obj, date_col.key, crop_col.key, use_history)
+
+
+def _collect_bulk(orm_execute_state) -> None:
+    """قراءة مفاتيح الصفوف قبل تنفيذ update/delete الجماعي"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    source = _sources().get(mapper.local_table.name)
+    if source is None:
+        return
+
+    model, date_col, crop_col, _ = source
+    session = orm_execute_state.session
+    pk_col = mapper.primary_key[0]
+    stmt = select(pk_col, date_col, crop_col)
+    whereclause = orm_execute_state.statement.whereclause
+    if whereclause is not None:
+        stmt = stmt.where(whereclause)
+
+    rows = session.execute(stmt).all()
+    session.info.setdefault(_KEYS, set()).update((r[1], r[2] or 0) for r in rows)
+    if orm_execute_state.is_update:
+        # القيم الجديدة تُقرأ قبل الـ commit بمعرفات الصفوف
+        rekey = session.info.setdefault(_REKEY, defaultdict(set))
+        rekey[mapper.local_table.name].update(r[0] for r in rows)
+
+
+def _apply_before_commit(session: Session) -> None:
+    session.flush()
+    keys = session.info.pop(_KEYS, set())
+    rekey = session.info.pop(_REKEY, {})
+
+    sources = _sources()
+    for table, ids in rekey.items():
+        model, date_col, crop_col, _ = sources[table]
+        pk_col = inspect(model).primary_key[0]
+        id_list = list(ids)
+        for i in range(0, len(id_list), _DATE_CHUNK):
+            rows = session.execute(
+                select(date_col, crop_col).where(pk_col.in_(id_list[i:i + _DATE_CHUNK]))
+            ).all()
+            keys.update((r[0], r[1] or 0) for r in rows)
+
+    if keys:
+        refresh_daily_facts(session, keys)
+
+
+def _discard(session: Session) -> None:
+    session.info.pop(_KEYS, None)
+    session.info.pop(_REKEY, None)
+
+
+def register_fact_maintenance(session_factory) -> None:
+    """ربط صيانة الحقائق اليومية بمصنع الجلسات (يُستدعى مرة واحدة من database.py)"""
+    event.listen(session_factory, "before_flush", _collect_flush)
+    event.listen(session_factory, "do_orm_execute", _collect_bulk)
+    event.listen(session_factory, "before_commit", _apply_before_commit)
+    event.listen(session_factory, "after_rollback", _discard)
+
+
+# ============================================
+# إعادة الحساب
+# ============================================
+
+def _aggregate(db: Session, dates: Optional[List[date]]) -> Dict[FactKey, Dict[str, Decimal]]:
+    """تجميع القيم من الجداول المصدر (لتواريخ محددة أو للكل)"""
+    result: Dict[FactKey, Dict[str, Decimal]] = defaultdict(dict)
+    for _, (model, date_col, crop_col, measures) in _sources().items():
+        crop_key = func.coalesce(crop_col, 0)
+        stmt = select(date_col, crop_key, *measures.values()).group_by(date_col, crop_key)
+        chunks = [None] if dates is None else [
+            dates[i:i + _DATE_CHUNK] for i in range(0, len(dates), _DATE_CHUNK)
+        ]
+        for chunk in chunks:
+            chunk_stmt = stmt if chunk is None else stmt.where(date_col.in_(chunk))
+            for row in db.execute(chunk_stmt):
+                values = result[(row[0], row[1])]
+                for name, value in zip(measures.keys(), row[2:]):
+                    values[name] = value or 0
+    return result
+
+
+def refresh_daily_facts(db: Session, keys: Iterable[FactKey]) -> None:
+    """إعادة حساب صفوف daily_facts للمفاتيح المحددة فقط"""
+    keys = set(keys)
+    dates = sorted({k[0] for k in keys})
+    fresh = _aggregate(db, dates)
+
+    existing = {}
+    for i in range(0, len(dates), _DATE_CHUNK):
+        for fact in db.query(models.DailyFact).filter(
+            models.DailyFact.fact_date.in_(dates[i:i + _DATE_CHUNK])
+        ):
+            existing[(fact.fact_date, fact.crop_id)] = fact
+
+    for key in keys:
+        values = fresh.get(key)
+        fact = existing.get(key)
+        if not values:
+            if fact is not None:
+                db.delete(fact)
+            continue
+        if fact is None:
+            fact = models.DailyFact(fact_date=key[0], crop_id=key[1])
+            db.add(fact)
+        for name in MEASURES:
+            setattr(fact, name, values.get(name, 0))
+
+
+def rebuild_daily_facts(db: Session) -> int:
+    """إعادة بناء الجدول بالكامل من الجداول المصدر (للترحيل الأولي أو الإصلاح)"""
+    db.query(models.DailyFact).delete()
+    fresh = _aggregate(db, None)
+    db.add_all(
+        models.DailyFact(
+            fact_date=key[0],
+            crop_id=key[1],
+            **{name: values.get(name, 0) for name in MEASURES}
+        )
+        for key, values in fresh.items()
+    )
+    db.commit()
+    return len(fresh)
+
+
+def ensure_daily_facts(db: Session) -> None:
+    """بناء الجدول عند أول تشغيل إذا كان فارغاً وتوجد بيانات"""
+    if db.query(models.DailyFact).first() is not None:
+        return
+    has_data = (
+        db.query(models.Sale.sale_id).first()
+        or db.query(models.Purchase.purchase_id).first()
+        or db.query(models.Expense.expense_id).first()
+    )
+    if has_data:
+        rebuild_daily_facts(db)
+
+
+# ============================================
+# القراءة
+# ============================================
+
+def get_daily_series(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    crop_id: Optional[int] = None
+) -> Dict[date, Dict[str, Decimal]]:
+    """
+    مجاميع كل يوم في الفترة (استعلام واحد على نطاق المفتاح الأساسي)
+    فلتر المحصول يطبق على المبيعات والمشتريات فقط؛ المصروفات تبقى إجمالية
+    """
+    sales = models.DailyFact.sales_amount
+    purchases = models.DailyFact.purchases_amount
+    if crop_id:
+        is_crop = models.DailyFact.crop_id == crop_id
+        sales = case((is_crop, sales), else_=0)
+        purchases = case((is_crop, purchases), else_=0)
+
+    rows = db.query(
+        models.DailyFact.fact_date,
+        func.sum(sales),
+        func.sum(purchases),
+        func.sum(models.DailyFact.expenses_amount),
+    ).filter(
+        models.DailyFact.fact_date.between(start_date, end_date)
+    ).group_by(models.DailyFact.fact_date)
+
+    return {
+        r[0]: {"sales": r[1] or 0, "purchases": r[2] or 0, "expenses": r[3] or 0}
+        for r in rows
+    }
+
+
+def get_period_totals(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    crop_id: Optional[int] = None
+) -> Dict[str, Decimal]:
+    """إجماليات فترة كاملة في صف واحد"""
+    query = db.query(*(func.coalesce(func.sum(getattr(models.DailyFact, m)), 0) for m in MEASURES))
+    if start_date:
+        query = query.filter(models.DailyFact.fact_date >= start_date)
+    if end_date:
+        query = query.filter(models.DailyFact.fact_date <= end_date)
+    if crop_id:
+        query = query.filter(models.DailyFact.crop_id == crop_id)
+    return dict(zip(MEASURES, query.one()))
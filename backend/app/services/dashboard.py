@@ -1,96 +1,237 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case, select
 from datetime import date, timedelta
+import threading
+import time
 from app import models
 from app.core.settings import get_setting
+from app.core.write_generation import current_generation
+from app.services import daily_facts
+from app.services.cash_flow import get_cash_account_ids
 
 
 from app.services.account_statement import get_all_customers_balances, get_all_suppliers_balances
 
-def get_dashboard_kpis(db: Session):
-    """الحصول على مؤشرات الأداء الرئيسية للوحة التحكم"""
-    
-    # الإيرادات الإجمالية
-    total_revenue = db.query(func.sum(models.Sale.total_sale_amount)).scalar() or 0
-    
-    # تكلفة البضاعة المباعة
+# ============================================
+# ذاكرة مؤقتة لمؤشرات لوحة التحكم (KPI Cache)
+# ============================================
+# كل مجموعة مؤشرات تُحسب بدالة مستقلة وتعتمد على جداول محددة.
+# النتيجة تبقى صالحة طالما لم تتغير عدادات الكتابة لهذه الجداول (كتابات هذه العملية)
+# ولا علامة الجداول في قاعدة البيانات (كتابات العمال الآخرين)، وبحد أقصى KPI_CACHE_SECONDS،
+# فيعاد حساب المجموعات المتأثرة فقط بعد كل ترحيل.
+
+# التعديلات في مكانها من عامل آخر (مثل إيقاف محصول) لا تغير العلامة، فتظهر بعد هذه المدة
+KPI_CACHE_SECONDS = 60
+
+def _kpi_sales(db: Session):
+    """الإيرادات وعدد المبيعات"""
+    total_revenue, sales_count = db.query(
+        func.sum(models.Sale.total_sale_amount),
+        func.count(models.Sale.sale_id)
+    ).one()
+    return {"total_revenue": total_revenue or 0, "sales_count": sales_count or 0}
+
+
+def _kpi_cogs(db: Session):
+    """تكلفة البضاعة المباعة"""
     cogs_id = int(get_setting(db, "COGS_ACCOUNT_ID"))
     total_cogs = db.query(func.sum(models.GeneralLedger.debit)).filter(
         models.GeneralLedger.account_id == cogs_id
     ).scalar() or 0
-    
-    # قيمة المخزون
-    inventory_value = db.query(
-        func.sum(models.Inventory.current_stock_kg * models.Inventory.average_cost_per_kg)
-    ).scalar() or 0
-    
-    # عدد المبيعات
-    sales_count = db.query(func.count(models.Sale.sale_id)).scalar() or 0
-    
-    # عدد المشتريات
+    return {"total_cogs": total_cogs}
+
+
+def _kpi_inventory(db: Session):
+    """قيمة وكمية المخزون"""
+    inventory_value, total_stock_kg = db.query(
+        func.sum(models.Inventory.current_stock_kg * models.Inventory.average_cost_per_kg),
+        func.sum(models.Inventory.current_stock_kg)
+    ).one()
+    return {"inventory_value": inventory_value or 0, "total_stock_kg": total_stock_kg or 0}
+
+
+def _kpi_purchases(db: Session):
+    """عدد المشتريات"""
     purchases_count = db.query(func.count(models.Purchase.purchase_id)).scalar() or 0
-    
-    # رصيد الخزينة
-    cash_id = int(get_setting(db, "CASH_ACCOUNT_ID"))
-    cash_account = db.query(models.FinancialAccount).filter(
-        models.FinancialAccount.account_id == cash_id
-    ).first()
-    cash_balance = cash_account.current_balance if cash_account else 0
-    
-    # إجمالي الذمم المدينة (ديون العملاء)
+    return {"purchases_count": purchases_count}
+
+
+def _kpi_cash(db: Session):
+    """رصيد الخزينة (مجموع الأدراج والبنوك) ورصيد كل حساب"""
+    cash_accounts = db.query(
+        models.FinancialAccount.account_id,
+        models.FinancialAccount.account_name,
+        models.FinancialAccount.current_balance
+    ).filter(
+        models.FinancialAccount.account_id.in_(get_cash_account_ids(db))
+    ).all()
+    return {
+        "cash_balance": sum((a.current_balance or 0 for a in cash_accounts), 0),
+        "cash_accounts": [
+            {"account_id": a.account_id, "account_name": a.account_name, "balance": a.current_balance or 0}
+            for a in cash_accounts
+        ]
+    }
+
+
+def _kpi_debts(db: Session):
+    """إجمالي الذمم المدينة والدائنة"""
     # استخدام المنطق الموحد في account_statement لضمان تطابق الأرقام مع التقارير
     customers_balances = get_all_customers_balances(db)
     total_receivables = sum(c['balance'] for c in customers_balances if c['balance'] > 0)
-    
-    # إجمالي الذمم الدائنة (ديون الموردين)
-    suppliers_balances = get_all_suppliers_balances(db)
+
     # الملاحظة: في get_all_suppliers_balances، الرصيد السالب يعني علينا له (دائن)
-    # لكن الدالة تعيد balance_due كما هو.
-    # في get_contact_summary للموردين: balance_due = -supplier_balance (سالب يعني علينا)
     # لذا نجمع القيم السالبة ونحولها لموجب للعرض كـ "مطلوبات"
+    suppliers_balances = get_all_suppliers_balances(db)
     total_payables = sum(abs(s['balance']) for s in suppliers_balances if s['balance'] < 0)
-    
-    # إجمالي المصروفات
+    return {"total_receivables": total_receivables, "total_payables": total_payables}
+
+
+def _kpi_expenses(db: Session):
+    """إجمالي المصروفات"""
     total_expenses = db.query(func.sum(models.Expense.amount)).scalar() or 0
-    
-    # صافي الربح
-    net_profit = total_revenue - total_cogs - total_expenses
-    
-    # هامش الربح الإجمالي
-    gross_margin = ((total_revenue - total_cogs) / total_revenue * 100) if total_revenue > 0 else 0
-    
-    # إجمالي كمية المخزون
-    total_stock_kg = db.query(func.sum(models.Inventory.current_stock_kg)).scalar() or 0
-    
-    # مبيعات اليوم
+    return {"total_expenses": total_expenses}
+
+
+def _kpi_today(db: Session):
+    """مبيعات وتحصيلات اليوم"""
     today = date.today()
     today_sales = db.query(func.sum(models.Sale.total_sale_amount)).filter(
         models.Sale.sale_date == today
     ).scalar() or 0
-    
-    # تحصيلات اليوم
     today_collections = db.query(func.sum(models.GeneralLedger.debit)).filter(
         and_(
-            models.GeneralLedger.account_id == cash_id,
+            models.GeneralLedger.account_id.in_(get_cash_account_ids(db)),
             models.GeneralLedger.entry_date == today
         )
     ).scalar() or 0
-    
-    # عدد العملاء
-    customers_count = db.query(func.count(models.Contact.contact_id)).filter(
-        models.Contact.is_customer == True
-    ).scalar() or 0
-    
-    # عدد الموردين
-    suppliers_count = db.query(func.count(models.Contact.contact_id)).filter(
-        models.Contact.is_supplier == True
-    ).scalar() or 0
-    
-    # عدد المحاصيل
+    return {"today_sales": today_sales, "today_collections": today_collections}
+
+
+def _kpi_counts(db: Session):
+    """عدد العملاء والموردين والمحاصيل"""
+    customers_count, suppliers_count = db.query(
+        func.count(case((models.Contact.is_customer == True, 1))),
+        func.count(case((models.Contact.is_supplier == True, 1)))
+    ).one()
     crops_count = db.query(func.count(models.Crop.crop_id)).filter(
         models.Crop.is_active == True
     ).scalar() or 0
-    
+    return {
+        "customers_count": customers_count or 0,
+        "suppliers_count": suppliers_count or 0,
+        "crops_count": crops_count,
+    }
+
+
+# المجموعة -> (دالة الحساب، الجداول التي تعتمد عليها)
+KPI_GROUPS = {
+    "sales": (_kpi_sales, ("sales",)),
+    "cogs": (_kpi_cogs, ("general_ledger", "settings")),
+    "inventory": (_kpi_inventory, ("inventory",)),
+    "purchases": (_kpi_purchases, ("purchases",)),
+    "cash": (_kpi_cash, ("financial_accounts", "settings")),
+    "debts": (_kpi_debts, ("sales", "purchases", "payments", "contacts")),
+    "expenses": (_kpi_expenses, ("expenses",)),
+    "today": (_kpi_today, ("sales", "general_ledger", "settings")),
+    "counts": (_kpi_counts, ("contacts", "crops")),
+}
+
+# كل الجداول التي تؤثر على أي مؤشر
+KPI_TABLES = frozenset(t for _, tables in KPI_GROUPS.values() for t in tables)
+
+# علامة كل جدول في قاعدة البيانات: أكبر معرف (الإضافات)، وآخر تعديل للإعدادات
+# المخزون وأرصدة الحسابات تتغير مع قيود دفتر الأستاذ، فعلامتها أكبر entry_id
+_DB_WATERMARKS = {
+    "general_ledger": func.max(models.GeneralLedger.entry_id),
+    "inventory": func.max(models.GeneralLedger.entry_id),
+    "financial_accounts": func.max(models.GeneralLedger.entry_id),
+    "sales": func.max(models.Sale.sale_id),
+    "purchases": func.max(models.Purchase.purchase_id),
+    "payments": func.max(models.Payment.payment_id),
+    "expenses": func.max(models.Expense.expense_id),
+    "contacts": func.max(models.Contact.contact_id),
+    "crops": func.max(models.Crop.crop_id),
+    "settings": func.max(models.Settings.updated_at),
+}
+
+_kpi_cache = {}
+_kpi_cache_lock = threading.Lock()
+
+
+def _db_watermarks(db: Session) -> dict:
+    """علامات كل الجداول في استعلام واحد (أكبر قيمة على المفتاح الأساسي أو الفهرس)"""
+    tables = sorted(KPI_TABLES)
+    row = db.query(*[select(_DB_WATERMARKS[t]).scalar_subquery() for t in tables]).one()
+    return dict(zip(tables, row))
+
+
+def _group_cache_key(group: str, watermarks: dict):
+    _, tables = KPI_GROUPS[group]
+    key = current_generation(*tables) + tuple(watermarks[t] for t in tables)
+    if group == "today":
+        # مؤشرات اليوم تنتهي صلاحيتها مع تغير التاريخ
+        key = key + (date.today(),)
+    return key
+
+
+def clear_kpi_cache():
+    """مسح الذاكرة المؤقتة للمؤشرات بالكامل"""
+    with _kpi_cache_lock:
+        _kpi_cache.clear()
+
+
+def get_dashboard_kpis_cached(db: Session):
+    """
+    الحصول على مؤشرات الأداء مع حالة الذاكرة المؤقتة
+
+    Returns:
+        (kpis, cache_status) حيث cache_status أحد:
+        - HIT: كل المجموعات من الذاكرة
+        - PARTIAL: أعيد حساب بعض المجموعات فقط
+        - MISS: أعيد حساب كل المجموعات
+    """
+    values = {}
+    recomputed = 0
+    # نقرأ المفاتيح قبل الحساب: أي كتابة أثناء الحساب تبطل النتيجة في الطلب التالي
+    watermarks = _db_watermarks(db)
+    now = time.monotonic()
+
+    for group, (compute, _) in KPI_GROUPS.items():
+        key = _group_cache_key(group, watermarks)
+        with _kpi_cache_lock:
+            cached = _kpi_cache.get(group)
+        if cached is not None and cached[0] == key and now - cached[1] < KPI_CACHE_SECONDS:
+            values.update(cached[2])
+            continue
+
+        group_values = compute(db)
+        with _kpi_cache_lock:
+            _kpi_cache[group] = (key, now, group_values)
+        values.update(group_values)
+        recomputed += 1
+
+    if recomputed == 0:
+        cache_status = "HIT"
+    elif recomputed == len(KPI_GROUPS):
+        cache_status = "MISS"
+    else:
+        cache_status = "PARTIAL"
+
+    return _build_kpis(values), cache_status
+
+
+def _build_kpis(v: dict) -> dict:
+    """تجميع المؤشرات النهائية من قيم المجموعات"""
+    total_revenue = v["total_revenue"]
+    total_cogs = v["total_cogs"]
+
+    # صافي الربح
+    net_profit = total_revenue - total_cogs - v["total_expenses"]
+
+    # هامش الربح الإجمالي
+    gross_margin = ((total_revenue - total_cogs) / total_revenue * 100) if total_revenue > 0 else 0
+
     return {
         # KPIs الرئيسية
         "total_revenue": round(total_revenue, 2),
@@ -99,32 +240,42 @@ def get_dashboard_kpis(db: Session):
         "gross_margin": round(gross_margin, 1),
         
         # المخزون
-        "inventory_value": round(inventory_value, 2),
-        "total_stock_kg": round(total_stock_kg, 2),
+        "inventory_value": round(v["inventory_value"], 2),
+        "total_stock_kg": round(v["total_stock_kg"], 2),
         
         # النقدية
-        "cash_balance": round(cash_balance, 2),
-        "total_receivables": round(total_receivables, 2),
-        "total_payables": round(total_payables, 2),
+        "cash_balance": round(v["cash_balance"], 2),
+        "cash_accounts": [dict(a, balance=round(a["balance"], 2)) for a in v["cash_accounts"]],
+        "total_receivables": round(v["total_receivables"], 2),
+        "total_payables": round(v["total_payables"], 2),
         
         # المصروفات
-        "total_expenses": round(total_expenses, 2),
+        "total_expenses": round(v["total_expenses"], 2),
         
         # الأعداد
-        "sales_count": sales_count,
-        "purchases_count": purchases_count,
-        "customers_count": customers_count,
-        "suppliers_count": suppliers_count,
-        "crops_count": crops_count,
+        "sales_count": v["sales_count"],
+        "purchases_count": v["purchases_count"],
+        "customers_count": v["customers_count"],
+        "suppliers_count": v["suppliers_count"],
+        "crops_count": v["crops_count"],
         
         # اليوم
-        "today_sales": round(today_sales, 2),
-        "today_collections": round(today_collections, 2),
+        "today_sales": round(v["today_sales"], 2),
+        "today_collections": round(v["today_collections"], 2),
     }
 
 
-def get_dashboard_alerts(db: Session):
-    """الحصول على التنبيهات الذكية"""
+def get_dashboard_kpis(db: Session):
+    """الحصول على مؤشرات الأداء الرئيسية للوحة التحكم"""
+    kpis, _ = get_dashboard_kpis_cached(db)
+    return kpis
+
+
+def get_dashboard_alerts(db: Session, cash_balance=None):
+    """
+    الحصول على التنبيهات الذكية
+    cash_balance: رصيد الخزينة إذا كان محسوباً مسبقاً (من المؤشرات) لتجنب إعادة قراءته
+    """
     alerts = []
     
     # تنبيه المخزون المنخفض
@@ -160,16 +311,14 @@ def get_dashboard_alerts(db: Session):
         })
     
     # تنبيه رصيد الخزينة
-    cash_id = int(get_setting(db, "CASH_ACCOUNT_ID"))
-    cash_account = db.query(models.FinancialAccount).filter(
-        models.FinancialAccount.account_id == cash_id
-    ).first()
+    if cash_balance is None:
+        cash_balance = _kpi_cash(db)["cash_balance"]
     
-    if cash_account and cash_account.current_balance < 1000:
+    if cash_balance < 1000:
         alerts.append({
             "type": "warning",
             "title": "رصيد منخفض",
-            "message": f"رصيد الخزينة منخفض: {cash_account.current_balance:.2f} ج.م",
+            "message": f"رصيد الخزينة منخفض: {cash_balance:.2f} ج.م",
             "icon": "bi-wallet"
         })
     
@@ -185,14 +334,67 @@ def get_dashboard_alerts(db: Session):
     return alerts
 
 
+def get_balance_check(db: Session):
+    """
+    التحقق المزدوج من توازن النظام المحاسبي
+    
+    Returns:
+        ledger_balance: التوازن الدفتري (من أرصدة الحسابات) - يتطابق مع ميزان المراجعة
+        physical_balance: التوازن الفعلي (من المخزون الحقيقي)
+        has_discrepancy: هل يوجد فرق بين المخزون الدفتري والفعلي
+        discrepancy_amount: قيمة الفرق في المخزون
+    """
+    from app.services.accounting_engine import get_engine
+
+    engine = get_engine(db)
+    dual_report = engine.validate_dual_balance()
+    
+    ledger = dual_report.ledger_balance
+    physical = dual_report.physical_balance
+    
+    return {
+        # المعاملات غير المتوازنة (المسبب المحتمل للفرق)
+        "unbalanced_transactions": engine.get_unbalanced_transactions(),
+        
+        # التوازن الدفتري (الأساسي - يتطابق مع ميزان المراجعة)
+        "is_balanced": ledger.is_balanced,
+        "difference": str(ledger.difference),
+        "total_assets": str(ledger.total_assets),
+        "total_liabilities_and_equity": str(ledger.total_liabilities_and_equity),
+        "details": ledger.details,
+        "status": "متوازن ✅" if ledger.is_balanced else f"غير متوازن ❌ (الفرق: {ledger.difference} ج.م)",
+        
+        # معلومات إضافية عن التوازن الفعلي
+        "physical_balance": {
+            "is_balanced": physical.is_balanced,
+            "difference": str(physical.difference),
+            "total_assets": str(physical.total_assets),
+            "total_liabilities_and_equity": str(physical.total_liabilities_and_equity),
+            "details": physical.details,
+        },
+        
+        # الفرق بين المخزون الدفتري والفعلي
+        "inventory_discrepancy": {
+            "has_discrepancy": dual_report.has_discrepancy,
+            "amount": str(dual_report.discrepancy_amount),
+            "ledger_inventory": ledger.details.get("inventory", 0),
+            "physical_inventory": physical.details.get("inventory", 0),
+            "message": f"فرق المخزون: {dual_report.discrepancy_amount} ج.م" if dual_report.has_discrepancy else "المخزون متطابق ✅"
+        },
+        
+        "checked_at": dual_report.checked_at.isoformat()
+    }
+
+
 def get_sales_by_crop(db: Session):
     """الحصول على توزيع المبيعات حسب المحصول (القيمة والكمية)"""
     results = db.query(
         models.Crop.crop_name,
-        func.sum(models.Sale.total_sale_amount).label('total_value'),
-        func.sum(models.Sale.quantity_sold_kg).label('total_volume'),
-        func.count(models.Sale.sale_id).label('transaction_count')
-    ).join(models.Sale, models.Sale.crop_id == models.Crop.crop_id)\
+        func.sum(models.DailyFact.sales_amount).label('total_value'),
+        func.sum(models.DailyFact.sales_quantity_kg).label('total_volume'),
+        func.sum(models.DailyFact.sales_count).label('transaction_count')
+    ).join(models.DailyFact, models.DailyFact.crop_id == models.Crop.crop_id)\
+     .filter(models.DailyFact.sales_count > 0)\
      .group_by(models.Crop.crop_name)\
      .all()
     
@@ -209,44 +411,144 @@ def get_sales_by_crop(db: Session):
 
 
 
+# ============================================
+# سجل النشاط الموحد (Activity Feed)
+# ============================================
+# استعلام UNION ALL واحد لكل أنواع المستندات مع الأسماء (JOIN)
+# وترقيم بالمفتاح (keyset) على (التاريخ، النوع، المعرف) تنازلياً.
+
+_ACTIVITY_ICONS = {
+    "sale": "bi-cart-check",
+    "purchase": "bi-bag",
+    "payment_in": "bi-cash-coin",
+    "payment_out": "bi-cash-stack",
+    "expense": "bi-receipt",
+    "sale_return": "bi-arrow-return-left",
+    "purchase_return": "bi-arrow-return-right",
+}
+
+
+def _activity_union(db: Session):
+    """كل المستندات كأعمدة موحدة: النوع، المعرف، التاريخ، المبلغ، المحصول، الطرف، الوصف"""
+    from sqlalchemy import literal, union_all
+
+    Crop, Contact = models.Crop, models.Contact
+    Sale, Purchase = models.Sale, models.Purchase
+
+    def columns(kind, doc_id, doc_date, amount, crop_name, contact_name, description):
+        return (
+            kind.label("kind"),
+            doc_id.label("doc_id"),
+            doc_date.label("activity_date"),
+            amount.label("amount"),
+            crop_name.label("crop_name"),
+            contact_name.label("contact_name"),
+            description.label("description"),
+        )
+
+    none = literal(None)
+
+    sales = db.query(*columns(
+        literal("sale"), Sale.sale_id, Sale.sale_date, Sale.total_sale_amount,
+        Crop.crop_name, Contact.name, none
+    )).join(Crop, Crop.crop_id == Sale.crop_id).join(Contact, Contact.contact_id == Sale.customer_id)
+
+    purchases = db.query(*columns(
+        literal("purchase"), Purchase.purchase_id, Purchase.purchase_date, Purchase.total_cost,
+        Crop.crop_name, Contact.name, none
+    )).join(Crop, Crop.crop_id == Purchase.crop_id).join(Contact, Contact.contact_id == Purchase.supplier_id)
+
+    # اتجاه الدفعة: تحصيل مبيعات أو دفعة عامة دخلت الخزينة = وارد
+    is_outgoing = case(
+        (models.Payment.transaction_type == 'SALE', False),
+        (models.Payment.transaction_type == 'PURCHASE', True),
+        else_=models.Payment.credit_account_id.in_(get_cash_account_ids(db))
+    )
+    payments = db.query(*columns(
+        case((is_outgoing, literal("payment_out")), else_=literal("payment_in")),
+        models.Payment.payment_id, models.Payment.payment_date, models.Payment.amount,
+        none, Contact.name, models.Payment.payment_method
+    )).join(Contact, Contact.contact_id == models.Payment.contact_id)
+
+    expenses = db.query(*columns(
+        literal("expense"), models.Expense.expense_id, models.Expense.expense_date, models.Expense.amount,
+        Crop.crop_name, Contact.name, models.Expense.description
+    )).outerjoin(Crop, Crop.crop_id == models.Expense.crop_id).outerjoin(
+        Contact, Contact.contact_id == models.Expense.supplier_id
+    )
+
+    sale_returns = db.query(*columns(
+        literal("sale_return"), models.SaleReturn.return_id, models.SaleReturn.return_date,
+        models.SaleReturn.refund_amount, Crop.crop_name, Contact.name, models.SaleReturn.return_reason
+    )).join(Sale, Sale.sale_id == models.SaleReturn.sale_id).join(
+        Crop, Crop.crop_id == Sale.crop_id
+    ).join(Contact, Contact.contact_id == Sale.customer_id)
+
+    purchase_returns = db.query(*columns(
+        literal("purchase_return"), models.PurchaseReturn.return_id, models.PurchaseReturn.return_date,
+        models.PurchaseReturn.returned_cost, Crop.crop_name, Contact.name, models.PurchaseReturn.return_reason
+    )).join(Purchase, Purchase.purchase_id == models.PurchaseReturn.purchase_id).join(
+        Crop, Crop.crop_id == Purchase.crop_id
+    ).join(Contact, Contact.contact_id == Purchase.supplier_id)
+
+    return union_all(
+        sales.statement, purchases.statement, payments.statement,
+        expenses.statement, sale_returns.statement, purchase_returns.statement
+    ).subquery("activities")
+
+
+def _activity_title(row) -> str:
+    crop = row.crop_name
+    if row.kind == "sale":
+        return f"بيع {crop}"
+    if row.kind == "purchase":
+        return f"شراء {crop}"
+    if row.kind == "payment_in":
+        return "تحصيل نقدية"
+    if row.kind == "payment_out":
+        return "صرف نقدية"
+    if row.kind == "expense":
+        return row.description or "مصروف"
+    if row.kind == "sale_return":
+        return f"مرتجع بيع {crop}"
+    return f"مرتجع شراء {crop}"
+
+
+def get_activity_feed(db: Session, limit: int = 50, cursor: str = None):
+    """
+    سجل النشاط الموحد (مبيعات، مشتريات، مدفوعات، مصروفات، مرتجعات) في استعلام واحد
+
+    Returns:
+        {"items": [...], "next_cursor": str | None}
+    """
+    from app.core.pagination import paginate
+
+    activities = _activity_union(db)
+    sort_key = (activities.c.activity_date, activities.c.kind, activities.c.doc_id)
+    rows = paginate(db.query(activities), sort_key, limit, cursor)
+
+    items = [
+        {
+            "id": f"{row.kind}_{row.doc_id}",
+            "type": row.kind,
+            "title": _activity_title(row),
+            "contact": row.contact_name or "غير محدد",
+            "amount": str(row.amount or 0),
+            "timestamp": row.activity_date.isoformat(),
+            "icon": _ACTIVITY_ICONS[row.kind],
+        }
+        for row in rows
+    ]
+
+    return {
+        "items": items,
+        "next_cursor": rows.next_cursor,
+    }
+
+
 def get_recent_activities(db: Session, limit: int = 10):
-    """آخر العمليات (مبيعات ومشتريات) - بيانات حقيقية"""
-    from datetime import datetime
-    
-    activities = []
-    
-    # جلب آخر المبيعات
-    sales = db.query(models.Sale).order_by(models.Sale.sale_date.desc()).limit(limit).all()
-    
-    for sale in sales:
-        activities.append({
-            "id": f"sale_{sale.sale_id}",
-            "type": "sale",
-            "title": f"بيع {sale.crop.crop_name}" if sale.crop else "عملية بيع",
-            "contact": sale.customer.name if sale.customer else "غير محدد",  # Sale uses 'customer' relationship
-            "amount": str(sale.total_sale_amount or 0),
-            "timestamp": sale.sale_date.isoformat() if sale.sale_date else datetime.now().isoformat(),
-            "icon": "bi-cart-check"
-        })
-    
-    # جلب آخر المشتريات
-    purchases = db.query(models.Purchase).order_by(models.Purchase.purchase_date.desc()).limit(limit).all()
-    
-    for purchase in purchases:
-        activities.append({
-            "id": f"purchase_{purchase.purchase_id}",
-            "type": "purchase",
-            "title": f"شراء {purchase.crop.crop_name}" if purchase.crop else "عملية شراء",
-            "contact": purchase.supplier.name if purchase.supplier else "غير محدد",  # Purchase uses 'supplier' relationship
-            "amount": str(purchase.total_cost or 0),
-            "timestamp": purchase.purchase_date.isoformat() if purchase.purchase_date else datetime.now().isoformat(),
-            "icon": "bi-bag"
-        })
-    
-    # ترتيب حسب التاريخ (الأحدث أولاً)
-    activities.sort(key=lambda x: x['timestamp'], reverse=True)
-    
-    return activities[:limit]
+    """آخر العمليات من كل أنواع المستندات (الصفحة الأولى من سجل النشاط)"""
+    return get_activity_feed(db, limit)["items"]
 
 
 
@@ -266,6 +568,9 @@ def get_current_season_summary(db: Session):
     progress = min(100, max(0, (elapsed_days / total_days) * 100)) if total_days > 0 else 0
     days_remaining = max(0, (season.end_date - today).days) if season.end_date else 0
     
+    # إجماليات الموسم حتى اليوم من جدول الحقائق المجمعة
+    totals = daily_facts.get_period_totals(db, season.start_date, min(today, season.end_date))
+    
     return {
         "id": season.season_id,
         "name": season.name,  # Column is 'name' not 'season_name'
@@ -275,7 +580,12 @@ def get_current_season_summary(db: Session):
         "days_remaining": days_remaining,
         "elapsed_days": elapsed_days,
         "total_days": total_days,
-        "is_active": season.status == 'ACTIVE'
+        "is_active": season.status == 'ACTIVE',
+        "total_sales": round(totals["sales_amount"], 2),
+        "total_purchases": round(totals["purchases_amount"], 2),
+        "total_expenses": round(totals["expenses_amount"], 2),
+        "sales_count": totals["sales_count"],
+        "purchases_count": totals["purchases_count"],
     }
 
 
@@ -292,57 +602,15 @@ def get_advanced_chart_data(
     جلب بيانات الرسم البياني المتقدم مع إمكانية المقارنة والفلترة
     """
     
-    # helper to fetch daily data
-    def fetch_daily_data(s_date, e_date):
-        # 1. Sales
-        sales_query = db.query(
-            models.Sale.sale_date.label('date'),
-            func.sum(models.Sale.total_sale_amount).label('amount')
-        ).filter(
-            models.Sale.sale_date >= s_date,
-            models.Sale.sale_date <= e_date
-        )
-        if crop_id:
-            sales_query = sales_query.filter(models.Sale.crop_id == crop_id)
-        
-        sales_data = {r.date: str(r.amount or 0) for r in sales_query.group_by(models.Sale.sale_date).all()}
-
-        # 2. Purchases
-        purchases_query = db.query(
-            models.Purchase.purchase_date.label('date'),
-            func.sum(models.Purchase.total_cost).label('amount')
-        ).filter(
-            models.Purchase.purchase_date >= s_date,
-            models.Purchase.purchase_date <= e_date
-        )
-        if crop_id:
-            purchases_query = purchases_query.filter(models.Purchase.crop_id == crop_id)
-            
-        purchases_data = {r.date: str(r.amount or 0) for r in purchases_query.group_by(models.Purchase.purchase_date).all()}
-
-        # 3. Expenses (Optional)
-        expenses_data = {}
-        if include_expenses:
-            expenses_query = db.query(
-                models.Expense.expense_date.label('date'),
-                func.sum(models.Expense.amount).label('amount')
-            ).filter(
-                models.Expense.expense_date >= s_date,
-                models.Expense.expense_date <= e_date
-            )
-            # expenses generally don't have crop_id, but some might if related to season
-            # for now, we include general expenses implicitly or filter if schema supported it better
-            expenses_data = {r.date: str(r.amount or 0) for r in expenses_query.group_by(models.Expense.expense_date).all()}
-            
-        return sales_data, purchases_data, expenses_data
-
-    # Fetch Main Data
-    sales_curr, purchases_curr, expenses_curr = fetch_daily_data(start_date, end_date)
+    # البيانات اليومية من جدول الحقائق المجمعة (استعلام واحد لكل فترة)
+    curr = daily_facts.get_daily_series(db, start_date, end_date, crop_id)
     
     # Fetch Comparison Data (if requested)
-    sales_comp, purchases_comp, expenses_comp = ({}, {}, {})
+    comp = {}
     if compare_start_date and compare_end_date:
-        sales_comp, purchases_comp, expenses_comp = fetch_daily_data(compare_start_date, compare_end_date)
+        comp = daily_facts.get_daily_series(db, compare_start_date, compare_end_date, crop_id)
+
+    empty = {"sales": 0, "purchases": 0, "expenses": 0}
 
     # Generate Labels and Datasets
     labels = []
@@ -362,26 +630,22 @@ def get_advanced_chart_data(
         labels.append(date_str)
         
         # Add Current Data
-        datasets["sales"].append(sales_curr.get(curr_day, 0))
-        datasets["purchases"].append(purchases_curr.get(curr_day, 0))
+        day_values = curr.get(curr_day, empty)
+        datasets["sales"].append(day_values["sales"])
+        datasets["purchases"].append(day_values["purchases"])
         if include_expenses:
-            datasets["expenses"].append(expenses_curr.get(curr_day, 0))
+            datasets["expenses"].append(day_values["expenses"])
             
         # Add Comparison Data (Index matching)
         if compare_start_date:
             comp_day = compare_start_date + timedelta(days=i)
-            # if comp_day exceeds compare_end_date, we fill 0 or stop? 
+            # if comp_day exceeds compare_end_date, we fill 0
             # Usually strict comparison ranges match in length
-            if comp_day <= compare_end_date:
-                datasets["sales_compare"].append(sales_comp.get(comp_day, 0))
-                datasets["purchases_compare"].append(purchases_comp.get(comp_day, 0))
-                if include_expenses:
-                    datasets["expenses_compare"].append(expenses_comp.get(comp_day, 0))
-            else:
-                datasets["sales_compare"].append(0)
-                datasets["purchases_compare"].append(0)
-                if include_expenses:
-                    datasets["expenses_compare"].append(0)
+            comp_values = comp.get(comp_day, empty) if comp_day <= compare_end_date else empty
+            datasets["sales_compare"].append(comp_values["sales"])
+            datasets["purchases_compare"].append(comp_values["purchases"])
+            if include_expenses:
+                datasets["expenses_compare"].append(comp_values["expenses"])
 
     # Calculate Summaries
     summary = {
@@ -406,5 +670,90 @@ def get_advanced_chart_data(
     }
 
 
+# ============================================
+# دفعة مكونات لوحة التحكم (Widget Batch)
+# ============================================
+# كل مكون في إعدادات المستخدم يحتاج مجموعة بيانات؛ المجموعات المشتركة
+# (مثل المؤشرات التي يعرضها أكثر من مكون) تُحسب مرة واحدة فقط.
+
+DASHBOARD_WIDGETS = {
+    "quick_stats": ("kpis", "balance_check"),
+    "quick_actions": (),
+    "main_kpis": ("kpis",),
+    "charts": ("sales_by_crop",),
+    "secondary_kpis": ("kpis",),
+    "recent_activity": ("recent_activities", "season_summary"),
+    "top_customers": ("top_customers", "alerts"),
+    "alerts": ("alerts",),
+}
+
+DEFAULT_DASHBOARD_LAYOUT = [
+    "quick_stats", "quick_actions", "main_kpis", "charts",
+    "secondary_kpis", "recent_activity", "top_customers", "alerts",
+]
+
+
+def parse_dashboard_layout(dashboard_config=None) -> list:
+    """
+    قراءة قائمة المكونات من User.dashboard_config (أو من قائمة جاهزة)
+    يقبل قائمة JSON أو {"widgets": [...]}؛ يرجع التخطيط الافتراضي عند عدم الصلاحية
+    """
+    import json
+
+    if not dashboard_config:
+        return list(DEFAULT_DASHBOARD_LAYOUT)
+    config = dashboard_config
+    if isinstance(config, str):
+        try:
+            config = json.loads(config)
+        except ValueError:
+            return list(DEFAULT_DASHBOARD_LAYOUT)
+
+    if isinstance(config, dict):
+        config = config.get("widgets")
+    if not isinstance(config, list):
+        return list(DEFAULT_DASHBOARD_LAYOUT)
+
+    layout = [w for w in config if w in DASHBOARD_WIDGETS]
+    return layout or list(DEFAULT_DASHBOARD_LAYOUT)
+
+
+def get_dashboard_batch(
+    db: Session,
+    widgets: list,
+    top_customers_limit: int = 5,
+    activities_limit: int = 10
+):
+    """
+    بيانات كل مكونات لوحة التحكم المطلوبة في طلب واحد ومعاملة قراءة واحدة
+
+    Returns:
+        {"widgets": [...], "data": {"kpis": ..., "alerts": ..., ...}}
+    """
+    from app.database import read_snapshot
+    from app.services.advanced_reports import get_top_customers
+
+    needed = {key for w in widgets for key in DASHBOARD_WIDGETS.get(w, ())}
+    data = {}
+
+    with read_snapshot(db):
+        shared = {}
+        if "kpis" in needed:
+            kpis = get_dashboard_kpis(db)
+            data["kpis"] = kpis
+            shared["cash_balance"] = kpis["cash_balance"]
 
+        if "alerts" in needed:
+            data["alerts"] = get_dashboard_alerts(db, cash_balance=shared.get("cash_balance"))
+        if "balance_check" in needed:
+            data["balance_check"] = get_balance_check(db)
+        if "sales_by_crop" in needed:
+            data["sales_by_crop"] = get_sales_by_crop(db)
+        if "top_customers" in needed:
+            data["top_customers"] = get_top_customers(db, top_customers_limit)
+        if "recent_activities" in needed:
+            data["recent_activities"] = get_recent_activities(db, activities_limit)
+        if "season_summary" in needed:
+            data["season_summary"] = get_current_season_summary(db)
 
+    return {"widgets": widgets, "data": data}
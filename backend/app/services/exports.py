@@ -0,0 +1,348 @@
+"""
+Streaming Export Service
+تصدير دفتر الأستاذ والقوائم (مبيعات، مشتريات، مدفوعات، مصروفات) بصيغة CSV أو XLSX
+
+- الاستعلام يُقرأ على دفعات (yield_per) ولا يُحمّل في الذاكرة مرة واحدة
+- كل دفعة تُكتب وتُرسل فوراً، فالذاكرة ثابتة مهما كان حجم البيانات
+- ملف XLSX يُكتب مباشرة كـ zip متدفق (write-only) بدون مكتبات خارجية
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from app import models
+
+# عدد الصفوف في كل دفعة من قاعدة البيانات
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+# ============================================
+# مجموعات البيانات
+# ============================================
+
+def _between(query, column, start_date: Optional[date], end_date: Optional[date]):
+    if start_date:
+        query = query.where(column >= start_date)
+    if end_date:
+        query = query.where(column <= end_date)
+    return query
+
+
+def _ledger(start_date, end_date):
+    GL = models.GeneralLedger
+    columns = [
+        ("رقم القيد", GL.entry_id),
+        ("التاريخ", GL.entry_date),
+        ("الحساب", models.FinancialAccount.account_name),
+        ("مدين", GL.debit),
+        ("دائن", GL.credit),
+        ("البيان", GL.description),
+        ("نوع المصدر", GL.source_type),
+        ("رقم المصدر", GL.source_id),
+    ]
+    query = select(*[c for _, c in columns]).join(
+        models.FinancialAccount, models.FinancialAccount.account_id == GL.account_id
+    )
+    query = _between(query, GL.entry_date, start_date, end_date)
+    return columns, query.order_by(GL.entry_date, GL.entry_id)
+
+
+def _sales(start_date, end_date):
+    S = models.Sale
+    columns = [
+        ("رقم البيع", S.sale_id),
+        ("التاريخ", S.sale_date),
+        ("العميل", models.Contact.name),
+        ("المحصول", models.Crop.crop_name),
+        ("الكمية (كجم)", S.quantity_sold_kg),
+        ("سعر الوحدة", S.selling_unit_price),
+        ("وحدة التسعير", S.selling_pricing_unit),
+        ("الإجمالي", S.total_sale_amount),
+        ("المحصل", S.amount_received),
+        ("حالة الدفع", S.payment_status),
+        ("ملاحظات", S.notes),
+    ]
+    query = (
+        select(*[c for _, c in columns])
+        .join(models.Contact, models.Contact.contact_id == S.customer_id)
+        .join(models.Crop, models.Crop.crop_id == S.crop_id)
+    )
+    query = _between(query, S.sale_date, start_date, end_date)
+    return columns, query.order_by(S.sale_date, S.sale_id)
+
+
+def _purchases(start_date, end_date):
+    P = models.Purchase
+    columns = [
+        ("رقم الشراء", P.purchase_id),
+        ("التاريخ", P.purchase_date),
+        ("المورد", models.Contact.name),
+        ("المحصول", models.Crop.crop_name),
+        ("الكمية (كجم)", P.quantity_kg),
+        ("سعر الوحدة", P.unit_price),
+        ("وحدة التسعير", P.purchasing_pricing_unit),
+        ("الإجمالي", P.total_cost),
+        ("المدفوع", P.amount_paid),
+        ("حالة الدفع", P.payment_status),
+        ("ملاحظات", P.notes),
+    ]
+    query = (
+        select(*[c for _, c in columns])
+        .join(models.Contact, models.Contact.contact_id == P.supplier_id)
+        .join(models.Crop, models.Crop.crop_id == P.crop_id)
+    )
+    query = _between(query, P.purchase_date, start_date, end_date)
+    return columns, query.order_by(P.purchase_date, P.purchase_id)
+
+
+def _payments(start_date, end_date):
+    P = models.Payment
+    debit_account = aliased(models.FinancialAccount)
+    credit_account = aliased(models.FinancialAccount)
+    columns = [
+        ("رقم الدفعة", P.payment_id),
+        ("التاريخ", P.payment_date),
+        ("الجهة", models.Contact.name),
+        ("المبلغ", P.amount),
+        ("طريقة الدفع", P.payment_method),
+        ("الحساب المدين", debit_account.account_name),
+        ("الحساب الدائن", credit_account.account_name),
+        ("نوع العملية", P.transaction_type),
+        ("رقم العملية", P.transaction_id),
+        ("رقم المرجع", P.reference_number),
+        ("ملاحظات", P.notes),
+    ]
+    query = (
+        select(*[c for _, c in columns])
+        .join(models.Contact, models.Contact.contact_id == P.contact_id)
+        .join(debit_account, debit_account.account_id == P.debit_account_id)
+        .join(credit_account, credit_account.account_id == P.credit_account_id)
+    )
+    query = _between(query, P.payment_date, start_date, end_date)
+    return columns, query.order_by(P.payment_date, P.payment_id)
+
+
+def _expenses(start_date, end_date):
+    E = models.Expense
+    columns = [
+        ("رقم المصروف", E.expense_id),
+        ("التاريخ", E.expense_date),
+        ("البيان", E.description),
+        ("المبلغ", E.amount),
+        ("النوع", E.expense_type),
+        ("الفئة", E.category),
+        ("المحصول", models.Crop.crop_name),
+        ("المورد", models.Contact.name),
+    ]
+    query = (
+        select(*[c for _, c in columns])
+        .outerjoin(models.Crop, models.Crop.crop_id == E.crop_id)
+        .outerjoin(models.Contact, models.Contact.contact_id == E.supplier_id)
+    )
+    query = _between(query, E.expense_date, start_date, end_date)
+    return columns, query.order_by(E.expense_date, E.expense_id)
+
+
+# اسم المجموعة -> دالة تبني (الأعمدة، الاستعلام)
+EXPORT_DATASETS: Dict[str, Callable] = {
+    "ledger": _ledger,
+    "sales": _sales,
+    "purchases": _purchases,
+    "payments": _payments,
+    "expenses": _expenses,
+}
+
+
+def iter_export_chunks(
+    db: Session,
+    dataset: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Tuple[List[str], Iterator[list]]:
+    """
+    ترجع (العناوين، مولد دفعات الصفوف)
+    الصفوف تُجلب من المؤشر على دفعات ولا يُبنى أي كائن ORM
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown export dataset: {dataset}")
+    columns, query = EXPORT_DATASETS[dataset](start_date, end_date)
+    headers = [header for header, _ in columns]
+
+    def chunks():
+        result = db.execute(query.execution_options(yield_per=chunk_size))
+        try:
+            for partition in result.partitions():
+                yield partition
+        finally:
+            result.close()
+
+    return headers, chunks()
+
+
+# ============================================
+# CSV
+# ============================================
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    return value
+
+
+def write_csv(headers: List[str], chunks: Iterator[list]) -> Iterator[bytes]:
+    """CSV بترميز UTF-8 مع BOM (ليفتحه Excel بالعربية بشكل صحيح)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(v) for v in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+# ============================================
+# XLSX (كتابة فقط، متدفق)
+# ============================================
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView rightToLeft="1" workbookViewId="0"/></sheetViews>'
+    '<sheetData>'
+)
+
+_SHEET_END = '</sheetData></worksheet>'
+
+# محارف التحكم غير المسموحة في XML
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _ChunkBuffer:
+    """مخرج غير قابل للـ seek يجمع ما يكتبه zipfile ليُرسل ثم يُفرّغ"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _xlsx_cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = value.isoformat() if isinstance(value, date) else str(value)
+    text = escape(_INVALID_XML_CHARS.sub("", text))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values) -> str:
+    return "<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>"
+
+
+def write_xlsx(headers: List[str], chunks: Iterator[list], sheet_name: str = "Sheet1") -> Iterator[bytes]:
+    """ملف XLSX بورقة واحدة، النصوص inline بدون sharedStrings حتى لا يُحفظ شيء في الذاكرة"""
+    output = _ChunkBuffer()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(name=escape(sheet_name, {'"': "&quot;"})))
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write((_SHEET_START + _xlsx_row(headers)).encode("utf-8"))
+            for rows in chunks:
+                sheet.write("".join(_xlsx_row(row) for row in rows).encode("utf-8"))
+                yield output.pop()
+            sheet.write(_SHEET_END.encode("utf-8"))
+    yield output.pop()
+
+
+def stream_export(
+    dataset: str,
+    file_format: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> Iterator[bytes]:
+    """
+    مولد بايتات الملف للـ StreamingResponse
+    يفتح جلسته الخاصة لأن الإرسال يستمر بعد انتهاء دالة الـ endpoint
+    """
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        headers, chunks = iter_export_chunks(db, dataset, start_date, end_date)
+        if file_format == "xlsx":
+            yield from write_xlsx(headers, chunks, sheet_name=dataset)
+        else:
+            yield from write_csv(headers, chunks)
+    finally:
+        db.close()
@@ -0,0 +1,89 @@
+"""
+Live Updates Service
+خدمة التحديثات الحية - تحويل ما يتم ترحيله إلى أحداث على ناقل الأحداث
+
+الأحداث المنشورة (بعد نجاح الـ commit فقط):
+- changes: أسماء الجداول التي تغيرت (من عدادات أجيال الكتابة)
+- notification: تنبيه جديد
+- treasury: حركة جديدة على أحد حسابات النقدية (CASH_ACCOUNT_IDS: الأدراج والبنوك)
+
+لا يتم أي عمل إضافي ما دام لا يوجد مشتركون متصلون.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core import write_generation
+from app.core.event_bus import event_bus
+
+_PENDING = "live_updates_pending"
+
+
+def _notification_payload(n: "models.Notification") -> dict:
+    return {
+        "id": n.notification_id,
+        "user_id": n.user_id,
+        "type": n.type,
+        "title": n.title,
+        "message": n.message,
+        "is_read": n.is_read,
+        "created_at": n.created_at,
+        "action_url": n.action_url,
+    }
+
+
+def _treasury_payload(entry: "models.GeneralLedger") -> dict:
+    return {
+        "entry_id": entry.entry_id,
+        "entry_date": entry.entry_date,
+        "debit": entry.debit,
+        "credit": entry.credit,
+        "description": entry.description,
+        "source_type": entry.source_type,
+        "source_id": entry.source_id,
+    }
+
+
+def _collect(session: Session, flush_context) -> None:
+    """التقاط التنبيهات وحركات الخزينة الجديدة بعد الـ flush (المعرفات متاحة)"""
+    if not event_bus.subscriber_count:
+        return
+
+    pending = session.info.setdefault(_PENDING, [])
+    cash_account_ids = None
+    for obj in session.new:
+        if isinstance(obj, models.Notification):
+            pending.append(("notification", _notification_payload(obj)))
+        elif isinstance(obj, models.GeneralLedger):
+            if cash_account_ids is None:
+                from app.services.cash_flow import get_cash_account_ids
+                cash_account_ids = set(get_cash_account_ids(session))
+            if obj.account_id in cash_account_ids:
+                pending.append(("treasury", _treasury_payload(obj)))
+
+
+def publish_notification(session: Session, notification) -> None:
+    """نشر تنبيه بعد الـ commit لكتابات لا تمر بالـ flush (مثل الإدراج المجمع للتنبيهات)"""
+    if event_bus.subscriber_count:
+        session.info.setdefault(_PENDING, []).append(("notification", _notification_payload(notification)))
+
+
+def _publish(session: Session) -> None:
+    for event_type, data in session.info.pop(_PENDING, []):
+        event_bus.publish(event_type, data)
+
+
+def _discard(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def _publish_changes(tables) -> None:
+    event_bus.publish("changes", sorted(tables))
+
+
+def register_live_updates(session_factory) -> None:
+    """ربط التحديثات الحية بمصنع الجلسات (يُستدعى مرة واحدة من database.py)"""
+    event.listen(session_factory, "after_flush", _collect)
+    event.listen(session_factory, "after_commit", _publish)
+    event.listen(session_factory, "after_rollback", _discard)
+    write_generation.on_bump(_publish_changes)
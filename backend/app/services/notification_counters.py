@@ -0,0 +1,202 @@
+"""
+Notification Counters Service
+عدادات التنبيهات غير المقروءة لكل مستخدم - حتى لا تقرأ شارة التنبيهات جدول notifications
+
+- جدول notification_counters: صف لكل مستخدم (user_id = 0 للتنبيهات العامة user_id NULL)
+  عدد غير المقروء للمستخدم = عداده + عداد التنبيهات العامة
+- العدادات تُعدّل في نفس معاملة الإدراج/القراءة (UPSERT واحد قبل الـ commit)؛ كتابات الـ ORM
+  تُلتقط من أحداث الجلسة، والإدراج المجمع وتحديد الكل كمقروء يستدعيان adjust/reset
+- بعد الـ commit: تحديث النسخة في الذاكرة ونشر حدث unread لمنتظري الاستطلاع الطويل
+- النسخة في الذاكرة داخل العملية؛ تُعاد قراءتها من الجدول بعد COUNTER_TTL_SECONDS
+  لتلتقط ما كتبته العمليات الأخرى (uvicorn --workers أو المجدول في عامل آخر)
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.event_bus import event_bus
+
+# مفتاح التنبيهات العامة (user_id NULL)
+BROADCAST = 0
+COUNTER_TTL_SECONDS = 30
+
+_DELTAS = "notification_counters_deltas"
+_PENDING = "notification_counters_pending"
+_RESET_ALL = "notification_counters_reset_all"
+
+_lock = threading.Lock()
+_cache: Dict[int, Tuple[int, float]] = {}  # bucket -> (العدد، وقت القراءة من الجدول)
+
+
+def bucket(user_id: Optional[int]) -> int:
+    return BROADCAST if user_id is None else user_id
+
+
+# ============================================
+# التعديل (داخل معاملة الكتابة)
+# ============================================
+
+def _pending(session: Session) -> Dict[int, Optional[int]]:
+    """bucket -> الفرق المعلق للذاكرة، أو None إذا صُفّر العداد (يُعاد قراءته من الجدول)"""
+    return session.info.setdefault(_PENDING, {})
+
+
+def adjust(session: Session, deltas: Dict[int, int]) -> None:
+    """
+    إضافة فروق للعدادات (موجبة عند الإدراج، سالبة عند القراءة)؛ تُكتب قبل الـ commit بـ UPSERT واحد
+    الكتابات عبر الـ ORM تُحسب تلقائياً؛ تُستدعى يدوياً فقط للإدراج المجمع
+    """
+    to_write = session.info.setdefault(_DELTAS, {})
+    pending = _pending(session)
+    for b, d in deltas.items():
+        if not d:
+            continue
+        to_write[b] = to_write.get(b, 0) + d
+        pending[b] = None if b in pending and pending[b] is None else pending.get(b, 0) + d
+
+
+def reset(session: Session, buckets: Optional[Iterable[int]] = None) -> None:
+    """تصفير عدادات (بعد تحديد الكل كمقروء)؛ None = كل العدادات"""
+    query = session.query(models.NotificationCounter)
+    to_write = session.info.setdefault(_DELTAS, {})
+    if buckets is None:
+        session.info[_RESET_ALL] = True
+        to_write.clear()
+    else:
+        buckets = list(buckets)
+        query = query.filter(models.NotificationCounter.user_id.in_(buckets))
+        _pending(session).update(dict.fromkeys(buckets))
+        for b in buckets:
+            to_write.pop(b, None)
+    query.update({"unread_count": 0}, synchronize_session=False)
+
+
+def _collect_flush(session: Session, flush_context, instances) -> None:
+    """التنبيهات المضافة/المقروءة/المحذوفة عبر الـ ORM"""
+    deltas: Dict[int, int] = {}
+    for obj in session.new:
+        if isinstance(obj, models.Notification) and not obj.is_read:
+            deltas[bucket(obj.user_id)] = deltas.get(bucket(obj.user_id), 0) + 1
+    for obj in session.dirty:
+        if isinstance(obj, models.Notification):
+            history = inspect(obj).attrs.is_read.history
+            if history.has_changes() and bool(history.deleted and history.deleted[0]) != bool(obj.is_read):
+                b = bucket(obj.user_id)
+                deltas[b] = deltas.get(b, 0) + (-1 if obj.is_read else 1)
+    for obj in session.deleted:
+        if isinstance(obj, models.Notification) and not obj.is_read:
+            deltas[bucket(obj.user_id)] = deltas.get(bucket(obj.user_id), 0) - 1
+    adjust(session, deltas)
+
+
+def _apply_before_commit(session: Session) -> None:
+    session.flush()
+    deltas = {b: d for b, d in session.info.pop(_DELTAS, {}).items() if d}
+    if not deltas:
+        return
+    stmt = insert(models.NotificationCounter).values(
+        [{"user_id": b, "unread_count": d} for b, d in deltas.items()]
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"unread_count": models.NotificationCounter.unread_count + stmt.excluded.unread_count}
+    ))
+
+
+def _apply_after_commit(session: Session) -> None:
+    """بعد نجاح الـ commit: تحديث الذاكرة ونشر الحدث (القائمة الفارغة = كل المستخدمين)"""
+    reset_all = session.info.pop(_RESET_ALL, False)
+    pending = session.info.pop(_PENDING, None)
+    if not pending and not reset_all:
+        return
+    with _lock:
+        if reset_all:
+            _cache.clear()
+        for b, delta in (pending or {}).items():
+            if b not in _cache:
+                continue
+            if delta is None:
+                del _cache[b]
+            else:
+                count, loaded_at = _cache[b]
+                _cache[b] = (max(count + delta, 0), loaded_at)
+    event_bus.publish("unread", [] if reset_all else sorted(pending))
+
+
+def _discard(session: Session, previous_transaction=None) -> None:
+    for key in (_DELTAS, _PENDING, _RESET_ALL):
+        session.info.pop(key, None)
+
+
+def register_notification_counters(session_factory) -> None:
+    """ربط صيانة العدادات بمصنع الجلسات (يُستدعى مرة واحدة من database.py)"""
+    event.listen(session_factory, "before_flush", _collect_flush)
+    event.listen(session_factory, "before_commit", _apply_before_commit)
+    event.listen(session_factory, "after_commit", _apply_after_commit)
+    event.listen(session_factory, "after_rollback", _discard)
+
+
+# ============================================
+# القراءة
+# ============================================
+
+def cached_unread_count(user_id: int) -> Optional[int]:
+    """العدد من الذاكرة بدون قاعدة البيانات؛ None إذا لم يُقرأ بعد أو انتهت صلاحيته"""
+    now = time.monotonic()
+    with _lock:
+        entries = [_cache.get(b) for b in (bucket(user_id), BROADCAST)]
+    if any(e is None or now - e[1] > COUNTER_TTL_SECONDS for e in entries):
+        return None
+    return sum(count for count, _ in entries)
+
+
+def get_unread_count(db: Session, user_id: int, fresh: bool = False) -> int:
+    """
+    عدد التنبيهات غير المقروءة للمستخدم (بحث بالمفتاح في جدول العدادات عند الحاجة فقط)
+    fresh: قراءة الجدول وتحديث الذاكرة (لالتقاط ما كتبته العمليات الأخرى قبل انتهاء COUNTER_TTL_SECONDS)
+    """
+    count = None if fresh else cached_unread_count(user_id)
+    if count is not None:
+        return count
+    buckets = {bucket(user_id), BROADCAST}
+    rows = dict(db.query(models.NotificationCounter.user_id, models.NotificationCounter.unread_count).filter(
+        models.NotificationCounter.user_id.in_(buckets)
+    ).all())
+    now = time.monotonic()
+    with _lock:
+        for b in buckets:
+            _cache[b] = (rows.get(b, 0), now)
+    return sum(rows.get(b, 0) for b in buckets)
+
+
+# ============================================
+# إعادة البناء
+# ============================================
+
+def rebuild_notification_counters(db: Session) -> int:
+    """إعادة حساب كل العدادات من جدول notifications"""
+    Notification = models.Notification
+    db.query(models.NotificationCounter).delete()
+    rows = db.query(
+        func.coalesce(Notification.user_id, BROADCAST), func.count()
+    ).filter(Notification.is_read == False).group_by(func.coalesce(Notification.user_id, BROADCAST)).all()
+    db.add_all([models.NotificationCounter(user_id=b, unread_count=c) for b, c in rows])
+    db.commit()
+    with _lock:
+        _cache.clear()
+    return len(rows)
+
+
+def ensure_notification_counters(db: Session) -> None:
+    """عند بدء التشغيل: إعادة البناء إذا لم يطابق مجموع العدادات عدد غير المقروء"""
+    unread = db.query(func.count(models.Notification.notification_id)).filter(
+        models.Notification.is_read == False
+    ).scalar() or 0
+    counted = db.query(func.sum(models.NotificationCounter.unread_count)).scalar() or 0
+    if unread != counted:
+        rebuild_notification_counters(db)
@@ -0,0 +1,258 @@
+"""
+Parquet Export Service
+تصدير جداول الحقائق (دفتر الأستاذ، المبيعات، المشتريات، المدفوعات، الدفعات، الأسعار اليومية)
+بصيغة Parquet عمودية للتحليل خارج التطبيق
+
+- الملفات مقسمة بأسلوب Hive: <الجدول>/month=YYYY-MM/crop_id=N/part-<بداية الدفعة>.parquet
+- التصدير تزايدي: كل جدول له علامة مائية (أكبر مفتاح أساسي تم تصديره) في manifest.json،
+  فالتشغيل الليلي يكتب الصفوف الجديدة فقط في ملفات جديدة ولا يعيد كتابة القديم
+- التعديلات والحذف على صفوف سبق تصديرها لا تظهر إلا بإعادة بناء كاملة (full=True)
+- الضغط zstd، والكتابة على دفعات (yield_per) فالذاكرة ثابتة مهما كان حجم الجدول
+- pyarrow اعتمادية اختيارية: بدونها يرجع التصدير خطأ واضحاً ولا يتأثر باقي التطبيق
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, func, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app import models
+from app.core.config import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - يعتمد على البيئة
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# عدد الصفوف في كل دفعة من قاعدة البيانات
+PARQUET_CHUNK_SIZE = 10000
+PARQUET_COMPRESSION = "zstd"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# الجدول -> (النموذج، عمود العلامة المائية، عمود تاريخ التقسيم الشهري، عمود المحصول إن وجد)
+# العلامة المائية هي المفتاح الأساسي (متزايد دائماً) وليس created_at لأن بعض الجداول بدونه
+PARQUET_TABLES = {
+    "general_ledger": (models.GeneralLedger, "entry_id", "entry_date", None),
+    "sales": (models.Sale, "sale_id", "sale_date", "crop_id"),
+    "purchases": (models.Purchase, "purchase_id", "purchase_date", "crop_id"),
+    "payments": (models.Payment, "payment_id", "payment_date", None),
+    "inventory_batches": (models.InventoryBatch, "batch_id", "purchase_date", "crop_id"),
+    "daily_prices": (models.DailyPrice, "price_id", "price_date", "crop_id"),
+}
+
+# تشغيل واحد في نفس الوقت (الملفات والـ manifest مشتركة)
+_export_lock = threading.Lock()
+
+
+def _require_pyarrow():
+    if pq is None:
+        raise HTTPException(
+            status_code=503,
+            detail="تصدير Parquet غير متاح: مكتبة pyarrow غير مثبتة (pip install pyarrow)"
+        )
+
+
+def _arrow_type(column_type):
+    """نوع Arrow المقابل لنوع عمود SQLAlchemy"""
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, Numeric):
+        if column_type.precision and column_type.scale is not None:
+            return pa.decimal128(column_type.precision, column_type.scale)
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _partition_dir(table_name: str, day: Optional[date], crop_id: Optional[int]) -> str:
+    """المسار النسبي لقسم الصف (بفواصل / ليكون الـ manifest مستقلاً عن نظام التشغيل)"""
+    month = day.strftime("%Y-%m") if day else "__HIVE_DEFAULT_PARTITION__"
+    parts = [table_name, f"month={month}"]
+    if crop_id is not None:
+        parts.append(f"crop_id={crop_id}")
+    return "/".join(parts)
+
+
+# ============================================
+# الـ Manifest
+# ============================================
+
+def get_output_dir(output_dir: Optional[str] = None) -> str:
+    return os.path.abspath(output_dir or settings.PARQUET_EXPORT_DIR)
+
+
+def read_manifest(output_dir: Optional[str] = None) -> dict:
+    path = os.path.join(get_output_dir(output_dir), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "compression": PARQUET_COMPRESSION, "tables": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(output_dir: str, manifest: dict):
+    """كتابة ذرية: العلامات المائية لا تتقدم إلا بعد اكتمال كتابة الملفات"""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ============================================
+# التصدير
+# ============================================
+
+def _export_table(db: Session, output_dir: str, table_name: str, watermark: int) -> Optional[dict]:
+    """
+    تصدير صفوف الجدول ذات المفتاح الأكبر من العلامة المائية
+    ترجع (العلامة الجديدة، الملفات المكتوبة) أو None إن لم توجد صفوف جديدة
+    """
+    model, key_name, date_name, crop_name = PARQUET_TABLES[table_name]
+    table = model.__table__
+    key = table.c[key_name]
+
+    # حد أعلى ثابت من بداية التشغيل حتى لا تختلط الصفوف المضافة أثناء التصدير
+    upper = db.execute(select(func.max(key)).where(key > watermark)).scalar()
+    if upper is None:
+        return None
+
+    columns = list(table.columns)
+    schema = pa.schema([pa.field(c.name, _arrow_type(c.type), nullable=c.nullable) for c in columns])
+    date_index = [c.name for c in columns].index(date_name)
+    crop_index = [c.name for c in columns].index(crop_name) if crop_name else None
+    key_index = [c.name for c in columns].index(key_name)
+
+    # اسم الملف مشتق من العلامة المائية: إعادة التشغيل بعد تعطل تستبدل نفس الملفات
+    file_name = f"part-{watermark + 1:010d}.parquet"
+    writers: Dict[str, "pq.ParquetWriter"] = {}
+    stats: Dict[str, dict] = {}
+
+    def flush(partition, rows):
+        if partition not in writers:
+            os.makedirs(os.path.join(output_dir, partition), exist_ok=True)
+            writers[partition] = pq.ParquetWriter(
+                os.path.join(output_dir, partition, file_name + ".tmp"),
+                schema, compression=PARQUET_COMPRESSION
+            )
+        arrays = [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)]
+        writers[partition].write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    query = select(*columns).where(key > watermark, key <= upper).order_by(key)
+    result = db.execute(query.execution_options(yield_per=PARQUET_CHUNK_SIZE))
+    try:
+        for chunk in result.partitions():
+            grouped: Dict[str, list] = {}
+            for row in chunk:
+                partition = _partition_dir(
+                    table_name, row[date_index], row[crop_index] if crop_index is not None else None
+                )
+                grouped.setdefault(partition, []).append(row)
+            for partition, rows in grouped.items():
+                flush(partition, rows)
+                entry = stats.setdefault(partition, {"rows": 0, "min_id": rows[0][key_index]})
+                entry["rows"] += len(rows)
+                entry["max_id"] = rows[-1][key_index]
+    finally:
+        result.close()
+        for writer in writers.values():
+            writer.close()
+
+    files = []
+    for partition, entry in sorted(stats.items()):
+        path = os.path.join(output_dir, partition, file_name)
+        os.replace(path + ".tmp", path)
+        files.append({"path": f"{partition}/{file_name}", **entry})
+    return {"watermark": upper, "files": files}
+
+
+def export_parquet(
+    db: Session,
+    tables: Optional[List[str]] = None,
+    full: bool = False,
+    output_dir: Optional[str] = None,
+) -> dict:
+    """
+    تصدير تزايدي لجداول الحقائق إلى Parquet وتحديث manifest.json
+    full=True يحذف ملفات الجداول المحددة ويعيد تصديرها من البداية
+    """
+    _require_pyarrow()
+    tables = tables or list(PARQUET_TABLES)
+    unknown = set(tables) - set(PARQUET_TABLES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"جداول غير معروفة: {', '.join(sorted(unknown))}")
+
+    if not _export_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="يوجد تصدير Parquet قيد التنفيذ")
+    try:
+        output_dir = get_output_dir(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = read_manifest(output_dir)
+        summary = {}
+
+        for table_name in tables:
+            _, key_name, _, crop_name = PARQUET_TABLES[table_name]
+            state = manifest["tables"].get(table_name)
+            if full or state is None:
+                shutil.rmtree(os.path.join(output_dir, table_name), ignore_errors=True)
+                state = {
+                    "watermark_column": key_name,
+                    "partition_by": ["month"] + (["crop_id"] if crop_name else []),
+                    "watermark": 0,
+                    "rows": 0,
+                    "files": [],
+                }
+
+            exported = _export_table(db, output_dir, table_name, state["watermark"])
+            rows = sum(f["rows"] for f in exported["files"]) if exported else 0
+            if exported:
+                state["watermark"] = exported["watermark"]
+                state["files"].extend(exported["files"])
+                state["rows"] += rows
+            state["exported_at"] = datetime.utcnow().isoformat()
+            manifest["tables"][table_name] = state
+            summary[table_name] = {"rows": rows, "watermark": state["watermark"]}
+
+            # بعد كل جدول حتى لا يضيع ما اكتمل إن فشل جدول لاحق
+            manifest["updated_at"] = datetime.utcnow().isoformat()
+            _write_manifest(output_dir, manifest)
+            logger.info(f"Parquet export {table_name}: {rows} rows up to {key_name}={state['watermark']}")
+
+        return {"output_dir": output_dir, "tables": summary}
+    finally:
+        _export_lock.release()
+
+
+if __name__ == "__main__":
+    # للتشغيل الليلي من cron: python -m app.services.parquet_export [--full] [--output DIR] [tables...]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental Parquet export of fact tables")
+    parser.add_argument("tables", nargs="*", help=f"tables to export (default: all of {', '.join(PARQUET_TABLES)})")
+    parser.add_argument("--full", action="store_true", help="rebuild the selected tables from scratch")
+    parser.add_argument("--output", default=None, help="output directory (default: PARQUET_EXPORT_DIR)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        print(json.dumps(export_parquet(session, args.tables or None, args.full, args.output), indent=2))
+    finally:
+        session.close()
@@ -0,0 +1,320 @@
+"""
+Report Cache Service
+ذاكرة التقارير المؤقتة الدائمة (جدول report_cache)
+
+كل نتيجة تُحفظ لكل (تقرير، معاملات) مع:
+- أكبر entry_id في دفتر الأستاذ وقت الحساب (ledger_watermark)
+- نطاق التواريخ الذي يعتمد عليه التقرير [range_start, range_end]
+
+النتيجة صالحة ما دام لم يُرحّل قيد جديد بتاريخ داخل نطاقها، لذلك تقارير
+الفترات المغلقة تُقرأ فوراً بينما القيود بتاريخ سابق (backdated) تبطلها.
+
+ما لا يكشفه الـ watermark يُعالج بأحداث الجلسة قبل الـ commit:
+- تعديل أو حذف قيود موجودة -> حذف النتائج التي يغطي نطاقها تلك التواريخ
+- تغيير جداول أخرى يعتمد عليها التقرير (العملاء، المدفوعات...) -> حذف نتائج هذا التقرير
+
+النتائج التي أبطلها الـ watermark أو مر عليها REPORT_CACHE_MAX_AGE تُحذف من مهمة المجدول report_cache_prune
+"""
+import functools
+import inspect as pyinspect
+import json
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import and_, event, exists, func, inspect, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.write_generation import current_generation, has_pending_writes
+
+logger = logging.getLogger(__name__)
+
+_STALE = "report_cache_stale"
+
+_DEBT_TABLES = ("contacts", "sales", "purchases", "payments", "sale_returns", "purchase_returns")
+
+# اسم التقرير -> الجداول (غير دفتر الأستاذ) التي يعتمد عليها
+# معرّفة هنا (وليس عند تغليف الدوال) ليعمل الإبطال في أي عملية تكتب حتى لو لم تستورد التقارير
+REPORT_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    "trial_balance": ("financial_accounts",),
+    "balance_sheet": ("financial_accounts",),
+    "income_statement": ("financial_accounts",),
+    "equity_statement": ("financial_accounts",),
+    "income_statement_periods": ("financial_accounts",),
+    "balance_sheet_periods": ("financial_accounts",),
+    "cash_flow": ("settings",),
+    "cash_flow_periods": ("settings",),
+    "debt_report": _DEBT_TABLES + ("settings",),
+    "capital_distribution": _DEBT_TABLES + ("inventory", "financial_accounts", "settings"),
+    "crop_profitability": ("sales", "sale_returns", "expenses", "crops", "seasons"),
+}
+
+_DEPENDENCY_TABLES = frozenset(t for tables in REPORT_DEPENDENCIES.values() for t in tables)
+
+# تغيير هذه الأعمدة فقط في الحسابات يؤثر على التقارير (الرصيد يتغير مع كل قيد)
+_ACCOUNT_FIELDS = ("account_name", "account_type")
+
+# يُعطل في العمليات التي لا تكتب في قاعدة البيانات (عمليات مهام التقارير)
+_enabled = True
+
+# النتائج الأقدم تُحذف حتى لو بقيت صالحة (معاملات لا تُطلب مرة أخرى)
+REPORT_CACHE_MAX_AGE = timedelta(days=30)
+
+
+# ============================================
+# الترميز (JSON مع الحفاظ على Decimal والتواريخ)
+# ============================================
+
+def _encode_value(value):
+    if isinstance(value, Decimal):
+        return {"$decimal": str(value)}
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+def _decode_object(obj: dict):
+    if len(obj) == 1:
+        if "$decimal" in obj:
+            return Decimal(obj["$decimal"])
+        if "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+        if "$date" in obj:
+            return date.fromisoformat(obj["$date"])
+    return obj
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_encode_value, sort_keys=True, ensure_ascii=False)
+
+
+def _loads(text: str):
+    return json.loads(text, object_hook=_decode_object)
+
+
+# ============================================
+# القراءة والكتابة
+# ============================================
+
+def _ledger_watermark(db: Session) -> int:
+    return db.query(func.max(models.GeneralLedger.entry_id)).scalar() or 0
+
+
+def _is_valid(db: Session, entry: "models.ReportCache") -> bool:
+    """هل رُحّل قيد جديد بتاريخ داخل نطاق النتيجة؟"""
+    query = db.query(models.GeneralLedger.entry_id).filter(
+        models.GeneralLedger.entry_id > entry.ledger_watermark
+    )
+    if entry.range_start is not None:
+        query = query.filter(models.GeneralLedger.entry_date >= entry.range_start)
+    if entry.range_end is not None:
+        query = query.filter(models.GeneralLedger.entry_date <= entry.range_end)
+    return query.first() is None
+
+
+def _store(report_name: str, params_key: str, date_range, watermark: int, result: str) -> None:
+    """حفظ النتيجة في جلسة مستقلة (لا نؤكد معاملة المستدعي)؛ الفشل لا يوقف التقرير"""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        db.merge(models.ReportCache(
+            report_name=report_name,
+            params_key=params_key,
+            range_start=date_range[0],
+            range_end=date_range[1],
+            ledger_watermark=watermark,
+            result=result,
+            created_at=datetime.utcnow(),
+        ))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning(f"Report cache write skipped for {report_name}: {e}")
+    finally:
+        db.close()
+
+
+def disable_report_cache() -> None:
+    """تعطيل القراءة والحفظ لكل التقارير في هذه العملية (بما فيها التقارير المتداخلة)"""
+    global _enabled
+    _enabled = False
+
+
+def cached_report(
+    report_name: str,
+    date_range: Callable[..., Tuple[Optional[date], Optional[date]]],
+    normalize: Optional[Callable[[dict], dict]] = None,
+    encode: Optional[Callable] = None,
+    decode: Optional[Callable] = None,
+):
+    """
+    تغليف دالة تقرير (db, ...) بالذاكرة المؤقتة الدائمة
+
+    Args:
+        date_range: دالة تأخذ معاملات التقرير وترجع (بداية، نهاية) نطاق القيود المؤثرة (None = مفتوح)
+        normalize: توحيد المعاملات قبل بناء المفتاح (مثل استبدال None بتاريخ اليوم)
+        encode / decode: تحويل النتيجة من/إلى قيم قابلة للتخزين كـ JSON
+    """
+    if report_name not in REPORT_DEPENDENCIES:
+        raise ValueError(f"Unknown cached report: {report_name}")
+    tracked_tables = (models.GeneralLedger.__tablename__,) + REPORT_DEPENDENCIES[report_name]
+
+    def decorator(fn):
+        signature = pyinspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(db: Session, *args, **kwargs):
+            bound = signature.bind(db, *args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k != "db"}
+            if normalize:
+                params = normalize(params)
+
+            # الكتابات غير المؤكدة قد تُلغى، فلا نقرأ ولا نحفظ نتيجة مبنية عليها
+            if not _enabled or has_pending_writes(db):
+                return fn(db, **params)
+
+            params_key = _dumps(params)
+            entry = db.get(models.ReportCache, (report_name, params_key))
+            if entry is not None and _is_valid(db, entry):
+                cached = _loads(entry.result)
+                return decode(cached) if decode else cached
+
+            watermark = _ledger_watermark(db)
+            generation = current_generation(*tracked_tables)
+            result = fn(db, **params)
+            # تعديل أو حذف قيود أثناء الحساب (لا يكشفه الـ watermark) -> لا نحفظ
+            if current_generation(*tracked_tables) == generation:
+                stored = encode(result) if encode else result
+                _store(report_name, params_key, date_range(**params), watermark, _dumps(stored))
+            return result
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
+
+
+def prune_report_cache(db: Session) -> int:
+    """
+    حذف النتائج غير الصالحة (قيد جديد بتاريخ داخل نطاقها بعد الـ watermark) والقديمة (مهمة المجدول)
+    نفس شرط _is_valid في جملة DELETE واحدة
+    """
+    Cache, GL = models.ReportCache, models.GeneralLedger
+    stale = exists().where(
+        GL.entry_id > Cache.ledger_watermark,
+        or_(Cache.range_start.is_(None), GL.entry_date >= Cache.range_start),
+        or_(Cache.range_end.is_(None), GL.entry_date <= Cache.range_end),
+    )
+    expired = and_(Cache.created_at.isnot(None), Cache.created_at < datetime.utcnow() - REPORT_CACHE_MAX_AGE)
+    count = db.query(Cache).filter(or_(stale, expired)).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
+def clear_report_cache(db: Session, report_name: Optional[str] = None) -> int:
+    """مسح النتائج المحفوظة (لتقرير محدد أو للكل)"""
+    query = db.query(models.ReportCache)
+    if report_name:
+        query = query.filter(models.ReportCache.report_name == report_name)
+    count = query.delete(synchronize_session=False)
+    db.commit()
+    return count
+
+
+# ============================================
+# الإبطال عبر أحداث الجلسة
+# ============================================
+
+def _stale(session: Session) -> dict:
+    return session.info.setdefault(_STALE, {"dates": set(), "tables": set(), "all_ledger": False})
+
+
+def _collect_flush(session: Session, flush_context, instances) -> None:
+    """القيود المعدلة أو المحذوفة والجداول المعتمد عليها (قبل الـ flush لقراءة القيم القديمة)"""
+    changed = list(session.dirty) + list(session.deleted)
+    stale = None
+
+    for obj in changed + list(session.new):
+        if isinstance(obj, models.GeneralLedger):
+            if obj in session.new:
+                continue  # القيود الجديدة يكشفها الـ watermark
+            stale = stale or _stale(session)
+            history = inspect(obj).attrs.entry_date.history
+            stale["dates"].update(d for d in (history.deleted or []) if d is not None)
+            if obj.entry_date is not None:
+                stale["dates"].add(obj.entry_date)
+            continue
+
+        table = getattr(obj, "__tablename__", None)
+        if table not in _DEPENDENCY_TABLES:
+            continue
+        if isinstance(obj, models.FinancialAccount) and obj in session.dirty:
+            state = inspect(obj)
+            if not any(state.attrs[f].history.has_changes() for f in _ACCOUNT_FIELDS):
+                continue
+        stale = stale or _stale(session)
+        stale["tables"].add(table)
+
+
+def _collect_bulk(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    table = mapper.local_table.name
+    if table == models.GeneralLedger.__tablename__:
+        _stale(orm_execute_state.session)["all_ledger"] = True
+    elif table in _DEPENDENCY_TABLES:
+        _stale(orm_execute_state.session)["tables"].add(table)
+
+
+def _invalidate_before_commit(session: Session) -> None:
+    session.flush()
+    stale = session.info.pop(_STALE, None)
+    if not stale:
+        return
+
+    query = session.query(models.ReportCache)
+    Cache = models.ReportCache
+
+    if stale["all_ledger"]:
+        query.delete(synchronize_session=False)
+        return
+
+    conditions = []
+    if stale["dates"]:
+        first, last = min(stale["dates"]), max(stale["dates"])
+        conditions.append(
+            or_(Cache.range_start.is_(None), Cache.range_start <= last)
+            & or_(Cache.range_end.is_(None), Cache.range_end >= first)
+        )
+    if stale["tables"]:
+        reports = [
+            name for name, tables in REPORT_DEPENDENCIES.items()
+            if stale["tables"].intersection(tables)
+        ]
+        if reports:
+            conditions.append(Cache.report_name.in_(reports))
+
+    if conditions:
+        query.filter(or_(*conditions)).delete(synchronize_session=False)
+
+
+def _discard(session: Session, previous_transaction=None) -> None:
+    session.info.pop(_STALE, None)
+
+
+def register_report_cache_invalidation(session_factory) -> None:
+    """ربط إبطال ذاكرة التقارير بمصنع الجلسات (يُستدعى مرة واحدة من database.py)"""
+    event.listen(session_factory, "before_flush", _collect_flush)
+    event.listen(session_factory, "do_orm_execute", _collect_bulk)
+    event.listen(session_factory, "before_commit", _invalidate_before_commit)
+    event.listen(session_factory, "after_rollback", _discard)
@@ -0,0 +1,398 @@
+"""
+Report Jobs Service
+تشغيل التقارير الثقيلة في الخلفية (process pool) بدلاً من عمال طلبات الـ API
+
+- كل مهمة تُحفظ في جدول report_jobs وتُتابع حالتها من الواجهة (submit / status / result)
+- التنفيذ في عملية منفصلة باتصال قراءة فقط بقاعدة البيانات، فلا يحجز عمال الـ API
+  ولا يمسك قفل الكتابة الذي تحتاجه عمليات الترحيل
+- طلب مطابق لمهمة قيد التنفيذ يُرجع نفس المهمة (فهرس فريد جزئي على الحالات النشطة)
+- الإلغاء: المهمة المنتظرة لا تبدأ؛ المهمة الجارية تُعلّم ملغاة وتُهمل نتيجتها
+- كل مهمة نشطة محجوزة لعامل الـ API الذي يتابعها (locked_by / locked_until) ويجدد حجزها دورياً،
+  فالاستعادة (عند البدء ومن المجدول) تُفشل فقط مهام العمال المتوقفين وليس مهام العمال الآخرين
+"""
+import importlib
+import inspect as pyinspect
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from urllib.request import pathname2url
+
+from fastapi import HTTPException
+from fastapi.params import Param
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import create_engine, event, or_
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+# database قبل models: العملية المنفذة (spawn) تستورد هذه الوحدة أولاً
+from app.database import SessionLocal
+from app import models
+from app.core.config import settings
+from app.services.report_cache import disable_report_cache
+from app.services.scheduler import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+# اسم التقرير -> "module:function" (الدالة تأخذ db ثم معاملات التقرير)
+JOB_REPORTS: Dict[str, str] = {
+    "trial_balance": "app.services.reporting:generate_trial_balance",
+    "balance_sheet": "app.services.reporting:generate_balance_sheet",
+    "income_statement": "app.services.reporting:generate_income_statement",
+    "equity_statement": "app.services.reporting:generate_equity_statement",
+    "income_statement_periods": "app.services.reporting:generate_income_statement_periods",
+    "balance_sheet_periods": "app.services.reporting:generate_balance_sheet_periods",
+    "cash_flow": "app.services.cash_flow:get_cash_flow_report",
+    "cash_flow_periods": "app.services.cash_flow:get_cash_flow_periods",
+    "capital_distribution": "app.services.capital_distribution:generate_capital_distribution",
+    "crop_profitability": "app.services.advanced_reports:get_crop_profitability",
+    "season_comparison": "app.services.advanced_reports:get_season_comparison",
+    "cardex": "app.api.v1.endpoints.inventory:get_inventory_cardex",
+}
+
+# تحويل النتائج التي لا يحولها jsonable_encoder كما هي (NamedTuple تفقد أسماء الحقول)
+_ENCODERS = {
+    "trial_balance": lambda rows: [row._asdict() for row in rows],
+}
+
+# مدة حجز المهمة للعامل؛ يجددها كل HEARTBEAT_SECONDS ما دام يعمل
+LEASE = timedelta(minutes=5)
+HEARTBEAT_SECONDS = 60
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_dispatcher: Optional[ThreadPoolExecutor] = None
+_heartbeat: Optional[threading.Thread] = None
+_stop_heartbeat = threading.Event()
+# job_id -> future الموزع؛ يكتبه الإرسال ويحذفه خيط الموزع ويقرؤه الإلغاء من خيوط مختلفة
+_running_lock = threading.Lock()
+_running: Dict[str, Future] = {}
+
+
+# ============================================
+# المعاملات
+# ============================================
+
+def _resolve(report_name: str):
+    module_name, function_name = JOB_REPORTS[report_name].split(":")
+    fn = getattr(importlib.import_module(module_name), function_name)
+    return getattr(fn, "uncached", fn)
+
+
+def _report_parameters(report_name: str):
+    return [p for name, p in pyinspect.signature(_resolve(report_name)).parameters.items() if name != "db"]
+
+
+def _parse_params(report_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """تحويل المعاملات (JSON) إلى أنواع الدالة مع تطبيق القيم الافتراضية"""
+    parameters = _report_parameters(report_name)
+    unknown = set(params) - {p.name for p in parameters}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"معاملات غير معروفة: {', '.join(sorted(unknown))}")
+
+    parsed = {}
+    for p in parameters:
+        # دوال الـ endpoints (مثل الكارديكس) قيمها الافتراضية Query(...)
+        default = p.default.default if isinstance(p.default, Param) else p.default
+        if p.name not in params:
+            if default is pyinspect.Parameter.empty or default is Ellipsis:
+                raise HTTPException(status_code=400, detail=f"المعامل {p.name} مطلوب")
+            parsed[p.name] = default
+            continue
+        annotation = Any if p.annotation is pyinspect.Parameter.empty else p.annotation
+        try:
+            parsed[p.name] = TypeAdapter(annotation).validate_python(params[p.name])
+        except ValidationError:
+            raise HTTPException(status_code=400, detail=f"قيمة غير صالحة للمعامل {p.name}")
+    return parsed
+
+
+def normalize_params(report_name: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """
+    المعاملات بعد التحقق بصيغة JSON ومفتاحها المرتب
+    الطلبات التي تختلف في الشكل فقط (قيمة افتراضية صريحة، تاريخ كنص) لها نفس المفتاح
+    """
+    if report_name not in JOB_REPORTS:
+        raise HTTPException(status_code=404, detail="التقرير غير متاح كمهمة خلفية")
+    normalized = jsonable_encoder(_parse_params(report_name, params or {}))
+    return normalized, json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+
+# ============================================
+# التنفيذ داخل العملية المنفصلة
+# ============================================
+
+_read_only_sessions: Optional[sessionmaker] = None
+
+
+def _init_worker() -> None:
+    """
+    تهيئة عملية الـ pool: الذاكرة المؤقتة للتقارير تحفظ بجلسة كتابة مستقلة،
+    فتُعطل لكل التقارير في العملية (التقارير المتداخلة مثل قائمة حقوق الملكية تستدعي المغلفة)
+    """
+    disable_report_cache()
+
+
+def _read_only_session() -> Session:
+    """جلسة باتصال قراءة فقط (mode=ro لملف SQLite و query_only لأي كتابة عرضية)"""
+    global _read_only_sessions
+    if _read_only_sessions is None:
+        url = make_url(settings.DATABASE_URL)
+        if url.get_backend_name() == "sqlite" and url.database:
+            uri = f"file:{pathname2url(os.path.abspath(url.database))}?mode=ro"
+            engine = create_engine(
+                "sqlite://",
+                creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False)
+            )
+
+            @event.listens_for(engine, "connect")
+            def _query_only(dbapi_connection, connection_record):
+                dbapi_connection.execute("PRAGMA query_only=ON;")
+        else:
+            engine = create_engine(url)
+        _read_only_sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return _read_only_sessions()
+
+
+def run_report(report_name: str, params: Dict[str, Any]) -> Tuple[bool, str]:
+    """
+    تنفيذ التقرير (يعمل داخل عملية الـ pool)
+    يرجع (نجاح، JSON النتيجة أو رسالة الخطأ) بدلاً من رفع الاستثناء عبر حدود العملية
+    """
+    db = _read_only_session()
+    try:
+        result = _resolve(report_name)(db=db, **_parse_params(report_name, params))
+        encode = _ENCODERS.get(report_name)
+        return True, json.dumps(jsonable_encoder(encode(result) if encode else result), ensure_ascii=False)
+    except HTTPException as e:
+        return False, str(e.detail)
+    except Exception as e:
+        logger.exception(f"Report job {report_name} failed")
+        return False, str(e) or type(e).__name__
+    finally:
+        db.close()
+
+
+# ============================================
+# الجدولة والحالة (داخل عملية الـ API)
+# ============================================
+
+def _renew_leases() -> int:
+    """تجديد حجز كل المهام النشطة التي يتابعها هذا العامل"""
+    db = SessionLocal()
+    try:
+        count = db.query(models.ReportJob).filter(
+            models.ReportJob.locked_by == WORKER_ID,
+            models.ReportJob.status.in_(models.REPORT_JOB_ACTIVE_STATUSES)
+        ).update({"locked_until": datetime.utcnow() + LEASE}, synchronize_session=False)
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+def _heartbeat_loop() -> None:
+    while not _stop_heartbeat.wait(HEARTBEAT_SECONDS):
+        try:
+            _renew_leases()
+        except Exception:
+            logger.exception("Report job lease renewal failed")
+
+
+def _executors() -> Tuple[ProcessPoolExecutor, ThreadPoolExecutor]:
+    """
+    pool العمليات ينفذ التقارير؛ وخيط واحد لكل عامل ينتظر النتيجة ويحدّث الحالة
+    (بنفس العدد، فبداية الخيط تعني أن المهمة بدأت فعلاً في عملية)
+    """
+    global _pool, _dispatcher, _heartbeat
+    with _lock:
+        if _pool is None:
+            workers = max(1, settings.REPORT_JOB_WORKERS)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+            )
+            _dispatcher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-job")
+            _stop_heartbeat.clear()
+            _heartbeat = threading.Thread(target=_heartbeat_loop, name="report-job-lease", daemon=True)
+            _heartbeat.start()
+        return _pool, _dispatcher
+
+
+def _transition(job_id: str, from_statuses: Tuple[str, ...], **values) -> bool:
+    """تغيير الحالة فقط إذا كانت المهمة ما زالت في إحدى الحالات المتوقعة (لا سباق مع الإلغاء)"""
+    db = SessionLocal()
+    try:
+        updated = db.query(models.ReportJob).filter(
+            models.ReportJob.job_id == job_id,
+            models.ReportJob.status.in_(from_statuses)
+        ).update(values, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    finally:
+        db.close()
+
+
+def _dispatch(job_id: str, report_name: str, params: Dict[str, Any]) -> None:
+    try:
+        if not _transition(job_id, ("PENDING",), status="RUNNING", started_at=datetime.utcnow()):
+            return  # أُلغيت قبل أن تبدأ
+
+        pool, _ = _executors()
+        try:
+            ok, payload = pool.submit(run_report, report_name, params).result()
+        except Exception as e:  # توقف العملية المنفذة نفسها
+            ok, payload = False, str(e) or type(e).__name__
+
+        values = {"status": "DONE", "result": payload} if ok else {"status": "FAILED", "error": payload}
+        _transition(job_id, ("RUNNING",), finished_at=datetime.utcnow(), **values)
+    except Exception:
+        logger.exception(f"Report job {job_id} dispatch failed")
+    finally:
+        with _running_lock:
+            _running.pop(job_id, None)
+
+
+def submit_report_job(db: Session, report_name: str, params: Dict[str, Any], user_id: Optional[int] = None) -> models.ReportJob:
+    """إنشاء مهمة أو إرجاع المهمة النشطة المطابقة"""
+    params, params_key = normalize_params(report_name, params)
+
+    def active():
+        return db.query(models.ReportJob).filter(
+            models.ReportJob.report_name == report_name,
+            models.ReportJob.params_key == params_key,
+            models.ReportJob.status.in_(models.REPORT_JOB_ACTIVE_STATUSES)
+        ).first()
+
+    job = active()
+    if job is not None:
+        return job
+
+    job = models.ReportJob(
+        job_id=uuid.uuid4().hex,
+        report_name=report_name,
+        params_key=params_key,
+        status="PENDING",
+        created_by=user_id,
+        locked_by=WORKER_ID,
+        locked_until=datetime.utcnow() + LEASE,
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # طلب مطابق سبقنا بين الفحص والإدراج
+        db.rollback()
+        return active()
+
+    _, dispatcher = _executors()
+    # الحفظ تحت القفل: إذا انتهت المهمة فوراً ينتظر الحذف في _dispatch حتى يُحفظ الـ future
+    with _running_lock:
+        _running[job.job_id] = dispatcher.submit(_dispatch, job.job_id, report_name, params)
+    return job
+
+
+def get_report_job(db: Session, job_id: str) -> models.ReportJob:
+    job = db.query(models.ReportJob).filter(models.ReportJob.job_id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="المهمة غير موجودة")
+    return job
+
+
+def get_report_job_result(db: Session, job_id: str) -> Any:
+    job = get_report_job(db, job_id)
+    if job.status == "FAILED":
+        raise HTTPException(status_code=422, detail=job.error or "فشل تنفيذ التقرير")
+    if job.status != "DONE":
+        raise HTTPException(status_code=409, detail="نتيجة المهمة غير جاهزة")
+    return json.loads(job.result)
+
+
+def cancel_report_job(db: Session, job_id: str) -> models.ReportJob:
+    job = get_report_job(db, job_id)
+    if job.status not in models.REPORT_JOB_ACTIVE_STATUSES:
+        raise HTTPException(status_code=400, detail="المهمة منتهية بالفعل")
+
+    with _running_lock:
+        future = _running.get(job_id)
+        # ينجح فقط إذا لم يبدأ الخيط بعد، وعندها لن يحذفه _dispatch
+        if future is not None and future.cancel():
+            del _running[job_id]
+    _transition(job_id, models.REPORT_JOB_ACTIVE_STATUSES, status="CANCELLED", finished_at=datetime.utcnow())
+    db.refresh(job)
+    return job
+
+
+def _owner_gone(locked_by: str) -> bool:
+    """هل توقفت عملية العامل الحاجز؟ (يمكن التحقق فقط على نفس الجهاز؛ غير ذلك ينتظر انتهاء الحجز)"""
+    host, _, rest = locked_by.partition(":")
+    pid = rest.partition(":")[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        return locked_by != WORKER_ID  # نفس رقم العملية بعد إعادة التشغيل
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def _fail_jobs(db: Session, *conditions) -> int:
+    count = db.query(models.ReportJob).filter(
+        models.ReportJob.status.in_(models.REPORT_JOB_ACTIVE_STATUSES), *conditions
+    ).update({
+        "status": "FAILED",
+        "error": "انقطع التنفيذ بتوقف الخادم",
+        "finished_at": datetime.utcnow(),
+    }, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def recover_report_jobs(db: Session) -> int:
+    """
+    إفشال المهام النشطة التي توقف عاملها (عند بدء التشغيل ومن المجدول)
+    المهمة تعتبر منقطعة إذا انتهى حجزها أو توقفت عملية العامل الحاجز على نفس الجهاز
+    """
+    Job = models.ReportJob
+    owners = [
+        owner for (owner,) in db.query(Job.locked_by).filter(
+            Job.status.in_(models.REPORT_JOB_ACTIVE_STATUSES), Job.locked_by != None
+        ).distinct()
+        if _owner_gone(owner)
+    ]
+    return _fail_jobs(db, or_(
+        Job.locked_until == None,
+        Job.locked_until < datetime.utcnow(),
+        Job.locked_by.in_(owners),
+    ))
+
+
+def shutdown_report_jobs() -> None:
+    """إيقاف التنفيذ عند إغلاق التطبيق؛ مهام هذا العامل لن تكتمل"""
+    global _pool, _dispatcher, _heartbeat
+    with _lock:
+        if _pool is None:
+            return
+        _stop_heartbeat.set()
+        _heartbeat.join(5)
+        _dispatcher.shutdown(wait=False, cancel_futures=True)
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = _dispatcher = _heartbeat = None
+
+    db = SessionLocal()
+    try:
+        _fail_jobs(db, models.ReportJob.locked_by == WORKER_ID)
+    finally:
+        db.close()
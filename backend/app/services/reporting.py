@@ -1,11 +1,40 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case, cast, Integer, String
+from fastapi import HTTPException
 from datetime import date, timedelta
 from decimal import Decimal
+from typing import Dict, List, NamedTuple
 
 from app import models
+from app.core.pagination import paginate
+from app.services.analytics import fetch_all
+from app.services.report_cache import cached_report
 
-def get_general_ledger_entries(db: Session, start_date: date = None, end_date: date = None, account_id: int = None):
+
+PERIOD_GRANULARITIES = ("month", "quarter", "year")
+
+# أقصى عدد أعمدة في القوائم متعددة الفترات
+MAX_PERIODS = 120
+
+# مفتاح فترة القيود السابقة لبداية التقرير (يسبق أي مفتاح سنة في الترتيب)
+OPENING_PERIOD = "0000"
+
+
+class TrialBalanceRow(NamedTuple):
+    account_id: int
+    account_name: str
+    total_debit: Decimal
+    total_credit: Decimal
+
+
+def get_general_ledger_entries(
+    db: Session, start_date: date = None, end_date: date = None, account_id: int = None,
+    limit: int = None, cursor: str = None, with_count: bool = False
+):
+    """
+    قيود دفتر الأستاذ (الأحدث أولاً)
+    بدون limit ترجع كل القيود المطابقة؛ مع limit تُرقّم بالمؤشر على (التاريخ، رقم القيد)
+    """
     query = db.query(models.GeneralLedger).options(joinedload(models.GeneralLedger.account))
     
     if start_date:
@@ -15,8 +44,17 @@ def get_general_ledger_entries(db: Session, start_date: date = None, end_date: d
     if account_id:
         query = query.filter(models.GeneralLedger.account_id == account_id)
         
-    return query.order_by(models.GeneralLedger.entry_date.desc(), models.GeneralLedger.entry_id.desc()).all()
+    sort_columns = (models.GeneralLedger.entry_date, models.GeneralLedger.entry_id)
+    if limit:
+        return paginate(query, sort_columns, limit, cursor, with_count=with_count)
+    return query.order_by(*(c.desc() for c in sort_columns)).all()
 
+@cached_report(
+    "trial_balance",
+    date_range=lambda end_date: (None, end_date),
+    encode=lambda rows: [row._asdict() for row in rows],
+    decode=lambda rows: [TrialBalanceRow(**row) for row in rows],
+)
 def generate_trial_balance(db: Session, end_date: date = None):
     """
     Calculates the trial balance by summing debits and credits for each account up to a specific date.
@@ -33,8 +71,9 @@ def generate_trial_balance(db: Session, end_date: date = None):
 
     query = query.group_by(models.FinancialAccount.account_id, models.FinancialAccount.account_name).order_by(models.FinancialAccount.account_id)
     
-    return query.all()
+    return [TrialBalanceRow(*row) for row in fetch_all(db, query)]
 
+@cached_report("balance_sheet", date_range=lambda end_date: (None, end_date))
 def generate_balance_sheet(db: Session, end_date: date):
     """
     Generates a balance sheet for a specific date.
@@ -79,8 +118,8 @@ def generate_balance_sheet(db: Session, end_date: date):
         elif acc_type == 'REVENUE':
             revenue_for_re += balance
         elif acc_type == 'EXPENSE':
-            # Expense balance is negative of what we want (debits are positive), so add it
-            expense_for_re += -balance
+            # Expense balance is not sign-flipped above (debits are positive)
+            expense_for_re += balance
 
     retained_earnings = revenue_for_re - expense_for_re
     equity_accounts.append({"account_name": "Retained Earnings", "balance": retained_earnings})
@@ -97,6 +136,7 @@ def generate_balance_sheet(db: Session, end_date: date):
         "total_liabilities_and_equity": total_liabilities + total_equity
     }
 
+@cached_report("equity_statement", date_range=lambda start_date, end_date: (None, end_date))
 def generate_equity_statement(db: Session, start_date: date, end_date: date):
     """
     Generates an equity statement for a given period.
@@ -139,6 +179,7 @@ def generate_equity_statement(db: Session, start_date: date, end_date: date):
         "ending_equity": ending_equity
     }
 
+@cached_report("income_statement", date_range=lambda start_date, end_date: (start_date, end_date))
 def generate_income_statement(db: Session, start_date: date, end_date: date):
     """
     Generates an income statement for a given period.
@@ -183,4 +224,182 @@ def generate_income_statement(db: Session, start_date: date, end_date: date):
         "expenses": expenses,
         "total_expense": total_expense,
         "net_income": net_income,
-    }
\ No newline at end of file
+    }
+
+
+# ============================================
+# القوائم متعددة الفترات (عمود لكل فترة)
+# ============================================
+
+def period_bucket(column, granularity: str):
+    """تعبير SQL يحول التاريخ إلى مفتاح الفترة: 2024-03 / 2024-Q1 / 2024"""
+    if granularity == "month":
+        return func.strftime('%Y-%m', column, type_=String)
+    year = func.strftime('%Y', column, type_=String)
+    if granularity == "year":
+        return year
+    quarter = (cast(func.strftime('%m', column), Integer) + 2) // 3
+    return year + '-Q' + cast(quarter, String)
+
+
+def period_ranges(start_date: date, end_date: date, granularity: str) -> List[Dict]:
+    """قائمة الفترات بين التاريخين بنفس مفاتيح period_bucket (الفترة الأولى والأخيرة قد تكون جزئية)"""
+    if granularity not in PERIOD_GRANULARITIES:
+        raise HTTPException(status_code=400, detail="نوع الفترة غير مدعوم")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="تاريخ البداية بعد تاريخ النهاية")
+
+    periods = []
+    current = start_date
+    while current <= end_date:
+        if granularity == "month":
+            key = f"{current.year}-{current.month:02d}"
+            next_start = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        elif granularity == "quarter":
+            quarter = (current.month - 1) // 3 + 1
+            key = f"{current.year}-Q{quarter}"
+            next_start = date(current.year + quarter // 4, (quarter % 4) * 3 + 1, 1)
+        else:
+            key = str(current.year)
+            next_start = date(current.year + 1, 1, 1)
+
+        periods.append({
+            "period": key,
+            "start_date": current,
+            "end_date": min(next_start - timedelta(days=1), end_date),
+        })
+        if len(periods) > MAX_PERIODS:
+            raise HTTPException(status_code=400, detail=f"عدد الفترات يتجاوز {MAX_PERIODS}")
+        current = next_start
+    return periods
+
+
+def _column_totals(lines: List[Dict], key: str, count: int) -> List[Decimal]:
+    totals = [Decimal(0)] * count
+    for line in lines:
+        totals = [t + v for t, v in zip(totals, line[key])]
+    return totals
+
+
+@cached_report(
+    "income_statement_periods",
+    date_range=lambda start_date, end_date, granularity: (start_date, end_date)
+)
+def generate_income_statement_periods(db: Session, start_date: date, end_date: date, granularity: str = "month"):
+    """
+    قائمة الدخل لعدة فترات في استعلام واحد (تجميع حسب الحساب ومفتاح الفترة)
+    كل بند يحمل amounts بنفس ترتيب periods
+    """
+    periods = period_ranges(start_date, end_date, granularity)
+    index = {p["period"]: i for i, p in enumerate(periods)}
+    bucket = period_bucket(models.GeneralLedger.entry_date, granularity)
+
+    rows = fetch_all(db,
+        db.query(
+            models.FinancialAccount.account_type,
+            models.FinancialAccount.account_name,
+            bucket,
+            func.sum(models.GeneralLedger.credit - models.GeneralLedger.debit)
+        )
+        .join(models.GeneralLedger, models.FinancialAccount.account_id == models.GeneralLedger.account_id)
+        .filter(models.FinancialAccount.account_type.in_(['REVENUE', 'EXPENSE']))
+        .filter(models.GeneralLedger.entry_date.between(start_date, end_date))
+        .group_by(models.FinancialAccount.account_type, models.FinancialAccount.account_name, bucket)
+        .order_by(models.FinancialAccount.account_type, models.FinancialAccount.account_name, bucket)
+    )
+
+    lines = {'REVENUE': {}, 'EXPENSE': {}}
+    for acc_type, acc_name, period, balance_val in rows:
+        amounts = lines[acc_type].setdefault(acc_name, [Decimal(0)] * len(periods))
+        balance = Decimal(str(balance_val or 0))
+        amounts[index[period]] += balance if acc_type == 'REVENUE' else -balance
+
+    revenues = [{"account_name": n, "amounts": a, "total": sum(a)} for n, a in lines['REVENUE'].items()]
+    expenses = [{"account_name": n, "amounts": a, "total": sum(a)} for n, a in lines['EXPENSE'].items()]
+    total_revenue = _column_totals(revenues, "amounts", len(periods))
+    total_expense = _column_totals(expenses, "amounts", len(periods))
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "granularity": granularity,
+        "periods": periods,
+        "revenues": revenues,
+        "total_revenue": total_revenue,
+        "expenses": expenses,
+        "total_expense": total_expense,
+        "net_income": [r - e for r, e in zip(total_revenue, total_expense)],
+    }
+
+
+@cached_report(
+    "balance_sheet_periods",
+    date_range=lambda start_date, end_date, granularity: (None, end_date)
+)
+def generate_balance_sheet_periods(db: Session, start_date: date, end_date: date, granularity: str = "month"):
+    """
+    الميزانية في نهاية كل فترة في استعلام واحد
+    القيود السابقة لبداية التقرير تُجمع في فترة افتتاحية، والرصيد التراكمي يُحسب بدالة نافذة
+    """
+    periods = period_ranges(start_date, end_date, granularity)
+    bucket = case(
+        (models.GeneralLedger.entry_date < start_date, OPENING_PERIOD),
+        else_=period_bucket(models.GeneralLedger.entry_date, granularity)
+    )
+    change = func.sum(models.GeneralLedger.debit - models.GeneralLedger.credit)
+
+    rows = fetch_all(db,
+        db.query(
+            models.FinancialAccount.account_id,
+            models.FinancialAccount.account_name,
+            models.FinancialAccount.account_type,
+            bucket,
+            func.sum(change).over(partition_by=models.FinancialAccount.account_id, order_by=bucket)
+        )
+        .join(models.GeneralLedger, models.FinancialAccount.account_id == models.GeneralLedger.account_id)
+        .filter(models.GeneralLedger.entry_date <= end_date)
+        .group_by(
+            models.FinancialAccount.account_id, models.FinancialAccount.account_name,
+            models.FinancialAccount.account_type, bucket
+        )
+        .order_by(models.FinancialAccount.account_id, bucket)
+    )
+
+    # الرصيد التراكمي لكل حساب في كل فترة (الفترة بلا حركة ترث رصيد ما قبلها)
+    accounts = {}
+    for acc_id, acc_name, acc_type, period, cumulative in rows:
+        accounts.setdefault(acc_id, (acc_name, acc_type, {}))[2][period] = Decimal(str(cumulative or 0))
+
+    sections = {'ASSET': [], 'LIABILITY': [], 'EQUITY': []}
+    retained_earnings = [Decimal(0)] * len(periods)
+    for acc_name, acc_type, by_period in accounts.values():
+        balances, balance = [], by_period.get(OPENING_PERIOD, Decimal(0))
+        for p in periods:
+            balance = by_period.get(p["period"], balance)
+            balances.append(-balance if acc_type in ['LIABILITY', 'EQUITY', 'REVENUE'] else balance)
+
+        if acc_type in sections:
+            sections[acc_type].append({"account_name": acc_name, "balances": balances})
+        elif acc_type == 'REVENUE':
+            retained_earnings = [r + b for r, b in zip(retained_earnings, balances)]
+        elif acc_type == 'EXPENSE':
+            retained_earnings = [r - b for r, b in zip(retained_earnings, balances)]
+
+    sections['EQUITY'].append({"account_name": "Retained Earnings", "balances": retained_earnings})
+    total_assets = _column_totals(sections['ASSET'], "balances", len(periods))
+    total_liabilities = _column_totals(sections['LIABILITY'], "balances", len(periods))
+    total_equity = _column_totals(sections['EQUITY'], "balances", len(periods))
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "granularity": granularity,
+        "periods": periods,
+        "assets": sections['ASSET'],
+        "total_assets": total_assets,
+        "liabilities": sections['LIABILITY'],
+        "total_liabilities": total_liabilities,
+        "equity": sections['EQUITY'],
+        "total_equity": total_equity,
+        "total_liabilities_and_equity": [l + e for l, e in zip(total_liabilities, total_equity)],
+    }
@@ -0,0 +1,318 @@
+"""
+Scheduler Service
+مجدول داخلي لمهام الصيانة الدورية (يبدأ مع التطبيق في main.lifespan)
+
+- كل مهمة مسجلة في SCHEDULED_JOBS بجدول تشغيل cron افتراضي، وتُحفظ في جدول scheduled_jobs
+  (يمكن تعديل الجدول أو إيقاف المهمة من الـ API دون تعديل الكود)
+- القفل في قاعدة البيانات: UPDATE ذري يحجز المهمة لعامل واحد حتى locked_until،
+  فلا تعمل نفس المهمة مرتين عند تشغيل أكثر من عامل (uvicorn --workers)
+- المهام تعمل بالتتابع في خيط واحد؛ فشل مهمة يُسجل في last_error ولا يوقف المجدول
+"""
+import importlib
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app import models, schemas
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# اسم المهمة -> (جدول cron الافتراضي، "module:function" تأخذ db)
+SCHEDULED_JOBS: Dict[str, Tuple[str, str]] = {
+    "alerts": ("*/15 * * * *", "app.services.alerts:check_all_alerts"),
+    "idempotency_cleanup": ("0 * * * *", "app.core.idempotency:cleanup_expired_keys"),
+    "session_cleanup": ("30 * * * *", "app.auth.sessions:cleanup_expired_sessions"),
+    "rate_limit_cleanup": ("45 * * * *", "app.core.rate_limit_storage:cleanup_expired_rate_limits"),
+    "report_job_recovery": ("*/5 * * * *", "app.services.report_jobs:recover_report_jobs"),
+    "report_cache_prune": ("30 3 * * *", "app.services.report_cache:prune_report_cache"),
+    "parquet_snapshot": ("15 1 * * *", "app.services.scheduler:refresh_parquet_snapshot"),
+    "backup": ("0 2 * * *", "app.services.scheduler:run_backup"),
+    "analyze": ("0 3 * * 0", "app.services.scheduler:analyze_database"),
+    "wal_checkpoint": ("*/10 * * * *", "app.services.scheduler:checkpoint_wal"),
+}
+
+# مدة حجز المهمة؛ بعدها يمكن لعامل آخر تشغيلها (إذا توقف العامل الحاجز أثناء التشغيل)
+LOCK_LEASE = timedelta(minutes=30)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+# ============================================
+# جداول cron
+# ============================================
+
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_field(field: str, low: int, high: int) -> Set[int]:
+    """حقل cron واحد: * و */n و a-b و a-b/n وقوائم مفصولة بفاصلة"""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(field)
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_cron(spec: str) -> List[Set[int]]:
+    """
+    "دقيقة ساعة يوم شهر يوم-الأسبوع" -> مجموعة القيم المسموحة لكل حقل
+    يوم الأسبوع: 0 = الأحد (7 تُقبل أيضاً للأحد)
+    """
+    fields = spec.split()
+    if len(fields) != 5:
+        raise HTTPException(status_code=400, detail=f"جدول تشغيل غير صالح: {spec}")
+    try:
+        parsed = [_parse_field(field, low, high) for field, (low, high) in zip(fields, _CRON_FIELDS)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"جدول تشغيل غير صالح: {spec}")
+    parsed[4] = {day % 7 for day in parsed[4]}
+    return parsed
+
+
+def next_run(spec: str, after: datetime) -> datetime:
+    """أول دقيقة بعد after تطابق جدول cron"""
+    minutes, hours, days, months, weekdays = parse_cron(spec)
+    fields = spec.split()
+    # مثل cron: إذا قُيد اليوم ويوم الأسبوع معاً يكفي تطابق أحدهما
+    either_day = fields[2] != "*" and fields[4] != "*"
+
+    def day_matches(moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7  # Python: الاثنين = 0
+        if either_day:
+            return moment.day in days or weekday in weekdays
+        return moment.day in days and weekday in weekdays
+
+    moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = moment + timedelta(days=366 * 5)
+    while moment < limit:
+        if moment.month not in months:
+            moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+        elif not day_matches(moment):
+            moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+        elif moment.hour not in hours:
+            moment = moment.replace(minute=0) + timedelta(hours=1)
+        elif moment.minute not in minutes:
+            moment += timedelta(minutes=1)
+        else:
+            return moment
+    raise HTTPException(status_code=400, detail=f"جدول التشغيل لا يطابق أي موعد: {spec}")
+
+
+# ============================================
+# مهام الصيانة
+# ============================================
+
+def refresh_parquet_snapshot(db: Session) -> None:
+    """تحديث تصدير Parquet تزايدياً (يُتخطى إذا لم تكن pyarrow مثبتة)"""
+    from app.services import parquet_export
+    if parquet_export.pa is None:
+        return
+    parquet_export.export_parquet(db)
+
+
+def run_backup(db: Session) -> None:
+    """نسخة احتياطية يومية مع الاحتفاظ بآخر 10 نسخ"""
+    from app.services import backup
+    backup.create_backup()
+    backup.cleanup_old_backups(max_backups=10)
+
+
+def analyze_database(db: Session) -> None:
+    """تحديث إحصائيات الفهارس ليختار SQLite خطط الاستعلام الصحيحة"""
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+
+def checkpoint_wal(db: Session) -> None:
+    """نقل صفحات ملف WAL إلى قاعدة البيانات (PASSIVE: لا ينتظر القراء ولا الكتّاب)"""
+    db.execute(text("PRAGMA wal_checkpoint(PASSIVE)"))
+
+
+def _resolve(name: str) -> Callable[[Session], object]:
+    module_name, function_name = SCHEDULED_JOBS[name][1].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+# ============================================
+# الجدول والقفل
+# ============================================
+
+def sync_scheduled_jobs(db: Session) -> None:
+    """
+    إضافة المهام المسجلة غير الموجودة في الجدول (الجدول المعدل من المستخدم يبقى كما هو)
+    INSERT ... ON CONFLICT DO NOTHING: كل العمليات تستدعيها معاً عند بدء التشغيل
+    """
+    now = datetime.now()
+    db.execute(insert(models.ScheduledJob).values([
+        {"name": name, "cron": cron, "enabled": True, "next_run_at": next_run(cron, now)}
+        for name, (cron, _) in SCHEDULED_JOBS.items()
+    ]).on_conflict_do_nothing(index_elements=["name"]))
+    db.commit()
+
+
+def _claim(db: Session, name: str, now: datetime) -> bool:
+    """حجز ذري: ينجح لعامل واحد فقط إذا حان موعد المهمة ولم يحجزها غيره"""
+    Job = models.ScheduledJob
+    claimed = db.query(Job).filter(
+        Job.name == name,
+        Job.enabled == True,
+        Job.next_run_at <= now,
+        or_(Job.locked_until == None, Job.locked_until < now)
+    ).update({"locked_by": WORKER_ID, "locked_until": now + LOCK_LEASE}, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def _finish(db: Session, name: str, started: datetime, error: Optional[str]) -> None:
+    Job = models.ScheduledJob
+    job = db.get(Job, name)
+    if job is None or job.locked_by != WORKER_ID:
+        return
+    finished = datetime.now()
+    job.last_run_at = started
+    job.last_status = "FAILED" if error else "OK"
+    job.last_error = error
+    job.last_duration_ms = int((finished - started).total_seconds() * 1000)
+    # الموعد التالي بعد انتهاء التشغيل (لا تتراكم المواعيد الفائتة أثناء توقف التطبيق)
+    job.next_run_at = next_run(job.cron, finished)
+    job.locked_by = None
+    job.locked_until = None
+    db.commit()
+
+
+def run_job(name: str) -> bool:
+    """تشغيل مهمة إذا حان موعدها ونجح حجزها؛ True إذا شُغلت"""
+    started = datetime.now()
+    db = SessionLocal()
+    try:
+        if not _claim(db, name, started):
+            return False
+        error = None
+        try:
+            _resolve(name)(db)
+        except Exception as e:
+            db.rollback()
+            error = str(getattr(e, "detail", None) or e)
+            logger.exception("Scheduled job %s failed", name)
+        _finish(db, name, started, error)
+        return True
+    finally:
+        db.close()
+
+
+def run_due_jobs() -> List[str]:
+    """تشغيل كل المهام المستحقة الآن (دورة واحدة للمجدول)"""
+    db = SessionLocal()
+    try:
+        due = [name for (name,) in db.query(models.ScheduledJob.name).filter(
+            models.ScheduledJob.enabled == True,
+            models.ScheduledJob.next_run_at <= datetime.now(),
+            models.ScheduledJob.name.in_(list(SCHEDULED_JOBS))
+        ).order_by(models.ScheduledJob.next_run_at)]
+    finally:
+        db.close()
+    return [name for name in due if not _stop.is_set() and run_job(name)]
+
+
+# ============================================
+# الخيط
+# ============================================
+
+def _loop() -> None:
+    while not _stop.is_set():
+        try:
+            run_due_jobs()
+        except Exception:
+            logger.exception("Scheduler tick failed")
+        _stop.wait(settings.SCHEDULER_TICK_SECONDS)
+
+
+def start_scheduler(db: Session) -> None:
+    """يُستدعى مرة واحدة عند بدء التطبيق"""
+    global _thread
+    if not settings.SCHEDULER_ENABLED:
+        return
+    sync_scheduled_jobs(db)
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _stop.clear()
+        _thread = threading.Thread(target=_loop, name="scheduler", daemon=True)
+        _thread.start()
+
+
+def stop_scheduler(timeout: float = 10) -> None:
+    """إيقاف المجدول عند إغلاق التطبيق (تنتظر المهمة الجارية حتى timeout)"""
+    global _thread
+    _stop.set()
+    with _lock:
+        if _thread is not None:
+            _thread.join(timeout)
+            _thread = None
+
+
+# ============================================
+# الإدارة
+# ============================================
+
+def list_scheduled_jobs(db: Session) -> List[models.ScheduledJob]:
+    sync_scheduled_jobs(db)
+    return db.query(models.ScheduledJob).order_by(models.ScheduledJob.name).all()
+
+
+def _get_job(db: Session, name: str) -> models.ScheduledJob:
+    job = db.get(models.ScheduledJob, name) if name in SCHEDULED_JOBS else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="المهمة غير موجودة")
+    return job
+
+
+def update_scheduled_job(db: Session, name: str, data: schemas.ScheduledJobUpdate) -> models.ScheduledJob:
+    sync_scheduled_jobs(db)
+    job = _get_job(db, name)
+    if data.cron is not None:
+        job.next_run_at = next_run(data.cron, datetime.now())
+        job.cron = " ".join(data.cron.split())
+    if data.enabled is not None:
+        job.enabled = data.enabled
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def trigger_scheduled_job(db: Session, name: str) -> models.ScheduledJob:
+    """تقديم موعد المهمة للآن؛ يشغلها المجدول في الدورة التالية (مع نفس القفل)"""
+    sync_scheduled_jobs(db)
+    job = _get_job(db, name)
+    if not job.enabled:
+        raise HTTPException(status_code=409, detail="المهمة موقوفة")
+    job.next_run_at = datetime.now()
+    db.commit()
+    db.refresh(job)
+    return job
@@ -7,8 +7,9 @@ from fastapi import HTTPException
 from decimal import Decimal
 from datetime import date
 
-from app.models import Season, GeneralLedger, FinancialAccount, Sale, Purchase, Expense
+from app.models import Season, GeneralLedger, FinancialAccount
 from app.services.accounting_engine import AccountingEngine
+from app.services import season_facts
 
 
 def close_season(db: Session, season_id: int) -> dict:
@@ -36,25 +37,14 @@ def close_season(db: Session, season_id: int) -> dict:
     if season.status == "COMPLETED":
         raise HTTPException(status_code=400, detail="الموسم مغلق بالفعل")
     
-    # 2. حساب إجمالي المبيعات للموسم
-    total_sales = db.query(Sale).filter(Sale.season_id == season_id).all()
-    total_revenue = sum(Decimal(str(s.total_sale_amount)) for s in total_sales)
-    
-    # 3. حساب تكلفة البضاعة المباعة (COGS)
-    # نحصل عليها من القيود المحاسبية
-    cogs_entries = db.query(GeneralLedger).filter(
-        GeneralLedger.source_type == "SALE",
-        GeneralLedger.description.like("%تكلفة البضاعة المباعة%")
-    ).all()
-    total_cogs = sum(Decimal(str(e.debit)) for e in cogs_entries)
-    
-    # 4. حساب إجمالي المصروفات للموسم
-    total_expenses = db.query(Expense).filter(Expense.season_id == season_id).all()
-    total_expense_amount = sum(Decimal(str(e.amount)) for e in total_expenses)
-    
-    # 5. حساب إجمالي المشتريات للموسم
-    total_purchases = db.query(Purchase).filter(Purchase.season_id == season_id).all()
-    total_purchase_amount = sum(Decimal(str(p.total_cost)) for p in total_purchases)
+    # 2-5. تجميد مجاميع الموسم وقراءة الإيرادات والتكلفة الفعلية (SALE_COGS)
+    # والمصروفات والمشتريات منها
+    season_facts.freeze_season_facts(db, season_id)
+    totals = season_facts.get_season_totals(db, [season_id])[season_id]
+    total_revenue = Decimal(str(totals["sales_amount"]))
+    total_cogs = Decimal(str(totals["cogs_amount"]))
+    total_expense_amount = Decimal(str(totals["expenses_amount"]))
+    total_purchase_amount = Decimal(str(totals["purchases_amount"]))
     
     # 6. حساب صافي الربح
     gross_profit = total_revenue - total_cogs
@@ -70,7 +60,7 @@ def close_season(db: Session, season_id: int) -> dict:
         retained_earnings = FinancialAccount(
             account_name="أرباح مرحلة",
             account_type="EQUITY",
-            initial_balance=Decimal(0)
+            current_balance=Decimal(0)
         )
         db.add(retained_earnings)
         db.flush()
@@ -112,20 +102,17 @@ def close_season(db: Session, season_id: int) -> dict:
 def get_season_summary(db: Session, season_id: int) -> dict:
     """
     ملخص الموسم (قبل الإغلاق)
+    الأرقام تُقرأ من مجاميع الموسم (season_facts) وليس من الحركات
     """
     season = db.query(Season).filter(Season.season_id == season_id).first()
     if not season:
         raise HTTPException(status_code=404, detail="الموسم غير موجود")
     
     # حساب الإحصائيات
-    total_sales = db.query(Sale).filter(Sale.season_id == season_id).all()
-    total_revenue = sum(Decimal(str(s.total_sale_amount)) for s in total_sales)
-    
-    total_purchases = db.query(Purchase).filter(Purchase.season_id == season_id).all()
-    total_purchase_amount = sum(Decimal(str(p.total_cost)) for p in total_purchases)
-    
-    total_expenses = db.query(Expense).filter(Expense.season_id == season_id).all()
-    total_expense_amount = sum(Decimal(str(e.amount)) for e in total_expenses)
+    totals = season_facts.get_season_totals(db, [season_id]).get(season_id, {})
+    total_revenue = Decimal(str(totals.get("sales_amount", 0)))
+    total_purchase_amount = Decimal(str(totals.get("purchases_amount", 0)))
+    total_expense_amount = Decimal(str(totals.get("expenses_amount", 0)))
     
     return {
         "season_id": season_id,
@@ -134,11 +121,11 @@ def get_season_summary(db: Session, season_id: int) -> dict:
         "start_date": str(season.start_date),
         "end_date": str(season.end_date),
         "statistics": {
-            "sales_count": len(total_sales),
+            "sales_count": totals.get("sales_count", 0),
             "total_revenue": str(total_revenue),
-            "purchases_count": len(total_purchases),
+            "purchases_count": totals.get("purchases_count", 0),
             "total_purchases": str(total_purchase_amount),
-            "expenses_count": len(total_expenses),
+            "expenses_count": totals.get("expenses_count", 0),
             "total_expenses": str(total_expense_amount),
             "estimated_profit": str(total_revenue - total_purchase_amount - total_expense_amount)
         }
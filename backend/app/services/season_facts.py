@@ -0,0 +1,313 @@
+"""
+Season Facts Service
+خدمة مجاميع المواسم - صيانة جدول season_facts وقراءته
+
+الجدول مفتاحه (الموسم، المحصول) ويحمل الإيرادات وتكلفة البضاعة الفعلية (SALE_COGS)
+والمشتريات والمصروفات والكميات والأعداد.
+
+الصيانة تتم تلقائياً قبل كل commit (مثل daily_facts):
+- أحداث الجلسة تجمع المواسم التي تأثرت بالمبيعات أو المشتريات أو المصروفات أو قيود التكلفة
+- قبل الـ commit يعاد حساب صفوف هذه المواسم فقط داخل نفس المعاملة
+- الموسم المغلق (frozen_at) لا يعاد حسابه: أرقامه هي أرقام الإغلاق
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+_SEASONS = "season_facts_seasons"
+_SALES = "season_facts_sales"
+_REKEY = "season_facts_rekey"
+
+# عدد المعرفات في كل استعلام (لتجنب حد متغيرات SQLite)
+_ID_CHUNK = 500
+
+MEASURES = (
+    "sales_amount", "sales_count", "sales_quantity_kg", "cogs_amount",
+    "purchases_amount", "purchases_count", "purchases_quantity_kg",
+    "expenses_amount", "expenses_count",
+)
+
+
+def _sources():
+    """الجداول المصدر: اسم الجدول -> (النموذج، عمود الموسم)"""
+    return {
+        "sales": (models.Sale, models.Sale.season_id),
+        "purchases": (models.Purchase, models.Purchase.season_id),
+        "expenses": (models.Expense, models.Expense.season_id),
+    }
+
+
+def _chunks(ids: List[int]):
+    for i in range(0, len(ids), _ID_CHUNK):
+        yield ids[i:i + _ID_CHUNK]
+
+
+# ============================================
+# تجميع المواسم المتأثرة (Session Events)
+# ============================================
+
+def _collect_flush(session: Session, flush_context, instances) -> None:
+    sources = _sources()
+    for group, use_history in ((session.new, False), (session.dirty, True), (session.deleted, True)):
+        for obj in group:
+            if isinstance(obj, models.GeneralLedger):
+                # قيد التكلفة يخص بيعاً؛ موسمه يُقرأ من البيع قبل الـ commit
+                if obj.source_type == "SALE_COGS" and obj.source_id:
+                    session.info.setdefault(_SALES, set()).add(obj.source_id)
+                continue
+            if getattr(obj, "__tablename__", None) not in sources:
+                continue
+
+            seasons = session.info.setdefault(_SEASONS, set())
+            seasons.add(obj.season_id)
+            if use_history:
+                seasons.update(inspect(obj).attrs.season_id.history.deleted or [])
+
+
+def _collect_bulk(orm_execute_state) -> None:
+    """قراءة مواسم الصفوف قبل تنفيذ update/delete الجماعي"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    table = mapper.local_table.name
+    session = orm_execute_state.session
+    whereclause = orm_execute_state.statement.whereclause
+
+    if table == models.GeneralLedger.__tablename__:
+        stmt = select(models.GeneralLedger.source_id).where(models.GeneralLedger.source_type == "SALE_COGS")
+        if whereclause is not None:
+            stmt = stmt.where(whereclause)
+        session.info.setdefault(_SALES, set()).update(r[0] for r in session.execute(stmt))
+        return
+
+    source = _sources().get(table)
+    if source is None:
+        return
+    _, season_col = source
+    pk_col = mapper.primary_key[0]
+    stmt = select(pk_col, season_col)
+    if whereclause is not None:
+        stmt = stmt.where(whereclause)
+
+    rows = session.execute(stmt).all()
+    session.info.setdefault(_SEASONS, set()).update(r[1] for r in rows)
+    if orm_execute_state.is_update:
+        # الموسم الجديد يُقرأ قبل الـ commit بمعرفات الصفوف
+        session.info.setdefault(_REKEY, defaultdict(set))[table].update(r[0] for r in rows)
+
+
+def _apply_before_commit(session: Session) -> None:
+    session.flush()
+    seasons = session.info.pop(_SEASONS, set())
+    sale_ids = session.info.pop(_SALES, set())
+    rekey = session.info.pop(_REKEY, {})
+
+    if sale_ids:
+        for chunk in _chunks(list(sale_ids)):
+            seasons.update(r[0] for r in session.execute(
+                select(models.Sale.season_id).where(models.Sale.sale_id.in_(chunk))
+            ))
+
+    sources = _sources()
+    for table, ids in rekey.items():
+        model, season_col = sources[table]
+        pk_col = inspect(model).primary_key[0]
+        for chunk in _chunks(list(ids)):
+            seasons.update(r[0] for r in session.execute(select(season_col).where(pk_col.in_(chunk))))
+
+    seasons.discard(None)
+    if seasons:
+        refresh_season_facts(session, seasons)
+
+
+def _discard(session: Session) -> None:
+    session.info.pop(_SEASONS, None)
+    session.info.pop(_SALES, None)
+    session.info.pop(_REKEY, None)
+
+
+def register_season_fact_maintenance(session_factory) -> None:
+    """ربط صيانة مجاميع المواسم بمصنع الجلسات (يُستدعى مرة واحدة من database.py)"""
+    event.listen(session_factory, "before_flush", _collect_flush)
+    event.listen(session_factory, "do_orm_execute", _collect_bulk)
+    event.listen(session_factory, "before_commit", _apply_before_commit)
+    event.listen(session_factory, "after_rollback", _discard)
+
+
+# ============================================
+# إعادة الحساب
+# ============================================
+
+def _aggregate(db: Session, season_ids: Optional[List[int]]) -> Dict[tuple, Dict[str, Decimal]]:
+    """تجميع القيم من الجداول المصدر (لمواسم محددة أو للكل)"""
+    from app.services.advanced_reports import join_sale_cogs
+
+    Sale, Purchase, Expense = models.Sale, models.Purchase, models.Expense
+    sales, sale_cogs = join_sale_cogs(db, db.query(Sale))
+    queries = [
+        (
+            sales.with_entities(
+                Sale.season_id, Sale.crop_id,
+                func.sum(Sale.total_sale_amount), func.count(Sale.sale_id),
+                func.sum(Sale.quantity_sold_kg), func.sum(sale_cogs)
+            ).group_by(Sale.season_id, Sale.crop_id),
+            Sale.season_id,
+            ("sales_amount", "sales_count", "sales_quantity_kg", "cogs_amount"),
+        ),
+        (
+            db.query(
+                Purchase.season_id, Purchase.crop_id,
+                func.sum(Purchase.total_cost), func.count(Purchase.purchase_id),
+                func.sum(Purchase.quantity_kg)
+            ).group_by(Purchase.season_id, Purchase.crop_id),
+            Purchase.season_id,
+            ("purchases_amount", "purchases_count", "purchases_quantity_kg"),
+        ),
+        (
+            db.query(
+                Expense.season_id, func.coalesce(Expense.crop_id, 0),
+                func.sum(Expense.amount), func.count(Expense.expense_id)
+            ).group_by(Expense.season_id, func.coalesce(Expense.crop_id, 0)),
+            Expense.season_id,
+            ("expenses_amount", "expenses_count"),
+        ),
+    ]
+
+    result: Dict[tuple, Dict[str, Decimal]] = defaultdict(dict)
+    for query, season_col, names in queries:
+        chunks = [None] if season_ids is None else list(_chunks(season_ids))
+        for chunk in chunks:
+            chunk_query = query.filter(season_col.isnot(None)) if chunk is None else query.filter(season_col.in_(chunk))
+            for row in chunk_query:
+                values = result[(row[0], row[1])]
+                for name, value in zip(names, row[2:]):
+                    values[name] = value or 0
+    return result
+
+
+def _frozen_seasons(db: Session, season_ids: List[int]) -> Set[int]:
+    frozen = set()
+    for chunk in _chunks(season_ids):
+        frozen.update(r[0] for r in db.query(models.SeasonFact.season_id).filter(
+            models.SeasonFact.season_id.in_(chunk),
+            models.SeasonFact.frozen_at.isnot(None)
+        ).distinct())
+    return frozen
+
+
+def refresh_season_facts(db: Session, season_ids: Iterable[int]) -> None:
+    """إعادة حساب صفوف المواسم المحددة فقط (المواسم المجمدة تُتجاهل)"""
+    season_ids = sorted(set(season_ids))
+    frozen = _frozen_seasons(db, season_ids)
+    season_ids = [s for s in season_ids if s not in frozen]
+    if not season_ids:
+        return
+
+    fresh = _aggregate(db, season_ids)
+    existing = {}
+    for chunk in _chunks(season_ids):
+        for fact in db.query(models.SeasonFact).filter(models.SeasonFact.season_id.in_(chunk)):
+            existing[(fact.season_id, fact.crop_id)] = fact
+
+    for key in set(fresh) | set(existing):
+        values = fresh.get(key)
+        fact = existing.get(key)
+        if not values:
+            db.delete(fact)
+            continue
+        if fact is None:
+            fact = models.SeasonFact(season_id=key[0], crop_id=key[1])
+            db.add(fact)
+        for name in MEASURES:
+            setattr(fact, name, values.get(name, 0))
+
+
+def freeze_season_facts(db: Session, season_id: int) -> None:
+    """
+    تجميد أرقام الموسم عند الإغلاق (بدون commit)
+    الموسم بلا حركات يحصل على صف فارغ حتى يبقى مجمداً
+    """
+    refresh_season_facts(db, [season_id])
+    db.flush()
+    facts = db.query(models.SeasonFact).filter(models.SeasonFact.season_id == season_id).all()
+    if not facts:
+        facts = [models.SeasonFact(season_id=season_id, crop_id=0, **{name: 0 for name in MEASURES})]
+        db.add(facts[0])
+
+    frozen_at = datetime.utcnow()
+    for fact in facts:
+        if fact.frozen_at is None:
+            fact.frozen_at = frozen_at
+    db.flush()
+
+
+def rebuild_season_facts(db: Session) -> int:
+    """إعادة بناء صفوف المواسم غير المجمدة من الجداول المصدر (للترحيل الأولي أو الإصلاح)"""
+    frozen = {r[0] for r in db.query(models.SeasonFact.season_id).filter(
+        models.SeasonFact.frozen_at.isnot(None)
+    ).distinct()}
+    db.query(models.SeasonFact).filter(models.SeasonFact.frozen_at.is_(None)).delete()
+
+    fresh = {k: v for k, v in _aggregate(db, None).items() if k[0] not in frozen}
+    db.add_all(
+        models.SeasonFact(
+            season_id=key[0],
+            crop_id=key[1],
+            **{name: values.get(name, 0) for name in MEASURES}
+        )
+        for key, values in fresh.items()
+    )
+    db.commit()
+    return len(fresh)
+
+
+def ensure_season_facts(db: Session) -> None:
+    """بناء الجدول عند أول تشغيل إذا كان فارغاً وتوجد حركات مرتبطة بمواسم"""
+    if db.query(models.SeasonFact).first() is not None:
+        return
+    has_data = (
+        db.query(models.Sale.sale_id).filter(models.Sale.season_id.isnot(None)).first()
+        or db.query(models.Purchase.purchase_id).filter(models.Purchase.season_id.isnot(None)).first()
+        or db.query(models.Expense.expense_id).filter(models.Expense.season_id.isnot(None)).first()
+    )
+    if has_data:
+        rebuild_season_facts(db)
+
+
+# ============================================
+# القراءة
+# ============================================
+
+def get_season_totals(db: Session, season_ids: List[int]) -> Dict[int, Dict[str, Decimal]]:
+    """إجماليات كل موسم (صف لكل موسم من جدول المجاميع)"""
+    Fact = models.SeasonFact
+    rows = db.query(
+        Fact.season_id,
+        *(func.coalesce(func.sum(getattr(Fact, m)), 0) for m in MEASURES),
+        func.max(Fact.frozen_at)
+    ).filter(Fact.season_id.in_(season_ids)).group_by(Fact.season_id)
+
+    totals = {}
+    for row in rows:
+        values = dict(zip(MEASURES, row[1:-1]))
+        values["frozen_at"] = row[-1]
+        totals[row[0]] = values
+    return totals
+
+
+def get_season_crop_facts(db: Session, season_ids: List[int]):
+    """صفوف (الموسم، المحصول) مع اسم المحصول"""
+    Fact = models.SeasonFact
+    return db.query(Fact, models.Crop.crop_name)\
+        .outerjoin(models.Crop, models.Crop.crop_id == Fact.crop_id)\
+        .filter(Fact.season_id.in_(season_ids))\
+        .order_by(Fact.season_id, Fact.sales_amount.desc())\
+        .all()
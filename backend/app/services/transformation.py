@@ -10,6 +10,7 @@ from typing import List
 from app import schemas
 from app.models import Transformation, TransformationOutput, Crop, Inventory
 from app.services.inventory import consume_stock, add_stock_batch
+from app.core.pagination import paginate
 
 
 def create_transformation(
@@ -136,9 +137,14 @@ def create_transformation(
         raise HTTPException(status_code=500, detail=f"خطأ أثناء التحويل: {str(e)}")
 
 
-def get_transformations(db: Session, skip: int = 0, limit: int = 100) -> List[Transformation]:
+def get_transformations(
+    db: Session, skip: int = 0, limit: int = 100, cursor: str = None, with_count: bool = False
+) -> List[Transformation]:
     """قائمة عمليات التحويل"""
-    return db.query(Transformation).order_by(Transformation.transformation_id.desc()).offset(skip).limit(limit).all()
+    return paginate(
+        db.query(Transformation), (Transformation.transformation_id,),
+        limit, cursor, with_count=with_count, skip=skip
+    )
 
 
 def get_transformation(db: Session, transformation_id: int) -> Transformation:
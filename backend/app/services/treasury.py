@@ -1,133 +1,191 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from datetime import date
+from decimal import Decimal
 from typing import List, Optional
 
 from app import models, schemas, crud
 from app.core.settings import get_setting
+from app.services.cash_flow import get_cash_account_ids
+from app.services.treasury_closes import get_balances_before, get_day_positions
 
-def get_treasury_summary(db: Session, target_date: date = None):
+def get_treasury_summary(db: Session, target_date: date = None, account_ids: Optional[List[int]] = None):
+    """
+    ملخص الخزنة ليوم: إجمالي موحد لحسابات النقدية والبنوك المحددة + مركز كل حساب (درج/بنك)
+    الافتراضي كل حسابات CASH_ACCOUNT_IDS (أو الخزنة الرئيسية فقط)
+    """
     if target_date is None:
         target_date = date.today()
     
-    from decimal import Decimal
-    
-    # 1. Opening Balance: Sum of all transactions BEFORE target_date for CASH accounts
-    # Balance = Sum(Debit) - Sum(Credit) [Asset Account]
-    
-    cash_id = int(get_setting(db, "CASH_ACCOUNT_ID"))
-    
-    opening_balance_query = db.query(
-        func.sum(models.GeneralLedger.debit - models.GeneralLedger.credit)
-    ).join(models.FinancialAccount, models.GeneralLedger.account_id == models.FinancialAccount.account_id)\
-     .filter(models.FinancialAccount.account_type.in_(['CASH', 'ASSET']))\
-     .filter(models.FinancialAccount.account_id == cash_id)\
-     .filter(models.GeneralLedger.entry_date < target_date)
-    
-    opening_balance = opening_balance_query.scalar() or Decimal(0)
+    account_ids = get_cash_account_ids(db, account_ids)
 
-    # 2. Total IN (Day): Sum of Debits to Cash accounts on target_date
-    total_in = db.query(func.sum(models.GeneralLedger.debit))\
-        .filter(models.GeneralLedger.account_id == cash_id)\
-        .filter(models.GeneralLedger.entry_date == target_date)\
-        .scalar() or Decimal(0)
+    # 1-4. Opening from the day-close snapshots, IN/OUT from the day's own lines (grouped by account)
+    positions = get_day_positions(db, account_ids, target_date)
 
-    # 3. Total OUT (Day): Sum of Credits to Cash accounts on target_date
-    total_out = db.query(func.sum(models.GeneralLedger.credit))\
-        .filter(models.GeneralLedger.account_id == cash_id)\
-        .filter(models.GeneralLedger.entry_date == target_date)\
-        .scalar() or Decimal(0)
+    # 5. Current Balance (Total System Balance right now)
+    cash_accounts = {
+        a.account_id: a for a in db.query(models.FinancialAccount).filter(
+            models.FinancialAccount.account_id.in_(account_ids)
+        )
+    }
 
-    # 4. Closing Balance
-    closing_balance = opening_balance + total_in - total_out
+    accounts = []
+    for account_id in account_ids:
+        position = positions[account_id]
+        day_close = position["day_close"]
+        cash_account = cash_accounts.get(account_id)
+        accounts.append(schemas.TreasuryAccountPosition(
+            account_id=account_id,
+            account_name=cash_account.account_name if cash_account else "",
+            opening_balance=position["opening_balance"],
+            total_in_today=position["total_in"],
+            total_out_today=position["total_out"],
+            closing_balance=position["closing_balance"],
+            current_balance=cash_account.current_balance if cash_account else Decimal(0),
+            is_closed=bool(day_close and day_close.closed_at),
+            counted_cash=day_close.counted_cash if day_close else None,
+            variance=day_close.variance if day_close else None
+        ))
 
-    # 5. Current Balance (Total System Balance right now)
-    cash_account = crud.get_financial_account(db, cash_id)
-    current_balance = cash_account.current_balance if cash_account else Decimal(0)
+    def total(field):
+        return sum((getattr(a, field) for a in accounts), Decimal(0))
 
+    # الجرد الموحد لا معنى له إلا إذا جُردت كل الحسابات
+    all_counted = all(a.counted_cash is not None for a in accounts)
     return schemas.TreasurySummary(
-        opening_balance=opening_balance,
-        total_in_today=total_in,
-        total_out_today=total_out,
-        closing_balance=closing_balance,
-        current_balance=current_balance
+        opening_balance=total("opening_balance"),
+        total_in_today=total("total_in_today"),
+        total_out_today=total("total_out_today"),
+        closing_balance=total("closing_balance"),
+        current_balance=total("current_balance"),
+        is_closed=all(a.is_closed for a in accounts),
+        counted_cash=total("counted_cash") if all_counted else None,
+        variance=total("variance") if all_counted else None,
+        account_ids=account_ids,
+        accounts=accounts
     )
 
-def get_treasury_transactions(db: Session, target_date: date = None, limit: int = 100):
-    from sqlalchemy.orm import joinedload
-    cash_id = int(get_setting(db, "CASH_ACCOUNT_ID"))
+# نوع المصدر في القيد -> المستند الذي يُقرأ منه الطرف المقابل
+_PAYMENT_SOURCES = ('CASH_RECEIPT', 'CASH_PAYMENT', 'PAYMENT')
+_EXPENSE_SOURCES = ('EXPENSE', 'QUICK_EXPENSE')
 
-    # Get all ledger entries affecting Cash accounts
-    query = db.query(models.GeneralLedger)\
-        .filter(models.GeneralLedger.account_id == cash_id)
-        
+
+def _cash_lines_query(db: Session, account_ids: List[int], start_date: date = None, end_date: date = None):
+    """
+    قيود حسابات النقدية مع الرصيد الجاري (الموحد) والطرف المقابل في استعلام واحد:
+    كل قيد يُربط (LEFT JOIN) بمستنده حسب (source_type, source_id) ثم بجهة التعامل
+    running = مجموع نافذة داخل الفترة؛ يضاف له رصيد ما قبلها (من لقطة الإقفال اليومي)
+    """
+    from sqlalchemy import select
+    from sqlalchemy.orm import aliased
+
+    GL = models.GeneralLedger
+    lines = db.query(
+        GL.entry_id, GL.entry_date, GL.account_id, GL.debit, GL.credit,
+        GL.description, GL.source_type, GL.source_id,
+        func.sum(GL.debit - GL.credit).over(order_by=(GL.entry_date, GL.entry_id)).label('running')
+    ).filter(GL.account_id.in_(account_ids))
+    if start_date:
+        lines = lines.filter(GL.entry_date >= start_date)
+    if end_date:
+        lines = lines.filter(GL.entry_date <= end_date)
+    lines = lines.subquery('cash_lines')
+
+    Payment, Sale, Purchase, Expense = models.Payment, models.Sale, models.Purchase, models.Expense
+    ReturnedSale, ReturnedPurchase = aliased(Sale), aliased(Purchase)
+    ExpenseAccount, Contact = aliased(models.FinancialAccount), models.Contact
+
+    # القيود بلا مستند بطرف مقابل (رأس المال، قيود اليومية): اسم الحساب الآخر في نفس القيد
+    Other, OtherAccount = aliased(GL), aliased(models.FinancialAccount)
+    contra_account = select(OtherAccount.account_name).join(
+        Other, Other.account_id == OtherAccount.account_id
+    ).where(
+        Other.source_type == lines.c.source_type,
+        Other.source_id == lines.c.source_id,
+        Other.entry_date == lines.c.entry_date,
+        Other.account_id.not_in(account_ids)
+    ).order_by(Other.entry_id).limit(1).scalar_subquery()
+
+    return db.query(
+        lines.c.entry_id,
+        lines.c.entry_date,
+        lines.c.account_id,
+        lines.c.debit,
+        lines.c.credit,
+        lines.c.description,
+        lines.c.source_type,
+        lines.c.source_id,
+        lines.c.running,
+        Contact.name.label('contact_name'),
+        func.coalesce(ExpenseAccount.account_name, Contact.name, contra_account).label('account_name')
+    ).outerjoin(
+        Payment, and_(lines.c.source_type.in_(_PAYMENT_SOURCES), Payment.payment_id == lines.c.source_id)
+    ).outerjoin(
+        Sale, and_(lines.c.source_type == 'SALE', Sale.sale_id == lines.c.source_id)
+    ).outerjoin(
+        Purchase, and_(lines.c.source_type == 'PURCHASE', Purchase.purchase_id == lines.c.source_id)
+    ).outerjoin(
+        Expense, and_(lines.c.source_type.in_(_EXPENSE_SOURCES), Expense.expense_id == lines.c.source_id)
+    ).outerjoin(
+        models.SaleReturn,
+        and_(lines.c.source_type == 'SALE_RETURN', models.SaleReturn.return_id == lines.c.source_id)
+    ).outerjoin(
+        ReturnedSale, ReturnedSale.sale_id == models.SaleReturn.sale_id
+    ).outerjoin(
+        models.PurchaseReturn,
+        and_(lines.c.source_type == 'PURCHASE_RETURN', models.PurchaseReturn.return_id == lines.c.source_id)
+    ).outerjoin(
+        ReturnedPurchase, ReturnedPurchase.purchase_id == models.PurchaseReturn.purchase_id
+    ).outerjoin(
+        ExpenseAccount, and_(lines.c.source_type == 'QUICK_EXPENSE', ExpenseAccount.account_id == Expense.debit_account_id)
+    ).outerjoin(
+        Contact, Contact.contact_id == func.coalesce(
+            Payment.contact_id, Sale.customer_id, Purchase.supplier_id, Expense.supplier_id,
+            ReturnedSale.customer_id, ReturnedPurchase.supplier_id
+        )
+    ), lines
+
+
+def get_treasury_transactions(
+    db: Session,
+    target_date: date = None,
+    limit: int = 100,
+    cursor: str = None,
+    start_date: date = None,
+    end_date: date = None,
+    account_ids: Optional[List[int]] = None
+):
+    """
+    دفتر النقدية (الأحدث أولاً) مع الطرف المقابل والرصيد بعد كل حركة
+    target_date ليوم واحد، أو start_date/end_date لفترة (مثل شهر كامل)؛ الصفحة التالية بالمؤشر
+    مع أكثر من حساب (أدراج وبنوك) يكون الرصيد موحداً لكل الحسابات المحددة
+    """
+    from app.core.pagination import Page, paginate
+
+    account_ids = get_cash_account_ids(db, account_ids)
     if target_date:
-        query = query.filter(models.GeneralLedger.entry_date == target_date)
-        
-    transactions = query.order_by(models.GeneralLedger.entry_date.desc(), models.GeneralLedger.entry_id.desc())\
-        .limit(limit)\
-        .all()
-    
-    # ✅ Fix N+1: Batch load all payments and expenses at once
-    payment_source_ids = [
-        t.source_id for t in transactions 
-        if t.source_type in ['CASH_RECEIPT', 'CASH_PAYMENT'] and t.source_id
-    ]
-    expense_source_ids = [
-        t.source_id for t in transactions 
-        if t.source_type == 'QUICK_EXPENSE' and t.source_id
-    ]
-    
-    payments_map = {}
-    if payment_source_ids:
-        from sqlalchemy.orm import joinedload
-        payments = db.query(models.Payment)\
-            .options(joinedload(models.Payment.contact))\
-            .filter(models.Payment.payment_id.in_(payment_source_ids))\
-            .all()
-        payments_map = {p.payment_id: p for p in payments}
-        
-    expenses_map = {}
-    if expense_source_ids:
-        expenses = db.query(models.Expense)\
-            .options(joinedload(models.Expense.debit_account))\
-            .filter(models.Expense.expense_id.in_(expense_source_ids))\
-            .all()
-        expenses_map = {e.expense_id: e for e in expenses}
-    
-    result = []
-    for t in transactions:
-        t_type = "IN" if t.debit > 0 else "OUT"
-        amount = t.debit if t.debit > 0 else t.credit
-        
-        contact_name = None
-        account_name = None
-        
-        if t.source_type in ['CASH_RECEIPT', 'CASH_PAYMENT'] and t.source_id:
-            payment = payments_map.get(t.source_id)
-            if payment and payment.contact:
-                contact_name = payment.contact.name
-                # For payments/receipts, the "Account" is essentially the Contact
-                account_name = contact_name 
-                
-        elif t.source_type == 'QUICK_EXPENSE' and t.source_id:
-            expense = expenses_map.get(t.source_id)
-            if expense and expense.debit_account:
-                account_name = expense.debit_account.account_name
+        start_date = end_date = target_date
+
+    query, lines = _cash_lines_query(db, account_ids, start_date, end_date)
+    rows = paginate(query, (lines.c.entry_date, lines.c.entry_id), limit, cursor)
+    opening = sum(get_balances_before(db, account_ids, start_date).values(), Decimal(0)) if start_date else Decimal(0)
 
+    result = []
+    for t in rows:
         result.append(schemas.TreasuryTransaction(
             transaction_id=t.entry_id,
             date=t.entry_date,
-            description=t.description,
-            amount=amount,
-            type=t_type,
+            description=t.description or "",
+            amount=t.debit if t.debit > 0 else t.credit,
+            type="IN" if t.debit > 0 else "OUT",
             source=t.source_type,
-            contact_name=contact_name,
-            account_name=account_name
+            contact_name=t.contact_name,
+            account_name=t.account_name,
+            cash_account_id=t.account_id,
+            balance=opening + Decimal(str(t.running or 0))
         ))
-        
-    return result
 
+    return Page(result, rows.next_cursor)
 
 def create_cash_receipt(db: Session, receipt: schemas.CashReceiptCreate, user_id: int = None) -> dict:
     """
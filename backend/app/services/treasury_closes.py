@@ -0,0 +1,307 @@
+"""
+Treasury Day Close Service
+خدمة الإقفال اليومي للخزنة - صيانة جدول treasury_day_closes وقراءته
+
+كل يوم به حركة على حساب نقدية له صف: الافتتاحي والوارد والمنصرف والختامي،
+فملخص أي يوم يقرأ صف اللقطة السابقة وقيود اليوم فقط بدلاً من جمع كل القيود السابقة.
+
+الصيانة تتم تلقائياً قبل كل commit (مثل daily_facts):
+- أحداث الجلسة تجمع أقدم تاريخ تأثر لكل حساب (إضافة أو تعديل أو حذف قيد)
+- قبل الـ commit يعاد حساب صفوف الحساب من ذلك التاريخ فصاعداً (ترحيل الأرصدة للأمام)
+- الأيام المقفلة يدوياً تحتفظ بالجرد الفعلي ويعاد حساب الفرق معه
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+
+_DATES = "treasury_close_dates"
+_REKEY = "treasury_close_rekey"
+
+# عدد المعرفات في كل استعلام (لتجنب حد متغيرات SQLite)
+_ID_CHUNK = 500
+
+
+def _note(session: Session, account_id: Optional[int], entry_date: Optional[date]) -> None:
+    """تسجيل أقدم تاريخ متأثر للحساب"""
+    if account_id is None or entry_date is None:
+        return
+    dates = session.info.setdefault(_DATES, {})
+    if account_id not in dates or entry_date < dates[account_id]:
+        dates[account_id] = entry_date
+
+
+# ============================================
+# تجميع الأيام المتأثرة (Session Events)
+# ============================================
+
+def _collect_flush(session: Session, flush_context, instances) -> None:
+    for group, use_history in ((session.new, False), (session.dirty, True), (session.deleted, True)):
+        for obj in group:
+            if not isinstance(obj, models.GeneralLedger):
+                continue
+            _note(session, obj.account_id, obj.entry_date)
+            if use_history:
+                state = inspect(obj)
+                for account_id in state.attrs.account_id.history.deleted or [obj.account_id]:
+                    for entry_date in state.attrs.entry_date.history.deleted or [obj.entry_date]:
+                        _note(session, account_id, entry_date)
+
+
+def _collect_bulk(orm_execute_state) -> None:
+    """قراءة أقدم تاريخ لكل حساب قبل تنفيذ update/delete الجماعي على القيود"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.local_table.name != models.GeneralLedger.__tablename__:
+        return
+
+    GL = models.GeneralLedger
+    session = orm_execute_state.session
+    stmt = select(GL.entry_id, GL.account_id, GL.entry_date)
+    whereclause = orm_execute_state.statement.whereclause
+    if whereclause is not None:
+        stmt = stmt.where(whereclause)
+
+    rows = session.execute(stmt).all()
+    for _, account_id, entry_date in rows:
+        _note(session, account_id, entry_date)
+    if orm_execute_state.is_update:
+        # الحساب والتاريخ الجديدان يُقرآن قبل الـ commit بمعرفات القيود
+        session.info.setdefault(_REKEY, set()).update(r[0] for r in rows)
+
+
+def _apply_before_commit(session: Session) -> None:
+    session.flush()
+    rekey = list(session.info.pop(_REKEY, set()))
+
+    GL = models.GeneralLedger
+    for i in range(0, len(rekey), _ID_CHUNK):
+        for account_id, entry_date in session.execute(
+            select(GL.account_id, GL.entry_date).where(GL.entry_id.in_(rekey[i:i + _ID_CHUNK]))
+        ):
+            _note(session, account_id, entry_date)
+
+    dates = session.info.pop(_DATES, {})
+    if not dates:
+        return
+    from app.services.cash_flow import get_cash_account_ids
+    cash_accounts = set(get_cash_account_ids(session))
+    for account_id, from_date in dates.items():
+        if account_id in cash_accounts:
+            roll_forward(session, account_id, from_date)
+
+
+def _discard(session: Session) -> None:
+    session.info.pop(_DATES, None)
+    session.info.pop(_REKEY, None)
+
+
+def register_treasury_close_maintenance(session_factory) -> None:
+    """ربط صيانة الإقفال اليومي بمصنع الجلسات (يُستدعى مرة واحدة من database.py)"""
+    event.listen(session_factory, "before_flush", _collect_flush)
+    event.listen(session_factory, "do_orm_execute", _collect_bulk)
+    event.listen(session_factory, "before_commit", _apply_before_commit)
+    event.listen(session_factory, "after_rollback", _discard)
+
+
+# ============================================
+# إعادة الحساب
+# ============================================
+
+def _latest_snapshots(db: Session, account_ids: List[int], day: date, inclusive: bool) -> Dict[int, "models.TreasuryDayClose"]:
+    """آخر لقطة لكل حساب قبل اليوم (أو حتى اليوم) في استعلام واحد مجمّع"""
+    TDC = models.TreasuryDayClose
+    latest = db.query(
+        TDC.account_id, func.max(TDC.close_date).label('close_date')
+    ).filter(
+        TDC.account_id.in_(account_ids),
+        TDC.close_date <= day if inclusive else TDC.close_date < day
+    ).group_by(TDC.account_id).subquery()
+    return {
+        row.account_id: row
+        for row in db.query(TDC).join(
+            latest, and_(TDC.account_id == latest.c.account_id, TDC.close_date == latest.c.close_date)
+        )
+    }
+
+
+def _ledger_balances_before(db: Session, account_ids: List[int], day: date) -> Dict[int, Decimal]:
+    """جمع القيود مباشرة (للحسابات التي لا لقطات لها بعد)"""
+    GL = models.GeneralLedger
+    return {
+        account_id: Decimal(str(total or 0))
+        for account_id, total in db.query(GL.account_id, func.sum(GL.debit - GL.credit)).filter(
+            GL.account_id.in_(account_ids),
+            GL.entry_date < day
+        ).group_by(GL.account_id)
+    }
+
+
+def get_balances_before(db: Session, account_ids: List[int], day: date) -> Dict[int, Decimal]:
+    """رصيد كل حساب قبل اليوم: ختامي آخر لقطة سابقة، أو جمع القيود إن لم توجد لقطة"""
+    balances = {
+        account_id: Decimal(str(row.closing_balance))
+        for account_id, row in _latest_snapshots(db, account_ids, day, inclusive=False).items()
+    }
+    missing = [a for a in account_ids if a not in balances]
+    if missing:
+        balances.update(_ledger_balances_before(db, missing, day))
+    return {a: balances.get(a, Decimal(0)) for a in account_ids}
+
+
+def get_balance_before(db: Session, account_id: int, day: date) -> Decimal:
+    return get_balances_before(db, [account_id], day)[account_id]
+
+
+def roll_forward(db: Session, account_id: int, from_date: date) -> None:
+    """
+    إعادة حساب صفوف الحساب من التاريخ فصاعداً (استعلام واحد مجمّع حسب اليوم على فهرس (الحساب، التاريخ))
+    الأيام التي لم تعد بها حركة تُحذف ما لم تكن مقفلة يدوياً
+    """
+    TDC, GL = models.TreasuryDayClose, models.GeneralLedger
+    movements = {
+        day: (Decimal(str(total_in or 0)), Decimal(str(total_out or 0)))
+        for day, total_in, total_out in db.query(
+            GL.entry_date, func.sum(GL.debit), func.sum(GL.credit)
+        ).filter(
+            GL.account_id == account_id,
+            GL.entry_date >= from_date
+        ).group_by(GL.entry_date)
+    }
+    existing = {
+        row.close_date: row
+        for row in db.query(TDC).filter(TDC.account_id == account_id, TDC.close_date >= from_date)
+    }
+
+    balance = get_balance_before(db, account_id, from_date)
+    for day in sorted(set(movements) | set(existing)):
+        row = existing.get(day)
+        if day not in movements and row.closed_at is None:
+            db.delete(row)
+            continue
+        if row is None:
+            row = models.TreasuryDayClose(account_id=account_id, close_date=day)
+            db.add(row)
+
+        total_in, total_out = movements.get(day, (Decimal(0), Decimal(0)))
+        row.opening_balance = balance
+        row.total_in = total_in
+        row.total_out = total_out
+        row.closing_balance = balance = balance + total_in - total_out
+        if row.counted_cash is not None:
+            row.variance = Decimal(str(row.counted_cash)) - balance
+
+
+def rebuild_treasury_day_closes(db: Session) -> int:
+    """إعادة بناء لقطات كل حسابات النقدية (للترحيل الأولي أو الإصلاح)؛ الأيام المقفلة تحتفظ بجردها"""
+    from app.services.cash_flow import get_cash_account_ids
+
+    for account_id in get_cash_account_ids(db):
+        roll_forward(db, account_id, date.min)
+    db.commit()
+    return db.query(models.TreasuryDayClose).count()
+
+
+def ensure_treasury_day_closes(db: Session) -> None:
+    """بناء الجدول عند أول تشغيل إذا كان فارغاً وتوجد قيود"""
+    if db.query(models.TreasuryDayClose).first() is not None:
+        return
+    if db.query(models.GeneralLedger.entry_id).first() is not None:
+        rebuild_treasury_day_closes(db)
+
+
+# ============================================
+# القراءة والإقفال اليدوي
+# ============================================
+
+def get_day_positions(db: Session, account_ids: List[int], day: date) -> Dict[int, Dict]:
+    """
+    أرصدة اليوم لكل حساب: لقطة اليوم أو آخر لقطة قبله + قيود اليوم نفسه
+    استعلامان مجمّعان لكل الحسابات معاً مهما كان عددها
+    قيود اليوم تُجمع دائماً حتى يعكس الملخص آخر ما تم حفظه
+    """
+    GL = models.GeneralLedger
+    snapshots = _latest_snapshots(db, account_ids, day, inclusive=True)
+    missing = [a for a in account_ids if a not in snapshots]
+    fallback = _ledger_balances_before(db, missing, day) if missing else {}
+
+    movements = {
+        account_id: (Decimal(str(total_in or 0)), Decimal(str(total_out or 0)))
+        for account_id, total_in, total_out in db.query(
+            GL.account_id, func.sum(GL.debit), func.sum(GL.credit)
+        ).filter(GL.account_id.in_(account_ids), GL.entry_date == day).group_by(GL.account_id)
+    }
+
+    positions = {}
+    for account_id in account_ids:
+        snapshot = snapshots.get(account_id)
+        today = snapshot if snapshot is not None and snapshot.close_date == day else None
+        if today is not None:
+            opening = Decimal(str(today.opening_balance))
+        elif snapshot is not None:
+            opening = Decimal(str(snapshot.closing_balance))
+        else:
+            opening = fallback.get(account_id, Decimal(0))
+
+        total_in, total_out = movements.get(account_id, (Decimal(0), Decimal(0)))
+        positions[account_id] = {
+            "opening_balance": opening,
+            "total_in": total_in,
+            "total_out": total_out,
+            "closing_balance": opening + total_in - total_out,
+            "day_close": today,
+        }
+    return positions
+
+
+def get_day_position(db: Session, account_id: int, day: date) -> Dict:
+    return get_day_positions(db, [account_id], day)[account_id]
+
+
+def close_treasury_day(db: Session, data: schemas.TreasuryDayCloseCreate, user_id: int = None) -> "models.TreasuryDayClose":
+    """إقفال يوم: تسجيل الجرد الفعلي وحساب الفرق مع الرصيد الدفتري"""
+    from app.core.settings import get_setting
+    from app.services.cash_flow import get_cash_account_ids
+
+    if data.close_date > date.today():
+        raise HTTPException(status_code=400, detail="لا يمكن إقفال يوم لم يأتِ بعد")
+    account_id = data.account_id or int(get_setting(db, "CASH_ACCOUNT_ID"))
+    get_cash_account_ids(db, [account_id])
+
+    row = db.get(models.TreasuryDayClose, (account_id, data.close_date))
+    if row is None:
+        row = models.TreasuryDayClose(account_id=account_id, close_date=data.close_date)
+        db.add(row)
+    row.counted_cash = data.counted_cash
+    row.notes = data.notes
+    row.closed_at = datetime.utcnow()
+    row.closed_by = user_id
+    db.flush()
+
+    roll_forward(db, account_id, data.close_date)
+    db.commit()
+    db.refresh(row)
+    return row
+
+
+def get_treasury_day_closes(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    account_id: Optional[int] = None,
+    closed_only: bool = False
+) -> List["models.TreasuryDayClose"]:
+    query = db.query(models.TreasuryDayClose).filter(
+        models.TreasuryDayClose.close_date.between(start_date, end_date)
+    )
+    if account_id:
+        query = query.filter(models.TreasuryDayClose.account_id == account_id)
+    if closed_only:
+        query = query.filter(models.TreasuryDayClose.closed_at.isnot(None))
+    return query.order_by(models.TreasuryDayClose.close_date, models.TreasuryDayClose.account_id).all()
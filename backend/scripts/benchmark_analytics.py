@@ -0,0 +1,70 @@
+"""
+Analytics Engine Benchmark
+مقارنة زمن التقارير الثقيلة بين SQLite و DuckDB على نفس قاعدة البيانات
+
+python scripts/benchmark_analytics.py [--repeat N] [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from datetime import date
+
+from app.database import SessionLocal
+from app.core.config import settings
+from app.services import advanced_reports, analytics, reporting
+
+
+def _reports(start: date, end: date):
+    # الدوال الأصلية بدون الكاش حتى يقاس الاستعلام نفسه
+    return {
+        "trial_balance": lambda db: reporting.generate_trial_balance.uncached(db, end),
+        "income_statement_periods": lambda db: reporting.generate_income_statement_periods.uncached(db, start, end, "month"),
+        "balance_sheet_periods": lambda db: reporting.generate_balance_sheet_periods.uncached(db, start, end, "quarter"),
+        "crop_profitability_month": lambda db: advanced_reports.get_crop_profitability.uncached(db, breakdown="month"),
+        "debt_report": lambda db: advanced_reports.get_debt_report.uncached(db),
+    }
+
+
+def _time(fn, db, repeat: int):
+    fn(db)  # تسخين (إرفاق DuckDB وذاكرة SQLite المؤقتة)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(db)
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def run_benchmark(start: date, end: date, repeat: int):
+    engines = ["sqlite"] + (["duckdb"] if analytics.duckdb is not None else [])
+    if len(engines) == 1:
+        print("⚠️  duckdb is not installed (pip install duckdb), measuring SQLite only\n")
+
+    db = SessionLocal()
+    configured = settings.ANALYTICS_ENGINE
+    try:
+        print(f"{'report':<28}" + "".join(f"{e + ' (ms)':>16}" for e in engines) + f"{'same result':>14}")
+        for name, fn in _reports(start, end).items():
+            timings, results = [], []
+            for engine in engines:
+                settings.ANALYTICS_ENGINE = engine
+                elapsed, result = _time(fn, db, repeat)
+                timings.append(elapsed)
+                results.append(result)
+            same = "yes" if all(r == results[0] for r in results) else "NO"
+            print(f"{name:<28}" + "".join(f"{t:>16.1f}" for t in timings) + f"{same if len(engines) > 1 else '-':>14}")
+    finally:
+        settings.ANALYTICS_ENGINE = configured
+        analytics.close_connection()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark heavy reports on SQLite vs DuckDB")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(date.today().year, 1, 1))
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+    args = parser.parse_args()
+    run_benchmark(args.start, args.end, args.repeat)
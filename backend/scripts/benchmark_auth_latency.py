@@ -0,0 +1,101 @@
+"""
+Auth Latency Benchmark
+زمن استجابة endpoints أخرى أثناء موجة تسجيل دخول (PBKDF2) في نفس العامل
+
+python scripts/benchmark_auth_latency.py [--username U] [--password P] [--logins N] [--requests N] [--inline-hash]
+
+--inline-hash: التحقق من كلمة المرور على حلقة الأحداث مباشرة (السلوك السابق) للمقارنة
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+
+from app.main import app
+from app.api.v1.endpoints import auth as auth_api
+from app.auth import jwt
+
+PROBE_PATHS = ["/api/v1/crops/", "/api/v1/auth/me"]
+
+
+async def _inline_verify(plain_password: str, hashed_password: str) -> bool:
+    return jwt.verify_password(plain_password, hashed_password)
+
+
+async def _login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/api/v1/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _probe(client: httpx.AsyncClient, headers: dict, count: int) -> list:
+    """طلبات متتالية للـ endpoints الأخرى؛ زمن كل طلب بالملي ثانية"""
+    timings = []
+    for i in range(count):
+        started = time.perf_counter()
+        response = await client.get(PROBE_PATHS[i % len(PROBE_PATHS)], headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return timings
+
+
+async def _storm(client: httpx.AsyncClient, username: str, password: str, concurrency: int, stop: asyncio.Event) -> int:
+    """تسجيلات دخول متزامنة مستمرة حتى stop؛ تعيد عدد التسجيلات المكتملة"""
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while not stop.is_set():
+            await _login(client, username, password)
+            done += 1
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return done
+
+
+def _summary(name: str, timings: list, extra: str = "") -> None:
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:<16}{statistics.median(timings):>12.1f}{p99:>12.1f}{timings[-1]:>12.1f}  {extra}")
+
+
+async def run_benchmark(username: str, password: str, logins: int, requests: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = {"Authorization": f"Bearer {await _login(client, username, password)}"}
+        await _probe(client, headers, 10)  # تسخين (الاتصال وذاكرة المصادقة)
+
+        print(f"{'phase':<16}{'p50 (ms)':>12}{'p99 (ms)':>12}{'max (ms)':>12}")
+        _summary("idle", await _probe(client, headers, requests))
+
+        stop = asyncio.Event()
+        storm = asyncio.ensure_future(_storm(client, username, password, logins, stop))
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        timings = await _probe(client, headers, requests)
+        stop.set()
+        completed = await storm
+        rate = completed / (time.perf_counter() - started)
+        _summary("login storm", timings, f"{logins} concurrent logins, {rate:.1f} logins/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure latency of other endpoints during a login storm")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--inline-hash", action="store_true")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.inline_hash:
+        auth_api.verify_password_async = _inline_verify
+    asyncio.run(run_benchmark(args.username, args.password, args.logins, args.requests))
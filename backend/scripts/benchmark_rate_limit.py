@@ -0,0 +1,73 @@
+"""
+Rate Limit Storage Benchmark
+زمن فحص تحديد المعدل لكل طلب (ما يستدعيه slowapi لكل حد) بين الذاكرة وملف SQLite المشترك
+
+python scripts/benchmark_rate_limit.py [--hits N] [--processes N] [--keys N]
+
+--processes: عدد العمليات المتزامنة على نفس الملف (مثل uvicorn --workers)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import multiprocessing
+import statistics
+import tempfile
+import time
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from app.core.rate_limit_storage import SQLiteStorage  # noqa: F401 - يسجل مخطط sqlite://
+
+BUDGET_US = 100
+LIMIT = parse("100000/minute")
+
+
+def _measure(uri: str, hits: int, keys: int) -> list:
+    """زمن كل فحص بالميكروثانية (مفاتيح متعددة مثل عناوين IP مختلفة)"""
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    for i in range(100):  # تسخين (فتح الاتصال وإنشاء الجدول)
+        limiter.hit(LIMIT, f"10.0.0.{i % keys}")
+    timings = []
+    for i in range(hits):
+        started = time.perf_counter()
+        limiter.hit(LIMIT, f"10.0.0.{i % keys}")
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return timings
+
+
+def _worker(args):
+    return _measure(*args)
+
+
+def _summary(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    mean = statistics.mean(timings)
+    p99 = timings[int(len(timings) * 0.99)]
+    verdict = "ok" if mean < BUDGET_US else "OVER BUDGET"
+    print(f"{name:<28}{mean:>12.1f}{statistics.median(timings):>12.1f}{p99:>12.1f}  {verdict}")
+
+
+def run_benchmark(hits: int, processes: int, keys: int):
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_uri = f"sqlite:///{os.path.join(directory, 'rate_limits.db')}"
+        print(f"{'storage':<28}{'mean (us)':>12}{'p50 (us)':>12}{'p99 (us)':>12}  budget {BUDGET_US} us")
+        _summary("memory", _measure("memory://", hits, keys))
+        _summary("sqlite (1 process)", _measure(sqlite_uri, hits, keys))
+        if processes > 1:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_worker, [(sqlite_uri, hits, keys)] * processes)
+            _summary(f"sqlite ({processes} processes)", [t for timings in results for t in timings])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-request rate limit overhead")
+    parser.add_argument("--hits", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=50)
+    args = parser.parse_args()
+    run_benchmark(args.hits, args.processes, args.keys)
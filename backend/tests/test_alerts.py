@@ -0,0 +1,87 @@
+"""
+اختبارات توليد التنبيهات (منع التكرار والإدراج دفعة واحدة)
+Alert Generation Tests
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app import models
+from app.database import engine
+from app.services import alerts
+
+
+# Fixtures are imported from conftest.py automatically
+
+
+def _notifications(db_session, dedup_key):
+    db_session.expire_all()
+    return db_session.query(models.Notification).filter(models.Notification.dedup_key == dedup_key).all()
+
+
+@pytest.fixture
+def overdue_sale(db_session, test_crop, test_customer):
+    """فاتورة بيع آجلة قديمة لم يُحصّل منها إلا جزء"""
+    sale = models.Sale(
+        crop_id=test_crop.crop_id, customer_id=test_customer.contact_id, sale_date=date(2014, 2, 1),
+        quantity_sold_kg=100, selling_unit_price=10, selling_pricing_unit="kg",
+        specific_selling_factor=1, total_sale_amount=1000, amount_received=400, payment_status="PARTIAL"
+    )
+    db_session.add(sale)
+    db_session.commit()
+    return sale
+
+
+class TestAlertGeneration:
+    """اختبارات منع التكرار والإدراج المجمّع"""
+
+    def test_low_stock_alert_once_per_episode(self, db_session, test_inventory):
+        key = f"LOW_STOCK:crop:{test_inventory.crop_id}"
+        alerts.check_low_stock(db_session)
+        alerts.check_low_stock(db_session)
+        [first] = _notifications(db_session, key)
+        assert test_inventory.crop.crop_name in first.message
+
+        # قراءته لا تعيد توليده في الفحص التالي ما دام المخزون منخفضاً
+        alerts.mark_as_read(db_session, first.notification_id)
+        alerts.check_low_stock(db_session)
+        assert [n.notification_id for n in _notifications(db_session, key)] == [first.notification_id]
+
+        # زوال الحالة يفك المفتاح، وعودتها تولد تنبيهاً جديداً
+        stock = test_inventory.current_stock_kg
+        test_inventory.current_stock_kg = test_inventory.low_stock_threshold + 1
+        db_session.commit()
+        alerts.check_low_stock(db_session)
+        assert _notifications(db_session, key) == []
+        test_inventory.current_stock_kg = stock
+        db_session.commit()
+        alerts.check_low_stock(db_session)
+        [second] = _notifications(db_session, key)
+        assert second.notification_id != first.notification_id
+
+    def test_overdue_sweep_is_set_based(self, db_session, overdue_sale):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if "notifications" in statement:
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            created = alerts.check_overdue_debts(db_session)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        # فك مفاتيح الحالات الزائلة + استعلام المرشحين (مع anti-join) + إدراج واحد مهما كان عدد الفواتير
+        assert created >= 1
+        assert len(statements) == 3
+        [notification] = _notifications(db_session, f"OVERDUE_DEBT:sale:{overdue_sale.sale_id}")
+        assert "600" in notification.message
+        assert alerts.check_overdue_debts(db_session) == 0
+
+    def test_concurrent_duplicate_is_ignored(self, db_session, overdue_sale):
+        """صف بنفس المفتاح أُدرج بين الفحص والإدراج: يتخطاه الفهرس الفريد دون فشل الدفعة"""
+        key = f"OVERDUE_DEBT:sale:{overdue_sale.sale_id}"
+        alerts.create_notification(db_session, "ديون متأخرة", "already there", "OVERDUE_DEBT", dedup_key=key)
+        row = {"title": "ديون متأخرة", "message": "duplicate", "type": "OVERDUE_DEBT", "dedup_key": key}
+        assert alerts._insert_notifications(db_session, [row]) == 0
+        assert [n.message for n in _notifications(db_session, key)] == ["already there"]
@@ -0,0 +1,76 @@
+"""
+اختبارات محرك التحليلات (DuckDB مع الرجوع لـ SQLite)
+Analytics Engine Tests
+"""
+import pytest
+from datetime import date
+from decimal import Decimal
+from app import models
+from app.core.config import settings
+from app.services import advanced_reports, analytics, reporting
+
+
+# Fixtures are imported from conftest.py automatically
+
+START = date(2015, 1, 1)
+END = date(2015, 12, 31)
+LEDGER_END = date(2030, 12, 31)
+
+
+@pytest.fixture
+def duckdb_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_ENGINE", "duckdb")
+    yield
+    analytics.close_connection()
+
+
+@pytest.fixture
+def sqlite_extension():
+    """DuckDB مع امتداد sqlite (يتخطى الاختبار إن لم يمكن تحميله، مثلاً بدون إنترنت)"""
+    duckdb = pytest.importorskip("duckdb")
+    conn = duckdb.connect(":memory:")
+    try:
+        conn.execute("INSTALL sqlite")
+        conn.execute("LOAD sqlite")
+    except duckdb.Error as e:
+        pytest.skip(f"DuckDB sqlite extension unavailable: {e}")
+    finally:
+        conn.close()
+
+
+class TestAnalyticsEngine:
+    """اختبارات الترجمة والرجوع لـ SQLite وتطابق النتائج"""
+
+    def test_compiles_sqlite_functions_for_duckdb(self):
+        """strftime بترتيب DuckDB، والقسمة الصحيحة //، وبدون مضاعفة %"""
+        bucket = reporting.period_bucket(models.GeneralLedger.entry_date, "quarter")
+        sql = analytics.compile_for_duckdb(models.GeneralLedger.__table__.select().with_only_columns(bucket))
+        assert "strftime(general_ledger.entry_date, '%m')" in sql
+        assert "// 3" in sql
+
+    def test_falls_back_without_duckdb(self, db_session, duckdb_enabled, monkeypatch):
+        monkeypatch.setattr(analytics, "duckdb", None)
+        assert not analytics.analytics_enabled()
+        expected = reporting.generate_income_statement_periods.uncached(db_session, START, END)
+        monkeypatch.setattr(settings, "ANALYTICS_ENGINE", "sqlite")
+        assert expected == reporting.generate_income_statement_periods.uncached(db_session, START, END)
+
+    def test_duckdb_matches_sqlite(self, db_session, duckdb_enabled, sqlite_extension, monkeypatch):
+        """نفس القيم (Decimal وليس float) ونفس ترتيب الصفوف، بدون رجوع صامت لـ SQLite"""
+        def no_fallback(db, query):
+            raise AssertionError("DuckDB query fell back to SQLite")
+
+        results = {}
+        for engine in ("sqlite", "duckdb"):
+            monkeypatch.setattr(settings, "ANALYTICS_ENGINE", engine)
+            if engine == "duckdb":
+                monkeypatch.setattr(analytics, "_sqlite_rows", no_fallback)
+            results[engine] = (
+                reporting.generate_trial_balance.uncached(db_session),
+                reporting.generate_income_statement_periods.uncached(db_session, START, LEDGER_END, "quarter"),
+                reporting.generate_balance_sheet_periods.uncached(db_session, START, LEDGER_END, "quarter"),
+                advanced_reports.get_crop_profitability.uncached(db_session, breakdown="month"),
+                advanced_reports.get_debt_report.uncached(db_session),
+            )
+        assert results["duckdb"] == results["sqlite"]
+        assert all(isinstance(row.total_debit, Decimal) for row in results["duckdb"][0])
@@ -0,0 +1,109 @@
+"""
+اختبارات عدم إيقاف حلقة الأحداث في المصادقة (PBKDF2 والاستعلامات خارج الحلقة)
+Non-blocking Auth Tests
+"""
+import asyncio
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from fastapi.concurrency import run_in_threadpool
+from app import models
+from app.api.v1.endpoints import auth as auth_api
+from app.auth import jwt
+from app.core.config import settings
+from app.database import SessionLocal, engine
+
+
+# Fixtures are imported from conftest.py automatically
+
+SLOW_HASH_SECONDS = 0.2
+
+
+@pytest.fixture
+def slow_hash(monkeypatch):
+    """PBKDF2 بطيء ثابت المدة؛ يسجل أقصى عدد تحقق متزامن"""
+    state = {"running": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def verify(plain, hashed):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(SLOW_HASH_SECONDS)
+        with lock:
+            state["running"] -= 1
+        return True
+
+    monkeypatch.setattr(jwt, "verify_password", verify)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 2)
+    monkeypatch.setattr(jwt, "_hash_limiter", None)
+    return state
+
+
+@pytest.fixture
+def username(db_session):
+    return db_session.query(models.User.username).filter(models.User.is_active == True).scalar()
+
+
+def _login(username):
+    """تسجيل دخول بجلسة قاعدة بيانات مستقلة (مثل طلب منفصل)"""
+    async def run():
+        db = SessionLocal()
+        try:
+            form = SimpleNamespace(username=username, password="secret")
+            return await auth_api.login(form_data=form, db=db)
+        finally:
+            db.close()
+    return run()
+
+
+async def _max_loop_lag(until: asyncio.Future, interval: float = 0.01) -> float:
+    """أكبر تأخير لحلقة الأحداث عن موعد الاستيقاظ حتى انتهاء until"""
+    lag = 0.0
+    while not until.done():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(lag, time.perf_counter() - started - interval)
+    return lag
+
+
+class TestNonBlockingAuth:
+    """اختبارات تسجيل الدخول تحت الضغط"""
+
+    def test_login_does_not_block_event_loop(self, slow_hash, username):
+        async def scenario():
+            login = asyncio.ensure_future(_login(username))
+            lag = await _max_loop_lag(login)
+            return await login, lag
+
+        token, lag = asyncio.run(scenario())
+        assert token["token_type"] == "bearer"
+        assert lag < SLOW_HASH_SECONDS / 2
+
+    def test_password_checks_are_bounded(self, slow_hash):
+        async def scenario():
+            return await asyncio.gather(*[jwt.verify_password_async("p", "h") for _ in range(6)])
+
+        started = time.perf_counter()
+        assert all(asyncio.run(scenario()))
+        assert slow_hash["peak"] == settings.PASSWORD_HASH_WORKERS
+        assert time.perf_counter() - started >= 3 * SLOW_HASH_SECONDS
+
+    def test_threadpool_stays_free_during_login_storm(self, slow_hash, username):
+        async def scenario():
+            idle_connections = engine.pool.checkedout()
+            storm = asyncio.ensure_future(asyncio.gather(*[_login(username) for _ in range(8)]))
+            await asyncio.sleep(SLOW_HASH_SECONDS / 2)
+            # تسجيلات الدخول المنتظرة للتحقق لا تحجز اتصالات قاعدة البيانات
+            held = engine.pool.checkedout() - idle_connections
+            # طلب آخر (endpoint متزامن) يحصل على خيط فوراً رغم انتظار 6 عمليات تحقق
+            started = time.perf_counter()
+            await run_in_threadpool(lambda: None)
+            waited = time.perf_counter() - started
+            await storm
+            return waited, held
+
+        waited, held = asyncio.run(scenario())
+        assert waited < SLOW_HASH_SECONDS / 2
+        assert held <= settings.PASSWORD_HASH_WORKERS
@@ -0,0 +1,107 @@
+"""
+اختبارات تقرير التدفقات النقدية
+Cash Flow Report Tests
+"""
+import uuid
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app import models, schemas
+from app.core import settings as settings_service
+from app.crud import finance as finance_crud
+from app.database import engine
+from app.services import accounting_engine, cash_flow
+
+
+# Fixtures are imported from conftest.py automatically
+
+START = date(2012, 6, 1)
+END = date(2012, 6, 30)
+
+
+def _post(db_session, debit_account_id, credit_account_id, entry_date, amount, source_type):
+    accounting_engine.get_engine(db_session).create_balanced_entry(
+        entry_date=entry_date,
+        source_type=source_type,
+        source_id=1,
+        entries=[
+            accounting_engine.LedgerEntry(account_id=debit_account_id, debit=amount, credit=0),
+            accounting_engine.LedgerEntry(account_id=credit_account_id, debit=0, credit=amount)
+        ]
+    )
+    db_session.commit()
+
+
+@pytest.fixture
+def cash_setup(db_session, test_financial_accounts):
+    """خزنة رئيسية وحساب بنك مسجل في CASH_ACCOUNT_IDS وحساب مقابل"""
+    unique_id = uuid.uuid4().hex[:8]
+    bank = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"CF Bank {unique_id}", account_type="ASSET", code=f"CFB{unique_id}"
+    ))
+    other = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"CF Other {unique_id}", account_type="REVENUE", code=f"CFO{unique_id}"
+    ))
+    cash_id = int(settings_service.get_setting(db_session, "CASH_ACCOUNT_ID"))
+    settings_service.set_setting(db_session, "CASH_ACCOUNT_IDS", [cash_id, bank.account_id])
+
+    _post(db_session, cash_id, other.account_id, date(2012, 5, 20), 70, "CASH_RECEIPT")
+    _post(db_session, cash_id, other.account_id, date(2012, 6, 2), 100, "CASH_RECEIPT")
+    _post(db_session, other.account_id, cash_id, date(2012, 6, 2), 30, "EXPENSE")
+    _post(db_session, bank.account_id, other.account_id, date(2012, 6, 9), 500, "CAPITAL_CONTRIBUTION")
+    _post(db_session, other.account_id, bank.account_id, date(2012, 6, 15), 80, "EQUIPMENT")
+
+    yield cash_id, bank
+
+    for key in ("CASH_ACCOUNT_IDS", "CASH_FLOW_SOURCE_MAPPING"):
+        db_session.query(models.Settings).filter(models.Settings.key == key).delete()
+        settings_service._settings_cache.pop(key, None)
+    db_session.commit()
+
+
+class TestCashFlow:
+    """اختبارات التصنيف والحسابات المتعددة والتفصيل اليومي"""
+
+    def test_single_statement_over_all_cash_accounts(self, db_session, cash_setup):
+        """كل حسابات النقدية في استعلام واحد؛ غير المصنف يظهر منفصلاً"""
+        _, bank = cash_setup
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if "general_ledger" in statement:
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            report = cash_flow.get_cash_flow_report.uncached(db_session, START, END)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert len(statements) == 1
+        assert bank.account_id in report["account_ids"]
+        assert report["financing_activities"]["capital_contributions"] == 500
+        assert report["unclassified"]["outflows"] == 80
+        assert report["actual_balance"] - report["closing_balance"] == pytest.approx(-80)
+
+    def test_mapping_is_configurable(self, db_session, cash_setup):
+        """نقل نوع مصدر إلى الأنشطة الاستثمارية من الإعدادات"""
+        settings_service.set_setting(db_session, "CASH_FLOW_SOURCE_MAPPING", {"EQUIPMENT": "outflows"})
+
+        report = cash_flow.get_cash_flow_report(db_session, START, END)
+        assert report["investing_activities"]["outflows"] == 80
+        assert report["unclassified"]["outflows"] == 0
+        assert report["is_balanced"]
+
+    def test_daily_breakdown_and_account_filter(self, db_session, cash_setup):
+        """التفصيل اليومي يجمع إلى الإجمالي، وفلتر البنك وحده يستبعد الخزنة"""
+        _, bank = cash_setup
+        report = cash_flow.get_cash_flow_report(db_session, START, END, daily=True)
+        assert report["daily"][-1]["closing_balance"] == report["actual_balance"]
+        assert sum(d["net_cash_change"] for d in report["daily"]) == pytest.approx(
+            report["actual_balance"] - report["opening_balance"]
+        )
+
+        bank_only = cash_flow.get_cash_flow_report(db_session, START, END, account_ids=[bank.account_id])
+        assert bank_only["opening_balance"] == 0
+        assert bank_only["operating_activities"]["customer_collections"] == 0
+        assert bank_only["actual_balance"] == 420
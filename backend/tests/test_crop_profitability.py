@@ -0,0 +1,94 @@
+"""
+اختبارات ربحية المحاصيل من التكلفة الفعلية
+Crop Profitability Tests
+"""
+import pytest
+from datetime import date
+from decimal import Decimal
+from app import models
+from app.services import advanced_reports
+
+
+# Fixtures are imported from conftest.py automatically
+
+SALE_DATE = date(2016, 4, 10)
+
+
+@pytest.fixture
+def crop_activity(db_session, test_crop, test_customer, test_season, test_financial_accounts):
+    """بيع 100 كجم بـ 3000 وتكلفة FIFO 1000، مرتجع 20 كجم، ومصروف مباشر 150"""
+    sale = models.Sale(
+        crop_id=test_crop.crop_id, customer_id=test_customer.contact_id,
+        season_id=test_season.season_id, sale_date=SALE_DATE,
+        quantity_sold_kg=100, selling_unit_price=30, selling_pricing_unit="kg",
+        specific_selling_factor=1, total_sale_amount=3000
+    )
+    db_session.add(sale)
+    db_session.flush()
+
+    accounts = test_financial_accounts
+    db_session.add_all([
+        models.GeneralLedger(
+            entry_date=SALE_DATE, account_id=accounts["inventory"].account_id,
+            debit=1000, credit=0, source_type="SALE_COGS", source_id=sale.sale_id
+        ),
+        models.GeneralLedger(
+            entry_date=SALE_DATE, account_id=accounts["inventory"].account_id,
+            debit=0, credit=1000, source_type="SALE_COGS", source_id=sale.sale_id
+        ),
+    ])
+
+    # المرتجع ينقص قيمة وكمية البيع الأصلي (كما في crud.returns)
+    db_session.add(models.SaleReturn(
+        sale_id=sale.sale_id, return_date=SALE_DATE, quantity_kg=20, refund_amount=600
+    ))
+    sale.quantity_sold_kg = 80
+    sale.total_sale_amount = 2400
+
+    db_session.add(models.Expense(
+        expense_date=date(2016, 5, 2), description="نقل", amount=150,
+        expense_type="DIRECT", crop_id=test_crop.crop_id, season_id=test_season.season_id,
+        credit_account_id=accounts["cash"].account_id, debit_account_id=accounts["inventory"].account_id
+    ))
+    db_session.commit()
+    return sale
+
+
+def _row(rows, crop):
+    return [r for r in rows if r["crop_id"] == crop.crop_id]
+
+
+class TestCropProfitability:
+    """اختبارات التقرير"""
+
+    def test_uses_actual_cogs_and_direct_expenses(self, db_session, test_crop, test_season, crop_activity):
+        """التكلفة = COGS للكمية غير المرتجعة + المصروفات المباشرة"""
+        rows = advanced_reports.get_crop_profitability(db_session, season_id=test_season.season_id)
+        (row,) = _row(rows, test_crop)
+
+        assert row["revenue"] == Decimal("2400")
+        assert row["cogs"] == Decimal("800")
+        assert row["direct_expenses"] == Decimal("150")
+        assert row["profit"] == Decimal("1450")
+
+    def test_month_breakdown(self, db_session, test_crop, test_season, crop_activity):
+        """التقسيم الشهري يفصل البيع عن المصروف الذي في شهر لاحق"""
+        rows = advanced_reports.get_crop_profitability(
+            db_session, season_id=test_season.season_id, breakdown="month"
+        )
+        by_month = {r["month"]: r for r in _row(rows, test_crop)}
+
+        assert set(by_month) == {"2016-04", "2016-05"}
+        assert by_month["2016-04"]["profit"] == Decimal("1600")
+        assert by_month["2016-05"]["profit"] == Decimal("-150")
+
+    def test_season_breakdown_and_filter(self, db_session, test_crop, test_season, crop_activity):
+        """التقسيم بالموسم يرجع اسم الموسم، وفلتر موسم آخر لا يرجع شيئاً"""
+        rows = advanced_reports.get_crop_profitability(
+            db_session, season_id=test_season.season_id, breakdown="season"
+        )
+        (row,) = _row(rows, test_crop)
+        assert row["season_name"] == test_season.name
+
+        other = advanced_reports.get_crop_profitability(db_session, season_id=test_season.season_id + 100000)
+        assert _row(other, test_crop) == []
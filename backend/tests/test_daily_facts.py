@@ -0,0 +1,115 @@
+"""
+اختبارات جدول الحقائق اليومية
+Daily Facts Tests
+"""
+from datetime import date, timedelta
+from app import models, schemas
+from app.services import daily_facts, dashboard, purchasing
+
+
+# Fixtures are imported from conftest.py automatically
+
+FACT_DAY = date(2031, 3, 15)
+
+
+def _fact(db_session, crop_id, fact_date=FACT_DAY):
+    db_session.expire_all()
+    return db_session.get(models.DailyFact, (fact_date, crop_id))
+
+
+def _purchase(db_session, crop, supplier, quantity=100.0, price=10.0, purchase_date=FACT_DAY):
+    return purchasing.create_new_purchase(db_session, schemas.PurchaseCreate(
+        crop_id=crop.crop_id,
+        supplier_id=supplier.contact_id,
+        purchase_date=purchase_date,
+        quantity_kg=quantity,
+        unit_price=price,
+        purchasing_pricing_unit="kg",
+        conversion_factor=1.0,
+        amount_paid=0.0
+    ))
+
+
+class TestDailyFactsMaintenance:
+    """اختبارات صيانة الحقائق اليومية مع كل commit"""
+
+    def test_purchase_creates_fact_row(self, db_session, test_crop, test_supplier):
+        """المشتراة تضيف صفاً مجمعاً لليوم والمحصول"""
+        _purchase(db_session, test_crop, test_supplier, quantity=100.0, price=10.0)
+        _purchase(db_session, test_crop, test_supplier, quantity=50.0, price=10.0)
+
+        fact = _fact(db_session, test_crop.crop_id)
+        assert fact is not None
+        assert fact.purchases_count == 2
+        assert fact.purchases_amount == 1500
+        assert fact.purchases_quantity_kg == 150
+
+    def test_date_change_moves_fact(self, db_session, test_crop, test_supplier):
+        """تغيير تاريخ العملية ينقلها من اليوم القديم إلى الجديد"""
+        purchase = _purchase(db_session, test_crop, test_supplier)
+        new_day = FACT_DAY + timedelta(days=1)
+
+        purchase.purchase_date = new_day
+        db_session.commit()
+
+        assert _fact(db_session, test_crop.crop_id) is None
+        assert _fact(db_session, test_crop.crop_id, new_day).purchases_count == 1
+
+    def test_bulk_delete_removes_fact(self, db_session, test_crop, test_supplier):
+        """الحذف الجماعي يعيد حساب المفاتيح المتأثرة"""
+        purchase = _purchase(db_session, test_crop, test_supplier)
+        db_session.query(models.InventoryBatch).filter(
+            models.InventoryBatch.purchase_id == purchase.purchase_id
+        ).delete()
+        db_session.query(models.Purchase).filter(
+            models.Purchase.purchase_id == purchase.purchase_id
+        ).delete()
+        db_session.commit()
+
+        assert _fact(db_session, test_crop.crop_id) is None
+
+    def test_rollback_leaves_facts_untouched(self, db_session, test_crop, test_supplier):
+        """التراجع لا يترك أثراً في الحقائق"""
+        _purchase(db_session, test_crop, test_supplier)
+        purchase = db_session.query(models.Purchase).filter(
+            models.Purchase.crop_id == test_crop.crop_id
+        ).first()
+        purchase.total_cost = 999999
+        db_session.flush()
+        db_session.rollback()
+
+        db_session.commit()
+        assert _fact(db_session, test_crop.crop_id).purchases_amount == 1000
+
+
+class TestDailyFactsReads:
+    """اختبارات القراءة من الحقائق اليومية"""
+
+    def test_chart_reads_facts(self, db_session, test_crop, test_supplier):
+        """الرسم البياني يعرض نفس مجاميع الجداول الخام"""
+        _purchase(db_session, test_crop, test_supplier, quantity=10.0, price=5.0)
+
+        result = dashboard.get_advanced_chart_data(
+            db_session,
+            FACT_DAY - timedelta(days=1),
+            FACT_DAY + timedelta(days=1),
+            compare_start_date=FACT_DAY - timedelta(days=31),
+            compare_end_date=FACT_DAY - timedelta(days=29),
+            crop_id=test_crop.crop_id,
+        )
+
+        assert result["labels"][1] == FACT_DAY.isoformat()
+        assert result["datasets"]["purchases"] == [0, 50, 0]
+        assert len(result["datasets"]["purchases_compare"]) == 3
+        assert result["summary"]["total_purchases"] == 50
+
+    def test_period_totals_match_rebuild(self, db_session, test_crop, test_supplier):
+        """الصيانة التزايدية تطابق إعادة البناء الكاملة"""
+        daily_facts.rebuild_daily_facts(db_session)
+        _purchase(db_session, test_crop, test_supplier)
+        incremental = daily_facts.get_period_totals(db_session)
+
+        daily_facts.rebuild_daily_facts(db_session)
+        rebuilt = daily_facts.get_period_totals(db_session)
+
+        assert incremental == rebuilt
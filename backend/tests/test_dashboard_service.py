@@ -3,8 +3,10 @@
 Dashboard Service Tests
 """
 import pytest
-from datetime import date
+from datetime import date, datetime
+from sqlalchemy import text
 from app import models, schemas
+from app.database import engine
 from app.services import dashboard, purchasing
 
 
@@ -43,6 +45,69 @@ class TestDashboardKPIs:
         assert result is not None
 
 
+class TestDashboardKPICache:
+    """اختبارات الذاكرة المؤقتة لمؤشرات الأداء"""
+    
+    def test_repeated_reads_are_served_from_cache(self, db_session):
+        """القراءة المتكررة بدون ترحيل تأتي من الذاكرة"""
+        dashboard.clear_kpi_cache()
+        first, first_status = dashboard.get_dashboard_kpis_cached(db_session)
+        second, second_status = dashboard.get_dashboard_kpis_cached(db_session)
+        
+        assert first_status == "MISS"
+        assert second_status == "HIT"
+        assert first == second
+    
+    def test_posting_invalidates_only_affected_groups(self, db_session, test_crop, test_supplier):
+        """الترحيل يعيد حساب المجموعات المتأثرة فقط"""
+        before, _ = dashboard.get_dashboard_kpis_cached(db_session)
+        
+        purchase_data = schemas.PurchaseCreate(
+            crop_id=test_crop.crop_id,
+            supplier_id=test_supplier.contact_id,
+            purchase_date=date.today(),
+            quantity_kg=100.0,
+            unit_price=10.0,
+            purchasing_pricing_unit="kg",
+            conversion_factor=1.0,
+            amount_paid=0.0
+        )
+        purchasing.create_new_purchase(db_session, purchase_data)
+        
+        after, status = dashboard.get_dashboard_kpis_cached(db_session)
+        
+        assert status == "PARTIAL"
+        assert after["purchases_count"] == before["purchases_count"] + 1
+        assert after == dashboard._build_kpis({
+            k: v for group in dashboard.KPI_GROUPS.values() for k, v in group[0](db_session).items()
+        })
+
+    def test_other_worker_writes_invalidate(self, db_session, monkeypatch):
+        """كتابة من عامل آخر (بدون أحداث جلسة هذه العملية) تبطل المجموعات المعتمدة عليها"""
+        dashboard.get_dashboard_kpis_cached(db_session)
+        computed = []
+        for group, (compute, tables) in dashboard.KPI_GROUPS.items():
+            monkeypatch.setitem(dashboard.KPI_GROUPS, group, (
+                lambda db, compute=compute, group=group: computed.append(group) or compute(db), tables
+            ))
+
+        with engine.begin() as conn:
+            conn.execute(
+                text("UPDATE settings SET updated_at = :now WHERE key = 'COGS_ACCOUNT_ID'"),
+                {"now": datetime.utcnow()}
+            )
+        db_session.commit()  # إنهاء معاملة القراءة لرؤية كتابة الاتصال الآخر
+
+        _, status = dashboard.get_dashboard_kpis_cached(db_session)
+        assert status == "PARTIAL"
+        assert sorted(computed) == ["cash", "cogs", "today"]
+
+    def test_entries_expire(self, db_session, monkeypatch):
+        dashboard.get_dashboard_kpis_cached(db_session)
+        monkeypatch.setattr(dashboard, "KPI_CACHE_SECONDS", 0)
+        assert dashboard.get_dashboard_kpis_cached(db_session)[1] == "MISS"
+
+
 class TestDashboardAlerts:
     """اختبارات التنبيهات الذكية"""
     
@@ -81,6 +146,76 @@ class TestRecentActivities:
         
         assert len(result) <= 3
 
+    def test_activity_feed_includes_joined_names(self, db_session, test_crop, test_supplier):
+        """أحدث مستند يظهر أولاً بأسماء المحصول والمورد"""
+        feed_day = date(2032, 1, 1)
+        purchase = purchasing.create_new_purchase(db_session, schemas.PurchaseCreate(
+            crop_id=test_crop.crop_id,
+            supplier_id=test_supplier.contact_id,
+            purchase_date=feed_day,
+            quantity_kg=10.0,
+            unit_price=5.0,
+            purchasing_pricing_unit="kg",
+            conversion_factor=1.0,
+            amount_paid=50.0
+        ))
+
+        items = dashboard.get_activity_feed(db_session, limit=10)["items"]
+        ids = [item["id"] for item in items]
+
+        assert f"purchase_{purchase.purchase_id}" in ids
+        first_purchase = next(i for i in items if i["id"] == f"purchase_{purchase.purchase_id}")
+        assert first_purchase["title"] == f"شراء {test_crop.crop_name}"
+        assert first_purchase["contact"] == test_supplier.name
+        assert any(i["type"] == "payment_out" and i["timestamp"] == feed_day.isoformat() for i in items)
+
+    def test_activity_feed_keyset_pages_do_not_overlap(self, db_session):
+        """الصفحات المتتالية لا تتكرر وتحافظ على الترتيب"""
+        first = dashboard.get_activity_feed(db_session, limit=3)
+        if first["next_cursor"] is None:
+            pytest.skip("لا توجد بيانات كافية")
+
+        second = dashboard.get_activity_feed(db_session, limit=3, cursor=first["next_cursor"])
+        combined = dashboard.get_activity_feed(db_session, limit=6)["items"]
+
+        assert [i["id"] for i in first["items"] + second["items"]] == [i["id"] for i in combined]
+
+
+class TestDashboardBatch:
+    """اختبارات دفعة مكونات لوحة التحكم"""
+
+    def test_batch_returns_only_requested_data(self, db_session):
+        """البيانات المرجعة تطابق مكونات إعدادات المستخدم فقط"""
+        layout = dashboard.parse_dashboard_layout('["main_kpis", "secondary_kpis", "charts", "unknown"]')
+        result = dashboard.get_dashboard_batch(db_session, layout)
+
+        assert result["widgets"] == ["main_kpis", "secondary_kpis", "charts"]
+        assert set(result["data"]) == {"kpis", "sales_by_crop"}
+
+    def test_invalid_config_falls_back_to_default_layout(self):
+        """الإعدادات غير الصالحة تعيد التخطيط الافتراضي"""
+        assert dashboard.parse_dashboard_layout('{"theme": "dark"}') == dashboard.DEFAULT_DASHBOARD_LAYOUT
+        assert dashboard.parse_dashboard_layout("not json") == dashboard.DEFAULT_DASHBOARD_LAYOUT
+
+    def test_read_snapshot_ignores_concurrent_commits(self, db_session, test_supplier):
+        """كل القراءات داخل الدفعة ترى نفس اللقطة"""
+        from app.database import SessionLocal, read_snapshot
+
+        def contacts_count():
+            return db_session.query(models.Contact).count()
+
+        with read_snapshot(db_session):
+            before = contacts_count()
+            writer = SessionLocal()
+            try:
+                writer.add(models.Contact(name=f"{test_supplier.name}_snapshot", is_supplier=True))
+                writer.commit()
+            finally:
+                writer.close()
+            assert contacts_count() == before
+
+        assert contacts_count() == before + 1
+
 
 class TestCurrentSeasonSummary:
     """اختبارات ملخص الموسم الحالي"""
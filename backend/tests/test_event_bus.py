@@ -0,0 +1,197 @@
+"""
+اختبارات ناقل الأحداث والتحديثات الحية
+Event Bus / Live Updates Tests
+"""
+import asyncio
+import uuid
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from fastapi import HTTPException
+from app import models, schemas
+from app.api.v1.endpoints import auth as auth_api
+from app.api.v1.endpoints import events as events_api
+from app.auth import dependencies
+from app.auth.jwt import create_access_token
+from app.core import settings as settings_service
+from app.core.event_bus import event_bus
+from app.crud import finance as finance_crud
+from app.services import accounting_engine
+
+
+# Fixtures are imported from conftest.py automatically
+
+
+ADMIN = SimpleNamespace(user_id=0, is_superuser=True)
+
+
+@pytest.fixture
+def member(db_session):
+    """مستخدم بدور يقرأ المبيعات فقط (بدون dashboard:view و treasury:read)"""
+    role = auth_api.create_role(
+        auth_api.RoleCreate(name=f"role_{uuid.uuid4().hex[:8]}", name_ar="دور اختبار", permissions=["sales:read"]),
+        db=db_session, current_user=ADMIN
+    )
+    user = asyncio.run(auth_api.create_user(
+        auth_api.UserCreate(username=f"user_{uuid.uuid4().hex[:8]}", password="secret", full_name="مستخدم", role_id=role.role_id),
+        db=db_session, current_user=ADMIN
+    ))
+    yield user
+    db_session.query(models.User).filter(models.User.user_id == user.user_id).delete()
+    db_session.query(models.Role).filter(models.Role.role_id == role.role_id).delete()
+    db_session.commit()
+    dependencies.invalidate_auth_cache()
+
+
+def _deactivate(db_session, user):
+    """مثل تعطيل الحساب من endpoint تعديل المستخدم"""
+    db_session.query(models.User).filter(models.User.user_id == user.user_id).update({"is_active": False})
+    db_session.commit()
+    dependencies.invalidate_auth_cache()
+
+
+class _Request:
+    async def is_disconnected(self):
+        return False
+
+
+def _stream(username, on_started, events=2):
+    """فتح البث، تنفيذ on_started بعد بدء الاستماع، ثم جمع الرسائل حتى events رسالة أو نهاية البث"""
+    async def run():
+        response = await events_api.stream_events(_Request(), token=create_access_token({"sub": username}))
+        stream = response.body_iterator
+        received = []
+        task = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        on_started()
+        try:
+            while len(received) < events:
+                received.append(await asyncio.wait_for(task, 1))
+                task = asyncio.ensure_future(stream.__anext__())
+        except (StopAsyncIteration, asyncio.TimeoutError):
+            pass
+        finally:
+            task.cancel()
+            await stream.aclose()
+        return received
+
+    return asyncio.run(run())
+
+
+def _collect_events(action):
+    """تنفيذ action أثناء وجود مشترك، ثم إرجاع كل الأحداث المستلمة"""
+    async def run():
+        subscription = event_bus.subscribe()
+        try:
+            action()
+            await asyncio.sleep(0)
+            return subscription.drain()
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return asyncio.run(run())
+
+
+class TestLiveUpdates:
+    """اختبارات نشر الأحداث بعد الـ commit"""
+
+    def test_commit_publishes_changes_and_notification(self, db_session):
+        """التنبيه الجديد يُنشر مع أسماء الجداول بعد الـ commit"""
+        def action():
+            db_session.add(models.Notification(
+                type="SYSTEM", title="اختبار", message="رسالة اختبار"
+            ))
+            db_session.commit()
+
+        events = _collect_events(action)
+        types = [e["type"] for e in events]
+
+        assert "changes" in types
+        assert "notifications" in next(e for e in events if e["type"] == "changes")["data"]
+        notification = next(e for e in events if e["type"] == "notification")["data"]
+        assert notification["title"] == "اختبار"
+        assert notification["id"] is not None
+
+    def test_rollback_publishes_nothing(self, db_session):
+        """التراجع لا ينشر أي حدث"""
+        def action():
+            db_session.add(models.Notification(
+                type="SYSTEM", title="ملغى", message="لن يُحفظ"
+            ))
+            db_session.flush()
+            db_session.rollback()
+
+        assert _collect_events(action) == []
+
+    def test_treasury_event_for_every_cash_account(self, db_session):
+        """حركة على حساب بنك في CASH_ACCOUNT_IDS تُنشر كحدث خزينة مثل الخزنة الرئيسية"""
+        unique_id = uuid.uuid4().hex[:8]
+        bank = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+            account_name=f"Live Bank {unique_id}", account_type="ASSET", code=f"LVB{unique_id}"
+        ))
+        other = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+            account_name=f"Live Other {unique_id}", account_type="REVENUE", code=f"LVO{unique_id}"
+        ))
+        cash_id = int(settings_service.get_setting(db_session, "CASH_ACCOUNT_ID"))
+        settings_service.set_setting(db_session, "CASH_ACCOUNT_IDS", [cash_id, bank.account_id])
+
+        def action():
+            accounting_engine.get_engine(db_session).create_balanced_entry(
+                entry_date=date(2012, 4, 1),
+                source_type="CASH_RECEIPT",
+                source_id=1,
+                entries=[
+                    accounting_engine.LedgerEntry(account_id=bank.account_id, debit=75, credit=0),
+                    accounting_engine.LedgerEntry(account_id=other.account_id, debit=0, credit=75)
+                ]
+            )
+            db_session.commit()
+
+        try:
+            events = _collect_events(action)
+        finally:
+            db_session.query(models.Settings).filter(models.Settings.key == "CASH_ACCOUNT_IDS").delete()
+            settings_service._settings_cache.pop("CASH_ACCOUNT_IDS", None)
+            db_session.commit()
+
+        treasury = [e["data"] for e in events if e["type"] == "treasury"]
+        assert len(treasury) == 1 and treasury[0]["debit"] == 75
+
+    def test_no_subscribers_is_noop(self, db_session):
+        """بدون مشتركين لا يتم تجميع أي شيء في الجلسة"""
+        db_session.add(models.Notification(
+            type="SYSTEM", title="بدون مشتركين", message="-"
+        ))
+        db_session.flush()
+
+        assert "live_updates_pending" not in db_session.info
+        db_session.rollback()
+
+
+class TestEventStreamAccess:
+    """اختبارات التحقق من المستخدم وصلاحياته في بث SSE"""
+
+    def test_inactive_user_rejected(self, db_session, member):
+        _deactivate(db_session, member)
+
+        with pytest.raises(HTTPException) as exc:
+            _stream(member.username, lambda: None)
+        assert exc.value.status_code == 403
+
+    def test_kpis_and_treasury_need_permissions(self, db_session, member):
+        def publish():
+            event_bus.publish("treasury", {"entry_id": 1})
+            event_bus.publish("notification", {"user_id": member.user_id, "title": "لك"})
+
+        received = _stream(member.username, publish)
+        assert len(received) == 1 and received[0].startswith("event: notification")
+
+    def test_deactivation_ends_stream(self, db_session, member, monkeypatch):
+        monkeypatch.setattr(events_api, "ACCESS_CHECK_SECONDS", 0)
+
+        def deactivate():
+            _deactivate(db_session, member)
+            event_bus.publish("notification", {"user_id": member.user_id, "title": "بعد التعطيل"})
+
+        assert _stream(member.username, deactivate) == []
+
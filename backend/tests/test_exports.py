@@ -0,0 +1,86 @@
+"""
+اختبارات التصدير المتدفق
+Streaming Export Tests
+"""
+import csv
+import io
+import uuid
+import zipfile
+from datetime import date
+from app import schemas
+from app.crud import finance as finance_crud
+from app.services import accounting_engine, exports
+
+
+# Fixtures are imported from conftest.py automatically
+
+EXPORT_DATE = date(2018, 3, 15)
+
+
+def _post_entry(db_session, amount):
+    unique_id = uuid.uuid4().hex[:8]
+    revenue = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"Export Revenue {unique_id}", account_type="REVENUE", code=f"XREV{unique_id}"
+    ))
+    cash = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"Export Cash {unique_id}", account_type="ASSET", code=f"XCASH{unique_id}"
+    ))
+    accounting_engine.get_engine(db_session).create_balanced_entry(
+        entry_date=EXPORT_DATE,
+        source_type="EXPORT_TEST",
+        source_id=1,
+        entries=[
+            accounting_engine.LedgerEntry(account_id=cash.account_id, debit=amount, credit=0),
+            accounting_engine.LedgerEntry(account_id=revenue.account_id, debit=0, credit=amount)
+        ]
+    )
+    db_session.commit()
+    return revenue
+
+
+def _ledger_chunks(db_session, chunk_size=exports.EXPORT_CHUNK_SIZE):
+    return exports.iter_export_chunks(db_session, "ledger", EXPORT_DATE, EXPORT_DATE, chunk_size=chunk_size)
+
+
+class TestStreamingExport:
+    """اختبارات ملفات CSV و XLSX"""
+
+    def test_csv_contains_filtered_ledger_rows(self, db_session):
+        """ملف CSV يحتوي العناوين وقيود الفترة فقط"""
+        revenue = _post_entry(db_session, 125)
+
+        headers, chunks = _ledger_chunks(db_session)
+        content = b"".join(exports.write_csv(headers, chunks)).decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(content)))
+
+        assert rows[0] == headers
+        assert all(row[1] == EXPORT_DATE.isoformat() for row in rows[1:])
+        revenue_row = next(row for row in rows if row[2] == revenue.account_name)
+        assert revenue_row[4] == "125"
+
+    def test_rows_are_fetched_in_chunks(self, db_session):
+        """الصفوف تُرسل على دفعات بالحجم المحدد"""
+        _post_entry(db_session, 10)
+        _post_entry(db_session, 20)
+
+        _, chunks = _ledger_chunks(db_session, chunk_size=1)
+        sizes = [len(chunk) for chunk in chunks]
+
+        assert len(sizes) >= 4
+        assert set(sizes) == {1}
+
+    def test_xlsx_is_valid_workbook(self, db_session):
+        """ملف XLSX المتدفق صالح ويحتوي الورقة والصفوف"""
+        revenue = _post_entry(db_session, 75)
+
+        headers, chunks = _ledger_chunks(db_session)
+        content = b"".join(exports.write_xlsx(headers, chunks, sheet_name="ledger"))
+
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            assert archive.testzip() is None
+            assert "xl/workbook.xml" in archive.namelist()
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+
+        assert sheet.endswith("</sheetData></worksheet>")
+        assert revenue.account_name in sheet
+        assert '<c t="n"><v>75' in sheet
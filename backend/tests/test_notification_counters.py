@@ -0,0 +1,124 @@
+"""
+اختبارات عدادات التنبيهات غير المقروءة والاستطلاع الطويل
+Notification Counter Tests
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, or_, text
+from app import models
+from app.api.v1.endpoints import notifications as notifications_api
+from app.database import SessionLocal, engine
+from app.services import alerts, notification_counters
+
+
+# Fixtures are imported from conftest.py automatically
+
+
+@pytest.fixture
+def user(db_session):
+    return db_session.query(models.User).first()
+
+
+def _actual_unread(db_session, user_id):
+    db_session.expire_all()
+    return db_session.query(models.Notification).filter(
+        or_(models.Notification.user_id == user_id, models.Notification.user_id == None),
+        models.Notification.is_read == False
+    ).count()
+
+
+def _statements(fn):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return result, statements
+
+
+class TestNotificationCounters:
+    """اختبارات العدادات وتحديد الكل كمقروء والاستطلاع الطويل"""
+
+    def test_counter_follows_insert_and_read(self, db_session, user):
+        user_id = user.user_id
+        own = alerts.create_notification(db_session, "t", "own", "SYSTEM", user_id=user_id)
+        alerts.create_notification(db_session, "t", "broadcast", "SYSTEM")
+        assert notification_counters.get_unread_count(db_session, user_id) == _actual_unread(db_session, user_id)
+
+        alerts.mark_as_read(db_session, own.notification_id)
+        alerts.mark_as_read(db_session, own.notification_id)  # قراءة مكررة لا تنقص العداد مرتين
+        assert notification_counters.get_unread_count(db_session, user_id) == _actual_unread(db_session, user_id)
+
+        # العدد من الذاكرة: لا استعلام عند تحديث الشارة
+        count, statements = _statements(lambda: notification_counters.get_unread_count(db_session, user_id))
+        assert statements == []
+        assert count == _actual_unread(db_session, user_id)
+
+    def test_mark_all_is_single_update(self, db_session, user):
+        for i in range(3):
+            alerts.create_notification(db_session, "t", f"bulk {i}", "SYSTEM", user_id=user.user_id)
+
+        read, statements = _statements(lambda: alerts.mark_all_as_read(db_session, user_id=user.user_id))
+        updates = [s for s in statements if s.lstrip().upper().startswith("UPDATE NOTIFICATIONS")]
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM notifications" in s]
+        assert read >= 3
+        assert len(updates) == 1 and selects == []
+        assert notification_counters.get_unread_count(db_session, user.user_id) == 0 == _actual_unread(db_session, user.user_id)
+
+    def test_long_poll_wakes_on_new_notification(self, db_session, user):
+        current_user = SimpleNamespace(user_id=user.user_id)
+        known = notification_counters.get_unread_count(db_session, user.user_id)
+
+        def notify():
+            db = SessionLocal()
+            try:
+                alerts.create_notification(db, "t", "poll wake", "SYSTEM", user_id=user.user_id)
+            finally:
+                db.close()
+
+        async def scenario():
+            poll = asyncio.create_task(
+                notifications_api.poll_notifications(count=known, timeout=5, current_user=current_user)
+            )
+            await asyncio.sleep(0.1)
+            assert not poll.done()
+            await run_in_threadpool(notify)
+            return await asyncio.wait_for(poll, 5)
+
+        result = asyncio.run(scenario())
+        assert result["count"] == known + 1
+        assert [n["message"] for n in result["notifications"]] == ["poll wake"]
+
+    def test_long_poll_sees_other_worker_writes(self, db_session, user, monkeypatch):
+        monkeypatch.setattr(notifications_api, "POLL_RECHECK_SECONDS", 0.2)
+        current_user = SimpleNamespace(user_id=user.user_id)
+        known = notification_counters.get_unread_count(db_session, user.user_id, fresh=True)
+
+        def other_worker():
+            # كتابة مباشرة بدون جلسة ORM: لا حدث في ناقل أحداث هذه العملية
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "INSERT INTO notifications (user_id, type, title, message, is_read, created_at) "
+                    "VALUES (:u, 'SYSTEM', 't', 'other worker', 0, CURRENT_TIMESTAMP)"
+                ), {"u": user.user_id})
+                conn.execute(text(
+                    "INSERT INTO notification_counters (user_id, unread_count) VALUES (:u, 1) "
+                    "ON CONFLICT (user_id) DO UPDATE SET unread_count = unread_count + 1"
+                ), {"u": user.user_id})
+
+        async def scenario():
+            poll = asyncio.create_task(
+                notifications_api.poll_notifications(count=known, timeout=10, current_user=current_user)
+            )
+            await asyncio.sleep(0.1)
+            await run_in_threadpool(other_worker)
+            return await asyncio.wait_for(poll, 2)
+
+        assert asyncio.run(scenario())["count"] == known + 1
@@ -0,0 +1,85 @@
+"""
+اختبارات ترقيم الصفحات بالمؤشر
+Keyset Pagination Tests
+"""
+import uuid
+import pytest
+from datetime import date
+from fastapi import HTTPException
+from app import schemas
+from app.crud import finance as finance_crud
+from app.services import accounting_engine, reporting
+
+
+# Fixtures are imported from conftest.py automatically
+
+
+@pytest.fixture
+def ledger_account(db_session):
+    """حساب بقيود في أيام مختلفة (قيدان في نفس اليوم لاختبار كسر التعادل بالمعرّف)"""
+    unique_id = uuid.uuid4().hex[:8]
+    account = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"Page Account {unique_id}", account_type="ASSET", code=f"PG{unique_id}"
+    ))
+    other = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"Page Other {unique_id}", account_type="REVENUE", code=f"PGO{unique_id}"
+    ))
+    for day in (1, 2, 2, 3, 4):
+        _post(db_session, account, other, date(2017, 7, day))
+    return account, other
+
+
+def _post(db_session, account, other, entry_date):
+    accounting_engine.get_engine(db_session).create_balanced_entry(
+        entry_date=entry_date,
+        source_type="PAGE_TEST",
+        source_id=1,
+        entries=[
+            accounting_engine.LedgerEntry(account_id=account.account_id, debit=10, credit=0),
+            accounting_engine.LedgerEntry(account_id=other.account_id, debit=0, credit=10)
+        ]
+    )
+    db_session.commit()
+
+
+def _page(db_session, account, cursor=None, with_count=False):
+    return reporting.get_general_ledger_entries(
+        db_session, account_id=account.account_id, limit=2, cursor=cursor, with_count=with_count
+    )
+
+
+class TestKeysetPagination:
+    """اختبارات المؤشر"""
+
+    def test_pages_cover_all_rows_once(self, db_session, ledger_account):
+        """المرور على كل الصفحات يرجع نفس ترتيب القائمة الكاملة بدون تكرار"""
+        account, _ = ledger_account
+        full = reporting.get_general_ledger_entries(db_session, account_id=account.account_id)
+
+        first = _page(db_session, account, with_count=True)
+        assert first.total_count == 5
+
+        seen, page = list(first), first
+        while page.next_cursor:
+            page = _page(db_session, account, cursor=page.next_cursor)
+            seen.extend(page)
+
+        assert [e.entry_id for e in seen] == [e.entry_id for e in full]
+
+    def test_inserts_do_not_shift_next_page(self, db_session, ledger_account):
+        """قيد جديد بعد قراءة الصفحة الأولى لا يسبب تكرار صفوف في الصفحة التالية"""
+        account, other = ledger_account
+        first = _page(db_session, account)
+
+        _post(db_session, account, other, date(2017, 7, 5))
+        second = _page(db_session, account, cursor=first.next_cursor)
+
+        assert not {e.entry_id for e in first} & {e.entry_id for e in second}
+        assert all(e.entry_date <= first[-1].entry_date for e in second)
+
+    def test_invalid_cursor_rejected(self, db_session, ledger_account):
+        """مؤشر تالف يرجع خطأ 400"""
+        account, _ = ledger_account
+        with pytest.raises(HTTPException) as exc:
+            _page(db_session, account, cursor="not-a-cursor")
+        assert exc.value.status_code == 400
@@ -0,0 +1,52 @@
+"""
+اختبارات تصدير Parquet
+Parquet Export Tests
+"""
+import os
+import pytest
+from datetime import date
+from fastapi import HTTPException
+from app.services import parquet_export
+
+
+# Fixtures are imported from conftest.py automatically
+
+
+class TestParquetExport:
+    """اختبارات التقسيم والتصدير التزايدي وغياب pyarrow"""
+
+    def test_partition_layout(self):
+        assert parquet_export._partition_dir("sales", date(2024, 3, 9), 7) == "sales/month=2024-03/crop_id=7"
+        assert parquet_export._partition_dir("general_ledger", date(2024, 3, 9), None) == "general_ledger/month=2024-03"
+
+    def test_missing_pyarrow_is_reported(self, db_session, monkeypatch, tmp_path):
+        monkeypatch.setattr(parquet_export, "pq", None)
+        with pytest.raises(HTTPException) as exc:
+            parquet_export.export_parquet(db_session, output_dir=str(tmp_path))
+        assert exc.value.status_code == 503
+        assert not os.listdir(tmp_path)
+
+    def test_incremental_export(self, db_session, tmp_path, test_crop):
+        """التشغيل الثاني لا يكتب شيئاً، وصف جديد يضاف في ملف جديد فقط"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        from app import models
+
+        first = parquet_export.export_parquet(db_session, ["daily_prices"], output_dir=str(tmp_path))
+        again = parquet_export.export_parquet(db_session, ["daily_prices"], output_dir=str(tmp_path))
+        assert again["tables"]["daily_prices"]["rows"] == 0
+
+        db_session.add(models.DailyPrice(
+            crop_id=test_crop.crop_id, price_date=date(2013, 4, 2),
+            opening_price=10, high_price=12, low_price=9, closing_price=11, average_price=10
+        ))
+        db_session.commit()
+        third = parquet_export.export_parquet(db_session, ["daily_prices"], output_dir=str(tmp_path))
+        assert third["tables"]["daily_prices"]["rows"] == 1
+        assert third["tables"]["daily_prices"]["watermark"] > first["tables"]["daily_prices"]["watermark"]
+
+        manifest = parquet_export.read_manifest(str(tmp_path))
+        new_file = manifest["tables"]["daily_prices"]["files"][-1]
+        assert new_file["path"].startswith(f"daily_prices/month=2013-04/crop_id={test_crop.crop_id}/")
+        table = pq.read_table(os.path.join(tmp_path, new_file["path"]))
+        assert table.num_rows == 1
+        assert pq.ParquetFile(os.path.join(tmp_path, new_file["path"])).metadata.row_group(0).column(0).compression == "ZSTD"
@@ -0,0 +1,100 @@
+"""
+اختبارات ذاكرة المصادقة (المستخدم النشط وصلاحيات الدور بدون قاعدة البيانات)
+Authorization Cache Tests
+"""
+import asyncio
+import uuid
+import pytest
+from types import SimpleNamespace
+from fastapi import HTTPException
+from sqlalchemy import event
+from app import models
+from app.api.v1.endpoints import auth as auth_api
+from app.auth import dependencies
+from app.auth.jwt import create_access_token
+from app.database import engine
+
+
+# Fixtures are imported from conftest.py automatically
+
+ADMIN = SimpleNamespace(user_id=0, is_superuser=True)
+
+
+@pytest.fixture
+def roles(db_session):
+    created = [
+        auth_api.create_role(
+            auth_api.RoleCreate(name=f"role_{uuid.uuid4().hex[:8]}", name_ar="دور اختبار", permissions=permissions),
+            db=db_session, current_user=ADMIN
+        )
+        for permissions in (["sales:read", "sales:write"], ["sales:read"])
+    ]
+    yield [r.role_id for r in created]
+    db_session.query(models.Role).filter(models.Role.role_id.in_([r.role_id for r in created])).delete()
+    db_session.commit()
+
+
+@pytest.fixture
+def member(db_session, roles):
+    user = asyncio.run(auth_api.create_user(
+        auth_api.UserCreate(username=f"user_{uuid.uuid4().hex[:8]}", password="secret", full_name="مستخدم", role_id=roles[0]),
+        db=db_session, current_user=ADMIN
+    ))
+    yield user
+    db_session.query(models.User).filter(models.User.user_id == user.user_id).delete()
+    db_session.commit()
+    dependencies.invalidate_auth_cache()
+
+
+def _statements(fn):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return result, statements
+
+
+def _authorize(db_session, username, permission="sales:write"):
+    """نفس سلسلة الاعتماديات في الطلب: المستخدم الحالي ثم فحص الصلاحية"""
+    token = create_access_token({"sub": username})
+    user = asyncio.run(dependencies.get_current_user(token=token, db=db_session))
+    checker = dependencies.require_permissions([permission])
+    return asyncio.run(checker(current_user=user, db=db_session))
+
+
+class TestPermissionCache:
+    """اختبارات الذاكرة وإبطالها من endpoints التعديل"""
+
+    def test_hot_path_does_not_query(self, db_session, member):
+        assert _authorize(db_session, member.username).user_id == member.user_id
+
+        user, statements = _statements(lambda: _authorize(db_session, member.username))
+        assert statements == []
+        assert user.user_id == member.user_id and user.full_name == "مستخدم"
+
+    def test_role_change_invalidates_permissions(self, db_session, member, roles):
+        _authorize(db_session, member.username)
+
+        auth_api.update_user(
+            member.user_id, auth_api.UserUpdate(role_id=roles[1]), db=db_session, current_user=ADMIN
+        )
+        assert _authorize(db_session, member.username, "sales:read").role_id == roles[1]
+        with pytest.raises(HTTPException) as exc:
+            _authorize(db_session, member.username)
+        assert exc.value.status_code == 403
+
+    def test_deactivated_user_is_rejected(self, db_session, member):
+        _authorize(db_session, member.username)
+
+        auth_api.update_user(
+            member.user_id, auth_api.UserUpdate(is_active=False), db=db_session, current_user=ADMIN
+        )
+        with pytest.raises(HTTPException) as exc:
+            _authorize(db_session, member.username)
+        assert exc.value.status_code == 403 and exc.value.detail == "الحساب معطل"
@@ -0,0 +1,59 @@
+"""
+اختبارات تخزين عدادات تحديد المعدل في SQLite (مشترك بين العمليات)
+Rate Limit Storage Tests
+"""
+import subprocess
+import sys
+import time
+import pytest
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from app.core.rate_limit_storage import SQLiteStorage
+
+
+# Fixtures are imported from conftest.py automatically
+
+
+@pytest.fixture
+def uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'rate_limits.db'}"
+
+
+class TestRateLimitStorage:
+    """اختبارات النافذة الثابتة والمشاركة بين العمليات"""
+
+    def test_window_counts_and_expires(self, uri):
+        storage = storage_from_string(uri)
+        assert isinstance(storage, SQLiteStorage)
+
+        assert [storage.incr("k", 0.2) for _ in range(3)] == [1, 2, 3]
+        assert storage.get("k") == 3 and storage.get_expiry("k") > time.time()
+
+        time.sleep(0.25)
+        assert storage.get("k") == 0
+        # النافذة المنتهية تبدأ من جديد في نفس جملة الزيادة
+        assert storage.incr("k", 0.2) == 1
+        time.sleep(0.25)
+        assert storage.purge_expired() == 1
+
+    def test_workers_share_one_limit(self, uri):
+        limit = parse("3/minute")
+        # عاملان (اتصالان مستقلان) على نفس الملف
+        first, second = FixedWindowRateLimiter(SQLiteStorage(uri)), FixedWindowRateLimiter(SQLiteStorage(uri))
+        assert first.hit(limit, "127.0.0.1") and second.hit(limit, "127.0.0.1") and first.hit(limit, "127.0.0.1")
+        assert not second.hit(limit, "127.0.0.1")
+        assert second.hit(limit, "10.0.0.2")
+
+        # العدادات تبقى بعد إعادة التشغيل
+        assert not FixedWindowRateLimiter(SQLiteStorage(uri)).test(limit, "127.0.0.1")
+
+    def test_concurrent_processes_do_not_lose_increments(self, uri):
+        script = (
+            "from app.core.rate_limit_storage import SQLiteStorage\n"
+            f"storage = SQLiteStorage({uri!r})\n"
+            "for _ in range(200): storage.incr('shared', 60)\n"
+        )
+        workers = [subprocess.Popen([sys.executable, "-c", script]) for _ in range(3)]
+        assert all(w.wait(60) == 0 for w in workers)
+        assert SQLiteStorage(uri).get("shared") == 600
@@ -0,0 +1,165 @@
+"""
+اختبارات ذاكرة التقارير الدائمة
+Report Cache Tests
+"""
+import json
+import uuid
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from app import models, schemas
+from app.crud import finance as finance_crud
+from app.services import reporting, accounting_engine, advanced_reports, report_cache
+
+
+# Fixtures are imported from conftest.py automatically
+
+PERIOD_START = date(2019, 5, 1)
+PERIOD_END = date(2019, 5, 31)
+
+
+@pytest.fixture
+def revenue_accounts(db_session):
+    """حساب إيرادات وحساب نقدية بأسماء فريدة"""
+    unique_id = uuid.uuid4().hex[:8]
+    revenue = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"Cache Revenue {unique_id}",
+        account_type="REVENUE",
+        code=f"CREV{unique_id}"
+    ))
+    cash = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"Cache Cash {unique_id}",
+        account_type="ASSET",
+        code=f"CCASH{unique_id}"
+    ))
+    return revenue, cash
+
+
+def _post(db_session, accounts, entry_date, amount):
+    revenue, cash = accounts
+    entries = accounting_engine.get_engine(db_session).create_balanced_entry(
+        entry_date=entry_date,
+        source_type="CACHE_TEST",
+        source_id=1,
+        entries=[
+            accounting_engine.LedgerEntry(account_id=cash.account_id, debit=amount, credit=0),
+            accounting_engine.LedgerEntry(account_id=revenue.account_id, debit=0, credit=amount)
+        ]
+    )
+    db_session.commit()
+    return entries
+
+
+def _revenue(db_session, accounts):
+    revenue, _ = accounts
+    statement = reporting.generate_income_statement(db_session, PERIOD_START, PERIOD_END)
+    return next(
+        (r["amount"] for r in statement["revenues"] if r["account_name"] == revenue.account_name), 0
+    )
+
+
+def _mark_cached(db_session):
+    """استبدال النتيجة المحفوظة بعلامة لإثبات أن القراءة التالية من الذاكرة"""
+    entry = db_session.query(models.ReportCache).filter(
+        models.ReportCache.report_name == "income_statement",
+        models.ReportCache.range_start == PERIOD_START,
+        models.ReportCache.range_end == PERIOD_END,
+    ).one()
+    entry.result = json.dumps({"revenues": [], "marker": True})
+    db_session.commit()
+
+
+class TestReportCache:
+    """اختبارات صلاحية النتائج المحفوظة"""
+
+    def test_past_period_served_from_cache(self, db_session, revenue_accounts):
+        """تقرير فترة سابقة يُقرأ من الذاكرة ما دام لا توجد قيود جديدة داخلها"""
+        _post(db_session, revenue_accounts, PERIOD_START, 100)
+        assert _revenue(db_session, revenue_accounts) >= 100
+
+        _mark_cached(db_session)
+        statement = reporting.generate_income_statement(db_session, PERIOD_START, PERIOD_END)
+        assert statement.get("marker") is True
+
+    def test_posting_outside_range_keeps_cache(self, db_session, revenue_accounts):
+        """قيد بتاريخ خارج نطاق التقرير لا يبطل النتيجة"""
+        _revenue(db_session, revenue_accounts)
+        _mark_cached(db_session)
+
+        _post(db_session, revenue_accounts, date(2019, 6, 15), 50)
+
+        statement = reporting.generate_income_statement(db_session, PERIOD_START, PERIOD_END)
+        assert statement.get("marker") is True
+
+    def test_backdated_posting_invalidates(self, db_session, revenue_accounts):
+        """قيد بتاريخ سابق داخل النطاق يبطل النتيجة"""
+        before = _revenue(db_session, revenue_accounts)
+        _mark_cached(db_session)
+
+        _post(db_session, revenue_accounts, date(2019, 5, 20), 70)
+
+        assert _revenue(db_session, revenue_accounts) == before + 70
+
+    def test_deleted_entry_invalidates(self, db_session, revenue_accounts):
+        """حذف قيد موجود (لا يكشفه الـ watermark) يبطل النتائج التي تغطي تاريخه"""
+        entries = _post(db_session, revenue_accounts, date(2019, 5, 10), 40)
+        with_entry = _revenue(db_session, revenue_accounts)
+
+        for entry in entries:
+            db_session.delete(entry)
+        db_session.commit()
+
+        assert _revenue(db_session, revenue_accounts) == with_entry - 40
+
+    def test_cached_values_keep_types(self, db_session, revenue_accounts):
+        """النتيجة من الذاكرة تحافظ على Decimal والتواريخ"""
+        _post(db_session, revenue_accounts, PERIOD_START, 10)
+        first = reporting.generate_income_statement(db_session, PERIOD_START, PERIOD_END)
+        second = reporting.generate_income_statement(db_session, PERIOD_START, PERIOD_END)
+
+        assert second == first
+        assert type(second["net_income"]) is type(first["net_income"])
+        assert second["start_date"] == PERIOD_START
+
+    def test_prune_removes_stale_and_old_results(self, db_session, revenue_accounts):
+        """المهمة الدورية تحذف ما أبطله الـ watermark وما تجاوز العمر الأقصى فقط"""
+        _post(db_session, revenue_accounts, date(2019, 5, 15), 10)
+        watermark = db_session.query(func.max(models.GeneralLedger.entry_id)).scalar()
+        now = datetime.utcnow()
+        rows = {
+            "valid": (watermark, now),
+            "stale": (watermark - 1, now),
+            "old": (watermark, now - report_cache.REPORT_CACHE_MAX_AGE - timedelta(days=1)),
+        }
+        keys = {name: uuid.uuid4().hex for name in rows}
+        for name, (entry_watermark, created_at) in rows.items():
+            db_session.add(models.ReportCache(
+                report_name="income_statement", params_key=keys[name],
+                range_start=PERIOD_START, range_end=PERIOD_END,
+                ledger_watermark=entry_watermark, result="{}", created_at=created_at,
+            ))
+        db_session.commit()
+
+        assert report_cache.prune_report_cache(db_session) >= 2
+        remaining = {
+            key for (key,) in db_session.query(models.ReportCache.params_key).filter(
+                models.ReportCache.params_key.in_(keys.values())
+            )
+        }
+        assert remaining == {keys["valid"]}
+        report_cache.clear_report_cache(db_session, "income_statement")
+
+    def test_dependency_table_change_invalidates(self, db_session, test_customer):
+        """تغيير جدول يعتمد عليه التقرير (العملاء) يحذف نتائجه المحفوظة"""
+        def cached_debt_reports():
+            return db_session.query(models.ReportCache).filter(
+                models.ReportCache.report_name == "debt_report"
+            ).count()
+
+        advanced_reports.get_debt_report(db_session)
+        assert cached_debt_reports() == 1
+
+        test_customer.phone = f"012{uuid.uuid4().hex[:8]}"
+        db_session.commit()
+
+        assert cached_debt_reports() == 0
@@ -0,0 +1,153 @@
+"""
+اختبارات مهام التقارير في الخلفية
+Report Jobs Tests
+"""
+import socket
+import subprocess
+import sys
+import time
+import uuid
+import pytest
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from app import models
+from app.services import report_cache, report_jobs, reporting
+
+
+# Fixtures are imported from conftest.py automatically
+
+PARAMS = {"start_date": "2015-01-01", "end_date": "2015-12-31"}
+
+
+class _HeldDispatcher:
+    """موزع لا يبدأ المهام (لاختبار الحالات قبل التنفيذ)"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+        return Future()
+
+
+@pytest.fixture
+def held_dispatcher(monkeypatch):
+    dispatcher = _HeldDispatcher()
+    monkeypatch.setattr(report_jobs, "_executors", lambda: (None, dispatcher))
+    return dispatcher
+
+
+class TestReportJobs:
+    """اختبارات الإرسال والتكرار والإلغاء والتنفيذ"""
+
+    def test_identical_requests_share_job(self, db_session, held_dispatcher):
+        """طلب مطابق (حتى مع اختلاف الشكل) يرجع نفس المهمة النشطة"""
+        first = report_jobs.submit_report_job(db_session, "income_statement_periods", PARAMS)
+        second = report_jobs.submit_report_job(
+            db_session, "income_statement_periods", {**PARAMS, "granularity": "month"}
+        )
+        assert second.job_id == first.job_id
+        assert len(held_dispatcher.submitted) == 1
+        report_jobs.cancel_report_job(db_session, first.job_id)
+
+    def test_cancel_before_start(self, db_session, held_dispatcher):
+        """المهمة الملغاة لا تبدأ، ونتيجتها غير متاحة، وطلب جديد ينشئ مهمة أخرى"""
+        job = report_jobs.submit_report_job(db_session, "income_statement", PARAMS)
+        assert job.job_id in report_jobs._running
+        assert report_jobs.cancel_report_job(db_session, job.job_id).status == "CANCELLED"
+        assert job.job_id not in report_jobs._running
+
+        report_jobs._dispatch(*held_dispatcher.submitted[0])
+        db_session.refresh(job)
+        assert job.status == "CANCELLED" and job.started_at is None
+
+        with pytest.raises(HTTPException) as exc:
+            report_jobs.get_report_job_result(db_session, job.job_id)
+        assert exc.value.status_code == 409
+
+        again = report_jobs.submit_report_job(db_session, "income_statement", PARAMS)
+        assert again.job_id != job.job_id
+        report_jobs.cancel_report_job(db_session, again.job_id)
+
+    def test_invalid_params_rejected(self, db_session, held_dispatcher):
+        with pytest.raises(HTTPException) as exc:
+            report_jobs.submit_report_job(db_session, "income_statement", {**PARAMS, "bogus": 1})
+        assert exc.value.status_code == 400
+        assert held_dispatcher.submitted == []
+
+    def test_worker_does_not_write_report_cache(self, db_session, monkeypatch):
+        """التقارير المتداخلة (حقوق الملكية -> قائمة الدخل) لا تحفظ في الذاكرة المؤقتة داخل العملية المنفذة"""
+        monkeypatch.setattr(report_cache, "_enabled", True)
+        params = {"start_date": "2014-03-01", "end_date": "2014-03-31"}
+
+        def cached_rows():
+            db_session.commit()
+            return db_session.query(models.ReportCache).count()
+
+        before = cached_rows()
+        report_jobs._init_worker()
+        ok, payload = report_jobs.run_report("equity_statement", params)
+        assert ok, payload
+        assert cached_rows() == before
+
+    def test_recovery_fails_only_orphaned_jobs(self, db_session):
+        """مهام العامل الحي (هذا أو عامل آخر) تبقى؛ مهام الحجز المنتهي أو العملية المتوقفة تفشل"""
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        now = datetime.utcnow()
+        owners = {
+            "own": (report_jobs.WORKER_ID, now + report_jobs.LEASE),
+            "other_host": ("other-host:1:abc", now + report_jobs.LEASE),
+            "expired": ("other-host:1:abc", now - timedelta(seconds=1)),
+            "dead_process": (f"{socket.gethostname()}:{dead.pid}:abc", now + report_jobs.LEASE),
+            "no_lease": (None, None),
+        }
+        jobs = {}
+        for name, (locked_by, locked_until) in owners.items():
+            jobs[name] = models.ReportJob(
+                job_id=uuid.uuid4().hex, report_name="income_statement", params_key=uuid.uuid4().hex,
+                status="RUNNING", locked_by=locked_by, locked_until=locked_until,
+            )
+            db_session.add(jobs[name])
+        db_session.commit()
+
+        try:
+            report_jobs.recover_report_jobs(db_session)
+            db_session.expire_all()
+            statuses = {name: db_session.get(models.ReportJob, job.job_id).status for name, job in jobs.items()}
+            assert statuses == {
+                "own": "RUNNING", "other_host": "RUNNING",
+                "expired": "FAILED", "dead_process": "FAILED", "no_lease": "FAILED",
+            }
+        finally:
+            report_jobs._fail_jobs(db_session, models.ReportJob.job_id.in_([j.job_id for j in jobs.values()]))
+
+    def test_worker_renews_its_leases(self, db_session, held_dispatcher):
+        job = report_jobs.submit_report_job(db_session, "income_statement", PARAMS)
+        try:
+            assert job.locked_by == report_jobs.WORKER_ID
+            job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+            db_session.commit()
+
+            assert report_jobs._renew_leases() >= 1
+            db_session.refresh(job)
+            assert job.locked_until > datetime.utcnow()
+        finally:
+            report_jobs.cancel_report_job(db_session, job.job_id)
+
+    def test_runs_in_process_pool(self, db_session):
+        """التنفيذ الفعلي في عملية منفصلة يرجع نفس نتيجة التقرير المباشر"""
+        try:
+            job = report_jobs.submit_report_job(db_session, "income_statement", PARAMS)
+            deadline = time.time() + 60
+            while job.status in ("PENDING", "RUNNING") and time.time() < deadline:
+                time.sleep(0.2)
+                db_session.refresh(job)
+        finally:
+            report_jobs.shutdown_report_jobs()
+
+        assert job.status == "DONE", job.error
+        expected = reporting.generate_income_statement(db_session, date(2015, 1, 1), date(2015, 12, 31))
+        assert report_jobs.get_report_job_result(db_session, job.job_id) == jsonable_encoder(expected)
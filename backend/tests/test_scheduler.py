@@ -0,0 +1,80 @@
+"""
+اختبارات المجدول الداخلي (cron، القفل، تسجيل النتيجة)
+Scheduler Tests
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import models
+from app.services import scheduler
+
+
+# Fixtures are imported from conftest.py automatically
+
+
+@pytest.fixture
+def due_job(db_session, monkeypatch):
+    """مهمة اختبارية حان موعدها؛ الدالة المنفذة تُستبدل لتسجيل عدد مرات التشغيل"""
+    calls = []
+    monkeypatch.setitem(scheduler.SCHEDULED_JOBS, "test_job", ("*/5 * * * *", "unused:unused"))
+    monkeypatch.setattr(scheduler, "_resolve", lambda name: lambda db: calls.append(name))
+    scheduler.sync_scheduled_jobs(db_session)
+    job = db_session.get(models.ScheduledJob, "test_job")
+    job.next_run_at = datetime.now() - timedelta(minutes=1)
+    db_session.commit()
+
+    yield calls
+
+    db_session.query(models.ScheduledJob).filter(models.ScheduledJob.name == "test_job").delete()
+    db_session.commit()
+
+
+class TestScheduler:
+    """اختبارات جدول التشغيل والحجز الذري"""
+
+    def test_next_run_follows_cron(self):
+        monday = datetime(2026, 10, 19, 10, 7, 30)
+        assert scheduler.next_run("*/15 * * * *", monday) == datetime(2026, 10, 19, 10, 15)
+        assert scheduler.next_run("0 2 * * *", monday) == datetime(2026, 10, 20, 2, 0)
+        assert scheduler.next_run("0 3 * * 0", monday) == datetime(2026, 10, 25, 3, 0)
+        assert scheduler.next_run("0 0 29 2 *", monday) == datetime(2028, 2, 29, 0, 0)
+        with pytest.raises(Exception):
+            scheduler.next_run("61 * * * *", monday)
+
+    def test_sync_keeps_existing_jobs(self, db_session, due_job):
+        job = db_session.get(models.ScheduledJob, "test_job")
+        job.cron = "0 4 * * *"
+        db_session.commit()
+        # عامل آخر يبدأ بعد إضافة المهام: لا خطأ تكرار ولا استبدال للجدول المعدل
+        scheduler.sync_scheduled_jobs(db_session)
+        db_session.expire_all()
+        assert db_session.get(models.ScheduledJob, "test_job").cron == "0 4 * * *"
+        assert db_session.query(models.ScheduledJob).filter(models.ScheduledJob.name == "test_job").count() == 1
+
+    def test_only_one_worker_claims_a_due_job(self, db_session, due_job):
+        now = datetime.now()
+        assert scheduler._claim(db_session, "test_job", now)
+        # عامل آخر (أو دورة متزامنة) لا يحجز المهمة أثناء التشغيل
+        assert not scheduler._claim(db_session, "test_job", now)
+        # بعد انتهاء مدة الحجز (توقف العامل) يمكن حجزها من جديد
+        assert scheduler._claim(db_session, "test_job", now + scheduler.LOCK_LEASE + timedelta(seconds=1))
+
+    def test_run_records_result_and_next_run(self, db_session, due_job, monkeypatch):
+        assert scheduler.run_job("test_job")
+        assert not scheduler.run_job("test_job")  # الموعد التالي لم يحن
+        assert due_job == ["test_job"]
+
+        db_session.expire_all()
+        job = db_session.get(models.ScheduledJob, "test_job")
+        assert job.last_status == "OK" and job.locked_by is None
+        assert job.next_run_at > job.last_run_at
+
+        def fail(db):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(scheduler, "_resolve", lambda name: fail)
+        job.next_run_at = datetime.now() - timedelta(minutes=1)
+        db_session.commit()
+        assert scheduler.run_job("test_job")
+        db_session.expire_all()
+        job = db_session.get(models.ScheduledJob, "test_job")
+        assert job.last_status == "FAILED" and job.last_error == "boom"
@@ -0,0 +1,118 @@
+"""
+اختبارات مجاميع المواسم ومقارنتها
+Season Facts & Season Comparison Tests
+"""
+import uuid
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from app import models
+from app.services import advanced_reports, season_closing, season_facts
+
+
+# Fixtures are imported from conftest.py automatically
+
+SALE_DATE = date(2016, 4, 10)
+
+
+def _add_sale(db_session, crop, customer, season, accounts, kg, amount, cogs):
+    sale = models.Sale(
+        crop_id=crop.crop_id, customer_id=customer.contact_id,
+        season_id=season.season_id, sale_date=SALE_DATE,
+        quantity_sold_kg=kg, selling_unit_price=amount / kg, selling_pricing_unit="kg",
+        specific_selling_factor=1, total_sale_amount=amount
+    )
+    db_session.add(sale)
+    db_session.flush()
+    db_session.add_all([
+        models.GeneralLedger(
+            entry_date=SALE_DATE, account_id=accounts["inventory"].account_id,
+            debit=cogs, credit=0, source_type="SALE_COGS", source_id=sale.sale_id
+        ),
+        models.GeneralLedger(
+            entry_date=SALE_DATE, account_id=accounts["inventory"].account_id,
+            debit=0, credit=cogs, source_type="SALE_COGS", source_id=sale.sale_id
+        ),
+    ])
+    db_session.commit()
+    return sale
+
+
+def _add_expense(db_session, season, accounts, amount, crop=None):
+    db_session.add(models.Expense(
+        expense_date=SALE_DATE, description="مصروف موسم", amount=amount,
+        crop_id=crop.crop_id if crop else None, season_id=season.season_id,
+        credit_account_id=accounts["cash"].account_id, debit_account_id=accounts["inventory"].account_id
+    ))
+    db_session.commit()
+
+
+@pytest.fixture
+def other_season(db_session):
+    season = models.Season(
+        name=f"موسم مقارنة {uuid.uuid4().hex[:8]}",
+        start_date=date.today() + timedelta(days=100),
+        end_date=date.today() + timedelta(days=190),
+        status="UPCOMING"
+    )
+    db_session.add(season)
+    db_session.commit()
+    return season
+
+
+class TestSeasonFacts:
+    """اختبارات المجاميع"""
+
+    def test_rollup_follows_postings(self, db_session, test_crop, test_customer, test_season, test_financial_accounts):
+        """البيع وقيد تكلفته والمصروفات تنعكس فوراً، والتعديل ينقل القيم"""
+        accounts = test_financial_accounts
+        sale = _add_sale(db_session, test_crop, test_customer, test_season, accounts, 100, 3000, 1000)
+        _add_expense(db_session, test_season, accounts, 200)
+        _add_expense(db_session, test_season, accounts, 50, crop=test_crop)
+
+        totals = season_facts.get_season_totals(db_session, [test_season.season_id])[test_season.season_id]
+        assert totals["sales_amount"] == Decimal("3000")
+        assert totals["cogs_amount"] == Decimal("1000")
+        assert totals["expenses_amount"] == Decimal("250")
+        assert totals["sales_count"] == 1
+
+        sale.total_sale_amount = 3500
+        db_session.commit()
+        summary = season_closing.get_season_summary(db_session, test_season.season_id)
+        assert Decimal(summary["statistics"]["total_revenue"]) == Decimal("3500")
+        assert summary["statistics"]["expenses_count"] == 2
+
+    def test_close_freezes_rollup(self, db_session, test_crop, test_customer, test_season, test_financial_accounts):
+        """الإغلاق يستخدم تكلفة البيع الفعلية ويجمد الأرقام ضد أي تعديل لاحق"""
+        accounts = test_financial_accounts
+        _add_sale(db_session, test_crop, test_customer, test_season, accounts, 100, 3000, 1000)
+        _add_expense(db_session, test_season, accounts, 300)
+
+        result = season_closing.close_season(db_session, test_season.season_id)
+        assert Decimal(result["summary"]["total_cogs"]) == Decimal("1000")
+        assert Decimal(result["summary"]["net_profit"]) == Decimal("1700")
+
+        _add_expense(db_session, test_season, accounts, 999)
+        totals = season_facts.get_season_totals(db_session, [test_season.season_id])[test_season.season_id]
+        assert totals["expenses_amount"] == Decimal("300")
+        assert totals["frozen_at"] is not None
+
+    def test_comparison_side_by_side(self, db_session, test_crop, test_customer, test_season,
+                                     other_season, test_financial_accounts):
+        """المقارنة ترجع المواسم بالترتيب المطلوب مع تفصيل المحاصيل"""
+        accounts = test_financial_accounts
+        _add_sale(db_session, test_crop, test_customer, test_season, accounts, 100, 3000, 1000)
+        _add_sale(db_session, test_crop, test_customer, other_season, accounts, 50, 2000, 600)
+        _add_expense(db_session, other_season, accounts, 100)
+
+        rows = advanced_reports.get_season_comparison(
+            db_session, [other_season.season_id, test_season.season_id]
+        )
+        assert [r["season_id"] for r in rows] == [other_season.season_id, test_season.season_id]
+
+        other, first = rows
+        assert other["totals"]["net_profit"] == Decimal("1300")
+        assert first["totals"]["gross_profit"] == Decimal("2000")
+        (crop_row,) = [c for c in first["crops"] if c["crop_id"] == test_crop.crop_id]
+        assert crop_row["sold_kg"] == Decimal("100")
+        assert any(c["crop_id"] is None for c in other["crops"])
@@ -0,0 +1,107 @@
+"""
+اختبارات الجلسات (تجميع آخر نشاط وتخزين سجل الجلسة)
+Session Activity Tests
+"""
+import pytest
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import models
+from app.auth import sessions
+from app.database import engine
+
+
+# Fixtures are imported from conftest.py automatically
+
+
+@pytest.fixture
+def user(db_session):
+    return db_session.query(models.User).filter(models.User.is_active == True).first()
+
+
+@pytest.fixture
+def tokens(db_session, user):
+    created = [sessions.create_session(db_session, user.user_id, "127.0.0.1", "pytest") for _ in range(2)]
+    sessions.flush_session_activity(db_session)
+    yield created
+    sessions._forget(*created)
+
+
+def _writes(fn):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith(("UPDATE", "INSERT", "DELETE")):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return result, statements
+
+
+def _last_activity(db_session, token):
+    db_session.expire_all()
+    return db_session.query(models.Session.last_activity).filter(models.Session.session_token == token).scalar()
+
+
+class TestSessionActivity:
+    """اختبارات الكتابة المؤجلة لآخر نشاط"""
+
+    def test_reads_do_not_write(self, db_session, user, tokens):
+        before = _last_activity(db_session, tokens[0])
+
+        def validate_many():
+            return [sessions.validate_session(db_session, t) for t in tokens * 5]
+
+        users, writes = _writes(validate_many)
+        assert {u.user_id for u in users} == {user.user_id}
+        assert writes == []
+        assert _last_activity(db_session, tokens[0]) == before
+
+    def test_flush_is_one_multi_row_update(self, db_session, tokens):
+        for token in tokens:
+            sessions.validate_session(db_session, token)
+        pending = dict(sessions._pending_activity)
+
+        flushed, writes = _writes(lambda: sessions.flush_session_activity(db_session))
+        assert flushed == 2 and len(writes) == 1
+        for token in tokens:
+            assert _last_activity(db_session, token) == pending[token]
+
+    def test_logout_flushes_and_invalidates_cache(self, db_session, tokens):
+        token = tokens[0]
+        sessions.validate_session(db_session, token)
+        pending_at = sessions._pending_activity[token]
+
+        assert sessions.delete_session(db_session, token)
+        assert token not in sessions._pending_activity
+        assert _last_activity(db_session, token) == pending_at
+        assert sessions.validate_session(db_session, token) is None
+
+        # سجل مخزن لجلسة منتهية يُرفض دون انتظار إعادة القراءة
+        other = tokens[1]
+        sessions.validate_session(db_session, other)
+        cached = sessions._session_cache[other]
+        sessions._session_cache[other] = cached._replace(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        assert sessions.validate_session(db_session, other) is None
+
+    def test_each_process_flushes_its_own_buffer(self, db_session, tokens, monkeypatch):
+        """مؤقت العملية يكتب مخزنها بدون المجدول (الذي يعمل في عامل واحد فقط)"""
+        sessions.stop_session_activity_flusher(db_session)
+        monkeypatch.setattr(sessions, "ACTIVITY_FLUSH_SECONDS", 0.1)
+        try:
+            sessions.validate_session(db_session, tokens[0])
+            pending_at = sessions._pending_activity[tokens[0]]
+            deadline = time.monotonic() + 3
+            while time.monotonic() < deadline:
+                db_session.commit()  # إنهاء معاملة القراءة لرؤية كتابة خيط المؤقت
+                if _last_activity(db_session, tokens[0]) == pending_at:
+                    break
+                time.sleep(0.05)
+            assert _last_activity(db_session, tokens[0]) == pending_at
+            assert tokens[0] not in sessions._pending_activity
+        finally:
+            sessions.stop_session_activity_flusher(db_session)
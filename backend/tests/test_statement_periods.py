@@ -0,0 +1,102 @@
+"""
+اختبارات القوائم المالية متعددة الفترات
+Multi-Period Financial Statements Tests
+"""
+import uuid
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app import schemas
+from app.core.settings import get_setting
+from app.crud import finance as finance_crud
+from app.database import engine
+from app.services import reporting, accounting_engine, cash_flow
+
+
+# Fixtures are imported from conftest.py automatically
+
+YEAR_START = date(2014, 1, 1)
+YEAR_END = date(2014, 12, 31)
+
+
+@pytest.fixture
+def period_accounts(db_session, test_financial_accounts):
+    """حساب إيرادات وحساب مصروفات بأسماء فريدة مع حركات في شهور مختلفة"""
+    unique_id = uuid.uuid4().hex[:8]
+    revenue = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"Period Revenue {unique_id}", account_type="REVENUE", code=f"PREV{unique_id}"
+    ))
+    expense = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"Period Expense {unique_id}", account_type="EXPENSE", code=f"PEXP{unique_id}"
+    ))
+    cash_id = int(get_setting(db_session, "CASH_ACCOUNT_ID"))
+
+    _post(db_session, cash_id, revenue.account_id, date(2013, 12, 20), 50, "SALE_PAYMENT")
+    _post(db_session, cash_id, revenue.account_id, date(2014, 1, 15), 100, "SALE_PAYMENT")
+    _post(db_session, cash_id, revenue.account_id, date(2014, 3, 3), 300, "SALE_PAYMENT")
+    _post(db_session, expense.account_id, cash_id, date(2014, 3, 9), 40, "EXPENSE")
+    _post(db_session, expense.account_id, cash_id, date(2014, 11, 30), 25, "EXPENSE")
+    return revenue, expense
+
+
+def _post(db_session, debit_account_id, credit_account_id, entry_date, amount, source_type):
+    accounting_engine.get_engine(db_session).create_balanced_entry(
+        entry_date=entry_date,
+        source_type=source_type,
+        source_id=1,
+        entries=[
+            accounting_engine.LedgerEntry(account_id=debit_account_id, debit=amount, credit=0),
+            accounting_engine.LedgerEntry(account_id=credit_account_id, debit=0, credit=amount)
+        ]
+    )
+    db_session.commit()
+
+
+def _line(lines, account, key):
+    return next(line[key] for line in lines if line["account_name"] == account.account_name)
+
+
+class TestStatementPeriods:
+    """كل عمود يطابق القائمة المفردة لنفس الفترة"""
+
+    def test_income_statement_matches_single_periods_in_one_query(self, db_session, period_accounts):
+        revenue, expense = period_accounts
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            matrix = reporting.generate_income_statement_periods.uncached(db_session, YEAR_START, YEAR_END)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert len(statements) == 1
+        assert [p["period"] for p in matrix["periods"]][:3] == ["2014-01", "2014-02", "2014-03"]
+        assert len(matrix["periods"]) == 12
+        assert _line(matrix["revenues"], revenue, "amounts")[2] == 300
+        assert _line(matrix["expenses"], expense, "total") == 65
+
+        for i, period in enumerate(matrix["periods"]):
+            single = reporting.generate_income_statement(db_session, period["start_date"], period["end_date"])
+            assert matrix["net_income"][i] == single["net_income"]
+
+    def test_balance_sheet_carries_balances_forward(self, db_session, period_accounts):
+        matrix = reporting.generate_balance_sheet_periods(db_session, YEAR_START, YEAR_END, "quarter")
+        assert [p["period"] for p in matrix["periods"]] == ["2014-Q1", "2014-Q2", "2014-Q3", "2014-Q4"]
+
+        for i, period in enumerate(matrix["periods"]):
+            single = reporting.generate_balance_sheet(db_session, period["end_date"])
+            assert matrix["total_assets"][i] == single["total_assets"]
+            assert matrix["total_equity"][i] == single["total_equity"]
+
+    def test_cash_flow_matches_single_periods(self, db_session, period_accounts):
+        matrix = cash_flow.get_cash_flow_periods(db_session, YEAR_START, YEAR_END)
+
+        for i, period in enumerate(matrix["periods"]):
+            single = cash_flow.get_cash_flow_report(db_session, period["start_date"], period["end_date"])
+            assert matrix["opening_balance"][i] == pytest.approx(float(single["opening_balance"]))
+            assert matrix["operating_activities"]["net_operating_cash_flow"][i] == \
+                pytest.approx(float(single["operating_activities"]["net_operating_cash_flow"]))
+            assert matrix["actual_balance"][i] == pytest.approx(float(single["actual_balance"]))
@@ -0,0 +1,102 @@
+"""
+اختبارات الخزنة متعددة الحسابات (أدراج وبنوك)
+Multi-Account Treasury Tests
+"""
+import uuid
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app import models, schemas
+from app.core import settings as settings_service
+from app.crud import finance as finance_crud
+from app.database import engine
+from app.services import accounting_engine, treasury
+
+
+# Fixtures are imported from conftest.py automatically
+
+DAY = date(2013, 4, 10)
+
+
+def _post(db_session, debit_account_id, credit_account_id, entry_date, amount, description):
+    accounting_engine.get_engine(db_session).create_balanced_entry(
+        entry_date=entry_date,
+        source_type="CASH_RECEIPT",
+        source_id=1,
+        entries=[
+            accounting_engine.LedgerEntry(account_id=debit_account_id, debit=amount, credit=0, description=description),
+            accounting_engine.LedgerEntry(account_id=credit_account_id, debit=0, credit=amount, description=description)
+        ]
+    )
+    db_session.commit()
+
+
+@pytest.fixture
+def drawers(db_session, test_financial_accounts):
+    """الخزنة الرئيسية وحساب بنك في CASH_ACCOUNT_IDS، مع حركة على كل منهما في نفس اليوم"""
+    unique_id = uuid.uuid4().hex[:8]
+    bank = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"TA Bank {unique_id}", account_type="ASSET", code=f"TAB{unique_id}"
+    ))
+    other = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"TA Other {unique_id}", account_type="REVENUE", code=f"TAO{unique_id}"
+    ))
+    cash_id = int(settings_service.get_setting(db_session, "CASH_ACCOUNT_ID"))
+    settings_service.set_setting(db_session, "CASH_ACCOUNT_IDS", [cash_id, bank.account_id])
+
+    _post(db_session, cash_id, other.account_id, DAY, 120, "drawer receipt")
+    _post(db_session, bank.account_id, other.account_id, DAY, 900, "bank deposit")
+    _post(db_session, other.account_id, bank.account_id, DAY, 150, "bank payment")
+
+    yield cash_id, bank
+
+    db_session.query(models.Settings).filter(models.Settings.key == "CASH_ACCOUNT_IDS").delete()
+    settings_service._settings_cache.pop("CASH_ACCOUNT_IDS", None)
+    db_session.commit()
+
+
+class TestMultiAccountTreasury:
+    """اختبارات الإجمالي الموحد ومركز كل حساب والتصفية"""
+
+    def test_summary_totals_are_sum_of_accounts(self, db_session, drawers):
+        cash_id, bank = drawers
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if "general_ledger" in statement:
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            summary = treasury.get_treasury_summary(db_session, DAY)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        # استعلام واحد مجمّع لحركة اليوم مهما كان عدد الحسابات
+        assert len(statements) == 1
+        by_id = {a.account_id: a for a in summary.accounts}
+        assert set(summary.account_ids) == {cash_id, bank.account_id}
+        assert by_id[bank.account_id].total_in_today == 900
+        assert by_id[bank.account_id].total_out_today == 150
+        for field in ("opening_balance", "total_in_today", "total_out_today", "closing_balance"):
+            assert getattr(summary, field) == sum(getattr(a, field) for a in summary.accounts)
+
+    def test_summary_filtered_to_one_account(self, db_session, drawers):
+        cash_id, bank = drawers
+        summary = treasury.get_treasury_summary(db_session, DAY, [bank.account_id])
+        assert summary.account_ids == [bank.account_id]
+        assert [a.account_name for a in summary.accounts] == [bank.account_name]
+        assert summary.closing_balance == summary.opening_balance + 750
+
+    def test_transactions_carry_their_account(self, db_session, drawers):
+        cash_id, bank = drawers
+        rows = treasury.get_treasury_transactions(db_session, DAY)
+        by_description = {r.description: r for r in rows}
+        assert by_description["drawer receipt"].cash_account_id == cash_id
+        assert by_description["bank deposit"].cash_account_id == bank.account_id
+
+        bank_only = treasury.get_treasury_transactions(db_session, DAY, account_ids=[bank.account_id])
+        assert {r.cash_account_id for r in bank_only} == {bank.account_id}
+        assert bank_only[0].balance == treasury.get_treasury_summary(
+            db_session, DAY, [bank.account_id]
+        ).closing_balance
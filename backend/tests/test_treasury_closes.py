@@ -0,0 +1,120 @@
+"""
+اختبارات الإقفال اليومي للخزنة
+Treasury Day Close Tests
+"""
+import os
+import subprocess
+import sys
+import uuid
+import pytest
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import event
+from app import models, schemas
+from app.core import settings as settings_service
+from app.crud import finance as finance_crud
+from app.database import engine
+from app.services import accounting_engine, treasury, treasury_closes
+
+
+# Fixtures are imported from conftest.py automatically
+
+DAY1 = date(2011, 3, 1)
+DAY2 = date(2011, 3, 5)
+DAY3 = date(2011, 3, 9)
+
+
+def _post(db_session, debit_account_id, credit_account_id, entry_date, amount):
+    accounting_engine.get_engine(db_session).create_balanced_entry(
+        entry_date=entry_date,
+        source_type="CASH_RECEIPT",
+        source_id=1,
+        entries=[
+            accounting_engine.LedgerEntry(account_id=debit_account_id, debit=amount, credit=0),
+            accounting_engine.LedgerEntry(account_id=credit_account_id, debit=0, credit=amount)
+        ]
+    )
+    db_session.commit()
+
+
+def _raw_balance_before(db_session, cash_id, day):
+    GL = models.GeneralLedger
+    rows = db_session.query(GL.debit, GL.credit).filter(GL.account_id == cash_id, GL.entry_date < day).all()
+    return sum((Decimal(str(d)) - Decimal(str(c)) for d, c in rows), Decimal(0))
+
+
+@pytest.fixture
+def cash_days(db_session, test_financial_accounts):
+    """قبض في اليوم الأول وصرف في الثالث على الخزنة الرئيسية"""
+    unique_id = uuid.uuid4().hex[:8]
+    other = finance_crud.create_financial_account(db_session, schemas.FinancialAccountCreate(
+        account_name=f"TDC Other {unique_id}", account_type="REVENUE", code=f"TDC{unique_id}"
+    ))
+    cash_id = int(settings_service.get_setting(db_session, "CASH_ACCOUNT_ID"))
+    _post(db_session, cash_id, other.account_id, DAY1, 100)
+    _post(db_session, other.account_id, cash_id, DAY3, 30)
+    return cash_id, other
+
+
+class TestTreasuryDayClose:
+    """اختبارات اللقطات والترحيل للأمام والجرد"""
+
+    def test_summary_reads_snapshot_and_day_lines(self, db_session, cash_days):
+        cash_id, _ = cash_days
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if "general_ledger" in statement:
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            summary = treasury.get_treasury_summary(db_session, DAY3)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert len(statements) == 1
+        assert summary.opening_balance == _raw_balance_before(db_session, cash_id, DAY3)
+        assert summary.total_out_today == 30
+        assert summary.closing_balance == summary.opening_balance - 30
+
+    def test_back_dated_entry_rolls_forward(self, db_session, cash_days):
+        """قيد بتاريخ سابق يحدّث افتتاحي وختامي كل الأيام اللاحقة"""
+        cash_id, other = cash_days
+        before = db_session.get(models.TreasuryDayClose, (cash_id, DAY3))
+        opening_before = Decimal(str(before.opening_balance))
+
+        _post(db_session, cash_id, other.account_id, DAY2, 50)
+
+        db_session.expire_all()
+        day2 = db_session.get(models.TreasuryDayClose, (cash_id, DAY2))
+        day3 = db_session.get(models.TreasuryDayClose, (cash_id, DAY3))
+        assert day2.total_in == 50
+        assert day3.opening_balance == day2.closing_balance == opening_before + 50
+        assert day3.opening_balance == _raw_balance_before(db_session, cash_id, DAY3)
+
+    def test_close_day_records_variance(self, db_session, cash_days):
+        """الفرق = المعدود - الختامي، ويعاد حسابه إذا تغير الرصيد بقيد لاحق بتاريخ سابق"""
+        cash_id, other = cash_days
+        closing = treasury.get_treasury_summary(db_session, DAY3).closing_balance
+
+        row = treasury_closes.close_treasury_day(db_session, schemas.TreasuryDayCloseCreate(
+            close_date=DAY3, counted_cash=closing - 5
+        ))
+        assert row.variance == -5 and row.closed_at is not None
+
+        _post(db_session, other.account_id, cash_id, DAY2, 10)
+        db_session.refresh(row)
+        assert row.variance == 5
+
+        summary = treasury.get_treasury_summary(db_session, DAY3)
+        assert summary.is_closed and summary.variance == 5
+
+    def test_models_import_first(self):
+        """database.py يستورد خدمة الإقفال أثناء تهيئة models؛ الاستيراد المباشر في عملية جديدة يعمل"""
+        for statement in ("from app import models", "from app.services import alerts"):
+            result = subprocess.run(
+                [sys.executable, "-c", statement], capture_output=True, text=True,
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            )
+            assert result.returncode == 0, result.stderr
@@ -0,0 +1,81 @@
+"""
+اختبارات دفتر النقدية (الطرف المقابل، الرصيد الجاري، المؤشر)
+Treasury Journal Tests
+"""
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app import schemas
+from app.core import settings as settings_service
+from app.database import engine
+from app.services import treasury, treasury_closes
+
+
+# Fixtures are imported from conftest.py automatically
+
+MONTH_START = date(2010, 8, 1)
+MONTH_END = date(2010, 8, 31)
+
+
+@pytest.fixture
+def month_of_receipts(db_session, test_customer, test_financial_accounts):
+    """خمس حركات في شهر واحد: قبض من عميل، وقبض عام، وصرف"""
+    for day in (3, 7, 7, 15):
+        treasury.create_cash_receipt(db_session, schemas.CashReceiptCreate(
+            receipt_date=date(2010, 8, day), amount=100, contact_id=test_customer.contact_id,
+            description=f"journal receipt {day}"
+        ))
+    treasury.create_cash_receipt(db_session, schemas.CashReceiptCreate(
+        receipt_date=date(2010, 8, 20), amount=40, description="journal general receipt"
+    ))
+    return test_customer
+
+
+class TestTreasuryJournal:
+    """اختبارات الإثراء والرصيد والترقيم"""
+
+    def test_single_query_with_counterparty(self, db_session, month_of_receipts):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if "general_ledger" in statement:
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            rows = treasury.get_treasury_transactions(db_session, start_date=MONTH_START, end_date=MONTH_END)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        # استعلام الدفتر + لقطة الرصيد الافتتاحي فقط
+        assert len(statements) == 2
+        by_description = {r.description: r for r in rows}
+        assert by_description["journal receipt 3"].contact_name == month_of_receipts.name
+        assert by_description["journal receipt 3"].account_name == month_of_receipts.name
+        assert by_description["journal general receipt"].contact_name is None
+        assert by_description["journal general receipt"].account_name is not None
+
+    def test_running_balance(self, db_session, month_of_receipts):
+        """رصيد آخر حركة = ختامي الشهر، وكل رصيد = التالي له قبل الحركة"""
+        rows = treasury.get_treasury_transactions(db_session, start_date=MONTH_START, end_date=MONTH_END)
+        cash_id = int(settings_service.get_setting(db_session, "CASH_ACCOUNT_ID"))
+        closing = treasury_closes.get_day_position(db_session, cash_id, MONTH_END)["closing_balance"]
+
+        assert rows[0].balance == closing
+        for newer, older in zip(rows, rows[1:]):
+            signed = newer.amount if newer.type == "IN" else -newer.amount
+            assert newer.balance - signed == older.balance
+
+    def test_cursor_pages_cover_the_month(self, db_session, month_of_receipts):
+        everything = treasury.get_treasury_transactions(db_session, start_date=MONTH_START, end_date=MONTH_END)
+        pages, cursor = [], None
+        while True:
+            page = treasury.get_treasury_transactions(
+                db_session, start_date=MONTH_START, end_date=MONTH_END, limit=2, cursor=cursor
+            )
+            pages.extend(page)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        assert [r.transaction_id for r in pages] == [r.transaction_id for r in everything]
+        assert [r.balance for r in pages] == [r.balance for r in everything]
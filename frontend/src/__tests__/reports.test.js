@@ -26,6 +26,7 @@ import {
     getTopCustomers,
     getDebtAnalysis,
     getRecentActivities,
+    getDashboardBatch,
     getSeasonSummary,
     getAdvancedChartData,
     getBalanceCheck
@@ -177,6 +178,20 @@ describe('Dashboard & Analytics', () => {
         });
     });
 
+    test('getDashboardBatch should send limits and optional widgets', async () => {
+        axios.get.mockResolvedValue({ data: { widgets: [], data: {} } });
+
+        await getDashboardBatch();
+        expect(axios.get).toHaveBeenCalledWith('/reports/dashboard/batch', {
+            params: { top_customers_limit: 5, activities_limit: 10 }
+        });
+
+        await getDashboardBatch(3, 20, ['main_kpis', 'charts']);
+        expect(axios.get).toHaveBeenCalledWith('/reports/dashboard/batch', {
+            params: { top_customers_limit: 3, activities_limit: 20, widgets: 'main_kpis,charts' }
+        });
+    });
+
     test('getSeasonSummary should fetch season summary', async () => {
         const mockData = { season_name: 'Summer 2024', status: 'Active' };
         axios.get.mockResolvedValue({ data: mockData });
@@ -37,13 +37,16 @@ describe('useDashboard Hook', () => {
 
     test('should fetch and return aggregated dashboard data', async () => {
         // Setup mocks
-        reportsApi.getDashboardKpis.mockResolvedValue({ total_sales: 1000 });
-        reportsApi.getDashboardAlerts.mockResolvedValue([{ id: 1, message: 'Low Stock' }]);
-        reportsApi.getSalesByCrop.mockResolvedValue([]);
-        reportsApi.getTopCustomers.mockResolvedValue([]);
-        reportsApi.getRecentActivities.mockResolvedValue([]);
-        reportsApi.getSeasonSummary.mockResolvedValue({ season_name: 'Summer 2024' });
-        reportsApi.getBalanceCheck.mockResolvedValue({ is_balanced: true });
+        reportsApi.getDashboardBatch.mockResolvedValue({
+            widgets: ['quick_stats', 'main_kpis', 'alerts', 'recent_activity'],
+            data: {
+                kpis: { total_sales: 1000 },
+                alerts: [{ id: 1, message: 'Low Stock' }],
+                recent_activities: [],
+                season_summary: { season_name: 'Summer 2024' },
+                balance_check: { is_balanced: true }
+            }
+        });
 
         const { result } = renderHook(() => useDashboard(), { wrapper: createWrapper() });
 
@@ -55,14 +58,33 @@ describe('useDashboard Hook', () => {
         expect(result.current.alerts).toHaveLength(1);
         expect(result.current.seasonSummary).toEqual({ season_name: 'Summer 2024' });
         expect(result.current.balanceCheck).toEqual({ is_balanced: true });
+        // Widgets not in the layout fall back to empty values
+        expect(result.current.salesByCrop).toEqual([]);
+        expect(result.current.topCustomers).toEqual([]);
 
         // Verify states
         expect(result.current.isError).toBe(false);
+
+        // Single round trip
+        expect(reportsApi.getDashboardBatch).toHaveBeenCalledTimes(1);
+    });
+
+    test('should send the user layout with the batch request', async () => {
+        reportsApi.getDashboardBatch.mockResolvedValue({ widgets: ['charts'], data: { sales_by_crop: [] } });
+
+        const { result } = renderHook(
+            () => useDashboard(5, 10, '["charts"]'),
+            { wrapper: createWrapper() }
+        );
+
+        await waitFor(() => expect(result.current.isLoading).toBe(false));
+
+        expect(reportsApi.getDashboardBatch).toHaveBeenCalledWith(5, 10, ['charts']);
     });
 
     test('should handle loading state', () => {
         // Mock slow response
-        reportsApi.getDashboardKpis.mockImplementation(() => new Promise(() => { }));
+        reportsApi.getDashboardBatch.mockImplementation(() => new Promise(() => { }));
 
         const { result } = renderHook(() => useDashboard(), { wrapper: createWrapper() });
 
@@ -72,29 +94,26 @@ describe('useDashboard Hook', () => {
     test('should handle API errors gracefully', async () => {
         // Mock errors
         const error = new Error('Failed to fetch');
-        reportsApi.getDashboardKpis.mockRejectedValue(error);
-
-        // Other API calls might succeed or fail, useDashboard handles some with catch()
-        reportsApi.getDashboardAlerts.mockRejectedValue(new Error('Ignored error'));
+        reportsApi.getDashboardBatch.mockRejectedValue(error);
 
         const { result } = renderHook(() => useDashboard(), { wrapper: createWrapper() });
 
         await waitFor(() => expect(result.current.isLoading).toBe(false));
 
         expect(result.current.isError).toBe(true);
-        // Alerts should be empty array due to .catch(() => []) in hook
+        // Lists fall back to empty arrays when the batch fails
         expect(result.current.alerts).toEqual([]);
     });
 
     test('should support refetching', async () => {
-        reportsApi.getDashboardKpis.mockResolvedValue({ total_sales: 1000 });
+        reportsApi.getDashboardBatch.mockResolvedValue({ widgets: ['main_kpis'], data: { kpis: { total_sales: 1000 } } });
 
         const { result } = renderHook(() => useDashboard(), { wrapper: createWrapper() });
 
         await waitFor(() => expect(result.current.isLoading).toBe(false));
 
         // Mock new value for refetch
-        reportsApi.getDashboardKpis.mockResolvedValue({ total_sales: 2000 });
+        reportsApi.getDashboardBatch.mockResolvedValue({ widgets: ['main_kpis'], data: { kpis: { total_sales: 2000 } } });
 
         await result.current.refetchKpis();
 
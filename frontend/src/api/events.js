@@ -0,0 +1,26 @@
+/**
+ * Live Updates (Server-Sent Events)
+ * الاشتراك في التحديثات الحية: kpis, kpi_delta, notification, treasury
+ */
+
+const STREAM_URL = '/api/v1/events/stream';
+
+/**
+ * فتح اتصال SSE وربط المعالجات بأسماء الأحداث
+ * @returns {Function|null} دالة إغلاق الاتصال، أو null إذا كان المتصفح لا يدعم EventSource
+ */
+export const subscribeToEvents = (token, handlers = {}, onError = null) => {
+    if (!token || typeof EventSource === 'undefined') return null;
+
+    const source = new EventSource(`${STREAM_URL}?token=${encodeURIComponent(token)}`);
+
+    Object.entries(handlers).forEach(([eventType, handler]) => {
+        source.addEventListener(eventType, (event) => handler(JSON.parse(event.data)));
+    });
+
+    if (onError) {
+        source.onerror = () => onError(source);
+    }
+
+    return () => source.close();
+};
@@ -14,6 +14,16 @@ export const getUnreadCount = async () => {
     return response.data;
 };
 
+// استطلاع طويل: يرد عند وصول تنبيه جديد أو تغير العدد عن count (أو بعد timeout ثانية)
+// الرد: { count, notifications }؛ يُعاد الاستدعاء مباشرة بالعدد الجديد
+export const pollNotifications = async (count, timeout = 25) => {
+    const response = await apiClient.get(`${API_URL}/poll`, {
+        params: { count, timeout },
+        timeout: (timeout + 10) * 1000
+    });
+    return response.data;
+};
+
 export const markAsRead = async (notificationId) => {
     const response = await apiClient.put(`${API_URL}/${notificationId}/read`, {});
     return response.data;
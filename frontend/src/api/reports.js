@@ -67,6 +67,14 @@ export const getSalesByCrop = async () => {
     return response.data;
 };
 
+// statement: 'income-statement' | 'balance-sheet' | 'cash-flow'
+export const getStatementPeriods = async (statement, startDate, endDate, granularity = 'month') => {
+    const response = await apiClient.get(`${API_URL}/${statement}/periods`, {
+        params: { start_date: startDate, end_date: endDate, granularity }
+    });
+    return response.data;
+};
+
 export const getCashFlowReport = async (startDate, endDate) => {
     const response = await apiClient.get(`${API_URL}/cash-flow`, {
         params: { start_date: startDate, end_date: endDate }
@@ -82,13 +90,22 @@ export const getCashFlowDetails = async (startDate, endDate, category = null) =>
 };
 
 // Advanced Reports
-export const getCropProfitability = async (seasonId = null) => {
+// breakdown: 'crop' (الافتراضي) | 'season' | 'month'
+export const getCropProfitability = async (seasonId = null, breakdown = null) => {
     const params = {};
     if (seasonId) params.season_id = seasonId;
+    if (breakdown) params.breakdown = breakdown;
     const response = await apiClient.get(`${API_URL}/crop-profitability`, { params });
     return response.data;
 };
 
+export const getSeasonComparison = async (seasonIds = []) => {
+    const params = {};
+    if (seasonIds.length) params.season_ids = seasonIds.join(',');
+    const response = await apiClient.get(`${API_URL}/season-comparison`, { params });
+    return response.data;
+};
+
 export const getTopCustomers = async (limit = 10) => {
     const response = await apiClient.get(`${API_URL}/top-customers`, { params: { limit } });
     return response.data;
@@ -106,6 +123,21 @@ export const getRecentActivities = async (limit = 10) => {
     return response.data;
 };
 
+export const getActivityFeed = async (limit = 50, cursor = null) => {
+    const params = { limit };
+    if (cursor) params.cursor = cursor;
+    const response = await apiClient.get(`${API_URL}/dashboard/activity-feed`, { params });
+    return response.data;
+};
+
+export const getDashboardBatch = async (topCustomersLimit = 5, activitiesLimit = 10, widgets = null) => {
+    const params = { top_customers_limit: topCustomersLimit, activities_limit: activitiesLimit };
+    // بدون widgets يستخدم الخادم إعدادات لوحة المستخدم المحفوظة
+    if (Array.isArray(widgets) && widgets.length > 0) params.widgets = widgets.join(',');
+    const response = await apiClient.get(`${API_URL}/dashboard/batch`, { params });
+    return response.data;
+};
+
 export const getSeasonSummary = async () => {
     const response = await apiClient.get(`${API_URL}/dashboard/season-summary`);
     return response.data;
@@ -121,3 +153,33 @@ export const getBalanceCheck = async () => {
     const response = await apiClient.get(`${API_URL}/balance-check`);
     return response.data;
 };
+
+// Streaming Export - تصدير دفتر الأستاذ والقوائم (ledger, sales, purchases, payments, expenses)
+export const downloadExport = async (dataset, format = 'csv', startDate = null, endDate = null) => {
+    const params = { format };
+    if (startDate) params.start_date = startDate;
+    if (endDate) params.end_date = endDate;
+    const response = await apiClient.get(`/exports/${dataset}`, { params, responseType: 'blob' });
+    return response.data;
+};
+
+// --- مهام التقارير في الخلفية ---
+export const submitReportJob = async (reportName, params = {}) => {
+    const response = await apiClient.post('/report-jobs', { report_name: reportName, params });
+    return response.data;
+};
+
+export const getReportJob = async (jobId) => {
+    const response = await apiClient.get(`/report-jobs/${jobId}`);
+    return response.data;
+};
+
+export const getReportJobResult = async (jobId) => {
+    const response = await apiClient.get(`/report-jobs/${jobId}/result`);
+    return response.data;
+};
+
+export const cancelReportJob = async (jobId) => {
+    const response = await apiClient.post(`/report-jobs/${jobId}/cancel`);
+    return response.data;
+};
@@ -0,0 +1,21 @@
+import apiClient from './client';
+
+const API_URL = '/system';
+
+// مهام الصيانة الدورية (التنبيهات، التنظيف، النسخ الاحتياطي...) وآخر نتيجة لكل منها
+export const getScheduledJobs = async () => {
+    const response = await apiClient.get(`${API_URL}/scheduled-jobs`);
+    return response.data;
+};
+
+// تعديل جدول التشغيل (cron) أو إيقاف/تفعيل المهمة
+export const updateScheduledJob = async (name, data) => {
+    const response = await apiClient.put(`${API_URL}/scheduled-jobs/${name}`, data);
+    return response.data;
+};
+
+// تشغيل المهمة في دورة المجدول التالية
+export const runScheduledJob = async (name) => {
+    const response = await apiClient.post(`${API_URL}/scheduled-jobs/${name}/run`, {});
+    return response.data;
+};
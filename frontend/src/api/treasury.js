@@ -3,9 +3,11 @@ import { CashReceiptSchema, CashPaymentSchema, QuickExpenseSchema } from '../sch
 
 const API_URL = '/treasury';
 
-export const getTreasurySummary = async (date) => {
+// accountIds: أدراج/بنوك محددة (الافتراضي كل حسابات النقدية)؛ accounts في الرد = مركز كل حساب
+export const getTreasurySummary = async (date, accountIds = null) => {
     const response = await apiClient.get(`${API_URL}/summary`, {
-        params: { target_date: date }
+        params: { target_date: date, account_ids: accountIds },
+        paramsSerializer: { indexes: null }
     });
     return response.data;
 };
@@ -17,6 +19,32 @@ export const getTreasuryTransactions = async (date, limit = 100) => {
     return response.data;
 };
 
+// دفتر النقدية لفترة مع الرصيد الجاري؛ nextCursor للصفحة التالية (null = آخر صفحة)
+export const getCashBook = async (startDate, endDate, cursor = null, limit = 500, accountIds = null) => {
+    const params = { start_date: startDate, end_date: endDate, limit };
+    if (cursor) params.cursor = cursor;
+    if (accountIds) params.account_ids = accountIds;
+    const response = await apiClient.get(`${API_URL}/transactions`, {
+        params,
+        paramsSerializer: { indexes: null }
+    });
+    return { items: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
+export const getTreasuryDayCloses = async (startDate, endDate, closedOnly = false) => {
+    const response = await apiClient.get(`${API_URL}/day-closes`, {
+        params: { start_date: startDate, end_date: endDate, closed_only: closedOnly }
+    });
+    return response.data;
+};
+
+export const closeTreasuryDay = async (closeDate, countedCash, notes = null) => {
+    const response = await apiClient.post(`${API_URL}/day-close`, {
+        close_date: closeDate, counted_cash: countedCash, notes
+    });
+    return response.data;
+};
+
 export const createCashReceipt = async (receiptData) => {
     const validatedData = CashReceiptSchema.parse(receiptData);
     const response = await apiClient.post(`${API_URL}/cash-receipt`, validatedData);
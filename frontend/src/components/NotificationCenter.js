@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import * as notifApi from '../api/notifications';
+import { subscribeToEvents } from '../api/events';
 import { FaBell, FaExclamationTriangle, FaInfoCircle, FaCheckCircle, FaExclamationCircle } from 'react-icons/fa';
 import { useNavigate } from 'react-router-dom';
 
@@ -33,17 +34,35 @@ const NotificationCenter = () => {
         }
     }, [token]);
 
-    // Initial load and periodic polling
+    // Initial load, then live updates (polling only as a fallback)
     useEffect(() => {
         if (!token) return;
 
         loadUnreadCount();
 
-        const pollInterval = setInterval(() => {
-            loadUnreadCount();
-        }, 60000);
+        let pollInterval = null;
+        const startPolling = () => {
+            if (!pollInterval) {
+                pollInterval = setInterval(loadUnreadCount, 60000);
+            }
+        };
+
+        const unsubscribe = subscribeToEvents(token, {
+            notification: (notification) => {
+                setUnreadCount((count) => count + 1);
+                setNotifications((items) => [notification, ...items]);
+            }
+        }, (source) => {
+            // EventSource يعيد الاتصال تلقائياً؛ نرجع للاستطلاع فقط عند الإغلاق النهائي
+            if (source.readyState === EventSource.CLOSED) startPolling();
+        });
+
+        if (!unsubscribe) startPolling();
 
-        return () => clearInterval(pollInterval);
+        return () => {
+            if (unsubscribe) unsubscribe();
+            if (pollInterval) clearInterval(pollInterval);
+        };
     }, [token, loadUnreadCount]);
 
     const loadNotifications = async () => {
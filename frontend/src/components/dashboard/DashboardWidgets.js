@@ -205,6 +205,9 @@ export function ActivityItem({ activity, formatCurrency, formatRelativeTime }) {
         }
     };
 
+    typeConfig.payment_in = typeConfig.sale;
+    typeConfig.payment_out = typeConfig.purchase;
+
     const config = typeConfig[activity.type] || typeConfig.expense;
 
     return (
@@ -1,19 +1,13 @@
-import { useQueries, useQueryClient } from '@tanstack/react-query';
-import {
-    getDashboardKpis,
-    getDashboardAlerts,
-    getSalesByCrop,
-    getTopCustomers,
-    getRecentActivities,
-    getSeasonSummary,
-    getBalanceCheck
-} from '../api/reports';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
+import { getDashboardBatch } from '../api/reports';
 
 /**
  * Query Keys للـ Dashboard
  */
 export const dashboardKeys = {
     all: ['dashboard'],
+    batch: (layoutKey, topCustomersLimit, activitiesLimit) =>
+        [...dashboardKeys.all, 'batch', layoutKey, topCustomersLimit, activitiesLimit],
     kpis: () => [...dashboardKeys.all, 'kpis'],
     alerts: () => [...dashboardKeys.all, 'alerts'],
     salesByCrop: () => [...dashboardKeys.all, 'salesByCrop'],
@@ -23,83 +17,51 @@ export const dashboardKeys = {
     balanceCheck: () => [...dashboardKeys.all, 'balanceCheck'],
 };
 
+const parseLayout = (layoutKey) => {
+    try {
+        const layout = JSON.parse(layoutKey);
+        return Array.isArray(layout) ? layout : null;
+    } catch {
+        return null;
+    }
+};
+
 /**
  * Hook لجلب جميع بيانات لوحة التحكم
- * يستخدم useQueries لجلب البيانات بشكل متوازي
+ * طلب واحد (/reports/dashboard/batch) يحسب مكونات المستخدم فقط في معاملة قراءة واحدة
+ * layoutKey: إعدادات لوحة المستخدم - تغييرها يعيد الجلب
  */
-export const useDashboard = (topCustomersLimit = 5, activitiesLimit = 10) => {
-    const results = useQueries({
-        queries: [
-            {
-                queryKey: dashboardKeys.kpis(),
-                queryFn: getDashboardKpis,
-                staleTime: 2 * 60 * 1000, // 2 minutes for KPIs
-            },
-            {
-                queryKey: dashboardKeys.alerts(),
-                queryFn: () => getDashboardAlerts().catch(() => []),
-                staleTime: 5 * 60 * 1000,
-            },
-            {
-                queryKey: dashboardKeys.salesByCrop(),
-                queryFn: () => getSalesByCrop().catch(() => []),
-                staleTime: 5 * 60 * 1000,
-            },
-            {
-                queryKey: dashboardKeys.topCustomers(topCustomersLimit),
-                queryFn: () => getTopCustomers(topCustomersLimit).catch(() => []),
-                staleTime: 5 * 60 * 1000,
-            },
-            // New Queries for Enhanced Dashboard
-            {
-                queryKey: dashboardKeys.recentActivities(activitiesLimit),
-                queryFn: () => getRecentActivities(activitiesLimit).catch(() => []),
-                staleTime: 2 * 60 * 1000, // 2 minutes for activities
-            },
-            {
-                queryKey: dashboardKeys.seasonSummary(),
-                queryFn: () => getSeasonSummary().catch(() => null),
-                staleTime: 10 * 60 * 1000, // 10 minutes for season
-            },
-            {
-                queryKey: dashboardKeys.balanceCheck(),
-                queryFn: () => getBalanceCheck().catch(() => ({ is_balanced: null, status: 'غير متاح' })),
-                staleTime: 5 * 60 * 1000, // 5 minutes
-            },
-        ],
+export const useDashboard = (topCustomersLimit = 5, activitiesLimit = 10, layoutKey = null) => {
+    const batchQuery = useQuery({
+        queryKey: dashboardKeys.batch(layoutKey, topCustomersLimit, activitiesLimit),
+        // التخطيط يرسل صراحة حتى لا ننتظر حفظ الإعدادات الجديدة على الخادم
+        queryFn: () => getDashboardBatch(topCustomersLimit, activitiesLimit, layoutKey ? parseLayout(layoutKey) : null),
+        staleTime: 2 * 60 * 1000, // 2 minutes
     });
 
-    const [
-        kpisQuery,
-        alertsQuery,
-        salesByCropQuery,
-        topCustomersQuery,
-        activitiesQuery,
-        seasonQuery,
-        balanceCheckQuery
-    ] = results;
+    const data = batchQuery.data?.data || {};
 
     return {
         // Data
-        kpis: kpisQuery.data,
-        alerts: alertsQuery.data || [],
-        salesByCrop: salesByCropQuery.data || [],
-        topCustomers: topCustomersQuery.data || [],
-        recentActivities: activitiesQuery.data || [],
-        seasonSummary: seasonQuery.data,
-        balanceCheck: balanceCheckQuery.data,
+        kpis: data.kpis,
+        alerts: data.alerts || [],
+        salesByCrop: data.sales_by_crop || [],
+        topCustomers: data.top_customers || [],
+        recentActivities: data.recent_activities || [],
+        seasonSummary: data.season_summary,
+        balanceCheck: data.balance_check,
 
         // Loading states
-        isLoading: results.some(r => r.isLoading),
-        isKpisLoading: kpisQuery.isLoading,
+        isLoading: batchQuery.isLoading,
+        isKpisLoading: batchQuery.isLoading,
 
         // Error states
-        isError: results.some(r => r.isError),
-        error: results.find(r => r.error)?.error,
+        isError: batchQuery.isError,
+        error: batchQuery.error,
 
         // Refetch functions
-        refetchAll: () => Promise.all(results.map(r => r.refetch())),
-        refetchKpis: kpisQuery.refetch,
+        refetchAll: batchQuery.refetch,
+        refetchKpis: batchQuery.refetch,
     };
 };
 
@@ -63,7 +63,7 @@ function Dashboard() {
         balanceCheck,
         isLoading: loading,
         refetchAll
-    } = useDashboard();
+    } = useDashboard(5, 10, user?.dashboard_config);
 
     const [refreshing, setRefreshing] = useState(false);
     const [lastUpdate, setLastUpdate] = useState(null);
@@ -199,7 +199,10 @@ function Dashboard() {
     };
 
     // Loading State
-    if (loading || !kpis) {
+    // Only widgets that render KPIs need them in the batch response
+    const needsKpis = layout.some(id => ['quick_stats', 'main_kpis', 'secondary_kpis'].includes(id));
+
+    if (loading || (needsKpis && !kpis)) {
         return (
             <div className="container mx-auto px-4 py-8">
                 <DashboardSkeleton />
@@ -65,7 +65,7 @@ export default defineConfig({
                         }
                     },
                     {
-                        urlPattern: ({ url }) => url.pathname.startsWith('/api'), // Cache API calls (NetworkFirst is safe)
+                        urlPattern: ({ url }) => url.pathname.startsWith('/api') && !url.pathname.startsWith('/api/v1/events'), // Cache API calls (NetworkFirst is safe); SSE streams bypass the SW
                         handler: 'NetworkFirst',
                         options: {
                             cacheName: 'api-cache',